@@ -2,6 +2,7 @@
 """
 Test-retest reliability analysis: Consistency of grading across multiple trials
 """
+import sys
 import sqlite3
 import json
 import pandas as pd
@@ -9,11 +10,15 @@ import numpy as np
 from pathlib import Path
 from scipy import stats
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.evaluation.ratings import GRADE_CODES, GRADE_POINTS
+
 def grade_to_numeric(grade):
-    """Convert letter grade to numeric for consistency calculation"""
-    grade_map = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'E': 0, 'D/E': 0.5}
+    """Convert letter grade to numeric for consistency calculation (rubric scale, 'D'/'E' = 'D/E')"""
     if isinstance(grade, str):
-        return grade_map.get(grade, 2)  # Default to C if unknown
+        code = GRADE_CODES.get(grade, GRADE_CODES['C'])  # Default to C if unknown
+        return float(GRADE_POINTS[code])
     return grade
 
 def analyze_consistency():
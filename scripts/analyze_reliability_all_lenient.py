@@ -15,11 +15,16 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import cohen_kappa_score, confusion_matrix
 from scipy.stats import pearsonr, spearmanr
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.analysis import scores_to_grades, INDONESIAN_THRESHOLDS
+
 ANALYSIS_DIR = PROJECT_ROOT / "analysis"
 BASELINE_FILE = ANALYSIS_DIR / "baseline" / "gold_standard_70_tasks.csv"
 EXPERIMENTS_DIR = ANALYSIS_DIR / "experiments"
@@ -31,14 +36,6 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 TABLES_DIR.mkdir(parents=True, exist_ok=True)
 FIGURES_DIR.mkdir(parents=True, exist_ok=True)
 
-def score_to_grade(score):
-    """Convert numerical score to letter grade"""
-    if score >= 3.6: return 'A'
-    elif score >= 3.0: return 'B'
-    elif score >= 2.0: return 'C'
-    elif score >= 1.0: return 'D'
-    else: return 'E'
-
 def load_baseline():
     """Load expert gold standard grades"""
     print("\n" + "="*70)
@@ -123,8 +120,8 @@ def aggregate_scores(df):
     aggregated['grade_mode'] = grouped.apply(get_mode_grade).values
     
     # Also calculate grade from mean score
-    aggregated['grade_from_mean'] = aggregated['score_mean'].apply(score_to_grade)
-    aggregated['grade_from_median'] = aggregated['score_median'].apply(score_to_grade)
+    aggregated['grade_from_mean'] = scores_to_grades(aggregated['score_mean'], INDONESIAN_THRESHOLDS).astype(str)
+    aggregated['grade_from_median'] = scores_to_grades(aggregated['score_median'], INDONESIAN_THRESHOLDS).astype(str)
     
     print(f"\n  📊 Aggregation Statistics:")
     print(f"     Unique tasks: {len(aggregated)}")
@@ -39,14 +39,6 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 FIGURES_DIR.mkdir(parents=True, exist_ok=True)
 
 # Grade conversion
-def score_to_grade(score):
-    """Convert numerical score to letter grade"""
-    if score >= 3.6: return 'A'
-    elif score >= 3.0: return 'B'
-    elif score >= 2.0: return 'C'
-    elif score >= 1.0: return 'D'
-    else: return 'E'
-
 def grade_to_numeric(grade):
     """Convert letter grade to numeric for correlation"""
     mapping = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'E': 0}
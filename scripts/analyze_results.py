@@ -3,7 +3,8 @@ Analysis Script - Process Experiment Results
 
 This script processes experiment results and generates comprehensive analysis:
 1. Load experiment results
-2. Calculate all metrics (agreement, consistency, accuracy)
+2. Calculate all metrics (agreement, consistency, accuracy) for every
+   criterion and agent in one batched pass
 3. Generate visualizations
 4. Create LaTeX-formatted tables
 5. Export comprehensive report
@@ -13,7 +14,7 @@ import json
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Optional
 import sys
 
 # Add src to path
@@ -22,11 +23,15 @@ sys.path.append(str(Path(__file__).parent.parent))
 from src.evaluation.agreement import AgreementMetrics
 from src.evaluation.consistency import ConsistencyMetrics
 from src.evaluation.accuracy import AccuracyMetrics
+from src.evaluation.grouped import consensus_grades, grouped_metrics
+from src.evaluation.ratings import RatingMatrix
 from src.evaluation.visualizer import MetricsVisualizer
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+AGENTS = ('ChatGPT', 'Gemini')
+
 
 class ResultsAnalyzer:
     """
@@ -61,156 +66,156 @@ class ResultsAnalyzer:
         logger.info(f"Loaded results from {results_file}")
         return results
     
-    def organize_results_by_criterion(self, results: Dict) -> Dict[str, Dict]:
+    def results_to_frame(self, results: Dict) -> pd.DataFrame:
         """
-        Organize results by criterion for analysis.
+        Flatten results into long format for the grouped metrics.
         
         Returns:
-            Dict mapping criterion names to organized data
+            DataFrame with one row per criterion, agent, trial and essay:
+            criterion, agent, trial, essay, grade, lecturer_grade
         """
-        organized = {}
-        
-        # Get rubric criteria
-        rubric = results['metadata']['rubric']
-        criteria = list(rubric['criteria'].keys())
-        
-        # Organize by criterion
-        for criterion in criteria:
-            organized[criterion] = {
-                'chatgpt': {'trials': [[] for _ in range(4)]},
-                'gemini': {'trials': [[] for _ in range(4)]},
-                'lecturer': []
-            }
+        criteria = list(results['metadata']['rubric']['criteria'].keys())
+        agents = (('ChatGPT', 'chatgpt_result'), ('Gemini', 'gemini_result'))
         
-        # Process each trial
+        rows = []
         for trial_idx, trial_data in enumerate(results['trials']):
-            for essay in trial_data['results']:
-                # Get lecturer scores
-                if trial_idx == 0:  # Only add lecturer once
-                    for criterion in criteria:
-                        lecturer_grade = essay['lecturer_scores'][criterion]['grade']
-                        organized[criterion]['lecturer'].append(lecturer_grade)
-                
-                # ChatGPT scores
-                if 'chatgpt_result' in essay and essay['chatgpt_result']:
+            for essay_idx, essay in enumerate(trial_data['results']):
+                for agent, key in agents:
+                    if not essay.get(key):
+                        continue
                     for criterion in criteria:
-                        grade = essay['chatgpt_result']['grades'][criterion]['grade']
-                        organized[criterion]['chatgpt']['trials'][trial_idx].append(grade)
-                
-                # Gemini scores
-                if 'gemini_result' in essay and essay['gemini_result']:
-                    for criterion in criteria:
-                        grade = essay['gemini_result']['grades'][criterion]['grade']
-                        organized[criterion]['gemini']['trials'][trial_idx].append(grade)
+                        rows.append((
+                            criterion, agent, trial_idx + 1, essay_idx,
+                            essay[key]['grades'][criterion]['grade'],
+                            essay['lecturer_scores'][criterion]['grade']
+                        ))
+        
+        return pd.DataFrame(rows, columns=['criterion', 'agent', 'trial', 'essay',
+                                           'grade', 'lecturer_grade'])
+    
+    def final_grades(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Each agent's modal grade per essay plus the lecturer grade.
+        
+        Returns:
+            Long DataFrame with criterion, agent ('ChatGPT', 'Gemini',
+            'Lecturer'), essay and grade
+        """
+        consensus = consensus_grades(frame, item='essay', grade='grade', by=['criterion', 'agent'])
+        lecturer = frame.drop_duplicates(['criterion', 'essay'])[['criterion', 'essay', 'lecturer_grade']] \
+            .rename(columns={'lecturer_grade': 'grade'}).assign(agent='Lecturer')
+        return pd.concat([consensus, lecturer], ignore_index=True)
+    
+    def calculate_grouped_metrics(
+        self,
+        frame: pd.DataFrame,
+        final: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Calculate all metrics for all criteria and agents in one batched pass.
         
-        return organized
+        Consistency and reliability are computed across trials, accuracy
+        from each essay's modal grade against the lecturer, and
+        fleiss_kappa_agents across the modal ChatGPT / Gemini grades and
+        the lecturer.
+        
+        Args:
+            frame: Output of results_to_frame
+            final: Output of final_grades (computed when omitted)
+        
+        Returns:
+            Tidy DataFrame with one row per (criterion, agent)
+        """
+        metrics = grouped_metrics(frame, item='essay', rater='trial', grade='grade',
+                                  by=['criterion', 'agent'], reference='lecturer_grade')
+        
+        # Agents' modal grades plus the lecturer as three raters per criterion
+        if final is None:
+            final = self.final_grades(frame)
+        agreement = grouped_metrics(final, item='essay', rater='agent', grade='grade', by='criterion')
+        agreement = agreement[['criterion', 'fleiss_kappa']].rename(columns={'fleiss_kappa': 'fleiss_kappa_agents'})
+        
+        return metrics.merge(agreement, on='criterion', how='left')
     
-    def calculate_all_metrics(self, organized_data: Dict[str, Dict]) -> Dict[str, Dict]:
+    def calculate_detailed_metrics(
+        self,
+        frame: pd.DataFrame,
+        final: Optional[pd.DataFrame] = None
+    ) -> Dict[str, Dict]:
         """
-        Calculate all metrics for all criteria.
+        Per-criterion metric dictionaries for the figures and complete_metrics.json.
+        
+        The grades are encoded once into two grouped RatingMatrix stores
+        (trials per criterion and agent, final grades per criterion); the
+        metric classes work on views of them.
+        
+        Args:
+            frame: Output of results_to_frame
+            final: Output of final_grades (computed when omitted)
         
         Returns:
-            Comprehensive metrics dictionary
+            Dict mapping criterion to its agreement, consistency and accuracy results
         """
-        all_metrics = {}
+        if final is None:
+            final = self.final_grades(frame)
+        trials = RatingMatrix.from_frame(frame, item='essay', rater='trial', grade='grade',
+                                         by=['criterion', 'agent'])
+        final = RatingMatrix.from_frame(final, item='essay', rater='agent', grade='grade', by='criterion')
         
-        for criterion, data in organized_data.items():
+        all_metrics = {}
+        for criterion in frame['criterion'].unique():
             logger.info(f"Calculating metrics for criterion: {criterion}")
-            
-            # Get average scores across trials for agreement analysis
-            chatgpt_avg = self._get_average_grades(data['chatgpt']['trials'])
-            gemini_avg = self._get_average_grades(data['gemini']['trials'])
-            lecturer = data['lecturer']
-            
-            # Agreement metrics (Fleiss' Kappa)
-            agreement = self.agreement_calc.calculate_all_agreements(
-                chatgpt_avg, gemini_avg, lecturer, criterion
-            )
-            
-            # Consistency metrics (per agent)
-            chatgpt_consistency = self.consistency_calc.calculate_all_consistency(
-                data['chatgpt']['trials'], "ChatGPT", criterion
-            )
-            gemini_consistency = self.consistency_calc.calculate_all_consistency(
-                data['gemini']['trials'], "Gemini", criterion
-            )
-            
-            # Accuracy metrics (per agent)
-            chatgpt_accuracy = self.accuracy_calc.calculate_all_accuracy(
-                chatgpt_avg, lecturer, "ChatGPT", criterion
-            )
-            gemini_accuracy = self.accuracy_calc.calculate_all_accuracy(
-                gemini_avg, lecturer, "Gemini", criterion
-            )
+            raters = final.group(criterion)
+            lecturer = raters.select_raters('Lecturer')
             
             all_metrics[criterion] = {
-                'agreement': agreement,
+                'agreement': self.agreement_calc.calculate_all_agreements(
+                    raters.select_raters('ChatGPT'), raters.select_raters('Gemini'), lecturer, criterion
+                ),
                 'consistency': {
-                    'ChatGPT': chatgpt_consistency,
-                    'Gemini': gemini_consistency
+                    agent: self.consistency_calc.calculate_all_consistency(
+                        trials.group((criterion, agent)), agent, criterion
+                    )
+                    for agent in AGENTS
                 },
                 'accuracy': {
-                    'ChatGPT': chatgpt_accuracy,
-                    'Gemini': gemini_accuracy
+                    agent: self.accuracy_calc.calculate_all_accuracy(
+                        raters.select_raters(agent), lecturer, agent, criterion
+                    )
+                    for agent in AGENTS
                 }
             }
         
         return all_metrics
     
-    def _get_average_grades(self, trials: List[List[str]]) -> List[str]:
-        """
-        Get average grade across trials using mode (most common).
-        """
-        if not trials or not trials[0]:
-            return []
-        
-        n_essays = len(trials[0])
-        avg_grades = []
-        
-        for i in range(n_essays):
-            essay_grades = [trial[i] for trial in trials if i < len(trial)]
-            # Use mode (most common grade)
-            mode_grade = pd.Series(essay_grades).mode()[0]
-            avg_grades.append(mode_grade)
-        
-        return avg_grades
-    
-    def generate_summary_table(self, metrics: Dict[str, Dict]) -> pd.DataFrame:
+    def generate_summary_table(self, metrics: pd.DataFrame) -> pd.DataFrame:
         """
         Generate summary table for all criteria.
         
+        Args:
+            metrics: Output of calculate_grouped_metrics
+        
         Returns:
             DataFrame with key metrics for each criterion
         """
-        rows = []
+        wide = metrics.pivot(index='criterion', columns='agent',
+                             values=['icc_2_1', 'mean_cv', 'mae', 'f1_score'])
+        agents_kappa = metrics.groupby('criterion', sort=False)['fleiss_kappa_agents'].first()
         
-        for criterion, data in metrics.items():
-            # Agreement
-            fleiss_kappa = data['agreement']['fleiss_kappa']['kappa']
-            
-            # Consistency
-            chatgpt_icc = data['consistency']['ChatGPT']['intraclass_correlation']['icc']
-            gemini_icc = data['consistency']['Gemini']['intraclass_correlation']['icc']
-            chatgpt_cv = data['consistency']['ChatGPT']['coefficient_of_variation']['mean_cv']
-            gemini_cv = data['consistency']['Gemini']['coefficient_of_variation']['mean_cv']
-            
-            # Accuracy
-            chatgpt_mae = data['accuracy']['ChatGPT']['mae']['mae']
-            gemini_mae = data['accuracy']['Gemini']['mae']['mae']
-            chatgpt_f1 = data['accuracy']['ChatGPT']['precision_recall_f1']['f1_score']
-            gemini_f1 = data['accuracy']['Gemini']['precision_recall_f1']['f1_score']
-            
+        rows = []
+        for criterion in metrics['criterion'].unique():
+            row = wide.loc[criterion]
             rows.append({
                 'Criterion': criterion,
-                'Fleiss Kappa': f"{fleiss_kappa:.3f}",
-                'ChatGPT ICC': f"{chatgpt_icc:.3f}",
-                'Gemini ICC': f"{gemini_icc:.3f}",
-                'ChatGPT CV (%)': f"{chatgpt_cv:.1f}",
-                'Gemini CV (%)': f"{gemini_cv:.1f}",
-                'ChatGPT MAE': f"{chatgpt_mae:.3f}",
-                'Gemini MAE': f"{gemini_mae:.3f}",
-                'ChatGPT F1': f"{chatgpt_f1:.3f}",
-                'Gemini F1': f"{gemini_f1:.3f}"
+                'Fleiss Kappa': f"{agents_kappa[criterion]:.3f}",
+                'ChatGPT ICC': f"{row[('icc_2_1', 'ChatGPT')]:.3f}",
+                'Gemini ICC': f"{row[('icc_2_1', 'Gemini')]:.3f}",
+                'ChatGPT CV (%)': f"{row[('mean_cv', 'ChatGPT')]:.1f}",
+                'Gemini CV (%)': f"{row[('mean_cv', 'Gemini')]:.1f}",
+                'ChatGPT MAE': f"{row[('mae', 'ChatGPT')]:.3f}",
+                'Gemini MAE': f"{row[('mae', 'Gemini')]:.3f}",
+                'ChatGPT F1': f"{row[('f1_score', 'ChatGPT')]:.3f}",
+                'Gemini F1': f"{row[('f1_score', 'Gemini')]:.3f}"
             })
         
         return pd.DataFrame(rows)
@@ -233,12 +238,23 @@ class ResultsAnalyzer:
     def create_comprehensive_report(
         self,
         experiment_name: str = "experiment",
-        output_dir: Optional[str] = None
+        output_dir: Optional[str] = None,
+        detailed: bool = True
     ):
         """
         Create comprehensive analysis report.
         
         This is the main function to run after experiments complete.
+        
+        Args:
+            experiment_name: Name of experiment directory
+            output_dir: Output directory (default: results/<experiment>/analysis)
+            detailed: Also build the figures and complete_metrics.json from the
+                      same encoded grades (the summary tables only need the
+                      grouped metrics)
+        
+        Returns:
+            (grouped metrics DataFrame, summary DataFrame)
         """
         if output_dir is None:
             output_dir = self.results_dir / experiment_name / "analysis"
@@ -256,28 +272,42 @@ class ResultsAnalyzer:
         results = self.load_experiment_results(experiment_name)
         
         # Step 2: Organize data
-        logger.info("\n[2/5] Organizing data by criterion...")
-        organized = self.organize_results_by_criterion(results)
+        logger.info("\n[2/5] Organizing data into long format...")
+        frame = self.results_to_frame(results)
         
-        # Step 3: Calculate metrics
+        # Step 3: Calculate metrics (all criteria and agents at once)
         logger.info("\n[3/5] Calculating all metrics...")
-        metrics = self.calculate_all_metrics(organized)
+        final = self.final_grades(frame)
+        grouped = self.calculate_grouped_metrics(frame, final)
+        grouped_csv = output_dir / "metrics_by_group.csv"
+        grouped.to_csv(grouped_csv, index=False)
+        logger.info(f"Saved grouped metrics: {grouped_csv}")
         
         # Step 4: Generate visualizations
-        logger.info("\n[4/5] Generating visualizations...")
-        figures_dir = output_dir / "figures"
-        for criterion, criterion_metrics in metrics.items():
-            self.visualizer.create_comprehensive_report(
-                criterion_metrics['agreement'],
-                criterion_metrics['consistency'],
-                criterion_metrics['accuracy'],
-                criterion,
-                str(figures_dir)
-            )
+        if detailed:
+            logger.info("\n[4/5] Generating visualizations...")
+            metrics = self.calculate_detailed_metrics(frame, final)
+            figures_dir = output_dir / "figures"
+            for criterion, criterion_metrics in metrics.items():
+                self.visualizer.create_comprehensive_report(
+                    criterion_metrics['agreement'],
+                    criterion_metrics['consistency'],
+                    criterion_metrics['accuracy'],
+                    criterion,
+                    str(figures_dir)
+                )
+            
+            # Save complete metrics as JSON
+            metrics_json = output_dir / "complete_metrics.json"
+            with open(metrics_json, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f, indent=2, ensure_ascii=False, default=str)
+            logger.info(f"Saved complete metrics: {metrics_json}")
+        else:
+            logger.info("\n[4/5] Skipping visualizations (summary only)")
         
         # Step 5: Create summary tables
         logger.info("\n[5/5] Creating summary tables...")
-        summary_df = self.generate_summary_table(metrics)
+        summary_df = self.generate_summary_table(grouped)
         
         # Save summary
         summary_csv = output_dir / "metrics_summary.csv"
@@ -288,12 +318,6 @@ class ResultsAnalyzer:
         summary_latex = output_dir / "metrics_summary.tex"
         self.export_latex_table(summary_df, str(summary_latex))
         
-        # Save complete metrics as JSON
-        metrics_json = output_dir / "complete_metrics.json"
-        with open(metrics_json, 'w', encoding='utf-8') as f:
-            json.dump(metrics, f, indent=2, ensure_ascii=False, default=str)
-        logger.info(f"Saved complete metrics: {metrics_json}")
-        
         # Print summary to console
         logger.info("\n" + "="*50)
         logger.info("METRICS SUMMARY")
@@ -304,7 +328,7 @@ class ResultsAnalyzer:
         logger.info(f"✅ ANALYSIS COMPLETE! Results saved to: {output_dir}")
         logger.info("="*50)
         
-        return metrics, summary_df
+        return grouped, summary_df
 
 
 def main():
@@ -332,6 +356,11 @@ def main():
         default=None,
         help='Output directory for analysis (default: results/<experiment>/analysis)'
     )
+    parser.add_argument(
+        '--summary-only',
+        action='store_true',
+        help='Only compute the grouped metrics and summary tables (no figures)'
+    )
     
     args = parser.parse_args()
     
@@ -342,7 +371,8 @@ def main():
     try:
         metrics, summary = analyzer.create_comprehensive_report(
             experiment_name=args.experiment,
-            output_dir=args.output
+            output_dir=args.output,
+            detailed=not args.summary_only
         )
         print("\n✅ Analysis completed successfully!")
         return 0
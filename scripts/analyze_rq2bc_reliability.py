@@ -5,6 +5,7 @@ RQ2b: Trial-to-trial correlation analysis
 RQ2c: ICC, Cronbach's Alpha, SEM, Fleiss' Kappa
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -14,6 +15,11 @@ from sklearn.metrics import cohen_kappa_score
 import warnings
 warnings.filterwarnings('ignore')
 
+# Add project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.evaluation.reliability import reliability_by_group
+
 # Configuration
 DATA_DIR = Path("results_experiment_final/data")
 OUTPUT_DIR = Path("results_experiment_final/rq2_consistency")
@@ -83,63 +89,6 @@ print("="*80 + "\n")
 
 print("[2/2] Calculating ICC, Cronbach's Alpha, SEM...")
 
-def calculate_icc_2_1(data):
-    """
-    Calculate ICC(2,1) - Two-way random effects, absolute agreement, single rater
-    """
-    n_items = data.shape[0]
-    n_raters = data.shape[1]
-    
-    # Mean squares
-    grand_mean = np.mean(data)
-    
-    # Between items variance
-    item_means = np.mean(data, axis=1)
-    ms_rows = np.sum((item_means - grand_mean)**2) * n_raters / (n_items - 1)
-    
-    # Between raters variance
-    rater_means = np.mean(data, axis=0)
-    ms_cols = np.sum((rater_means - grand_mean)**2) * n_items / (n_raters - 1)
-    
-    # Residual variance
-    residuals = data - item_means[:, np.newaxis] - rater_means + grand_mean
-    ms_error = np.sum(residuals**2) / ((n_items - 1) * (n_raters - 1))
-    
-    # ICC(2,1)
-    icc = (ms_rows - ms_error) / (ms_rows + (n_raters - 1) * ms_error + n_raters * (ms_cols - ms_error) / n_items)
-    
-    return icc
-
-def calculate_cronbach_alpha(data):
-    """Calculate Cronbach's Alpha"""
-    n_items = data.shape[0]
-    n_raters = data.shape[1]
-    
-    # Variance of each rater
-    rater_variances = np.var(data, axis=0, ddof=1)
-    
-    # Variance of total scores
-    total_scores = np.sum(data, axis=1)
-    total_variance = np.var(total_scores, ddof=1)
-    
-    # Cronbach's alpha
-    alpha = (n_raters / (n_raters - 1)) * (1 - np.sum(rater_variances) / total_variance)
-    
-    return alpha
-
-def calculate_sem(data):
-    """Calculate Standard Error of Measurement"""
-    # Pooled standard deviation
-    pooled_std = np.std(data)
-    
-    # ICC for reliability
-    icc = calculate_icc_2_1(data)
-    
-    # SEM = SD * sqrt(1 - reliability)
-    sem = pooled_std * np.sqrt(1 - icc)
-    
-    return sem
-
 def calculate_fleiss_kappa(data):
     """Calculate Fleiss' Kappa for multiple raters"""
     # Convert continuous scores to ordinal categories for kappa
@@ -173,6 +122,13 @@ def calculate_fleiss_kappa(data):
     
     return kappa
 
+# ICC, alpha and SEM for every model-strategy in one batched pass
+# (missing trials are estimated instead of dropping the item)
+coefficients = reliability_by_group(
+    df, item=['student_id', 'question_number'], rater='trial_number',
+    value='score', by=['model', 'strategy']
+).set_index(['model', 'strategy'])
+
 # Calculate for each model-strategy
 reliability_results = []
 
@@ -192,14 +148,15 @@ for (model, strategy), group in df.groupby(['model', 'strategy']):
         continue
     
     # Calculate metrics
-    icc = calculate_icc_2_1(data_matrix)
-    alpha = calculate_cronbach_alpha(data_matrix)
-    sem = calculate_sem(data_matrix)
+    row = coefficients.loc[(model, strategy)]
+    icc = row['icc_2_1']
+    alpha = row['cronbach_alpha']
+    sem = row['sem']
     fleiss_k = calculate_fleiss_kappa(data_matrix)
     
     # Mean and SD across all scores
-    mean_score = np.mean(data_matrix)
-    sd_score = np.std(data_matrix)
+    mean_score = row['mean']
+    sd_score = row['sd']
     
     reliability_results.append({
         'model': model,
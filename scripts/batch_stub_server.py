@@ -0,0 +1,223 @@
+"""
+Local stand-in for the OpenAI Files + Batch API.
+
+Implements just enough of the API for ChatGPTAgent's batch mode:
+file upload, batch create/retrieve and file content download. Every
+chat completion request is answered with deterministic grades, so a full
+batch run can be tested without an API key or network access.
+
+Usage:
+    python scripts/batch_stub_server.py --port 8080
+    OPENAI_API_KEY=test python scripts/run_batch_experiment.py \
+        --experiment_id stub_test --strategy zero-shot --base-url http://localhost:8080/v1 --poll-interval 1
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+GRADES = ['A', 'B', 'C', 'D/E']
+CRITERION_PATTERN = re.compile(r'^ {4}"(.+)": \{$', re.MULTILINE)
+
+
+class StubState:
+    """In-memory files and batches."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}    # file_id -> (filename, bytes)
+        self.batches = {}  # batch_id -> batch dict
+        self.counter = 0
+
+    def next_id(self, prefix):
+        with self.lock:
+            self.counter += 1
+            return f"{prefix}-stub{self.counter:06d}"
+
+
+def fake_completion(body):
+    """Build a deterministic chat completion for a grading request."""
+    user_prompt = next(
+        (m['content'] for m in body.get('messages', []) if m['role'] == 'user'), ''
+    )
+    criteria = CRITERION_PATTERN.findall(user_prompt) or ['Overall']
+    digest = hashlib.sha256(user_prompt.encode('utf-8')).digest()
+
+    scores = {
+        criterion: {
+            'grade': GRADES[digest[i % len(digest)] % len(GRADES)],
+            'justification': f"Stub justification for {criterion}, generated by the local batch server."
+        }
+        for i, criterion in enumerate(criteria)
+    }
+    content = json.dumps({'scores': scores, 'overall_comment': 'Stub response'}, ensure_ascii=False)
+
+    prompt_tokens = len(user_prompt) // 4
+    completion_tokens = len(content) // 4
+    return {
+        'id': f"chatcmpl-{digest.hex()[:12]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'stub'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def make_handler(state, polls_before_complete):
+    """Create a request handler bound to the given state."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, payload, status=200):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return self.rfile.read(length)
+
+        def do_POST(self):
+            if self.path.endswith('/files'):
+                self._upload_file()
+            elif self.path.endswith('/batches'):
+                self._create_batch()
+            else:
+                self._send_json({'error': {'message': f"Unknown path {self.path}"}}, 404)
+
+        def do_GET(self):
+            match = re.search(r'/files/([^/]+)/content$', self.path)
+            if match:
+                filename, content = state.files.get(match.group(1), (None, None))
+                if content is None:
+                    self._send_json({'error': {'message': 'File not found'}}, 404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+
+            match = re.search(r'/batches/([^/]+)$', self.path)
+            if match and match.group(1) in state.batches:
+                batch = state.batches[match.group(1)]
+                batch['_polls'] += 1
+                if batch['_polls'] > polls_before_complete:
+                    batch['status'] = 'completed'
+                    batch['completed_at'] = int(time.time())
+                    batch['request_counts']['completed'] = batch['request_counts']['total'] - batch['request_counts']['failed']
+                self._send_json({k: v for k, v in batch.items() if not k.startswith('_')})
+                return
+
+            self._send_json({'error': {'message': f"Unknown path {self.path}"}}, 404)
+
+        def _upload_file(self):
+            header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8')
+            message = BytesParser(policy=HTTP).parsebytes(header + self._read_body())
+
+            filename, content, purpose = 'upload.jsonl', b'', 'batch'
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                if name == 'file':
+                    filename = part.get_filename() or filename
+                    content = part.get_payload(decode=True)
+                elif name == 'purpose':
+                    purpose = part.get_payload(decode=True).decode('utf-8')
+
+            file_id = state.next_id('file')
+            state.files[file_id] = (filename, content)
+            self._send_json({
+                'id': file_id, 'object': 'file', 'bytes': len(content),
+                'created_at': int(time.time()), 'filename': filename,
+                'purpose': purpose, 'status': 'processed'
+            })
+
+        def _create_batch(self):
+            request = json.loads(self._read_body())
+            _, content = state.files[request['input_file_id']]
+
+            outputs = []
+            for line in content.decode('utf-8').splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                outputs.append({
+                    'id': state.next_id('batch_req'),
+                    'custom_id': item['custom_id'],
+                    'response': {
+                        'status_code': 200,
+                        'request_id': state.next_id('req'),
+                        'body': fake_completion(item['body'])
+                    },
+                    'error': None
+                })
+
+            output_id = state.next_id('file')
+            state.files[output_id] = (
+                'output.jsonl',
+                ''.join(json.dumps(o, ensure_ascii=False) + '\n' for o in outputs).encode('utf-8')
+            )
+
+            batch_id = state.next_id('batch')
+            state.batches[batch_id] = {
+                'id': batch_id,
+                'object': 'batch',
+                'endpoint': request['endpoint'],
+                'completion_window': request['completion_window'],
+                'input_file_id': request['input_file_id'],
+                'output_file_id': output_id,
+                'error_file_id': None,
+                'status': 'in_progress',
+                'created_at': int(time.time()),
+                'metadata': request.get('metadata'),
+                'request_counts': {'total': len(outputs), 'completed': 0, 'failed': 0},
+                '_polls': 0
+            }
+            self._send_json({k: v for k, v in state.batches[batch_id].items() if not k.startswith('_')})
+
+        def log_message(self, format, *args):
+            print(f"[stub] {self.command} {self.path}")
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8080, polls_before_complete=1):
+    """Start the stand-in server (blocking)."""
+    server = ThreadingHTTPServer((host, port), make_handler(StubState(), polls_before_complete))
+    print(f"[OK] Batch stub server listening on http://{host}:{port}/v1")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the OpenAI Files + Batch API')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8080, help='Port (default: 8080)')
+    parser.add_argument('--polls', type=int, default=1,
+                       help='Status polls answered with in_progress before completing (default: 1)')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.polls)
+
+
+if __name__ == '__main__':
+    main()
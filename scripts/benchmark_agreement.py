@@ -0,0 +1,245 @@
+"""
+Microbenchmark: agreement metrics on large rating matrices.
+
+Compares the vectorized AgreementMetrics implementations (Fleiss' kappa,
+Krippendorff's alpha, pairwise Cohen's kappa) with the previous Python
+loops (kept here as reference implementations), and the batched bootstrap
+engine with a per-resample loop. The loop versions run on a subsample and are extrapolated linearly; the
+vectorized versions run on the full matrix.
+
+Usage:
+    python scripts/benchmark_agreement.py
+    python scripts/benchmark_agreement.py --items 1000000 --raters 10 --missing 0.1
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.evaluation.agreement import AgreementMetrics, category_counts, coincidence_matrix
+from src.evaluation.ratings import RatingMatrix
+from src.evaluation.bootstrap import bootstrap_ci, fleiss_kappa_batch
+
+
+def make_codes(n_items, n_raters, n_categories, missing, seed=42):
+    """Synthetic integer-coded ratings with some agreement and missing cells (-1)."""
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(0, n_categories, size=(n_items, 1))
+    noise = rng.integers(0, n_categories, size=(n_items, n_raters))
+    codes = np.where(rng.random((n_items, n_raters)) < 0.6, truth, noise).astype(np.int8)
+    codes[rng.random((n_items, n_raters)) < missing] = -1
+    return codes
+
+
+def legacy_fleiss_kappa(ratings, categories):
+    """Previous implementation: Python double loop with categories.index per cell."""
+    ratings = np.array(ratings)
+    n_items, n_raters = ratings.shape
+    freq_matrix = np.zeros((n_items, len(categories)))
+    for i, item_ratings in enumerate(ratings):
+        for rating in item_ratings:
+            if rating in categories:
+                freq_matrix[i, categories.index(rating)] += 1
+    P_bar = np.mean(np.sum(freq_matrix * (freq_matrix - 1), axis=1) / (n_raters * (n_raters - 1)))
+    P_bar_e = np.sum((np.sum(freq_matrix, axis=0) / (n_items * n_raters)) ** 2)
+    return (P_bar - P_bar_e) / (1 - P_bar_e)
+
+
+def legacy_krippendorff_alpha(ratings):
+    """Previous nominal implementation: loops over items x values x values."""
+    ratings = np.array(ratings, dtype=float)
+    n_raters, n_items = ratings.shape
+    values = np.unique(ratings[~np.isnan(ratings)])
+    n_values = len(values)
+    coincidence = np.zeros((n_values, n_values))
+    for item in range(n_items):
+        item_ratings = ratings[:, item]
+        valid_ratings = item_ratings[~np.isnan(item_ratings)]
+        n_valid = len(valid_ratings)
+        if n_valid < 2:
+            continue
+        for i, val1 in enumerate(values):
+            for j, val2 in enumerate(values):
+                count1 = np.sum(valid_ratings == val1)
+                count2 = np.sum(valid_ratings == val2)
+                if i == j:
+                    coincidence[i, j] += count1 * (count1 - 1) / (n_valid - 1)
+                else:
+                    coincidence[i, j] += count1 * count2 / (n_valid - 1)
+    return coincidence
+
+
+# Krippendorff (2011) example: 3 coders x 15 units with missing values
+PUBLISHED_EXAMPLE = [
+    [np.nan, np.nan, np.nan, np.nan, np.nan, 3, 4, 1, 2, 1, 1, 3, 3, np.nan, 3],
+    [1, np.nan, 2, 1, 3, 3, 4, 3, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+    [np.nan, np.nan, 2, 1, 3, 4, 4, np.nan, 2, 1, 1, 3, 3, np.nan, 4],
+]
+PUBLISHED_ALPHA = {'nominal': 0.691, 'ordinal': 0.807, 'interval': 0.811, 'ratio': 0.809}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_fleiss(metrics, codes, categories, sample):
+    """Fleiss' kappa: legacy loop (subsample) vs codes, labels and counts input."""
+    n_items = len(codes)
+    labels = np.array(categories, dtype=object)[codes.clip(0)]
+    labels[codes < 0] = None
+
+    # Sanity check on complete data, where both definitions coincide
+    complete = codes[:sample].clip(0)
+    legacy, _ = timed(legacy_fleiss_kappa, np.array(categories)[complete], categories)
+    vectorized = metrics.fleiss_kappa(complete, categories, input_format='codes')['kappa']
+    assert abs(legacy - vectorized) < 1e-9, (legacy, vectorized)
+    print("[OK] Vectorized and loop Fleiss' kappa agree")
+
+    _, legacy_time = timed(legacy_fleiss_kappa, labels[:sample], categories)
+    result, codes_time = timed(metrics.fleiss_kappa, codes, categories, input_format='codes')
+    _, labels_time = timed(metrics.fleiss_kappa, labels, categories)
+    counts = category_counts(codes, len(categories))
+    _, counts_time = timed(metrics.fleiss_kappa, counts, categories, input_format='counts')
+
+    estimated = legacy_time * n_items / sample
+    print(f"\nFleiss' kappa = {result['kappa']:.4f} over {result['n_items']} items")
+    print(f"Loop (extrapolated from {sample}): {estimated:8.3f}s")
+    print(f"Vectorized, integer codes:        {codes_time:8.3f}s  ({estimated / codes_time:,.0f}x)")
+    print(f"Vectorized, string labels:        {labels_time:8.3f}s  ({estimated / labels_time:,.0f}x)")
+    print(f"Vectorized, count matrix:         {counts_time:8.3f}s")
+
+
+def bench_krippendorff(metrics, codes, sample):
+    """Krippendorff's alpha: legacy loop (subsample) vs vectorized, every level."""
+    n_items = len(codes)
+    for level, expected in PUBLISHED_ALPHA.items():
+        alpha = metrics.krippendorff_alpha(PUBLISHED_EXAMPLE, level)['alpha']
+        assert round(alpha, 3) == expected, (level, alpha, expected)
+    print("[OK] Vectorized Krippendorff's alpha matches the published example")
+
+    # Raters x items, NaN for missing, values 1-4 like grades
+    ratings = np.where(codes >= 0, 4 - codes, np.nan).T
+    reference = legacy_krippendorff_alpha(ratings[:, :2000])
+    coincidence, _ = coincidence_matrix(codes[:2000], 4)
+    assert np.allclose(reference[::-1, ::-1], coincidence)  # Code 0 is value 4
+    print("[OK] Vectorized and loop coincidence matrices agree")
+
+    loop_sample = min(sample, 2000)
+    _, legacy_time = timed(legacy_krippendorff_alpha, ratings[:, :loop_sample])
+    estimated = legacy_time * n_items / loop_sample
+    print(f"\nKrippendorff's alpha over {n_items} items")
+    print(f"Loop, nominal (extrapolated from {loop_sample}): {estimated:8.3f}s")
+    for level in PUBLISHED_ALPHA:
+        result, elapsed = timed(metrics.krippendorff_alpha, ratings, level)
+        print(f"Vectorized, {level:<8} alpha = {result['alpha']:.4f}: {elapsed:8.3f}s  "
+              f"({estimated / elapsed:,.0f}x)")
+
+
+def legacy_pairwise_matrix(metrics, raters_dict):
+    """Previous implementation: cohen_kappa for every pair of raters."""
+    names = list(raters_dict)
+    kappa_matrix = np.eye(len(names))
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            kappa = metrics.cohen_kappa(raters_dict[names[i]], raters_dict[names[j]])['kappa']
+            kappa_matrix[i, j] = kappa_matrix[j, i] = kappa
+    return kappa_matrix
+
+
+def bench_pairwise(metrics, codes, categories, n_items, n_raters, n_resamples):
+    """Pairwise Cohen's kappa: per-pair loop vs one confusion tensor, plus per-pair CIs."""
+    rng = np.random.default_rng(7)
+    codes = codes[:n_items, rng.integers(0, codes.shape[1], size=n_raters)].clip(0)  # Complete data
+    labels = np.array(categories, dtype=object)[codes]
+    raters_dict = {f'rater_{r}': labels[:, r] for r in range(n_raters)}
+    matrix = RatingMatrix(codes, raters=list(raters_dict))
+
+    legacy, legacy_time = timed(legacy_pairwise_matrix, metrics, raters_dict)
+    vectorized, vectorized_time = timed(metrics.pairwise_agreement_matrix, matrix)
+    assert np.allclose(legacy, vectorized.to_numpy()), np.abs(legacy - vectorized.to_numpy()).max()
+    print("[OK] Vectorized and loop pairwise kappa matrices agree")
+
+    n_pairs = n_raters * (n_raters - 1) // 2
+    print(f"\nPairwise Cohen's kappa, {n_raters} raters ({n_pairs} pairs) x {n_items} items")
+    print(f"{'Loop over pairs:':<32}{legacy_time:8.3f}s")
+    print(f"{'Confusion tensor:':<32}{vectorized_time:8.3f}s  ({legacy_time / vectorized_time:,.0f}x)")
+    _, all_time = timed(metrics.pairwise_kappa, matrix)
+    print(f"{'All three weightings:':<32}{all_time:8.3f}s")
+    for n_jobs in (1, -1):
+        _, elapsed = timed(metrics.pairwise_kappa, matrix, n_resamples=n_resamples, seed=42, n_jobs=n_jobs)
+        print(f"{f'+ {n_resamples} resample CIs, n_jobs={n_jobs}:':<32}{elapsed:8.3f}s")
+
+
+def bench_bootstrap(metrics, codes, categories, n_items, n_resamples):
+    """Bootstrap CI of Fleiss' kappa: per-resample loop vs batched engine."""
+    counts = category_counts(codes[:n_items], len(categories))
+
+    loop_resamples = min(n_resamples, 500)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(loop_resamples):
+        indices = rng.integers(0, n_items, size=n_items)
+        metrics.fleiss_kappa(counts[indices], categories, input_format='counts')
+    estimated = (time.perf_counter() - start) * n_resamples / loop_resamples
+
+    print(f"\nBootstrap CI of Fleiss' kappa, {n_items} items, {n_resamples} resamples")
+    print(f"{f'Loop (extrapolated from {loop_resamples}):':<32}{estimated:8.3f}s")
+    for n_jobs in (1, -1):
+        result, elapsed = timed(bootstrap_ci, fleiss_kappa_batch, counts, n_resamples=n_resamples,
+                                method='percentile', seed=42, n_jobs=n_jobs)
+        print(f"{f'Batched, percentile, n_jobs={n_jobs}:':<32}{elapsed:8.3f}s  "
+              f"({estimated / elapsed:,.1f}x)  CI {result['percentile_ci'][0]:.4f} .. "
+              f"{result['percentile_ci'][1]:.4f}")
+    result, elapsed = timed(bootstrap_ci, fleiss_kappa_batch, counts, n_resamples=n_resamples,
+                            method='both', seed=42, n_jobs=-1)
+    print(f"Batched, percentile + BCa:      {elapsed:8.3f}s  BCa CI {result['bca_ci'][0]:.4f} .. "
+          f"{result['bca_ci'][1]:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark agreement metrics')
+    parser.add_argument('--items', type=int, default=1_000_000, help='Number of items (default: 1000000)')
+    parser.add_argument('--raters', type=int, default=10, help='Raters per item (default: 10)')
+    parser.add_argument('--missing', type=float, default=0.05,
+                        help='Fraction of missing ratings (default: 0.05)')
+    parser.add_argument('--sample', type=int, default=20_000,
+                        help='Items used for the loop implementations (default: 20000)')
+    parser.add_argument('--bootstrap-items', type=int, default=1000,
+                        help='Items in the bootstrap benchmark (default: 1000)')
+    parser.add_argument('--resamples', type=int, default=10_000,
+                        help='Bootstrap resamples (default: 10000)')
+    parser.add_argument('--pairwise-raters', type=int, default=23,
+                        help='Raters in the pairwise kappa benchmark (default: 23)')
+    parser.add_argument('--pairwise-resamples', type=int, default=1000,
+                        help='Bootstrap resamples per pair (default: 1000)')
+    args = parser.parse_args()
+
+    metrics = AgreementMetrics()
+    categories = metrics.grade_categories
+    codes = make_codes(args.items, args.raters, len(categories), args.missing)
+    sample = min(args.sample, args.items)
+
+    print(f"{'='*60}")
+    print(f"{args.items} items x {args.raters} raters, {args.missing:.0%} missing")
+    print(f"{'='*60}")
+    bench_fleiss(metrics, codes, categories, sample)
+    print()
+    bench_krippendorff(metrics, codes, sample)
+    print()
+    bench_bootstrap(metrics, codes, categories, min(args.bootstrap_items, args.items), args.resamples)
+    print()
+    bench_pairwise(metrics, codes, categories, min(args.bootstrap_items, args.items),
+                   args.pairwise_raters, args.pairwise_resamples)
+
+
+if __name__ == '__main__':
+    main()
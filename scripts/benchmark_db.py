@@ -0,0 +1,182 @@
+"""
+Benchmark: per-task DatabaseManager overhead.
+
+Replays the writes the experiment runner makes for every task
+(check_exists, insert pending, mark processing, store result) against a
+temporary database in several modes:
+
+    legacy       new connection per call, rollback journal (original behaviour)
+    persistent   one connection per thread, WAL + synchronous=NORMAL
+    transaction  persistent + all tasks of a batch in one transaction()
+    lifecycle    persistent + seed_tasks / start_tasks / complete_task as used
+                 by run_experiment (bulk seed and status transition per batch,
+                 one single-statement finalize per task)
+    write-behind lifecycle with complete_task queued to a WriteBehindWriter
+                 (time until every result is committed; the grading loop
+                 itself only pays for the enqueue)
+
+A second benchmark times resume startup for a large, mostly completed
+experiment: one check_exists per task versus get_completed_keys plus a
+bulk seed_tasks.
+
+Usage:
+    python scripts/benchmark_db.py
+    python scripts/benchmark_db.py --tasks 2000 --batch 70 --resume-tasks 100000
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.db_manager import DatabaseManager
+from src.database.write_behind import WriteBehindWriter
+
+
+GRADES = {'Pemahaman Konten': 'A', 'Organisasi & Struktur': 'B', 'Argumen & Bukti': 'B',
+          'Gaya Bahasa & Mekanik': 'C'}
+
+
+def run_task(db, experiment_id, i):
+    """The DB calls of one graded task, as made by scripts/run_experiment.py."""
+    student_id = f"student_{i // 7:04d}"
+    question_number = i % 7 + 1
+    key = dict(experiment_id=experiment_id, trial_number=1, student_id=student_id,
+               question_number=question_number)
+    common = dict(student_name=f"Mahasiswa {i // 7}", question_text="Jelaskan konsep AES.",
+                  answer_text="Jawaban mahasiswa. " * 50, model='chatgpt', strategy='zero-shot')
+
+    if db.check_exists(**key):
+        return
+    db.insert_or_update(**key, **common, status='pending')
+    db.update_status(**key, status='processing')
+    db.insert_or_update(
+        **key, **common, status='completed', grades=GRADES, weighted_score=3.1,
+        justification='{"stub": "justification"}' * 10, overall_comment='Baik',
+        tokens_used=1500, api_call_time=2.0
+    )
+
+
+def run_lifecycle(db, experiment_id, offset, count, writer=None):
+    """The DB calls of `count` tasks with the task lifecycle API (results via writer if given)."""
+    common = dict(question_text="Jelaskan konsep AES.", answer_text="Jawaban mahasiswa. " * 50)
+    tasks = [
+        dict(trial_number=1, student_id=f"student_{i // 7:04d}", student_name=f"Mahasiswa {i // 7}",
+             question_number=i % 7 + 1, **common)
+        for i in range(offset, offset + count)
+    ]
+    keys = [(1, t['student_id'], t['question_number']) for t in tasks]
+    db.seed_tasks(experiment_id, 'chatgpt', 'zero-shot', tasks)
+    db.start_tasks(experiment_id, keys)
+    for key in keys:
+        (writer or db).complete_task(
+            experiment_id, *key, grades=GRADES, weighted_score=3.1,
+            justification='{"stub": "justification"}' * 10, overall_comment='Baik',
+            tokens_used=1500, api_call_time=2.0
+        )
+
+
+def bench(mode, tasks, batch, workdir):
+    """Time `tasks` tasks in the given mode; returns seconds."""
+    db_path = Path(workdir) / f"{mode}.db"
+    if mode == 'legacy':
+        db = DatabaseManager(db_path, persistent=False, wal=False)
+    else:
+        db = DatabaseManager(db_path)
+
+    start = time.perf_counter()
+    if mode == 'transaction':
+        for offset in range(0, tasks, batch):
+            with db.transaction():
+                for i in range(offset, min(offset + batch, tasks)):
+                    run_task(db, 'bench', i)
+    elif mode == 'lifecycle':
+        for offset in range(0, tasks, batch):
+            run_lifecycle(db, 'bench', offset, min(batch, tasks - offset))
+    elif mode == 'write-behind':
+        with WriteBehindWriter(db) as writer:
+            for offset in range(0, tasks, batch):
+                run_lifecycle(db, 'bench', offset, min(batch, tasks - offset), writer)
+    else:
+        for i in range(tasks):
+            run_task(db, 'bench', i)
+    elapsed = time.perf_counter() - start
+
+    completed, total, _ = db.get_progress('bench')
+    assert completed == total == tasks, (completed, total)
+    db.close()
+    return elapsed
+
+
+def bench_resume(total, workdir, sample=2000):
+    """Time resume startup of a `total`-task experiment that is 90% completed."""
+    db = DatabaseManager(Path(workdir) / "resume.db")
+    tasks = [
+        dict(trial_number=i // 700 + 1, student_id=f"student_{i % 700 // 7:04d}",
+             student_name="Mahasiswa", question_number=i % 7 + 1,
+             question_text="Jelaskan konsep AES.", answer_text="Jawaban mahasiswa. " * 50)
+        for i in range(total)
+    ]
+    db.seed_tasks('resume', 'chatgpt', 'zero-shot', tasks)
+    with db.transaction() as conn:
+        conn.execute("UPDATE grading_results_base SET status = 'completed' WHERE id % 10 != 0")
+    keys = [(t['trial_number'], t['student_id'], t['question_number']) for t in tasks]
+
+    # Old path: one check_exists per task (timed on a sample, extrapolated)
+    legacy = DatabaseManager(Path(workdir) / "resume.db", persistent=False)
+    start = time.perf_counter()
+    for key in keys[:sample]:
+        legacy.check_exists('resume', *key)
+    per_task = (time.perf_counter() - start) / min(sample, total)
+
+    # New path: completed set in one query, then seed the outstanding tasks
+    start = time.perf_counter()
+    completed = db.get_completed_keys('resume')
+    outstanding = [t for t, key in zip(tasks, keys) if key not in completed]
+    db.seed_tasks('resume', 'chatgpt', 'zero-shot', outstanding)
+    bulk = time.perf_counter() - start
+    db.close()
+
+    print(f"\n{'='*60}")
+    print(f"Resume startup for {total} tasks ({len(outstanding)} outstanding)")
+    print(f"{'='*60}")
+    print(f"check_exists per task:   {per_task * total:8.3f}s  (extrapolated from {min(sample, total)} calls)")
+    print(f"get_completed_keys+seed: {bulk:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DatabaseManager per-task overhead')
+    parser.add_argument('--tasks', type=int, default=700, help='Number of tasks (default: 700)')
+    parser.add_argument('--batch', type=int, default=70,
+                       help='Tasks per transaction / seeding batch (default: 70)')
+    parser.add_argument('--dir', default=None,
+                       help='Directory for the temporary databases (default: system temp dir; '
+                            'use a path on the real results disk for realistic fsync cost)')
+    parser.add_argument('--resume-tasks', type=int, default=100000,
+                       help='Experiment size for the resume benchmark (default: 100000, 0 = skip)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        timings = {mode: bench(mode, args.tasks, args.batch, workdir)
+                   for mode in ('legacy', 'persistent', 'transaction', 'lifecycle', 'write-behind')}
+
+    print(f"\n{'='*60}")
+    print(f"DB overhead for {args.tasks} tasks")
+    print(f"{'='*60}")
+    baseline = timings['legacy']
+    for mode, elapsed in timings.items():
+        print(f"{mode:12s} {elapsed:8.3f}s  {elapsed / args.tasks * 1000:7.3f} ms/task  "
+              f"({baseline / elapsed:5.1f}x)")
+
+    if args.resume_tasks:
+        with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+            bench_resume(args.resume_tasks, workdir)
+
+
+if __name__ == '__main__':
+    main()
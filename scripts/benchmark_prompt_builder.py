@@ -0,0 +1,89 @@
+"""
+Microbenchmark: prompt build time for many essays.
+
+Compares the old per-essay path (fresh PromptBuilder, full re-render of
+rubric, strategy text and output format) with the compiled-template path
+(builder reused, static text rendered once, only question/answer
+substituted).
+
+Usage:
+    python scripts/benchmark_prompt_builder.py
+    python scripts/benchmark_prompt_builder.py --essays 10000 --strategy detailed-rubric --layout prefix-cache
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.rubric import RubricManager
+from src.core.prompt_builder import PromptBuilder, PROMPT_LAYOUTS, clear_template_cache
+
+
+def make_essays(count):
+    """Synthetic (question, answer) pairs of realistic length."""
+    return [
+        (
+            f"Soal {i % 7 + 1}: Jelaskan konsep dan penerapan topik nomor {i % 7 + 1} dalam proyek capstone.",
+            f"Jawaban mahasiswa {i}. " + "Penjelasan konsep, contoh penerapan dan analisis singkat. " * 20
+        )
+        for i in range(count)
+    ]
+
+
+def bench_uncached(rubric, essays, language, strategy, layout):
+    """Old path: new builder and full render for every essay."""
+    start = time.perf_counter()
+    for question, answer in essays:
+        builder = PromptBuilder(rubric, language=language, strategy=strategy, layout=layout)
+        builder._render_grading_prompt(question, answer)
+        builder.get_system_prompt()
+    return time.perf_counter() - start
+
+
+def bench_compiled(rubric, essays, language, strategy, layout):
+    """New path: one builder, compiled template reused for every essay."""
+    clear_template_cache()
+    start = time.perf_counter()
+    builder = PromptBuilder(rubric, language=language, strategy=strategy, layout=layout)
+    for question, answer in essays:
+        builder.build_grading_prompt(question, answer)
+        builder.get_system_prompt()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prompt building')
+    parser.add_argument('--essays', type=int, default=10000, help='Number of essays (default: 10000)')
+    parser.add_argument('--language', default='indonesian', choices=['indonesian', 'english'])
+    parser.add_argument('--strategy', default='few-shot',
+                       choices=['zero-shot', 'few-shot', 'cot', 'lenient', 'detailed-rubric', 'strict'])
+    parser.add_argument('--layout', default='standard', choices=PROMPT_LAYOUTS)
+    args = parser.parse_args()
+
+    rubric = RubricManager().get_rubric("default")
+    essays = make_essays(args.essays)
+
+    # Sanity check: both paths produce identical prompts
+    builder = PromptBuilder(rubric, language=args.language, strategy=args.strategy, layout=args.layout)
+    for question, answer in essays[:50]:
+        assert builder.build_grading_prompt(question, answer) == builder._render_grading_prompt(question, answer)
+    print("[OK] Compiled and uncached prompts are identical")
+
+    uncached = bench_uncached(rubric, essays, args.language, args.strategy, args.layout)
+    compiled = bench_compiled(rubric, essays, args.language, args.strategy, args.layout)
+
+    print(f"\n{'='*60}")
+    print(f"Prompt build time for {args.essays} essays ({args.language}, {args.strategy}, {args.layout})")
+    print(f"{'='*60}")
+    print(f"Uncached (builder per essay): {uncached:8.3f}s  ({uncached / args.essays * 1e6:8.1f} us/essay)")
+    print(f"Compiled template:            {compiled:8.3f}s  ({compiled / args.essays * 1e6:8.1f} us/essay)")
+    print(f"Speedup:                      {uncached / compiled:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
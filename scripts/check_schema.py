@@ -3,11 +3,21 @@ import sqlite3
 conn = sqlite3.connect('results/grading_results.db')
 cur = conn.cursor()
 
-cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='grading_results'")
-schema = cur.fetchone()[0]
+# grading_results is a view over grading_results_base and the text tables
+cur.execute("""
+    SELECT type, name, sql FROM sqlite_master
+    WHERE type IN ('table', 'view')
+    AND name IN ('grading_results_base', 'questions', 'answers', 'grading_results')
+    ORDER BY CASE name
+        WHEN 'grading_results_base' THEN 1 WHEN 'questions' THEN 2
+        WHEN 'answers' THEN 3 ELSE 4 END
+""")
+schemas = cur.fetchall()
 
 print("DATABASE SCHEMA:")
 print("="*70)
-print(schema)
+for object_type, name, schema in schemas:
+    print(f"\n-- {object_type} {name}")
+    print(schema)
 
 conn.close()
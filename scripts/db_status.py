@@ -106,6 +106,26 @@ def show_experiment_details(db: DatabaseManager, experiment_id: str):
         headers = ['Trial', 'Completed', 'Total', 'Progress']
         print(tabulate(trial_data, headers=headers, tablefmt='grid'))
         print()
+    
+    # Live consistency across trials (running totals, no re-scan of the results)
+    live = db.get_live_reliability(experiment_id)
+    if live:
+        print("Live Reliability (approximate until every trial is complete):")
+        live_data = []
+        for criterion, metrics in live.items():
+            live_data.append([
+                criterion,
+                metrics['n_items'],
+                metrics['n_raters'],
+                f"{metrics['fleiss_kappa']:.3f}",
+                f"{metrics['icc_2_1']:.3f}",
+                f"{metrics['perfect_agreement_pct']:.1f}%",
+                f"{metrics['mean_sd']:.3f}"
+            ])
+        
+        headers = ['Criterion', 'Items', 'Trials', "Fleiss' Kappa", 'ICC(2,1)', 'Perfect Agr.', 'Mean SD']
+        print(tabulate(live_data, headers=headers, tablefmt='grid'))
+        print()
 
 
 def show_failed_tasks(db: DatabaseManager, experiment_id: str):
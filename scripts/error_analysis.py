@@ -33,14 +33,6 @@ FIGURES_DIR.mkdir(parents=True, exist_ok=True)
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-def score_to_grade(score):
-    """Convert numerical score to letter grade"""
-    if score >= 3.6: return 'A'
-    elif score >= 3.0: return 'B'
-    elif score >= 2.0: return 'C'
-    elif score >= 1.0: return 'D'
-    else: return 'E'
-
 def load_baseline():
     """Load expert gold standard grades"""
     print("\n" + "="*70)
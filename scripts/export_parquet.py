@@ -0,0 +1,55 @@
+"""
+Export grading results to partitioned Parquet for the analysis stack.
+
+Writes hive-partitioned datasets (model/strategy/experiment_id) of the
+results and per-criterion grades. Reruns only rewrite experiments whose
+rows changed since the last export.
+
+Usage:
+    python scripts/export_parquet.py
+    python scripts/export_parquet.py --experiment exp_chatgpt_lenient_01 --experiment exp_gemini_lenient_01
+    python scripts/export_parquet.py --full --output results/parquet
+
+Loading:
+    from src.database.parquet_export import load_parquet
+    df = load_parquet(columns=['experiment_id', 'student_id', 'weighted_score'],
+                      filters=[('model', '=', 'chatgpt')])
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.db_manager import DatabaseManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export grading results to partitioned Parquet')
+    parser.add_argument('--db', default='results/grading_results.db', help='Path to SQLite database')
+    parser.add_argument('--output', default='results/parquet', help='Output root directory')
+    parser.add_argument('--experiment', action='append', default=None,
+                       help='Only refresh this experiment (repeatable; default: all)')
+    parser.add_argument('--full', action='store_true', help='Rewrite every partition')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with DatabaseManager(args.db) as db_manager:
+        summary = db_manager.export_parquet(args.output, experiment_ids=args.experiment, full=args.full)
+    elapsed = time.perf_counter() - start
+
+    for relative in summary['written']:
+        print(f"[OK] Wrote {relative}")
+    for relative in summary['removed']:
+        print(f"[OK] Removed {relative}")
+    print(f"[OK] {len(summary['written'])} partitions written ({summary['rows']} rows), "
+          f"{summary['unchanged']} unchanged, {len(summary['removed'])} removed in {elapsed:.2f}s")
+    print(f"[OK] Parquet datasets in: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ Usage:
     python scripts/export_to_json.py --experiment exp_01
     python scripts/export_to_json.py --experiment exp_01 --trial 1
     python scripts/export_to_json.py --experiment exp_01 --output results/custom_dir
+    python scripts/export_to_json.py --experiment exp_01 --format jsonl
 """
 
 import sys
@@ -17,13 +18,14 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.database.db_manager import DatabaseManager
+from src.database.db_manager import DatabaseManager, EXPORT_FORMATS
 
 
 def export_experiment(
     experiment_id: str,
     trial_number: int = None,
-    output_dir: str = None
+    output_dir: str = None,
+    fmt: str = 'json'
 ):
     """
     Export experiment results to JSON files.
@@ -32,6 +34,8 @@ def export_experiment(
         experiment_id: Experiment identifier
         trial_number: Optional specific trial to export (exports all if None)
         output_dir: Custom output directory (auto-generated if None)
+        fmt: 'json' (trial_N/ directories with one file per student) or
+             'jsonl' (one compact file)
     """
     db = DatabaseManager()
     
@@ -63,23 +67,18 @@ def export_experiment(
     
     print()
     
-    # Export each trial
+    # Export in one streaming pass over the experiment
+    output_path = Path(output_dir) if output_dir else Path(f"results/experiments/{experiment_id}")
+    counts = db.export_results(
+        experiment_id, output_path, trial_number=trial_number, fmt=fmt, trial_subdirs=True
+    )
+    
     for trial in trials:
-        if output_dir:
-            output_path = Path(output_dir) / f"trial_{trial}"
+        if counts.get(trial):
+            location = output_path / f"trial_{trial}" if fmt == 'json' else output_path
+            print(f"  Trial {trial}: Exported {counts[trial]} results to {location}")
         else:
-            output_path = Path(f"results/experiments/{experiment_id}/trial_{trial}")
-        
-        # Check if trial has any completed tasks
-        completed, total, percentage = db.get_progress(experiment_id, trial)
-        
-        if completed == 0:
             print(f"  Trial {trial}: No completed tasks to export")
-            continue
-        
-        # Export
-        db.export_to_json(experiment_id, trial, output_path)
-        print(f"  Trial {trial}: Exported {completed} results to {output_path}")
     
     print()
     print("✅ Export complete!")
@@ -105,13 +104,20 @@ def main():
         type=str,
         help='Custom output directory (optional, auto-generated if not specified)'
     )
+    parser.add_argument(
+        '--format',
+        choices=EXPORT_FORMATS,
+        default='json',
+        help='json: one file per student and trial; jsonl: one compact file (default: json)'
+    )
     
     args = parser.parse_args()
     
     export_experiment(
         experiment_id=args.experiment,
         trial_number=args.trial,
-        output_dir=args.output
+        output_dir=args.output,
+        fmt=args.format
     )
 
 
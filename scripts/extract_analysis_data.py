@@ -3,11 +3,10 @@ Extract and organize all experimental data for comprehensive analysis.
 Creates structured analysis folder with baseline, experiments, and metrics.
 """
 
-import sqlite3
+import sys
 import json
 import pandas as pd
 from pathlib import Path
-from collections import defaultdict
 import numpy as np
 
 # Paths
@@ -16,90 +15,66 @@ DB_PATH = PROJECT_ROOT / "results" / "grading_results.db"
 BASELINE_DIR = PROJECT_ROOT / "results" / "baseline_batch"
 ANALYSIS_DIR = PROJECT_ROOT / "analysis"
 
-# Grade conversion
-def score_to_grade(score):
-    """Convert numerical score to letter grade (Indonesian system)"""
-    if score >= 3.6: return 'A'
-    elif score >= 3.0: return 'B'
-    elif score >= 2.0: return 'C'
-    elif score >= 1.0: return 'D'
-    else: return 'E'
+sys.path.insert(0, str(PROJECT_ROOT))
 
-def load_gold_standard():
-    """Load baseline gold standard from JSON files"""
+from src.analysis import get_dataset, scores_to_grades, INDONESIAN_THRESHOLDS
+
+
+def load_gold_standard(data):
+    """Load baseline gold standard (ChatGPT score, else Gemini) with task text"""
     print("Loading baseline gold standard...")
     
-    baseline_data = []
-    student_files = sorted(BASELINE_DIR.glob("student_*.json"))
+    baseline = data.baseline()
+    scores = baseline.pivot_table(index=['student_id', 'student_name', 'question_number'],
+                                  columns='model', values='weighted_score', observed=True)
+    scores = scores.reindex(columns=['chatgpt', 'gemini'])
+    df = scores.reset_index()
+    df['weighted_score'] = df['chatgpt'].fillna(df['gemini'])
+    df = df.dropna(subset=['weighted_score'])  # Skip if no score available
     
-    for file in student_files:
-        with open(file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        student_name = data['student_name']
-        
-        for idx, q in enumerate(data['questions'], start=1):
-            # Get weighted score from either chatgpt or gemini
-            weighted_score = q.get('chatgpt', {}).get('weighted_score') or q.get('gemini', {}).get('weighted_score')
-            
-            if weighted_score is None:
-                continue  # Skip if no score available
-            
-            baseline_data.append({
-                'student_name': student_name,
-                'question_number': idx,
-                'question_text': q['question'],
-                'answer': q['answer'],
-                'weighted_score': weighted_score,
-                'grade': score_to_grade(weighted_score)
-            })
+    # Question and answer text as stored with the graded results
+    text = data.with_text(data.results(), columns=['question_text', 'answer_text'])
+    text = text.drop_duplicates(['student_id', 'question_number'])
+    df = df.astype({'student_id': str, 'student_name': str}).merge(
+        text[['student_id', 'question_number', 'question_text', 'answer_text']]
+        .astype({'student_id': str, 'question_text': str}),
+        on=['student_id', 'question_number'], how='left'
+    ).rename(columns={'answer_text': 'answer'})
     
-    df = pd.DataFrame(baseline_data)
-    print(f"  ✅ Loaded {len(df)} baseline tasks from {len(student_files)} students")
+    df['grade'] = scores_to_grades(df['weighted_score'], INDONESIAN_THRESHOLDS).astype(str)
+    df = df[['student_name', 'question_number', 'question_text', 'answer', 'weighted_score', 'grade']]
+    print(f"  ✅ Loaded {len(df)} baseline tasks from {df['student_name'].nunique()} students")
     return df
 
-def extract_experiment_data(conn):
-    """Extract all experiment data from database"""
+def extract_experiment_data(data):
+    """Extract all experiment data from the shared dataset"""
     print("\nExtracting experiment data from database...")
     
-    query = """
-    SELECT 
-        experiment_id,
-        model,
-        strategy,
-        student_name,
-        question_number,
-        weighted_score,
-        status,
-        timestamp
-    FROM grading_results
-    WHERE status = 'completed'
-    ORDER BY experiment_id, student_name, question_number
-    """
-    
-    df = pd.read_sql_query(query, conn)
-    df['grade'] = df['weighted_score'].apply(score_to_grade)
+    df = data.results()[['experiment_id', 'model', 'strategy', 'student_name', 'question_number',
+                         'weighted_score', 'status', 'timestamp']]
+    df = df.astype({column: str for column in ['experiment_id', 'model', 'strategy',
+                                               'student_name', 'status']})
+    df['timestamp'] = df['timestamp'].map(pd.Timestamp.isoformat, na_action='ignore')
+    df = df.sort_values(['experiment_id', 'student_name', 'question_number'],
+                        kind='stable').reset_index(drop=True)
+    df['grade'] = scores_to_grades(df['weighted_score'], INDONESIAN_THRESHOLDS).astype(str)
     
     print(f"  ✅ Extracted {len(df)} completed tasks")
     return df
 
-def get_experiment_metadata(conn):
+def get_experiment_metadata(data):
     """Get metadata for all experiments"""
-    query = """
-    SELECT DISTINCT
-        experiment_id,
-        model,
-        strategy,
-        COUNT(*) as total_tasks,
-        SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_tasks,
-        SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_tasks
-    FROM grading_results
-    GROUP BY experiment_id, model, strategy
-    ORDER BY experiment_id
-    """
-    
-    df = pd.read_sql_query(query, conn)
-    return df
+    df = data.results(completed_only=False)
+    df = df.assign(completed=df['status'] == 'completed', failed=df['status'] == 'failed')
+    return (
+        df.groupby(['experiment_id', 'model', 'strategy'], observed=True)
+        .agg(total_tasks=('id', 'size'), completed_tasks=('completed', 'sum'),
+             failed_tasks=('failed', 'sum'))
+        .reset_index()
+        .astype({'experiment_id': str, 'model': str, 'strategy': str})
+        .sort_values('experiment_id')
+        .reset_index(drop=True)
+    )
 
 def save_baseline_data(baseline_df):
     """Save baseline/gold standard data"""
@@ -272,17 +247,15 @@ def main():
     print("EXTRACTING ALL EXPERIMENTAL DATA FOR ANALYSIS")
     print("="*70)
     
-    # Load baseline
-    baseline_df = load_gold_standard()
+    data = get_dataset(db_path=str(DB_PATH), baseline_dir=str(BASELINE_DIR),
+                       cache_dir=str(PROJECT_ROOT / "results" / ".analysis_cache"))
     
-    # Connect to database
-    conn = sqlite3.connect(DB_PATH)
+    # Load baseline
+    baseline_df = load_gold_standard(data)
     
     # Extract experiment data
-    exp_df = extract_experiment_data(conn)
-    metadata_df = get_experiment_metadata(conn)
-    
-    conn.close()
+    exp_df = extract_experiment_data(data)
+    metadata_df = get_experiment_metadata(data)
     
     # Save all data
     save_baseline_data(baseline_df)
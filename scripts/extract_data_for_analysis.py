@@ -8,11 +8,15 @@ Outputs:
 4. experiment_summary.json - Metadata about experiments
 """
 
-import sqlite3
+import sys
 import pandas as pd
 import json
 from pathlib import Path
-from collections import defaultdict
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.analysis import get_dataset
 
 # Paths
 DB_PATH = "results/grading_results.db"
@@ -23,36 +27,20 @@ print("\n" + "="*80)
 print("EXTRACTING DATA FROM DATABASE")
 print("="*80 + "\n")
 
-# Connect to database
-conn = sqlite3.connect(DB_PATH)
+data = get_dataset(db_path=DB_PATH)
 
 # 1. Extract ALL experiment data
 print("[1/4] Extracting all experiment data...")
-query_all = """
-    SELECT 
-        experiment_id,
-        trial_number,
-        student_id,
-        student_name,
-        question_number,
-        question_text,
-        answer_text,
-        model,
-        strategy,
-        grades,
-        weighted_score,
-        justification,
-        overall_comment,
-        tokens_used,
-        api_call_time,
-        timestamp,
-        status
-    FROM grading_results
-    WHERE status = 'completed'
-    ORDER BY experiment_id, trial_number, student_id, question_number
-"""
 
-df_all = pd.read_sql_query(query_all, conn)
+df_all = data.with_text(data.results())[[
+    'experiment_id', 'trial_number', 'student_id', 'student_name', 'question_number',
+    'question_text', 'answer_text', 'model', 'strategy', 'grades', 'weighted_score',
+    'justification', 'overall_comment', 'tokens_used', 'api_call_time', 'timestamp', 'status'
+]]
+df_all = df_all.astype({column: str for column in ['experiment_id', 'student_id', 'student_name',
+                                                   'model', 'strategy', 'status']})
+# Back to the ISO strings stored in the database
+df_all['timestamp'] = df_all['timestamp'].map(pd.Timestamp.isoformat, na_action='ignore')
 print(f"   ✓ Loaded {len(df_all)} completed gradings")
 
 # Save complete data
@@ -73,39 +61,26 @@ experiment_patterns = {
     'gemini_lenient': [f'exp_gemini_lenient_{i:02d}' for i in range(1, 14)],
 }
 
-per_item_data = []
-
-for strategy_name, exp_ids in experiment_patterns.items():
-    model = strategy_name.split('_')[0]
-    strategy = strategy_name.split('_', 1)[1]
-    
-    for trial_idx, exp_id in enumerate(exp_ids, start=1):
-        query = f"""
-            SELECT 
-                student_id,
-                student_name,
-                question_number,
-                question_text,
-                weighted_score
-            FROM grading_results
-            WHERE experiment_id = ? AND status = 'completed'
-        """
-        
-        df_trial = pd.read_sql_query(query, conn, params=(exp_id,))
-        
-        for _, row in df_trial.iterrows():
-            per_item_data.append({
-                'model': model,
-                'strategy': strategy,
-                'trial_number': trial_idx,
-                'student_id': row['student_id'],
-                'student_name': row['student_name'],
-                'question_number': row['question_number'],
-                'question_text': row['question_text'],
-                'score': row['weighted_score']
-            })
-
-df_per_item = pd.DataFrame(per_item_data)
+# One row per experiment: its model, strategy and trial index within the pattern
+trial_map = pd.DataFrame([
+    {
+        'experiment_id': exp_id,
+        'model': strategy_name.split('_')[0],
+        'strategy': strategy_name.split('_', 1)[1],
+        'trial_number': trial_idx
+    }
+    for strategy_name, exp_ids in experiment_patterns.items()
+    for trial_idx, exp_id in enumerate(exp_ids, start=1)
+])
+
+df_per_item = trial_map.merge(
+    df_all[['experiment_id', 'student_id', 'student_name', 'question_number',
+            'question_text', 'weighted_score']],
+    on='experiment_id'
+).rename(columns={'weighted_score': 'score'})[[
+    'model', 'strategy', 'trial_number', 'student_id', 'student_name',
+    'question_number', 'question_text', 'score'
+]]
 print(f"   ✓ Loaded {len(df_per_item)} per-item scores")
 
 output_file = OUTPUT_DIR / "per_item_scores.csv"
@@ -115,33 +90,27 @@ print(f"   ✓ Saved to: {output_file}")
 # 3. Load gold standard
 print("\n[3/4] Loading gold standard...")
 
-# Use baseline as gold standard
-baseline_path = Path("results/baseline_batch")
-if baseline_path.exists():
-    gold_data = []
+# Use the ChatGPT baseline as gold standard
+baseline = data.baseline(model='chatgpt')
+if len(baseline):
+    criteria = [column for column in baseline.columns
+                if column not in ('student_id', 'student_name', 'question_number', 'model', 'weighted_score')]
+    question_texts = (df_all.drop_duplicates('question_number')
+                      .set_index('question_number')['question_text'])
     
-    for json_file in sorted(baseline_path.glob("student_*.json")):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Extract student info from filename or data
-        student_name = data.get('student_name', '')
-        student_index = data.get('student_index', 0)
-        student_id = f"{student_index:02d}"
-        
-        for i, question_data in enumerate(data['questions'], start=1):
-            # Use ChatGPT baseline as gold standard
-            if 'chatgpt' in question_data:
-                gold_data.append({
-                    'student_id': student_id,
-                    'student_name': student_name,
-                    'question_number': i,
-                    'question_text': question_data.get('question', ''),
-                    'gold_score': question_data['chatgpt']['weighted_score'],
-                    'gold_grades': json.dumps(question_data['chatgpt']['scores'])
-                })
-    
-    df_gold = pd.DataFrame(gold_data)
+    df_gold = pd.DataFrame({
+        # Number from 'student_07'; the analysis scripts add the prefix back
+        'student_id': baseline['student_id'].astype(str).str.replace('student_', '', regex=False),
+        'student_name': baseline['student_name'].astype(str),
+        'question_number': baseline['question_number'],
+        'question_text': baseline['question_number'].map(question_texts).fillna(''),
+        'gold_score': baseline['weighted_score'],
+        'gold_grades': [
+            json.dumps({criterion: {'grade': grade} for criterion, grade in zip(criteria, grades)
+                        if pd.notna(grade)}, ensure_ascii=False)
+            for grades in baseline[criteria].itertuples(index=False)
+        ]
+    })
     print(f"   ✓ Created {len(df_gold)} gold standard entries from baseline")
     
     output_file = OUTPUT_DIR / "gold_standard.csv"
@@ -210,5 +179,3 @@ print(f"2. {OUTPUT_DIR}/per_item_scores.csv")
 print(f"3. {OUTPUT_DIR}/gold_standard.csv")
 print(f"4. {OUTPUT_DIR}/experiment_summary.json")
 print("="*80 + "\n")
-
-conn.close()
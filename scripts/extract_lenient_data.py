@@ -11,58 +11,37 @@ This script filters data to include only:
 import sys
 from pathlib import Path
 import pandas as pd
-import numpy as np
 from datetime import datetime
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.database.db_manager import DatabaseManager
+from src.analysis import get_dataset, scores_to_grades
 
 
-def load_expert_grades(gold_standard_dir):
-    """Load expert grades from gold standard JSON files."""
+# Columns written to the lenient CSVs, in order
+OUTPUT_COLUMNS = [
+    'experiment_id', 'trial_number', 'student_id', 'student_name', 'question_number',
+    'question_text', 'answer_text', 'model', 'strategy', 'grades', 'weighted_score',
+    'justification', 'overall_comment', 'tokens_used', 'api_call_time', 'status', 'aes_grade'
+]
+
+
+def load_expert_grades(data):
+    """Load expert grades from the shared dataset's gold standard."""
     print("\n[1/4] Loading expert grades...")
     
-    import json
-    gold_standard_dir = Path(gold_standard_dir)
-    
-    expert_data = []
-    json_files = list(gold_standard_dir.glob("*.json"))
-    
-    print(f"  Found {len(json_files)} gold standard files")
-    
-    for json_file in json_files:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        student_name = data['student_name']
-        student_id = f"student_{student_name.replace('Mahasiswa ', '').zfill(2)}"
-        
-        for idx, q_data in enumerate(data['questions'], 1):
-            # Calculate letter grade from weighted_score
-            score = q_data['weighted_score']
-            if score >= 3.5:
-                grade = 'A'
-            elif score >= 2.5:
-                grade = 'B'
-            elif score >= 1.5:
-                grade = 'C'
-            elif score >= 0.5:
-                grade = 'D'
-            else:
-                grade = 'E'
-            
-            expert_data.append({
-                'student_id': student_id,
-                'student_name': student_name,
-                'question_number': idx,
-                'expert_grade': grade,
-                'expert_score': score
-            })
+    gold = data.gold_standard()
+    print(f"  Found {gold['student_id'].nunique()} gold standard students")
     
-    expert_df = pd.DataFrame(expert_data)
+    expert_df = pd.DataFrame({
+        'student_id': gold['student_id'].astype(str),
+        'student_name': gold['student_name'].astype(str),
+        'question_number': gold['question_number'],
+        'expert_grade': scores_to_grades(gold['weighted_score']).astype(str),
+        'expert_score': gold['weighted_score']
+    })
     print(f"  Extracted {len(expert_df)} expert grades")
     print(f"  Questions: {sorted(expert_df['question_number'].unique())}")
     print(f"  Students: {len(expert_df['student_id'].unique())}")
@@ -71,40 +50,14 @@ def load_expert_grades(gold_standard_dir):
     return expert_df
 
 
-def extract_lenient_data(db_path, output_dir):
-    """Extract lenient strategy data from database."""
+def extract_lenient_data(data):
+    """Extract lenient strategy data from the shared dataset."""
     print("\n[2/4] Extracting lenient data from database...")
     
-    db = DatabaseManager(str(db_path))
-    conn = db._get_connection()
-    
-    # Query for lenient strategy only
-    query = """
-    SELECT 
-        experiment_id,
-        trial_number,
-        student_id,
-        student_name,
-        question_number,
-        question_text,
-        answer_text,
-        model,
-        strategy,
-        grades,
-        weighted_score,
-        justification,
-        overall_comment,
-        tokens_used,
-        api_call_time,
-        status
-    FROM grading_results
-    WHERE strategy = 'lenient'
-        AND status = 'completed'
-    ORDER BY experiment_id, trial_number, student_id, question_number
-    """
-    
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    df = data.with_text(data.results(strategy='lenient'))
+    # Plain columns for the CSV writers and the merge below
+    df = df.astype({column: str for column in ['experiment_id', 'model', 'strategy', 'student_id',
+                                               'student_name', 'status', 'question_text']})
     
     print(f"  Retrieved {len(df)} records")
     print(f"  Models: {df['model'].unique()}")
@@ -112,18 +65,9 @@ def extract_lenient_data(db_path, output_dir):
     print(f"  Students: {len(df['student_id'].unique())}")
     print(f"  Questions: {sorted(df['question_number'].unique())}")
     
-    # Parse grades JSON
-    print("\n  Parsing grade data...")
-    import json
-    
-    def parse_grades(grades_str):
-        try:
-            grades = json.loads(grades_str)
-            return grades.get('overall', 'N/A')
-        except:
-            return 'N/A'
-    
-    df['aes_grade'] = df['grades'].apply(parse_grades)
+    # Same GPA cut-offs as the expert grades
+    df['aes_grade'] = scores_to_grades(df['weighted_score']).astype(str)
+    df = df[OUTPUT_COLUMNS]
     
     # Distribution summary
     print("\n  Data distribution:")
@@ -243,7 +187,7 @@ def save_datasets(merged_df, output_dir):
         
         # Missing data
         missing_expert = merged_df['expert_grade'].isna().sum()
-        missing_aes = (merged_df['aes_grade'] == 'N/A').sum()
+        missing_aes = merged_df['weighted_score'].isna().sum()
         f.write(f"Missing Expert Grades: {missing_expert}\n")
         f.write(f"Missing AES Grades: {missing_aes}\n")
         
@@ -282,11 +226,14 @@ def main():
     print(f"Gold standard: {gold_standard_dir}")
     print(f"Output directory: {output_dir}")
     
+    data = get_dataset(db_path=str(db_path), gold_dir=str(gold_standard_dir),
+                       cache_dir=str(project_root / "results" / ".analysis_cache"))
+    
     # Load expert grades
-    expert_df = load_expert_grades(gold_standard_dir)
+    expert_df = load_expert_grades(data)
     
     # Extract lenient data
-    aes_df = extract_lenient_data(db_path, output_dir)
+    aes_df = extract_lenient_data(data)
     
     # Merge
     merged_df = merge_with_expert(aes_df, expert_df)
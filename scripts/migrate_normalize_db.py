@@ -0,0 +1,77 @@
+"""
+Migrate a grading results database to the normalized layout.
+
+Question and answer text moves from every grading_results row into the
+content-hashed `questions` / `answers` tables; `grading_results` becomes a
+view over `grading_results_base` that joins the text back in, so existing
+analysis queries keep working. DatabaseManager also migrates on first open;
+this script additionally keeps a backup, drops orphaned text and VACUUMs
+so the file actually shrinks.
+
+Usage:
+    python scripts/migrate_normalize_db.py
+    python scripts/migrate_normalize_db.py --db results/grading_results.db --no-backup
+"""
+
+import sys
+import sqlite3
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.db_manager import DatabaseManager
+
+
+def database_size(db_path):
+    """Size of the database file plus its WAL, in bytes."""
+    wal = Path(f"{db_path}-wal")
+    return db_path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+
+
+def backup_database(db_path):
+    """Copy the database (including uncommitted WAL pages) next to the original."""
+    backup_path = db_path.with_suffix(db_path.suffix + '.bak')
+    source = sqlite3.connect(str(db_path))
+    target = sqlite3.connect(str(backup_path))
+    with target:
+        source.backup(target)
+    target.close()
+    source.close()
+    return backup_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize question/answer text in a results database')
+    parser.add_argument('--db', default='results/grading_results.db', help='Path to SQLite database')
+    parser.add_argument('--no-backup', action='store_true', help='Do not write a .bak copy first')
+    args = parser.parse_args()
+
+    db_path = Path(args.db)
+    if not db_path.exists():
+        print(f"[ERROR] Database not found: {db_path}")
+        sys.exit(1)
+
+    size_before = database_size(db_path)
+    if not args.no_backup:
+        print(f"[OK] Backup written to: {backup_database(db_path)}")
+
+    db_manager = DatabaseManager(db_path)
+    deleted = db_manager.compact()
+    conn = db_manager._acquire()
+    rows = conn.execute("SELECT COUNT(*) FROM grading_results_base").fetchone()[0]
+    questions = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    answers = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db_manager.close()
+    size_after = database_size(db_path)
+
+    print(f"[OK] {rows} results reference {questions} questions and {answers} answers")
+    print(f"[OK] Removed {deleted['questions']} orphaned questions, {deleted['answers']} orphaned answers")
+    print(f"[OK] Size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -23,7 +23,6 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
 from sklearn.metrics import cohen_kappa_score
 import warnings
 warnings.filterwarnings('ignore')
@@ -32,151 +31,48 @@ warnings.filterwarnings('ignore')
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.evaluation.agreement import AgreementMetrics, GRADE_VALUES, pairwise_confusion
+from src.evaluation.ratings import RatingMatrix
+from src.evaluation.reliability import reliability_by_group, reliability_coefficients
+
+
+def grades_to_numeric(data):
+    """Map a subjects × trials grade matrix to rubric points (unknown grades -> NaN)."""
+    return RatingMatrix.from_wide(data).numeric()
+
+
+def summarize_icc(coefficients):
+    """ICC(2,1), ICC(2,k) and the ICC(2,1) 95% CI from reliability_coefficients output."""
+    return {
+        'icc_single': np.maximum(coefficients['icc_2_1'], 0),  # ICC can't be negative
+        'icc_average': np.maximum(coefficients['icc_2_k'], 0),
+        'ci_lower': np.maximum(coefficients['icc_2_1_ci_lower'], 0),
+        'ci_upper': np.minimum(coefficients['icc_2_1_ci_upper'], 1),
+        'n_subjects': coefficients['n_items'],
+        'n_raters': coefficients['n_raters']
+    }
+
 
 def calculate_icc(data):
     """
     Calculate ICC(2,1) and ICC(2,k) for consistency.
     
-    Data should be: rows=subjects (student-question pairs), columns=trials (raters)
+    Data should be: rows=subjects (student-question pairs), columns=trials (raters).
+    Missing trials are estimated by the reliability engine instead of dropping the subject.
     """
-    # Remove rows with any NaN
-    data = data.dropna()
-    
-    if len(data) == 0 or data.shape[1] < 2:
-        return {'icc_single': np.nan, 'icc_average': np.nan, 'ci_lower': np.nan, 'ci_upper': np.nan}
-    
-    n = data.shape[0]  # number of subjects
-    k = data.shape[1]  # number of raters (trials)
-    
-    # Convert grades to numeric
-    grade_map = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'E': 0}
-    data_numeric = data.applymap(lambda x: grade_map.get(x, np.nan))
-    data_numeric = data_numeric.dropna()
-    
-    if len(data_numeric) == 0:
-        return {'icc_single': np.nan, 'icc_average': np.nan, 'ci_lower': np.nan, 'ci_upper': np.nan}
-    
-    n = data_numeric.shape[0]
-    k = data_numeric.shape[1]
-    
-    # Mean for each subject
-    subject_means = data_numeric.mean(axis=1)
-    # Grand mean
-    grand_mean = data_numeric.values.mean()
-    
-    # Sum of squares
-    # Between subjects
-    ss_between = k * np.sum((subject_means - grand_mean) ** 2)
-    # Within subjects (residual)
-    ss_within = np.sum((data_numeric.values - subject_means.values.reshape(-1, 1)) ** 2)
-    # Total
-    ss_total = np.sum((data_numeric.values - grand_mean) ** 2)
-    
-    # Mean squares
-    ms_between = ss_between / (n - 1)
-    ms_within = ss_within / (n * (k - 1))
-    
-    # ICC(2,1) - single measure
-    icc_single = (ms_between - ms_within) / (ms_between + (k - 1) * ms_within)
-    
-    # ICC(2,k) - average measures
-    icc_average = (ms_between - ms_within) / ms_between
-    
-    # Confidence interval (95%) for ICC(2,1)
-    f_stat = ms_between / ms_within
-    df1 = n - 1
-    df2 = n * (k - 1)
-    
-    f_lower = f_stat / stats.f.ppf(0.975, df1, df2)
-    f_upper = f_stat / stats.f.ppf(0.025, df1, df2)
-    
-    ci_lower = (f_lower - 1) / (f_lower + k - 1)
-    ci_upper = (f_upper - 1) / (f_upper + k - 1)
-    
-    return {
-        'icc_single': max(0, icc_single),  # ICC can't be negative
-        'icc_average': max(0, icc_average),
-        'ci_lower': max(0, ci_lower),
-        'ci_upper': min(1, ci_upper),
-        'n_subjects': n,
-        'n_raters': k
-    }
+    return summarize_icc(reliability_coefficients(grades_to_numeric(data)))
 
 
 def calculate_cronbach_alpha(data):
-    """Calculate Cronbach's Alpha for internal consistency."""
-    # Remove rows with any NaN
-    data = data.dropna()
-    
-    if len(data) == 0 or data.shape[1] < 2:
-        return np.nan
-    
-    # Convert to numeric
-    grade_map = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'E': 0}
-    data_numeric = data.applymap(lambda x: grade_map.get(x, np.nan))
-    data_numeric = data_numeric.dropna()
-    
-    if len(data_numeric) == 0:
-        return np.nan
-    
-    k = data_numeric.shape[1]  # number of items (trials)
-    
-    # Variance of each item (trial)
-    item_variances = data_numeric.var(axis=0, ddof=1)
-    # Variance of total scores
-    total_variance = data_numeric.sum(axis=1).var(ddof=1)
-    
-    # Cronbach's Alpha
-    alpha = (k / (k - 1)) * (1 - item_variances.sum() / total_variance)
-    
-    return alpha
+    """Calculate Cronbach's Alpha for internal consistency (trials as items)."""
+    return reliability_coefficients(grades_to_numeric(data))['cronbach_alpha']
 
 
 def calculate_fleiss_kappa(data):
-    """Calculate Fleiss' Kappa for multi-rater agreement."""
-    # Remove rows with any NaN
-    data = data.dropna()
-    
-    if len(data) == 0 or data.shape[1] < 2:
+    """Calculate Fleiss' Kappa for multi-rater agreement ('D'/'E' count as the rubric's 'D/E')."""
+    if data.shape[1] < 2:
         return np.nan
-    
-    n = len(data)  # number of subjects
-    k = data.shape[1]  # number of raters
-    
-    # Get all unique categories
-    categories = ['A', 'B', 'C', 'D', 'E']
-    
-    # Count matrix: n subjects × c categories
-    count_matrix = np.zeros((n, len(categories)))
-    
-    for i, row in enumerate(data.values):
-        for rating in row:
-            if rating in categories:
-                cat_idx = categories.index(rating)
-                count_matrix[i, cat_idx] += 1
-    
-    # Proportion of all assignments in each category
-    p_j = count_matrix.sum(axis=0) / (n * k)
-    
-    # Calculate P_i (extent of agreement for subject i)
-    P_i = []
-    for i in range(n):
-        sum_n_ij_squared = np.sum(count_matrix[i] ** 2)
-        P_i.append((sum_n_ij_squared - k) / (k * (k - 1)))
-    
-    # Mean agreement
-    P_bar = np.mean(P_i)
-    
-    # Expected agreement
-    P_e = np.sum(p_j ** 2)
-    
-    # Fleiss' Kappa
-    if P_e == 1:
-        return 0
-    
-    kappa = (P_bar - P_e) / (1 - P_e)
-    
-    return kappa
+    return AgreementMetrics().fleiss_kappa(RatingMatrix.from_wide(data))['kappa']
 
 
 def analyze_variance_decomposition(data):
@@ -187,9 +83,8 @@ def analyze_variance_decomposition(data):
     if len(data) == 0:
         return {'between_trial': np.nan, 'within_trial': np.nan, 'total': np.nan}
     
-    # Convert to numeric
-    grade_map = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'E': 0}
-    data_numeric = data.applymap(lambda x: grade_map.get(x, np.nan))
+    # Convert to numeric (rubric points, unknown grades dropped)
+    data_numeric = pd.DataFrame(grades_to_numeric(data), index=data.index, columns=data.columns)
     data_numeric = data_numeric.dropna()
     
     if len(data_numeric) == 0:
@@ -235,29 +130,17 @@ def prepare_trial_matrix(df, model=None):
 
 def plot_icc_by_question(df, model_name, save_path):
     """Plot ICC scores for each question."""
-    questions = sorted(df['question_number'].unique())
-    
-    icc_singles = []
-    icc_averages = []
-    ci_lowers = []
-    ci_uppers = []
-    
-    for q in questions:
-        q_data = df[df['question_number'] == q].copy()
-        q_data['subject_id'] = q_data['student_id']
-        
-        matrix = q_data.pivot_table(
-            index='subject_id',
-            columns='trial_number',
-            values='aes_grade',
-            aggfunc='first'
-        )
-        
-        icc_result = calculate_icc(matrix)
-        icc_singles.append(icc_result['icc_single'])
-        icc_averages.append(icc_result['icc_average'])
-        ci_lowers.append(icc_result['ci_lower'])
-        ci_uppers.append(icc_result['ci_upper'])
+    # All questions in one batched pass
+    graded = df.assign(grade_value=df['aes_grade'].map(GRADE_VALUES))
+    table = reliability_by_group(graded, item='student_id', rater='trial_number',
+                                 value='grade_value', by='question_number')
+    questions = table['question_number'].tolist()
+    
+    icc_result = summarize_icc(table)
+    icc_singles = icc_result['icc_single'].tolist()
+    icc_averages = icc_result['icc_average'].tolist()
+    ci_lowers = icc_result['ci_lower'].tolist()
+    ci_uppers = icc_result['ci_upper'].tolist()
     
     # Plot
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
@@ -310,23 +193,13 @@ def plot_consistency_heatmap(df, model_name, save_path):
     """Plot trial-to-trial consistency heatmap."""
     matrix = prepare_trial_matrix(df)
     
-    # Calculate pairwise agreement between trials
+    # Pairwise agreement between trials (items both trials graded)
     trials = sorted(matrix.columns)
-    n_trials = len(trials)
-    agreement_matrix = np.zeros((n_trials, n_trials))
-    
-    for i, trial_i in enumerate(trials):
-        for j, trial_j in enumerate(trials):
-            if i == j:
-                agreement_matrix[i, j] = 1.0
-            else:
-                # Calculate agreement
-                valid_pairs = matrix[[trial_i, trial_j]].dropna()
-                if len(valid_pairs) > 0:
-                    agreement = (valid_pairs[trial_i] == valid_pairs[trial_j]).sum() / len(valid_pairs)
-                    agreement_matrix[i, j] = agreement
-                else:
-                    agreement_matrix[i, j] = np.nan
+    ratings = RatingMatrix.from_wide(matrix[trials])
+    confusion = pairwise_confusion(ratings.codes, ratings.n_categories)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        agreement_matrix = np.trace(confusion, axis1=-2, axis2=-1) / confusion.sum(axis=(-2, -1))
+    np.fill_diagonal(agreement_matrix, 1.0)
     
     # Plot
     fig, ax = plt.subplots(figsize=(10, 8))
@@ -0,0 +1,216 @@
+"""
+Run a ChatGPT experiment through the OpenAI Batch API.
+
+All pending tasks of the experiment are written to one JSONL request file,
+submitted as a batch job, polled until the job finishes, and the results
+are bulk-ingested back into the grading_results table. Meant for large,
+latency-insensitive runs (e.g. 10 lenient trials x 70 tasks).
+
+Usage:
+    python scripts/run_batch_experiment.py --experiment_id exp_chatgpt_lenient_01 --strategy lenient
+    python scripts/run_batch_experiment.py --experiment_id exp_chatgpt_lenient_01 --strategy lenient --batch-id batch_abc123
+    python scripts/run_batch_experiment.py ... --base-url http://localhost:8080/v1   # local stand-in server
+"""
+
+import sys
+import os
+import json
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.run_experiment import load_student_data, extract_questions, build_task_matrix
+from src.database.db_manager import DatabaseManager
+from src.core.rubric import RubricManager
+from src.agents.chatgpt_agent import ChatGPTAgent
+
+
+def make_custom_id(experiment_id, trial_number, student_id, question_number):
+    """Encode a task key as a batch custom_id."""
+    return f"{experiment_id}|{trial_number}|{student_id}|{question_number}"
+
+
+def parse_custom_id(custom_id):
+    """Decode a batch custom_id into (experiment_id, trial_number, student_id, question_number)."""
+    experiment_id, trial_number, student_id, question_number = custom_id.rsplit('|', 3)
+    return experiment_id, int(trial_number), student_id, int(question_number)
+
+
+def seed_pending_tasks(db_manager, experiment_id, strategy, trials, df, questions):
+    """Insert a pending row for every task that is not completed yet (one transaction)."""
+    completed_keys = db_manager.get_completed_keys(experiment_id)
+    outstanding = build_task_matrix(df, questions, trials, completed_keys)
+    return db_manager.seed_tasks(experiment_id, 'chatgpt', strategy, [
+        {
+            'trial_number': trial,
+            'student_id': task['student_id'],
+            'student_name': task['student_name'],
+            'question_number': task['question_number'],
+            'question_text': task['question'],
+            'answer_text': task['answer']
+        }
+        for trial, tasks in outstanding.items()
+        for task in tasks
+    ])
+
+
+def ingest_batch(agent, db_manager, experiment_id, lines, rubric):
+    """Convert batch output lines to result rows and bulk-write them."""
+    records = []
+    for line in lines:
+        exp_id, trial, student_id, question_number = parse_custom_id(line['custom_id'])
+        if exp_id != experiment_id:
+            continue
+
+        record = {
+            'trial_number': trial,
+            'student_id': student_id,
+            'question_number': question_number
+        }
+        try:
+            result = agent.grade_from_batch_line(line, student_id, str(question_number), trial, rubric)
+            record.update({
+                'status': 'completed',
+                'grades': result.scores,
+                'weighted_score': result.weighted_score,
+                'justification': json.dumps(result.scores, ensure_ascii=False),
+                'overall_comment': result.overall_comment or '',
+                'tokens_used': result.metadata.get('tokens', 0),
+                'api_call_time': 0.0
+            })
+        except Exception as e:
+            record.update({'status': 'failed', 'error_message': str(e)})
+        records.append(record)
+
+    db_manager.ingest_results(experiment_id, records)
+    return records
+
+
+def run_batch_experiment(experiment_id, strategy, trials, excel_path, db_path,
+                         batch_dir='results/batches', poll_interval=30,
+                         batch_id=None, base_url=None):
+    """
+    Run (or resume) a Batch API experiment.
+
+    Args:
+        experiment_id: Unique identifier for this experiment
+        strategy: Prompting strategy to use
+        trials: Number of independent trials
+        excel_path: Path to student data Excel file
+        db_path: Path to SQLite database
+        batch_dir: Directory for request files and batch state
+        poll_interval: Seconds between batch status checks
+        batch_id: Existing batch to resume polling instead of submitting
+        base_url: Optional OpenAI-compatible base URL (e.g. local stand-in server)
+    """
+    print(f"\n{'='*60}")
+    print(f"Batch experiment: {experiment_id}")
+    print(f"Strategy: {strategy}")
+    print(f"Trials: {trials}")
+    print(f"{'='*60}\n")
+
+    db_manager = DatabaseManager(db_path)
+    rubric = RubricManager().get_rubric("default")
+    agent = ChatGPTAgent(rubric=rubric, strategy=strategy, base_url=base_url)
+
+    batch_dir = Path(batch_dir)
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    state_file = batch_dir / f"{experiment_id}_batch.json"
+
+    if batch_id is None and state_file.exists():
+        with open(state_file, 'r', encoding='utf-8') as f:
+            batch_id = json.load(f).get('batch_id')
+        print(f"[OK] Resuming batch from {state_file}: {batch_id}")
+
+    if batch_id is None:
+        # Seed tasks and write the request file
+        df = load_student_data(excel_path)
+        questions = extract_questions(df)
+        seeded = seed_pending_tasks(db_manager, experiment_id, strategy, trials, df, questions)
+        print(f"[OK] Seeded {seeded} pending tasks")
+
+        tasks = db_manager.get_pending_tasks(experiment_id)
+        if not tasks:
+            print("[OK] Nothing to do, all tasks completed")
+            return
+
+        requests = [
+            agent.build_batch_request(
+                make_custom_id(experiment_id, t['trial_number'], t['student_id'], t['question_number']),
+                t['question_text'],
+                t['answer_text'],
+                rubric
+            )
+            for t in tasks
+        ]
+        request_file = agent.write_batch_file(requests, batch_dir / f"{experiment_id}_requests.jsonl")
+        print(f"[OK] Wrote {len(requests)} requests to {request_file}")
+
+        batch_id = agent.submit_batch(request_file, metadata={'experiment_id': experiment_id})
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump({'batch_id': batch_id, 'request_file': str(request_file)}, f, indent=2)
+        print(f"[OK] Submitted batch: {batch_id}")
+
+    batch = agent.wait_for_batch(batch_id, poll_interval=poll_interval)
+    print(f"[OK] Batch {batch_id} finished with status: {batch.status}")
+
+    lines = agent.download_batch_results(batch)
+    records = ingest_batch(agent, db_manager, experiment_id, lines, rubric)
+    completed = sum(1 for r in records if r['status'] == 'completed')
+    print(f"[OK] Ingested {len(records)} results ({completed} completed, {len(records) - completed} failed)")
+
+    # Batch is consumed; a rerun submits a new batch for remaining tasks
+    state_file.unlink(missing_ok=True)
+
+    export_dir = Path(f"results/{experiment_id}")
+    db_manager.export_results(experiment_id, export_dir)
+    print(f"[OK] Results exported to: {export_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run ChatGPT grading experiment via the OpenAI Batch API')
+    parser.add_argument('--experiment_id', required=True, help='Unique experiment identifier')
+    parser.add_argument('--strategy', required=True,
+                       choices=['zero-shot', 'few-shot', 'cot', 'lenient', 'detailed-rubric', 'strict'],
+                       help='Prompting strategy')
+    parser.add_argument('--trials', type=int, default=1,
+                       help='Number of independent trials (default: 1)')
+    parser.add_argument('--excel', default='data/Jawaban/jawaban UTS  Capstone Project.xlsx',
+                       help='Path to Excel file with student data')
+    parser.add_argument('--db', default='results/grading_results.db',
+                       help='Path to SQLite database')
+    parser.add_argument('--batch-dir', default='results/batches',
+                       help='Directory for batch request files and state')
+    parser.add_argument('--poll-interval', type=float, default=30,
+                       help='Seconds between batch status checks (default: 30)')
+    parser.add_argument('--batch-id', default=None,
+                       help='Resume polling an already submitted batch')
+    parser.add_argument('--base-url', default=None,
+                       help='OpenAI-compatible base URL (e.g. local stand-in server)')
+
+    args = parser.parse_args()
+
+    os.makedirs('results', exist_ok=True)
+
+    run_batch_experiment(
+        experiment_id=args.experiment_id,
+        strategy=args.strategy,
+        trials=args.trials,
+        excel_path=args.excel,
+        db_path=args.db,
+        batch_dir=args.batch_dir,
+        poll_interval=args.poll_interval,
+        batch_id=args.batch_id,
+        base_url=args.base_url
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ import sys
 import os
 from pathlib import Path
 import argparse
+import asyncio
 import pandas as pd
 import time
 import json
@@ -22,11 +23,13 @@ load_dotenv()
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.database.db_manager import DatabaseManager
-from src.core.prompt_builder import PromptBuilder
+from src.database.db_manager import DatabaseManager, EXPORT_FORMATS
+from src.database.write_behind import WriteBehindWriter
+from src.core.prompt_builder import PromptBuilder, PROMPT_LAYOUTS
 from src.core.rubric import RubricManager
 from src.agents.chatgpt_agent import ChatGPTAgent
 from src.agents.gemini_agent import GeminiAgent
+from src.agents.response_cache import ResponseCache, CACHE_MODES
 
 
 def load_student_data(excel_path):
@@ -74,23 +77,89 @@ def extract_questions(df):
     return questions
 
 
-def create_grader(model_name, strategy_name, rubric):
+def build_task_matrix(df, questions, trials, completed_keys=frozenset()):
+    """
+    Build the outstanding tasks of every trial.
+    
+    Args:
+        df: Student DataFrame
+        questions: Question list from extract_questions
+        trials: Number of trials
+        completed_keys: Set of (trial, student_id, question_number) to skip
+    
+    Returns:
+        Dict of trial number -> list of task dicts
+    """
+    students = []
+    for _, row in df.iterrows():
+        # Use row name (Mahasiswa X) as student_id since NIM column doesn't exist
+        student_name = row['Nama']
+        student_id = f"student_{student_name.replace('Mahasiswa ', '').zfill(2)}"
+        students.append((student_id, student_name, row))
+    
+    outstanding = {}
+    for trial in range(1, trials + 1):
+        outstanding[trial] = [
+            {
+                'student_id': student_id,
+                'student_name': student_name,
+                'question_id': str(question['number']),
+                'question_number': question['number'],
+                'question': question['text'],
+                'answer': row[question['column']]
+            }
+            for student_id, student_name, row in students
+            for question in questions
+            if (trial, student_id, question['number']) not in completed_keys
+        ]
+    return outstanding
+
+
+def create_grader(model_name, strategy_name, rubric, response_cache=None, prompt_layout='standard'):
     """Create appropriate grader instance."""
     if model_name == 'chatgpt':
         return ChatGPTAgent(
             rubric=rubric,
-            strategy=strategy_name
+            strategy=strategy_name,
+            response_cache=response_cache,
+            prompt_layout=prompt_layout
         )
     elif model_name == 'gemini':
         return GeminiAgent(
             rubric=rubric,
-            strategy=strategy_name
+            strategy=strategy_name,
+            response_cache=response_cache,
+            prompt_layout=prompt_layout
         )
     else:
         raise ValueError(f"Unknown model: {model_name}")
 
 
-def grade_task(grader, prompt_builder, student, question, strategy_name, rubric):
+def result_to_record(result, api_call_time):
+    """Convert a GradingResult to the dict stored by the runner."""
+    return {
+        'success': True,
+        'grades': result.scores,
+        'weighted_score': result.weighted_score,
+        'justification': json.dumps(result.scores, ensure_ascii=False),
+        'overall_comment': result.overall_comment or '',
+        'tokens': result.metadata.get('tokens', 0),
+        'time': api_call_time,
+        'error': None
+    }
+
+
+def error_to_record(error):
+    """Convert a grading exception to the dict stored by the runner."""
+    return {
+        'success': False,
+        'error': str(error),
+        'tokens': 0,
+        'time': 0
+    }
+
+
+def grade_task(grader, prompt_builder, student, question, strategy_name, rubric, trial=1):
     """Grade a single task and return results with metadata."""
     try:
         # Call agent's grade_essay method
@@ -101,32 +170,51 @@ def grade_task(grader, prompt_builder, student, question, strategy_name, rubric)
             question=question['text'],
             answer=student['answer'],
             rubric=rubric,
-            trial=1
+            trial=trial
         )
         api_call_time = time.time() - start_time
         
         # Convert GradingResult to our format
-        return {
-            'success': True,
-            'grades': result.scores,
-            'weighted_score': result.weighted_score,
-            'justification': json.dumps(result.scores, ensure_ascii=False),
-            'overall_comment': result.overall_comment or '',
-            'tokens': result.metadata.get('tokens', 0),
-            'time': api_call_time,
-            'error': None
-        }
+        return result_to_record(result, api_call_time)
         
     except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'tokens': 0,
-            'time': 0
-        }
+        return error_to_record(e)
 
 
-def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path):
+def save_task_result(db_manager, experiment_id, trial, task, result, worker_id=None):
+    """Finalize a seeded task (completed or failed) with a single UPDATE.
+
+    db_manager may also be a WriteBehindWriter, which queues the write.
+    With worker_id, the write only applies while that worker holds the task's lease.
+    """
+    if result['success']:
+        db_manager.complete_task(
+            experiment_id=experiment_id,
+            trial_number=trial,
+            student_id=task['student_id'],
+            question_number=task['question_number'],
+            grades=result['grades'],
+            weighted_score=result['weighted_score'],
+            justification=result['justification'],
+            overall_comment=result['overall_comment'],
+            tokens_used=result['tokens'],
+            api_call_time=result['time'],
+            worker_id=worker_id
+        )
+    else:
+        db_manager.fail_task(
+            experiment_id=experiment_id,
+            trial_number=trial,
+            student_id=task['student_id'],
+            question_number=task['question_number'],
+            error_message=result['error'],
+            worker_id=worker_id
+        )
+
+
+def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path, concurrency=1,
+                   cache_mode=None, cache_path='results/response_cache.db', pack_size=1,
+                   prompt_layout='standard', write_behind=True, export_format='json'):
     """
     Run experiment with checkpoint/resume support.
     
@@ -137,12 +225,27 @@ def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path):
         trials: Number of independent trials
         excel_path: Path to student data Excel file
         db_path: Path to SQLite database
+        concurrency: Number of in-flight API calls (1 = sequential)
+        cache_mode: Response cache mode ('read-through', 'write-only', 'bypass');
+                    None falls back to the AES_RESPONSE_CACHE environment variable
+        cache_path: Path to the response cache file
+        pack_size: Answers of one student graded per API call (1 = one call per answer)
+        prompt_layout: 'standard' or 'prefix-cache' (static rubric/instructions first
+                       so provider prompt caching applies)
+        write_behind: Persist results from a background thread in batched
+                      transactions instead of committing after every call
+        export_format: 'json' (one file per student and trial) or 'jsonl'
+                       (one compact file for the whole experiment)
     """
     print(f"\n{'='*60}")
     print(f"Experiment: {experiment_id}")
     print(f"Strategy: {strategy}")
     print(f"Model: {model}")
     print(f"Trials: {trials}")
+    print(f"Concurrency: {concurrency}")
+    if pack_size > 1:
+        print(f"Pack size: {pack_size}")
+    print(f"Prompt layout: {prompt_layout}")
     print(f"{'='*60}\n")
     
     # Initialize components
@@ -155,8 +258,13 @@ def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path):
     df = load_student_data(excel_path)
     questions = extract_questions(df)
     
-    # Create grader
-    grader = create_grader(model, strategy, rubric)
+    # Create grader (cache entries are namespaced per experiment so that
+    # replicate experiments never reuse each other's responses)
+    if cache_mode:
+        response_cache = ResponseCache(cache_path, mode=cache_mode, namespace=experiment_id)
+    else:
+        response_cache = ResponseCache.from_env(namespace=experiment_id)
+    grader = create_grader(model, strategy, rubric, response_cache, prompt_layout)
     
     # Calculate total tasks
     total_tasks = len(df) * len(questions) * trials
@@ -167,120 +275,102 @@ def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path):
     print(f"    - Questions: {len(questions)}")
     print(f"    - Trials: {trials}")
     
+    # Resume: one query for everything already completed, then seed the
+    # outstanding task matrix of all trials in one transaction
+    completed_keys = db_manager.get_completed_keys(experiment_id)
+    outstanding = build_task_matrix(df, questions, trials, completed_keys)
+    seeded = db_manager.seed_tasks(experiment_id, model, strategy, [
+        {
+            'trial_number': trial,
+            'student_id': task['student_id'],
+            'student_name': task['student_name'],
+            'question_number': task['question_number'],
+            'question_text': task['question'],
+            'answer_text': task['answer']
+        }
+        for trial, trial_tasks in outstanding.items()
+        for task in trial_tasks
+    ])
+    print(f"[OK] Resume: {len(completed_keys)} already completed, {seeded} new tasks seeded")
+    
+    # Results are queued to the write-behind thread (flushed on exit and Ctrl+C)
+    writer = WriteBehindWriter(db_manager) if write_behind else None
+    results_sink = writer or db_manager
+    
     # Process each trial
-    for trial in range(1, trials + 1):
-        print(f"\n{'='*60}")
-        print(f"TRIAL {trial}/{trials}")
-        print(f"{'='*60}")
-        
-        trial_start = time.time()
-        trial_completed = 0
-        trial_skipped = 0
-        
-        # Process each student
-        for idx, row in df.iterrows():
-            # Use row name (Mahasiswa X) as student_id since NIM column doesn't exist
-            student_name = row['Nama']
-            student_id = f"student_{student_name.replace('Mahasiswa ', '').zfill(2)}"
+    try:
+        for trial in range(1, trials + 1):
+            print(f"\n{'='*60}")
+            print(f"TRIAL {trial}/{trials}")
+            print(f"{'='*60}")
             
-            # Process each question
-            for question in questions:
-                # Check if already completed
-                if db_manager.check_exists(
-                    experiment_id, trial, student_id, question['number']
-                ):
-                    trial_skipped += 1
-                    completed_tasks += 1
-                    continue
-                
-                # Prepare student data
-                student_data = {
-                    'id': student_id,
-                    'name': student_name,
-                    'answer': row[question['column']]
-                }
-                
-                # Insert pending task
-                db_manager.insert_or_update(
-                    experiment_id=experiment_id,
-                    trial_number=trial,
-                    student_id=student_id,
-                    student_name=student_name,
-                    question_number=question['number'],
-                    question_text=question['text'],
-                    answer_text=student_data['answer'],
-                    model=model,
-                    strategy=strategy,
-                    status='pending'
-                )
-                
-                # Mark as processing
-                db_manager.insert_or_update(
-                    experiment_id=experiment_id,
-                    trial_number=trial,
-                    student_id=student_id,
-                    student_name=student_name,
-                    question_number=question['number'],
-                    question_text=question['text'],
-                    answer_text=student_data['answer'],
-                    model=model,
-                    strategy=strategy,
-                    status='processing'
-                )
-                
-                # Grade the task
-                result = grade_task(
-                    grader, prompt_builder, student_data, question, strategy, rubric
-                )
-                
-                # Update database
+            trial_start = time.time()
+            trial_completed = 0
+            
+            # Outstanding tasks for this trial
+            tasks = outstanding[trial]
+            trial_skipped = len(df) * len(questions) - len(tasks)
+            completed_tasks += trial_skipped
+            
+            def on_task_done(task, result):
+                nonlocal trial_completed, completed_tasks
+                save_task_result(results_sink, experiment_id, trial, task, result)
                 if result['success']:
-                    db_manager.insert_or_update(
-                        experiment_id=experiment_id,
-                        trial_number=trial,
-                        student_id=student_id,
-                        student_name=student_name,
-                        question_number=question['number'],
-                        question_text=question['text'],
-                        answer_text=student_data['answer'],
-                        model=model,
-                        strategy=strategy,
-                        grades=result['grades'],
-                        weighted_score=result['weighted_score'],
-                        justification=result['justification'],
-                        overall_comment=result['overall_comment'],
-                        tokens_used=result['tokens'],
-                        api_call_time=result['time'],
-                        status='completed'
-                    )
                     trial_completed += 1
                     completed_tasks += 1
                     
                     # Progress indicator
                     progress = (completed_tasks / total_tasks) * 100
-                    print(f"[{progress:5.1f}%] Trial {trial}, Student {student_name}, Q{question['number']}: {result['weighted_score']:.1f} ({result['tokens']} tokens, {result['time']:.1f}s)")
+                    print(f"[{progress:5.1f}%] Trial {trial}, Student {task['student_name']}, Q{task['question_number']}: {result['weighted_score']:.1f} ({result['tokens']} tokens, {result['time']:.1f}s)")
                 else:
-                    db_manager.insert_or_update(
-                        experiment_id=experiment_id,
-                        trial_number=trial,
-                        student_id=student_id,
-                        student_name=student_name,
-                        question_number=question['number'],
-                        question_text=question['text'],
-                        answer_text=student_data['answer'],
-                        model=model,
-                        strategy=strategy,
-                        status='failed',
-                        error_message=result['error']
+                    print(f"[ERROR] Trial {trial}, Student {task['student_name']}, Q{task['question_number']}: {result['error']}")
+            
+            # Mark the trial's tasks as processing (status columns only, one transaction)
+            db_manager.start_tasks(
+                experiment_id, [(trial, task['student_id'], task['question_number']) for task in tasks]
+            )
+            
+            if concurrency > 1 or pack_size > 1:
+                # Grade the whole trial with bounded concurrency (optionally packed per student)
+                def on_result(task, outcome):
+                    if isinstance(outcome, Exception):
+                        on_task_done(task, error_to_record(outcome))
+                    else:
+                        on_task_done(task, result_to_record(outcome, outcome.metadata.get('api_call_time', 0)))
+                
+                asyncio.run(grader.grade_batch_async(
+                    tasks, rubric, trial=trial, max_concurrency=concurrency, on_result=on_result,
+                    pack_size=pack_size
+                ))
+            else:
+                for task in tasks:
+                    # Grade the task
+                    student_data = {
+                        'id': task['student_id'],
+                        'name': task['student_name'],
+                        'answer': task['answer']
+                    }
+                    question = {'number': task['question_number'], 'text': task['question']}
+                    result = grade_task(
+                        grader, prompt_builder, student_data, question, strategy, rubric, trial
                     )
-                    print(f"[ERROR] Trial {trial}, Student {student_name}, Q{question['number']}: {result['error']}")
-        
-        # Trial summary
-        trial_time = time.time() - trial_start
-        print(f"\n[OK] Trial {trial} completed:")
-        print(f"    - New tasks: {trial_completed}")
-        print(f"    - Skipped (already done): {trial_skipped}")
-        print(f"    - Time: {trial_time:.1f}s ({trial_time/60:.1f} min)")
+                    on_task_done(task, result)
+            
+            # Trial summary
+            trial_time = time.time() - trial_start
+            print(f"\n[OK] Trial {trial} completed:")
+            print(f"    - New tasks: {trial_completed}")
+            print(f"    - Skipped (already done): {trial_skipped}")
+            print(f"    - Time: {trial_time:.1f}s ({trial_time/60:.1f} min)")
+    finally:
+        if writer:
+            writer.close()
+            print(f"\n[OK] Write-behind: {writer.written} results in {writer.transactions} transactions")
+    
+    stats = grader.get_statistics()
+    if stats['prompt_tokens']:
+        print(f"\n[OK] Prompt tokens: {stats['prompt_tokens']} "
+              f"({stats['cached_tokens']} cached, {stats['cached_token_rate']:.1%})")
     
     # Experiment summary
     print(f"\n{'='*60}")
@@ -288,11 +378,10 @@ def run_experiment(experiment_id, strategy, model, trials, excel_path, db_path):
     print(f"{'='*60}")
     print(f"Total tasks processed: {completed_tasks}/{total_tasks}")
     
-    # Export to JSON for each trial
+    # Export all trials in one streaming pass
     from pathlib import Path
     export_dir = Path(f"results/{experiment_id}")
-    for trial_num in range(1, trials + 1):
-        db_manager.export_to_json(experiment_id, trial_num, export_dir)
+    db_manager.export_results(experiment_id, export_dir, fmt=export_format)
     print(f"[OK] Results exported to: {export_dir}")
 
 
@@ -311,6 +400,20 @@ def main():
                        help='Path to Excel file with student data')
     parser.add_argument('--db', default='results/grading_results.db',
                        help='Path to SQLite database')
+    parser.add_argument('--concurrency', type=int, default=1,
+                       help='Number of concurrent API calls (default: 1 = sequential)')
+    parser.add_argument('--cache', choices=CACHE_MODES, default=None,
+                       help='Response cache mode (default: AES_RESPONSE_CACHE env var, else disabled)')
+    parser.add_argument('--cache-path', default='results/response_cache.db',
+                       help='Path to response cache file')
+    parser.add_argument('--pack-size', type=int, default=1,
+                       help='Grade up to N answers of one student per API call (default: 1 = unpacked)')
+    parser.add_argument('--prompt-layout', choices=PROMPT_LAYOUTS, default='standard',
+                       help='Prompt layout; prefix-cache puts rubric/instructions first (default: standard)')
+    parser.add_argument('--no-write-behind', action='store_true',
+                       help='Commit every result synchronously instead of from a background writer')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, default='json',
+                       help='Export one JSON file per student and trial, or one JSONL file (default: json)')
     
     args = parser.parse_args()
     
@@ -324,7 +427,14 @@ def main():
         model=args.model,
         trials=args.trials,
         excel_path=args.excel,
-        db_path=args.db
+        db_path=args.db,
+        concurrency=args.concurrency,
+        cache_mode=args.cache,
+        cache_path=args.cache_path,
+        pack_size=args.pack_size,
+        prompt_layout=args.prompt_layout,
+        write_behind=not args.no_write_behind,
+        export_format=args.export_format
     )
 
 
@@ -16,9 +16,13 @@ Time: ~3-3.5 hours
 import subprocess
 import sys
 import time
-import sqlite3
 from pathlib import Path
 
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.db_manager import DatabaseManager
+
 # ============================================================================
 # EXPERIMENT CONFIGURATIONS
 # ============================================================================
@@ -62,27 +66,26 @@ EXPERIMENTS = [
 ]
 
 
-def is_experiment_complete(experiment_id):
+def load_experiment_counts():
+    """Load task counts of all experiments in one query (empty if no database yet)"""
+    try:
+        db = DatabaseManager('results/grading_results.db')
+        counts = db.get_experiment_counts([exp["id"] for exp in EXPERIMENTS])
+        db.close()
+        return counts
+    except Exception:
+        return {}
+
+
+def is_experiment_complete(experiment_id, counts=None):
     """Check if an experiment is already 100% complete in the database"""
     try:
-        conn = sqlite3.connect('results/grading_results.db')
-        cur = conn.cursor()
-        
-        # Count completed and failed tasks
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-                SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM grading_results 
-            WHERE experiment_id = ?
-        """, (experiment_id,))
+        if counts is None:
+            counts = load_experiment_counts()
+        row = counts.get(experiment_id)
         
-        row = cur.fetchone()
-        conn.close()
-        
-        if row and row[0] > 0:  # Has tasks
-            total, completed, failed = row
+        if row and row['total'] > 0:  # Has tasks
+            total, completed, failed = row['total'], row['completed'], row['failed']
             # Consider complete if we have 70 completed tasks (or 60+ if some failed)
             if completed >= 70:
                 return True, completed, failed
@@ -95,10 +98,10 @@ def is_experiment_complete(experiment_id):
         return False, 0, 0
 
 
-def run_experiment(exp_config):
+def run_experiment(exp_config, counts=None):
     """Run a single experiment"""
     # Check if already complete
-    status, completed, failed = is_experiment_complete(exp_config["id"])
+    status, completed, failed = is_experiment_complete(exp_config["id"], counts)
     
     if status == True:
         print(f"\n[SKIP] {exp_config['id']} already complete ({completed} tasks)")
@@ -159,6 +162,9 @@ def main():
     
     input("Press ENTER to start (or Ctrl+C to cancel)...")
     
+    # Completion status of every experiment, loaded once
+    counts = load_experiment_counts()
+    
     overall_start = time.time()
     successful = 0
     failed = 0
@@ -176,7 +182,7 @@ def main():
     for i, exp in enumerate(chatgpt_exps, 1):
         print(f"\n### ChatGPT Experiment {i}/{len(chatgpt_exps)} ###")
         
-        result = run_experiment(exp)
+        result = run_experiment(exp, counts)
         if result == "skipped":
             skipped += 1
         elif result:
@@ -196,7 +202,7 @@ def main():
     for i, exp in enumerate(gemini_exps, 1):
         print(f"\n### Gemini Experiment {i}/{len(gemini_exps)} ###")
         
-        result = run_experiment(exp)
+        result = run_experiment(exp, counts)
         if result == "skipped":
             skipped += 1
         elif result:
@@ -0,0 +1,264 @@
+"""
+Run a grading worker that drains an experiment's task queue.
+
+Several workers (e.g. one per API key or per model) can work on the same
+experiment_id at once. Each worker claims a batch of tasks with a lease,
+renews the lease while grading, and finalizes each task. Tasks of a
+crashed worker are picked up by the others once its lease expires.
+
+Usage:
+    python scripts/run_worker.py --experiment_id exp_chatgpt_lenient_01 --strategy lenient --model chatgpt
+    python scripts/run_worker.py --experiment_id exp_01 --strategy lenient --model gemini --worker-id gemini-key2 --no-seed
+"""
+
+import sys
+import os
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.run_experiment import (
+    load_student_data, extract_questions, build_task_matrix, create_grader,
+    result_to_record, error_to_record, save_task_result
+)
+from src.database.db_manager import DatabaseManager
+from src.database.write_behind import WriteBehindWriter
+from src.core.rubric import RubricManager
+from src.core.prompt_builder import PROMPT_LAYOUTS
+from src.agents.response_cache import ResponseCache, CACHE_MODES
+
+
+def seed_experiment(db_manager, experiment_id, strategy, model, trials, excel_path):
+    """Seed the experiment's task matrix (idempotent, safe for every worker)."""
+    df = load_student_data(excel_path)
+    questions = extract_questions(df)
+    completed_keys = db_manager.get_completed_keys(experiment_id)
+    outstanding = build_task_matrix(df, questions, trials, completed_keys)
+    return db_manager.seed_tasks(experiment_id, model, strategy, [
+        {
+            'trial_number': trial,
+            'student_id': task['student_id'],
+            'student_name': task['student_name'],
+            'question_number': task['question_number'],
+            'question_text': task['question'],
+            'answer_text': task['answer']
+        }
+        for trial, tasks in outstanding.items()
+        for task in tasks
+    ])
+
+
+def row_to_task(row):
+    """Convert a claimed grading_results row to the runner's task dict."""
+    return {
+        'id': row['id'],
+        'trial_number': row['trial_number'],
+        'student_id': row['student_id'],
+        'student_name': row['student_name'],
+        'question_id': str(row['question_number']),
+        'question_number': row['question_number'],
+        'question': row['question_text'],
+        'answer': row['answer_text']
+    }
+
+
+def keep_leases_alive(db_manager, worker_id, active_ids, lease_seconds, stop_event):
+    """Heartbeat loop: renew leases of in-flight tasks every lease_seconds / 3."""
+    while not stop_event.wait(lease_seconds / 3):
+        ids = list(active_ids)
+        if ids:
+            extended = db_manager.heartbeat(worker_id, ids, lease_seconds)
+            if extended < len(ids):
+                print(f"[WARN] {len(ids) - extended} lease(s) lost to another worker")
+
+
+def run_worker(experiment_id, strategy, model, db_path, worker_id, batch_size=10,
+               lease_seconds=300, concurrency=1, pack_size=1, retry_failed=False,
+               idle_timeout=60, cache_mode=None, cache_path='results/response_cache.db',
+               prompt_layout='standard', write_behind=True):
+    """
+    Claim and grade tasks until the experiment has no claimable work left.
+
+    Args:
+        experiment_id: Experiment to work on (tasks must be seeded)
+        strategy: Prompting strategy to use
+        model: Model to use ('chatgpt' or 'gemini')
+        db_path: Path to SQLite database
+        worker_id: Unique worker identifier (lease owner)
+        batch_size: Tasks claimed per round trip
+        lease_seconds: Lease duration (renewed by heartbeat while grading)
+        concurrency: Number of in-flight API calls
+        pack_size: Answers of one student graded per API call
+        retry_failed: Also claim failed tasks
+        idle_timeout: Seconds to keep polling while other workers still hold leases
+            (never less than it takes the leases held when idling began to expire)
+        cache_mode: Response cache mode (None = AES_RESPONSE_CACHE env var)
+        cache_path: Path to the response cache file
+        prompt_layout: 'standard' or 'prefix-cache'
+        write_behind: Persist results from a background thread in batched transactions
+    """
+    db_manager = DatabaseManager(db_path)
+    rubric = RubricManager().get_rubric("default")
+
+    if cache_mode:
+        response_cache = ResponseCache(cache_path, mode=cache_mode, namespace=experiment_id)
+    else:
+        response_cache = ResponseCache.from_env(namespace=experiment_id)
+    grader = create_grader(model, strategy, rubric, response_cache, prompt_layout)
+
+    active_ids = set()
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(
+        target=keep_leases_alive,
+        args=(db_manager, worker_id, active_ids, lease_seconds, stop_event),
+        daemon=True
+    )
+    heartbeat.start()
+    writer = WriteBehindWriter(db_manager) if write_behind else None
+
+    completed = failed = 0
+    idle_deadline = None
+    try:
+        while True:
+            rows = db_manager.claim_tasks(
+                experiment_id, worker_id, limit=batch_size,
+                lease_seconds=lease_seconds, include_failed=retry_failed
+            )
+            if not rows:
+                if writer:
+                    writer.flush()  # Our own queued results still count as processing
+                leases = db_manager.get_lease_summary(experiment_id)
+                if leases['leased'] == 0:
+                    if leases['unleased']:
+                        print(f"[WARN] {leases['unleased']} processing task(s) without a lease "
+                              f"(run_experiment) left untouched")
+                    break  # Nothing pending and no other worker holds a lease
+                now = time.time()
+                if idle_deadline is None:
+                    # Leases held now belong to live or crashed workers; wait until
+                    # all of them have had a chance to expire before giving up
+                    idle_deadline = max(now + idle_timeout, leases['last_expiry'])
+                if now > idle_deadline:
+                    print("[OK] Idle timeout reached while other workers hold leases, exiting")
+                    break
+                # Wake up when the next lease expires, so it is claimed right away
+                time.sleep(min(5, lease_seconds / 3, max(leases['first_expiry'] - now, 0) + 0.1))
+                continue
+            idle_deadline = None
+
+            tasks = [row_to_task(row) for row in rows]
+            active_ids.update(task['id'] for task in tasks)
+
+            def on_result(task, outcome):
+                nonlocal completed, failed
+                if isinstance(outcome, Exception):
+                    record = error_to_record(outcome)
+                else:
+                    record = result_to_record(outcome, outcome.metadata.get('api_call_time', 0))
+                save_task_result(writer or db_manager, experiment_id, task['trial_number'], task,
+                                 record, worker_id)
+                active_ids.discard(task['id'])
+                if record['success']:
+                    completed += 1
+                    print(f"[{worker_id}] Trial {task['trial_number']}, {task['student_name']}, "
+                          f"Q{task['question_number']}: {record['weighted_score']:.1f}")
+                else:
+                    failed += 1
+                    print(f"[{worker_id}] [ERROR] Trial {task['trial_number']}, {task['student_name']}, "
+                          f"Q{task['question_number']}: {record['error']}")
+
+            for trial in sorted({task['trial_number'] for task in tasks}):
+                trial_tasks = [task for task in tasks if task['trial_number'] == trial]
+                asyncio.run(grader.grade_batch_async(
+                    trial_tasks, rubric, trial=trial, max_concurrency=concurrency,
+                    on_result=on_result, pack_size=pack_size
+                ))
+    finally:
+        if writer:
+            writer.close()  # Commit queued results before giving up the leases
+        stop_event.set()
+        heartbeat.join()
+        if active_ids:
+            released = db_manager.release_tasks(worker_id, list(active_ids))
+            print(f"[OK] Released {released} unfinished task(s)")
+        db_manager.close()
+
+    print(f"\n[OK] Worker {worker_id} done: {completed} completed, {failed} failed")
+    return completed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a lease-based grading worker')
+    parser.add_argument('--experiment_id', required=True, help='Experiment identifier')
+    parser.add_argument('--strategy', required=True,
+                       choices=['zero-shot', 'few-shot', 'cot', 'lenient', 'detailed-rubric', 'strict'],
+                       help='Prompting strategy')
+    parser.add_argument('--model', required=True, choices=['chatgpt', 'gemini'], help='Model to use')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                       help='Unique worker id (default: hostname-pid)')
+    parser.add_argument('--trials', type=int, default=1,
+                       help='Number of trials to seed (default: 1)')
+    parser.add_argument('--no-seed', action='store_true',
+                       help='Do not seed tasks (another process already did)')
+    parser.add_argument('--excel', default='data/Jawaban/jawaban UTS  Capstone Project.xlsx',
+                       help='Path to Excel file with student data')
+    parser.add_argument('--db', default='results/grading_results.db', help='Path to SQLite database')
+    parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed at a time (default: 10)')
+    parser.add_argument('--lease', type=float, default=300, help='Lease duration in seconds (default: 300)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concurrent API calls (default: 1)')
+    parser.add_argument('--pack-size', type=int, default=1,
+                       help='Grade up to N answers of one student per API call (default: 1)')
+    parser.add_argument('--retry-failed', action='store_true', help='Also claim failed tasks')
+    parser.add_argument('--idle-timeout', type=float, default=60,
+                       help='Seconds to wait for other workers\' leases before exiting, at least until '
+                            'the leases held when idling began expire (default: 60)')
+    parser.add_argument('--cache', choices=CACHE_MODES, default=None,
+                       help='Response cache mode (default: AES_RESPONSE_CACHE env var, else disabled)')
+    parser.add_argument('--cache-path', default='results/response_cache.db', help='Path to response cache file')
+    parser.add_argument('--prompt-layout', choices=PROMPT_LAYOUTS, default='standard', help='Prompt layout')
+    parser.add_argument('--no-write-behind', action='store_true',
+                       help='Commit every result synchronously instead of from a background writer')
+
+    args = parser.parse_args()
+
+    os.makedirs('results', exist_ok=True)
+
+    if not args.no_seed:
+        db_manager = DatabaseManager(args.db)
+        seeded = seed_experiment(db_manager, args.experiment_id, args.strategy, args.model,
+                                 args.trials, args.excel)
+        db_manager.close()
+        print(f"[OK] Seeded {seeded} new tasks")
+
+    run_worker(
+        experiment_id=args.experiment_id,
+        strategy=args.strategy,
+        model=args.model,
+        db_path=args.db,
+        worker_id=args.worker_id,
+        batch_size=args.batch_size,
+        lease_seconds=args.lease,
+        concurrency=args.concurrency,
+        pack_size=args.pack_size,
+        retry_failed=args.retry_failed,
+        idle_timeout=args.idle_timeout,
+        cache_mode=args.cache,
+        cache_path=args.cache_path,
+        prompt_layout=args.prompt_layout,
+        write_behind=not args.no_write_behind
+    )
+
+
+if __name__ == '__main__':
+    main()
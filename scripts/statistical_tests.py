@@ -2,8 +2,7 @@
 """
 Comprehensive statistical tests for AES research paper
 """
-import sqlite3
-import json
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -13,39 +12,12 @@ from statsmodels.stats.proportion import proportion_confint
 import warnings
 warnings.filterwarnings('ignore')
 
-def score_to_grade(score):
-    """Convert GPA score to letter grade"""
-    if score >= 3.5:
-        return 'A'
-    elif score >= 2.5:
-        return 'B'
-    elif score >= 1.5:
-        return 'C'
-    elif score >= 0.5:
-        return 'D'
-    else:
-        return 'E'
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
 
-def load_gold_standard():
-    """Load gold standard grades"""
-    gold_dir = Path('results/gold_standard')
-    gold_data = {}
-    
-    for json_file in gold_dir.glob('student_*_gold.json'):
-        with open(json_file, encoding='utf-8') as f:
-            data = json.load(f)
-            student_name = data['student_name']
-            student_num = ''.join(filter(str.isdigit, student_name))
-            if student_num:
-                student_id = f"student_{int(student_num):02d}"
-            else:
-                continue
-                
-            for q_idx, q in enumerate(data['questions'], start=1):
-                score = q['weighted_score']
-                gold_data[(student_id, q_idx)] = score
-    
-    return gold_data
+from src.analysis import get_dataset, scores_to_grades
+from src.evaluation.bootstrap import bootstrap_ci, fleiss_kappa_batch
 
 def test_strategy_differences():
     """ANOVA: Test if strategies differ significantly"""
@@ -53,8 +25,7 @@ def test_strategy_differences():
     print("1. ANOVA: Strategy Differences")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
-    gold_data = load_gold_standard()
+    data = get_dataset()
     
     for model in ['chatgpt', 'gemini']:
         print(f"\n{model.upper()}:")
@@ -71,18 +42,10 @@ def test_strategy_differences():
             else:
                 exp_pattern = f'exp_{model}_zero'
             
-            df = pd.read_sql_query(f"""
-                SELECT student_id, question_number, weighted_score
-                FROM grading_results
-                WHERE experiment_id LIKE '{exp_pattern}%' AND status = 'completed'
-            """, conn)
+            df = data.results(experiment_prefix=exp_pattern)
             
             # Calculate errors
-            df['gold_score'] = df.apply(
-                lambda row: gold_data.get((row['student_id'], row['question_number'])),
-                axis=1
-            )
-            df = df.dropna()
+            df = data.with_gold(df)
             df['error'] = abs(df['weighted_score'] - df['gold_score'])
             
             strategies_data.append(df['error'].values)
@@ -110,7 +73,6 @@ def test_strategy_differences():
                 t_stat, p_val = stats.ttest_ind(strategies_data[i], strategies_data[j])
                 print(f"    {strategy_names[i]} vs {strategy_names[j]}: t={t_stat:.3f}, p={p_val:.6f}")
     
-    conn.close()
 
 def test_model_differences():
     """Independent t-test: ChatGPT vs Gemini"""
@@ -118,8 +80,7 @@ def test_model_differences():
     print("2. Independent t-test: Model Comparison")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
-    gold_data = load_gold_standard()
+    data = get_dataset()
     
     for strategy in ['lenient', 'few-shot', 'zero-shot']:
         print(f"\n{strategy.upper()} Strategy:")
@@ -135,31 +96,15 @@ def test_model_differences():
             exp_pattern_chat = 'exp_chatgpt_zero'
             exp_pattern_gem = 'exp_gemini_zero'
         
-        df_chat = pd.read_sql_query(f"""
-            SELECT student_id, question_number, weighted_score
-            FROM grading_results
-            WHERE experiment_id LIKE '{exp_pattern_chat}%' AND status = 'completed'
-        """, conn)
+        df_chat = data.results(experiment_prefix=exp_pattern_chat)
         
-        df_gem = pd.read_sql_query(f"""
-            SELECT student_id, question_number, weighted_score
-            FROM grading_results
-            WHERE experiment_id LIKE '{exp_pattern_gem}%' AND status = 'completed'
-        """, conn)
+        df_gem = data.results(experiment_prefix=exp_pattern_gem)
         
         # Calculate errors
-        df_chat['gold_score'] = df_chat.apply(
-            lambda row: gold_data.get((row['student_id'], row['question_number'])),
-            axis=1
-        )
-        df_chat = df_chat.dropna()
+        df_chat = data.with_gold(df_chat)
         df_chat['error'] = abs(df_chat['weighted_score'] - df_chat['gold_score'])
         
-        df_gem['gold_score'] = df_gem.apply(
-            lambda row: gold_data.get((row['student_id'], row['question_number'])),
-            axis=1
-        )
-        df_gem = df_gem.dropna()
+        df_gem = data.with_gold(df_gem)
         df_gem['error'] = abs(df_gem['weighted_score'] - df_gem['gold_score'])
         
         # t-test
@@ -186,16 +131,14 @@ def test_model_differences():
         else:
             print(f"  No significant difference (p >= 0.05)")
     
-    conn.close()
 
 def test_kappa_confidence_intervals():
-    """Bootstrap confidence intervals for Fleiss' Kappa"""
+    """Bootstrap confidence intervals for Fleiss' Kappa (10,000 resamples)"""
     print("\n" + "="*80)
     print("3. Fleiss' Kappa Confidence Intervals (Bootstrap)")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
-    gold_data = load_gold_standard()
+    data = get_dataset()
     
     # Load data from all raters
     experiments = {
@@ -207,18 +150,10 @@ def test_kappa_confidence_intervals():
     
     all_data = []
     for name, exp_id in experiments.items():
-        df = pd.read_sql_query(f"""
-            SELECT student_id, question_number, weighted_score
-            FROM grading_results
-            WHERE experiment_id = '{exp_id}' AND status = 'completed'
-        """, conn)
+        df = data.results(experiment_id=exp_id)
         
-        df['gold_score'] = df.apply(
-            lambda row: gold_data.get((row['student_id'], row['question_number'])),
-            axis=1
-        )
-        df = df.dropna()
-        df['grade'] = df['weighted_score'].apply(score_to_grade)
+        df = data.with_gold(df)
+        df['grade'] = scores_to_grades(df['weighted_score'])
         df['rater'] = name
         all_data.append(df)
     
@@ -226,7 +161,7 @@ def test_kappa_confidence_intervals():
     
     # Create rating matrix
     grades = ['A', 'B', 'C', 'D', 'E']
-    items = combined.groupby(['student_id', 'question_number']).size().index
+    items = combined.groupby(['student_id', 'question_number'], observed=True).size().index
     
     rating_matrix = []
     for item in items:
@@ -244,22 +179,12 @@ def test_kappa_confidence_intervals():
     print(f"\nFleiss' Kappa: {kappa:.4f}")
     
     # Bootstrap confidence interval
-    n_bootstrap = 1000
-    kappa_samples = []
-    
-    for _ in range(n_bootstrap):
-        indices = np.random.choice(len(rating_matrix), size=len(rating_matrix), replace=True)
-        sample_matrix = rating_matrix[indices]
-        try:
-            k = fleiss_kappa(sample_matrix)
-            kappa_samples.append(k)
-        except:
-            continue
-    
-    ci_lower = np.percentile(kappa_samples, 2.5)
-    ci_upper = np.percentile(kappa_samples, 97.5)
+    bootstrap = bootstrap_ci(fleiss_kappa_batch, rating_matrix, n_resamples=10000, seed=42, n_jobs=-1)
+    ci_lower, ci_upper = bootstrap['percentile_ci']
+    bca_lower, bca_upper = bootstrap['bca_ci']
     
     print(f"95% CI: [{ci_lower:.4f}, {ci_upper:.4f}]")
+    print(f"95% BCa CI: [{bca_lower:.4f}, {bca_upper:.4f}]")
     
     # Interpretation
     if kappa >= 0.81:
@@ -273,7 +198,6 @@ def test_kappa_confidence_intervals():
     
     print(f"Interpretation: {interpretation}")
     
-    conn.close()
 
 def test_grade_distribution():
     """Chi-square test: Grade distribution differences"""
@@ -281,25 +205,17 @@ def test_grade_distribution():
     print("4. Chi-square: Grade Distribution Differences")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
+    data = get_dataset()
     
     # Compare ChatGPT vs Gemini (lenient)
     print("\nChatGPT vs Gemini (Lenient Strategy):")
     
-    df_chat = pd.read_sql_query("""
-        SELECT weighted_score
-        FROM grading_results
-        WHERE model = 'chatgpt' AND strategy = 'lenient' AND status = 'completed'
-    """, conn)
+    df_chat = data.results(model='chatgpt', strategy='lenient')
     
-    df_gem = pd.read_sql_query("""
-        SELECT weighted_score
-        FROM grading_results
-        WHERE model = 'gemini' AND strategy = 'lenient' AND status = 'completed'
-    """, conn)
+    df_gem = data.results(model='gemini', strategy='lenient')
     
-    df_chat['grade'] = df_chat['weighted_score'].apply(score_to_grade)
-    df_gem['grade'] = df_gem['weighted_score'].apply(score_to_grade)
+    df_chat['grade'] = scores_to_grades(df_chat['weighted_score'])
+    df_gem['grade'] = scores_to_grades(df_gem['weighted_score'])
     
     grades = ['A', 'B', 'C', 'D', 'E']
     chat_counts = [sum(df_chat['grade'] == g) for g in grades]
@@ -341,7 +257,6 @@ def test_grade_distribution():
     cramers_v = np.sqrt(chi2 / (n * (min(contingency_table.shape) - 1)))
     print(f"  Cramér's V: {cramers_v:.3f} ({'small' if cramers_v < 0.3 else 'medium' if cramers_v < 0.5 else 'large'} effect)")
     
-    conn.close()
 
 def test_correlation_significance():
     """Test significance of correlations with gold standard"""
@@ -349,8 +264,7 @@ def test_correlation_significance():
     print("5. Correlation Significance Tests")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
-    gold_data = load_gold_standard()
+    data = get_dataset()
     
     configs = [
         ('ChatGPT', 'lenient', 'exp_chatgpt_lenient_01'),
@@ -362,17 +276,9 @@ def test_correlation_significance():
     ]
     
     for model, strategy, exp_id in configs:
-        df = pd.read_sql_query(f"""
-            SELECT student_id, question_number, weighted_score
-            FROM grading_results
-            WHERE experiment_id = '{exp_id}' AND status = 'completed'
-        """, conn)
+        df = data.results(experiment_id=exp_id)
         
-        df['gold_score'] = df.apply(
-            lambda row: gold_data.get((row['student_id'], row['question_number'])),
-            axis=1
-        )
-        df = df.dropna()
+        df = data.with_gold(df)
         
         # Pearson correlation
         r_pearson, p_pearson = stats.pearsonr(df['gold_score'], df['weighted_score'])
@@ -393,7 +299,6 @@ def test_correlation_significance():
         ci_high = np.tanh(z_ci_high)
         print(f"  95% CI: [{ci_low:.4f}, {ci_high:.4f}]")
     
-    conn.close()
 
 def test_exact_match_proportions():
     """Confidence intervals for exact match proportions"""
@@ -401,8 +306,7 @@ def test_exact_match_proportions():
     print("6. Exact Match Proportion Confidence Intervals")
     print("="*80)
     
-    conn = sqlite3.connect('results/grading_results.db')
-    gold_data = load_gold_standard()
+    data = get_dataset()
     
     configs = [
         ('ChatGPT', 'lenient', 'exp_chatgpt_lenient_01'),
@@ -410,20 +314,12 @@ def test_exact_match_proportions():
     ]
     
     for model, strategy, exp_id in configs:
-        df = pd.read_sql_query(f"""
-            SELECT student_id, question_number, weighted_score
-            FROM grading_results
-            WHERE experiment_id = '{exp_id}' AND status = 'completed'
-        """, conn)
+        df = data.results(experiment_id=exp_id)
         
-        df['gold_score'] = df.apply(
-            lambda row: gold_data.get((row['student_id'], row['question_number'])),
-            axis=1
-        )
-        df = df.dropna()
+        df = data.with_gold(df)
         
-        df['ai_grade'] = df['weighted_score'].apply(score_to_grade)
-        df['gold_grade'] = df['gold_score'].apply(score_to_grade)
+        df['ai_grade'] = scores_to_grades(df['weighted_score'])
+        df['gold_grade'] = scores_to_grades(df['gold_score'])
         
         exact_matches = sum(df['ai_grade'] == df['gold_grade'])
         total = len(df)
@@ -436,7 +332,6 @@ def test_exact_match_proportions():
         print(f"  Exact match: {exact_matches}/{total} = {proportion*100:.2f}%")
         print(f"  95% CI: [{ci_low*100:.2f}%, {ci_high*100:.2f}%]")
     
-    conn.close()
 
 def main():
     print("\n" + "="*80)
@@ -4,7 +4,8 @@ Defines interface for all essay grading agents
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, List, Tuple
+import asyncio
 import time
 import json
 from datetime import datetime
@@ -70,7 +71,11 @@ class BaseAgent(ABC):
         max_tokens: int = 2000,
         max_retries: int = 3,
         retry_delay: int = 5,
-        timeout: int = 60
+        timeout: int = 60,
+        max_concurrency: int = 5,
+        rate_limiter=None,
+        response_cache=None,
+        prompt_layout: str = "standard"
     ):
         self.api_key = api_key
         self.model_name = model_name
@@ -79,15 +84,28 @@ class BaseAgent(ABC):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.timeout = timeout
+        self.max_concurrency = max_concurrency  # In-flight limit for async grading
+        self.rate_limiter = rate_limiter  # Optional RateLimiter shared across agents/processes
+        self.response_cache = response_cache  # Optional ResponseCache for replaying identical calls
+        self.prompt_layout = prompt_layout  # 'prefix-cache' puts the static prompt part first
+        self._prompt_builders = {}  # (id(rubric), language, strategy, layout) -> (rubric, PromptBuilder)
         
         # Statistics
         self.total_calls = 0
         self.successful_calls = 0
         self.failed_calls = 0
         self.total_tokens = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0  # Prompt tokens served from the provider's prefix cache
     
     @abstractmethod
-    def _call_api(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    def _call_api(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Make API call to the LLM
         Must be implemented by each specific agent
@@ -95,6 +113,7 @@ class BaseAgent(ABC):
         Args:
             prompt: The grading prompt
             system_prompt: Optional system prompt
+            max_tokens: Output budget override (default: self.max_tokens)
             
         Returns:
             Raw response from API
@@ -115,6 +134,365 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def _call_api_async(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Make API call to the LLM without blocking the event loop
+        
+        Agents with a native async client should override this. The default
+        runs the blocking _call_api in a worker thread.
+        
+        Args:
+            prompt: The grading prompt
+            system_prompt: Optional system prompt
+            max_tokens: Output budget override (default: self.max_tokens)
+            
+        Returns:
+            Raw response from API
+        """
+        return await asyncio.to_thread(self._call_api, prompt, system_prompt, max_tokens)
+    
+    def _get_prompt_builder(self, rubric, language: str = "indonesian"):
+        """
+        Get the PromptBuilder for a rubric/language, reusing it across essays
+        
+        Rubrics are treated as immutable once loaded; the builder (and its
+        compiled template) is created once per rubric object.
+        """
+        from src.core.prompt_builder import PromptBuilder
+        
+        # Build prompt with language and strategy support
+        strategy = getattr(self, 'strategy', 'zero-shot')  # Default to zero-shot if not set
+        key = (id(rubric), language, strategy, self.prompt_layout)
+        cached = self._prompt_builders.get(key)
+        if cached is None or cached[0] is not rubric:
+            builder = PromptBuilder(rubric, language=language, strategy=strategy, layout=self.prompt_layout)
+            cached = (rubric, builder)
+            self._prompt_builders[key] = cached
+        return cached[1]
+    
+    def _build_prompts(
+        self,
+        question: str,
+        answer: str,
+        rubric,
+        additional_context: Optional[str] = None,
+        language: str = "indonesian"
+    ) -> Tuple[str, str]:
+        """
+        Build user and system prompts for a single essay
+        
+        Returns:
+            Tuple of (prompt, system_prompt)
+        """
+        builder = self._get_prompt_builder(rubric, language)
+        prompt = builder.build_grading_prompt(question, answer, additional_context)
+        system_prompt = builder.get_system_prompt()
+        return prompt, system_prompt
+    
+    def _build_packed_prompts(
+        self,
+        items: List[Dict[str, Any]],
+        rubric,
+        additional_context: Optional[str] = None,
+        language: str = "indonesian"
+    ) -> Tuple[str, str]:
+        """
+        Build user and system prompts for several answers of one student
+        
+        Returns:
+            Tuple of (prompt, system_prompt)
+        """
+        builder = self._get_prompt_builder(rubric, language)
+        prompt = builder.build_packed_grading_prompt(items, additional_context)
+        system_prompt = builder.get_system_prompt()
+        return prompt, system_prompt
+    
+    def _result_from_parsed(
+        self,
+        student_id: str,
+        question_id: str,
+        trial: int,
+        rubric,
+        parsed: Dict[str, Any],
+        metadata: Dict[str, Any]
+    ) -> GradingResult:
+        """Wrap parsed scores in a GradingResult with the weighted score"""
+        # Calculate weighted score
+        grades = {criterion: data["grade"] for criterion, data in parsed["scores"].items()}
+        weighted_score = rubric.calculate_weighted_score(grades)
+        
+        return GradingResult(
+            student_id=student_id,
+            question_id=question_id,
+            trial=trial,
+            model=self.model_name,
+            scores=parsed["scores"],
+            weighted_score=weighted_score,
+            overall_comment=parsed.get("overall_comment"),
+            metadata=metadata
+        )
+    
+    def _build_result(
+        self,
+        student_id: str,
+        question_id: str,
+        trial: int,
+        rubric,
+        response: Dict[str, Any]
+    ) -> GradingResult:
+        """Parse a raw API response and wrap it in a GradingResult"""
+        # Parse response
+        parsed = self.parse_response(response)
+        
+        # Create result
+        result = self._result_from_parsed(student_id, question_id, trial, rubric, parsed, {
+            "tokens": response.get("tokens", 0),
+            "api_call_time": response.get("call_time", 0),
+            "prompt_tokens": response.get("prompt_tokens", 0),
+            "cached_tokens": response.get("cached_tokens", 0)
+        })
+        
+        self.successful_calls += 1
+        return result
+    
+    def parse_packed_response(
+        self,
+        response: Dict[str, Any],
+        question_ids: List[str],
+        rubric
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Exception]]:
+        """
+        Parse and validate a packed (multi-answer) response item by item
+        
+        Each entry of the "results" array is validated on its own with
+        parse_response, so one malformed item does not discard the others.
+        
+        Args:
+            response: Raw API response of a packed call
+            question_ids: Question ids that were packed into the prompt
+            rubric: Rubric object (criterion names must match exactly)
+            
+        Returns:
+            Tuple of (parsed items by question_id, errors by question_id)
+        """
+        content = response["content"].strip()
+        
+        # Some models wrap the JSON in markdown code blocks
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        
+        try:
+            data = json.loads(content.strip())
+        except json.JSONDecodeError as e:
+            error = ValueError(f"Failed to parse packed JSON response: {e}")
+            return {}, {str(qid): error for qid in question_ids}
+        
+        entries = data.get("results", []) if isinstance(data, dict) else data
+        by_id = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and "question_id" in entry:
+                by_id.setdefault(str(entry["question_id"]), entry)
+        
+        expected_criteria = set(rubric.criteria.keys())
+        parsed_items, errors = {}, {}
+        for qid in map(str, question_ids):
+            entry = by_id.get(qid)
+            if entry is None:
+                errors[qid] = ValueError(f"Packed response has no entry for question {qid}")
+                continue
+            try:
+                item = {"scores": entry.get("scores"), "overall_comment": entry.get("overall_comment")}
+                parsed = self.parse_response({"content": json.dumps(item, ensure_ascii=False)})
+                if set(parsed["scores"].keys()) != expected_criteria:
+                    raise ValueError(f"Criteria {sorted(parsed['scores'])} do not match rubric")
+                parsed_items[qid] = parsed
+            except Exception as e:
+                errors[qid] = e if isinstance(e, ValueError) else ValueError(str(e))
+        
+        return parsed_items, errors
+    
+    def _packed_results(
+        self,
+        student_id: str,
+        items: List[Dict[str, Any]],
+        trial: int,
+        rubric,
+        response: Dict[str, Any]
+    ) -> Tuple[Dict[str, GradingResult], Dict[str, Exception]]:
+        """
+        Turn a packed response into per-question GradingResults
+        
+        Tokens and call time are split evenly across the packed items so that
+        per-task totals still add up to the experiment cost.
+        
+        Returns:
+            Tuple of (results by question_id, errors by question_id)
+        """
+        question_ids = [str(item["question_id"]) for item in items]
+        parsed_items, errors = self.parse_packed_response(response, question_ids, rubric)
+        
+        size = len(items)
+        metadata = {
+            "tokens": response.get("tokens", 0) // size,
+            "api_call_time": response.get("call_time", 0) / size,
+            "prompt_tokens": response.get("prompt_tokens", 0) // size,
+            "cached_tokens": response.get("cached_tokens", 0) // size,
+            "packed_size": size
+        }
+        results = {
+            qid: self._result_from_parsed(student_id, qid, trial, rubric, parsed, dict(metadata))
+            for qid, parsed in parsed_items.items()
+        }
+        if results:
+            self.successful_calls += 1
+        return results, errors
+    
+    def grade_packed(
+        self,
+        student_id: str,
+        items: List[Dict[str, Any]],
+        rubric,
+        trial: int = 1,
+        additional_context: Optional[str] = None,
+        language: str = "indonesian",
+        return_exceptions: bool = False
+    ) -> list:
+        """
+        Grade several answers of one student in a single API call
+        
+        The rubric, instructions and system prompt are sent once for all
+        items. Items missing from or invalid in the packed response are
+        re-graded individually with grade_essay.
+        
+        Args:
+            student_id: Student identifier
+            items: List of dicts with question_id, question, answer
+            rubric: Rubric object for grading
+            trial: Trial number
+            additional_context: Optional additional instructions
+            language: Language for justifications
+            return_exceptions: If True, items whose fallback also failed appear
+                               as their exception instead of raising
+            
+        Returns:
+            List of GradingResult objects in item order
+        """
+        if len(items) == 1:
+            item = items[0]
+            outcome = self._grade_fallback(student_id, item, rubric, trial, additional_context, language)
+            if isinstance(outcome, Exception) and not return_exceptions:
+                raise outcome
+            return [outcome]
+        
+        prompt, system_prompt = self._build_packed_prompts(items, rubric, additional_context, language)
+        question_ids = [str(item["question_id"]) for item in items]
+        try:
+            response = self._call_with_retries(
+                prompt, system_prompt, trial=trial, max_tokens=self.max_tokens * len(items),
+                cacheable=lambda reply: not self.parse_packed_response(reply, question_ids, rubric)[1]
+            )
+            results, errors = self._packed_results(student_id, items, trial, rubric, response)
+        except Exception as e:
+            print(f"Packed call for {student_id} failed: {e}. Grading items individually...")
+            results, errors = {}, {str(item["question_id"]): e for item in items}
+        
+        outcomes = []
+        for item in items:
+            qid = str(item["question_id"])
+            if qid in results:
+                outcomes.append(results[qid])
+                continue
+            if results:
+                print(f"Packed item {student_id}/{qid} invalid: {errors[qid]}. Grading individually...")
+            outcome = self._grade_fallback(student_id, item, rubric, trial, additional_context, language)
+            if isinstance(outcome, Exception) and not return_exceptions:
+                raise outcome
+            outcomes.append(outcome)
+        return outcomes
+    
+    async def grade_packed_async(
+        self,
+        student_id: str,
+        items: List[Dict[str, Any]],
+        rubric,
+        trial: int = 1,
+        additional_context: Optional[str] = None,
+        language: str = "indonesian",
+        return_exceptions: bool = False
+    ) -> list:
+        """
+        Async counterpart of grade_packed
+        
+        Same arguments and return value as grade_packed.
+        """
+        if len(items) == 1:
+            item = items[0]
+            outcome = await self._grade_fallback_async(student_id, item, rubric, trial, additional_context, language)
+            if isinstance(outcome, Exception) and not return_exceptions:
+                raise outcome
+            return [outcome]
+        
+        prompt, system_prompt = self._build_packed_prompts(items, rubric, additional_context, language)
+        question_ids = [str(item["question_id"]) for item in items]
+        try:
+            response = await self._call_with_retries_async(
+                prompt, system_prompt, trial=trial, max_tokens=self.max_tokens * len(items),
+                cacheable=lambda reply: not self.parse_packed_response(reply, question_ids, rubric)[1]
+            )
+            results, errors = self._packed_results(student_id, items, trial, rubric, response)
+        except Exception as e:
+            print(f"Packed call for {student_id} failed: {e}. Grading items individually...")
+            results, errors = {}, {str(item["question_id"]): e for item in items}
+        
+        # Only the failing items are split back out, concurrently
+        missing = [item for item in items if str(item["question_id"]) not in results]
+        if results:
+            for item in missing:
+                print(f"Packed item {student_id}/{item['question_id']} invalid: "
+                      f"{errors[str(item['question_id'])]}. Grading individually...")
+        fallbacks = await asyncio.gather(*(
+            self._grade_fallback_async(student_id, item, rubric, trial, additional_context, language)
+            for item in missing
+        ))
+        for item, outcome in zip(missing, fallbacks):
+            results[str(item["question_id"])] = outcome
+        
+        outcomes = [results[str(item["question_id"])] for item in items]
+        if not return_exceptions:
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    raise outcome
+        return outcomes
+    
+    def _grade_fallback(self, student_id, item, rubric, trial, additional_context, language):
+        """Grade one item on its own; returns the GradingResult or the exception"""
+        try:
+            return self.grade_essay(
+                student_id, item["question_id"], item["question"], item["answer"],
+                rubric, trial=trial, additional_context=additional_context, language=language
+            )
+        except Exception as e:
+            return e
+    
+    async def _grade_fallback_async(self, student_id, item, rubric, trial, additional_context, language):
+        """Async counterpart of _grade_fallback"""
+        try:
+            return await self.grade_essay_async(
+                student_id, item["question_id"], item["question"], item["answer"],
+                rubric, trial=trial, additional_context=additional_context, language=language
+            )
+        except Exception as e:
+            return e
+    
     def grade_essay(
         self,
         student_id: str,
@@ -142,46 +520,212 @@ class BaseAgent(ABC):
         Returns:
             GradingResult with scores and justifications
         """
-        from src.core.prompt_builder import PromptBuilder
-        
-        # Build prompt with language and strategy support
-        strategy = getattr(self, 'strategy', 'zero-shot')  # Default to zero-shot if not set
-        builder = PromptBuilder(rubric, language=language, strategy=strategy)
-        prompt = builder.build_grading_prompt(question, answer, additional_context)
-        system_prompt = builder.get_system_prompt()
+        prompt, system_prompt = self._build_prompts(
+            question, answer, rubric, additional_context, language
+        )
         
         # Call API with retries
-        response = self._call_with_retries(prompt, system_prompt)
+        response = self._call_with_retries(
+            prompt, system_prompt, trial=trial,
+            cacheable=lambda reply: self._is_valid_reply(reply, rubric)
+        )
         
-        # Parse response
-        parsed = self.parse_response(response)
+        return self._build_result(student_id, question_id, trial, rubric, response)
+    
+    async def grade_essay_async(
+        self,
+        student_id: str,
+        question_id: str,
+        question: str,
+        answer: str,
+        rubric,
+        trial: int = 1,
+        additional_context: Optional[str] = None,
+        language: str = "indonesian"
+    ) -> GradingResult:
+        """
+        Grade a single essay without blocking the event loop
         
-        # Calculate weighted score
-        grades = {criterion: data["grade"] for criterion, data in parsed["scores"].items()}
-        weighted_score = rubric.calculate_weighted_score(grades)
+        Same arguments and return value as grade_essay.
+        """
+        prompt, system_prompt = self._build_prompts(
+            question, answer, rubric, additional_context, language
+        )
         
-        # Create result
-        result = GradingResult(
-            student_id=student_id,
-            question_id=question_id,
-            trial=trial,
-            model=self.model_name,
-            scores=parsed["scores"],
-            weighted_score=weighted_score,
-            overall_comment=parsed.get("overall_comment"),
-            metadata={
-                "tokens": response.get("tokens", 0),
-                "api_call_time": response.get("call_time", 0)
-            }
+        # Call API with retries
+        response = await self._call_with_retries_async(
+            prompt, system_prompt, trial=trial,
+            cacheable=lambda reply: self._is_valid_reply(reply, rubric)
         )
         
-        self.successful_calls += 1
-        return result
+        return self._build_result(student_id, question_id, trial, rubric, response)
+    
+    async def grade_batch_async(
+        self,
+        essays: List[Dict[str, Any]],
+        rubric,
+        trial: int = 1,
+        max_concurrency: Optional[int] = None,
+        language: str = "indonesian",
+        on_result: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+        return_exceptions: bool = False,
+        pack_size: Optional[int] = None
+    ) -> list:
+        """
+        Grade multiple essays concurrently with a bounded number of in-flight calls
+        
+        Args:
+            essays: List of dicts with student_id, question_id, question, answer
+            rubric: Rubric object
+            trial: Trial number
+            max_concurrency: In-flight request limit (default: self.max_concurrency)
+            language: Language for justifications
+            on_result: Optional callback(essay, result_or_exception), called as
+                       soon as each essay finishes
+            return_exceptions: If True, failed essays appear in the output as
+                               their exception instead of being dropped
+            pack_size: If > 1, answers of the same student are graded up to
+                       pack_size per call with grade_packed_async
+            
+        Returns:
+            List of GradingResult objects in input order
+        """
+        limit = max(1, max_concurrency or self.max_concurrency)
+        semaphore = asyncio.Semaphore(limit)
+        
+        if pack_size and pack_size > 1:
+            outcomes = await self._grade_packs_async(
+                essays, rubric, trial, semaphore, language, on_result, pack_size
+            )
+            if return_exceptions:
+                return outcomes
+            return [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        
+        async def grade_one(essay: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    outcome = await self.grade_essay_async(
+                        student_id=essay["student_id"],
+                        question_id=essay["question_id"],
+                        question=essay["question"],
+                        answer=essay["answer"],
+                        rubric=rubric,
+                        trial=trial,
+                        language=language
+                    )
+                except Exception as e:
+                    print(f"Error grading essay {essay.get('student_id')}: {e}")
+                    outcome = e
+            if on_result is not None:
+                on_result(essay, outcome)
+            return outcome
+        
+        outcomes = await asyncio.gather(*(grade_one(essay) for essay in essays))
+        
+        if return_exceptions:
+            return list(outcomes)
+        return [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+    
+    async def _grade_packs_async(
+        self,
+        essays: List[Dict[str, Any]],
+        rubric,
+        trial: int,
+        semaphore: asyncio.Semaphore,
+        language: str,
+        on_result: Optional[Callable[[Dict[str, Any], Any], None]],
+        pack_size: int
+    ) -> list:
+        """Group essays by student into packs and grade each pack in one call"""
+        by_student: Dict[str, List[int]] = {}
+        for index, essay in enumerate(essays):
+            by_student.setdefault(essay["student_id"], []).append(index)
+        
+        packs = []
+        for indices in by_student.values():
+            for start in range(0, len(indices), pack_size):
+                packs.append(indices[start:start + pack_size])
+        
+        outcomes: List[Any] = [None] * len(essays)
+        
+        async def grade_pack(indices: List[int]):
+            pack = [essays[i] for i in indices]
+            async with semaphore:
+                try:
+                    results = await self.grade_packed_async(
+                        student_id=pack[0]["student_id"],
+                        items=pack,
+                        rubric=rubric,
+                        trial=trial,
+                        language=language,
+                        return_exceptions=True
+                    )
+                except Exception as e:
+                    results = [e] * len(pack)
+            for index, essay, outcome in zip(indices, pack, results):
+                if isinstance(outcome, Exception):
+                    print(f"Error grading essay {essay.get('student_id')}: {outcome}")
+                outcomes[index] = outcome
+                if on_result is not None:
+                    on_result(essay, outcome)
+        
+        await asyncio.gather(*(grade_pack(indices) for indices in packs))
+        return outcomes
+    
+    def _estimate_tokens(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> int:
+        """
+        Estimate tokens a call may consume, for rate-limit reservations
+        
+        Uses ~4 characters per token for the input plus the full output budget
+        (providers count max_tokens against the per-minute token quota).
+        """
+        return (len(prompt) + len(system_prompt or "")) // 4 + (max_tokens or self.max_tokens)
+    
+    def _is_valid_reply(self, response: Dict[str, Any], rubric) -> bool:
+        """Whether a single-answer reply parses and grades exactly the rubric's criteria"""
+        try:
+            parsed = self.parse_response(response)
+        except Exception:
+            return False
+        return set(parsed["scores"].keys()) == set(rubric.criteria.keys())
+    
+    def _cache_lookup(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        trial: int
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a call in the response cache
+        
+        Returns:
+            Tuple of (cache_key, cached_response); both None without a cache
+        """
+        if self.response_cache is None:
+            return None, None
+        
+        key = self.response_cache.make_key(
+            self.model_name, system_prompt, prompt, self.temperature, trial
+        )
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            cached["call_time"] = 0.0
+            cached["cached"] = True
+        return key, cached
     
     def _call_with_retries(
         self,
         prompt: str,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        trial: int = 1,
+        max_tokens: Optional[int] = None,
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None
     ) -> Dict[str, Any]:
         """
         Call API with retry logic
@@ -189,6 +733,10 @@ class BaseAgent(ABC):
         Args:
             prompt: The prompt
             system_prompt: Optional system prompt
+            trial: Trial number (part of the response cache key)
+            max_tokens: Output budget override (default: self.max_tokens)
+            cacheable: Predicate on the reply; only replies it accepts (parsed
+                       and valid) are stored in the response cache
             
         Returns:
             API response
@@ -197,14 +745,28 @@ class BaseAgent(ABC):
             Exception: If all retries fail
         """
         self.total_calls += 1
+        cache_key, cached = self._cache_lookup(prompt, system_prompt, trial)
+        if cached is not None:
+            return cached
+        
         last_error = None
+        reserved_tokens = self._estimate_tokens(prompt, system_prompt, max_tokens)
         
         for attempt in range(self.max_retries):
             try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(reserved_tokens)
+                
                 start_time = time.time()
-                response = self._call_api(prompt, system_prompt)
+                response = self._call_api(prompt, system_prompt, max_tokens)
                 call_time = time.time() - start_time
                 
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record_usage(reserved_tokens, response.get("tokens", reserved_tokens))
+                
+                if cache_key is not None and (cacheable is None or cacheable(response)):
+                    self.response_cache.put(cache_key, response)
+                
                 response["call_time"] = call_time
                 return response
                 
@@ -219,6 +781,59 @@ class BaseAgent(ABC):
         
         raise Exception(f"API call failed after {self.max_retries} attempts: {last_error}")
     
+    async def _call_with_retries_async(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        trial: int = 1,
+        max_tokens: Optional[int] = None,
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of _call_with_retries (backoff uses asyncio.sleep)
+        
+        Rate-limiter and response-cache SQLite access runs in worker threads,
+        so a lock held by another process never stalls the event loop.
+        """
+        self.total_calls += 1
+        cache_key, cached = await asyncio.to_thread(self._cache_lookup, prompt, system_prompt, trial)
+        if cached is not None:
+            return cached
+        
+        last_error = None
+        reserved_tokens = self._estimate_tokens(prompt, system_prompt, max_tokens)
+        
+        for attempt in range(self.max_retries):
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async(reserved_tokens)
+                
+                start_time = time.time()
+                response = await self._call_api_async(prompt, system_prompt, max_tokens)
+                call_time = time.time() - start_time
+                
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.record_usage_async(
+                        reserved_tokens, response.get("tokens", reserved_tokens)
+                    )
+                
+                if cache_key is not None and (cacheable is None or cacheable(response)):
+                    await asyncio.to_thread(self.response_cache.put, cache_key, response)
+                
+                response["call_time"] = call_time
+                return response
+                
+            except Exception as e:
+                last_error = e
+                if attempt < self.max_retries - 1:
+                    print(f"Attempt {attempt + 1} failed: {e}. Retrying in {self.retry_delay}s...")
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    self.failed_calls += 1
+                    print(f"All {self.max_retries} attempts failed")
+        
+        raise Exception(f"API call failed after {self.max_retries} attempts: {last_error}")
+    
     def get_statistics(self) -> Dict[str, Any]:
         """Get agent statistics"""
         return {
@@ -227,7 +842,11 @@ class BaseAgent(ABC):
             "successful_calls": self.successful_calls,
             "failed_calls": self.failed_calls,
             "success_rate": self.successful_calls / self.total_calls if self.total_calls > 0 else 0,
-            "total_tokens": self.total_tokens
+            "total_tokens": self.total_tokens,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_token_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens > 0 else 0
         }
     
     def reset_statistics(self):
@@ -236,6 +855,9 @@ class BaseAgent(ABC):
         self.successful_calls = 0
         self.failed_calls = 0
         self.total_tokens = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
     
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(model={self.model_name})"
@@ -5,9 +5,13 @@ Uses OpenAI API for essay grading
 
 import json
 import os
-from typing import Dict, Any, Optional
-from openai import OpenAI
-from src.agents.base_agent import BaseAgent, validate_grading_response
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from openai import OpenAI, AsyncOpenAI
+from src.agents.base_agent import BaseAgent, GradingResult, validate_grading_response
+from src.agents.rate_limiter import RateLimiter
+from src.agents.response_cache import ResponseCache
 
 
 class ChatGPTAgent(BaseAgent):
@@ -24,7 +28,12 @@ class ChatGPTAgent(BaseAgent):
         timeout: int = 60,
         rubric = None,
         language: str = "indonesian",
-        strategy: str = "zero-shot"
+        strategy: str = "zero-shot",
+        max_concurrency: int = 5,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        base_url: Optional[str] = None,
+        prompt_layout: str = "standard"
     ):
         # Get API key from environment if not provided
         if api_key is None:
@@ -39,7 +48,11 @@ class ChatGPTAgent(BaseAgent):
             max_tokens=max_tokens,
             max_retries=max_retries,
             retry_delay=retry_delay,
-            timeout=timeout
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter or RateLimiter.from_config("chatgpt"),
+            response_cache=response_cache or ResponseCache.from_env(),
+            prompt_layout=prompt_layout
         )
         
         # Store rubric, language, and strategy
@@ -47,53 +60,283 @@ class ChatGPTAgent(BaseAgent):
         self.language = language
         self.strategy = strategy
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
+        # Initialize OpenAI clients (async client is created on first use).
+        # base_url points the agent at a compatible local server for testing.
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self._async_client = None
     
-    def _call_api(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Lazily created AsyncOpenAI client for the async grading path"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._async_client
+    
+    def _build_request(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Build chat.completions.create keyword arguments"""
+        messages = []
+        
+        # Add system prompt if provided
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        # Add user prompt
+        messages.append({"role": "user", "content": prompt})
+        
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            "response_format": {"type": "json_object"},  # Force JSON response
+        }
+    
+    def _call_api(self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Call OpenAI API
         
         Args:
             prompt: The grading prompt
             system_prompt: System prompt for the model
+            max_tokens: Output budget override (default: self.max_tokens)
             
         Returns:
             Response with content and metadata
         """
-        messages = []
-        
-        # Add system prompt if provided
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        # Add user prompt
-        messages.append({"role": "user", "content": prompt})
-        
-        # Make API call
         response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
-            response_format={"type": "json_object"},  # Force JSON response
-            timeout=self.timeout
+            timeout=self.timeout,
+            **self._build_request(prompt, system_prompt, max_tokens)
         )
+        return self._extract_response(response)
+    
+    async def _call_api_async(self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Call OpenAI API through AsyncOpenAI
         
+        Args:
+            prompt: The grading prompt
+            system_prompt: System prompt for the model
+            max_tokens: Output budget override (default: self.max_tokens)
+            
+        Returns:
+            Response with content and metadata
+        """
+        response = await self.async_client.chat.completions.create(
+            timeout=self.timeout,
+            **self._build_request(prompt, system_prompt, max_tokens)
+        )
+        return self._extract_response(response)
+    
+    def _extract_response(self, response) -> Dict[str, Any]:
+        """Convert a ChatCompletion into the agent's response dict"""
         # Extract response
         content = response.choices[0].message.content
         
-        # Track tokens
+        # Track tokens (cached_tokens: prompt prefix served from OpenAI's prompt cache)
         tokens_used = response.usage.total_tokens
+        prompt_tokens = response.usage.prompt_tokens or 0
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
         self.total_tokens += tokens_used
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
         
         return {
             "content": content,
             "tokens": tokens_used,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
             "model": response.model,
             "finish_reason": response.choices[0].finish_reason
         }
     
+    def build_batch_request(
+        self,
+        custom_id: str,
+        question: str,
+        answer: str,
+        rubric,
+        language: str = "indonesian"
+    ) -> Dict[str, Any]:
+        """
+        Build one line of an OpenAI Batch API request file
+        
+        Args:
+            custom_id: Identifier echoed back in the batch output
+            question: The essay question/prompt
+            answer: Student's essay answer
+            rubric: Rubric object for grading
+            language: Language for justifications
+            
+        Returns:
+            Request dict (custom_id, method, url, body)
+        """
+        prompt, system_prompt = self._build_prompts(question, answer, rubric, language=language)
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self._build_request(prompt, system_prompt)
+        }
+    
+    def write_batch_file(self, requests: List[Dict[str, Any]], path) -> Path:
+        """
+        Write batch requests to a JSONL file
+        
+        Args:
+            requests: Request dicts from build_batch_request
+            path: Output file path
+            
+        Returns:
+            Path to the written file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        return path
+    
+    def submit_batch(self, path, metadata: Optional[Dict[str, str]] = None) -> str:
+        """
+        Upload a request file and create a batch job
+        
+        Args:
+            path: JSONL request file from write_batch_file
+            metadata: Optional batch metadata (e.g. experiment id)
+            
+        Returns:
+            Batch id
+        """
+        with open(path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        
+        kwargs = {"metadata": metadata} if metadata else {}
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            **kwargs
+        )
+        return batch.id
+    
+    def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 30,
+        timeout: Optional[float] = None
+    ):
+        """
+        Poll a batch until it reaches a terminal status
+        
+        Args:
+            batch_id: Batch id from submit_batch
+            poll_interval: Seconds between status checks
+            timeout: Optional maximum seconds to wait
+            
+        Returns:
+            Final Batch object
+            
+        Raises:
+            TimeoutError: If the batch is still running after timeout
+        """
+        start_time = time.time()
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                return batch
+            
+            counts = getattr(batch, "request_counts", None)
+            if counts is not None:
+                print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+            else:
+                print(f"Batch {batch_id}: {batch.status}")
+            
+            if timeout is not None and time.time() - start_time > timeout:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+            time.sleep(poll_interval)
+    
+    def download_batch_results(self, batch) -> List[Dict[str, Any]]:
+        """
+        Download output and error lines of a finished batch
+        
+        Args:
+            batch: Batch object from wait_for_batch
+            
+        Returns:
+            List of result lines (dicts with custom_id, response, error)
+        """
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = self.client.files.content(file_id).text
+            lines.extend(json.loads(line) for line in content.splitlines() if line.strip())
+        return lines
+    
+    def grade_from_batch_line(
+        self,
+        line: Dict[str, Any],
+        student_id: str,
+        question_id: str,
+        trial: int,
+        rubric
+    ) -> GradingResult:
+        """
+        Turn one batch output line into a GradingResult
+        
+        Args:
+            line: Result line from download_batch_results
+            student_id: Student identifier
+            question_id: Question identifier
+            trial: Trial number
+            rubric: Rubric object for grading
+            
+        Returns:
+            GradingResult with scores and justifications
+            
+        Raises:
+            ValueError: If the request failed or the response is invalid
+        """
+        self.total_calls += 1
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            self.failed_calls += 1
+            error = line.get("error") or response.get("body", {}).get("error")
+            raise ValueError(f"Batch request failed: {error}")
+        
+        body = response["body"]
+        usage = body.get("usage") or {}
+        tokens_used = usage.get("total_tokens", 0)
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        self.total_tokens += tokens_used
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        
+        return self._build_result(student_id, question_id, trial, rubric, {
+            "content": body["choices"][0]["message"]["content"],
+            "tokens": tokens_used,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "model": body.get("model", self.model_name),
+            "finish_reason": body["choices"][0].get("finish_reason")
+        })
+    
     def parse_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parse ChatGPT response
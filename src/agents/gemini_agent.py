@@ -8,6 +8,8 @@ import os
 from typing import Dict, Any, Optional
 import google.generativeai as genai
 from src.agents.base_agent import BaseAgent
+from src.agents.rate_limiter import RateLimiter
+from src.agents.response_cache import ResponseCache
 
 
 class GeminiAgent(BaseAgent):
@@ -20,11 +22,15 @@ class GeminiAgent(BaseAgent):
         temperature: float = 0.3,
         max_tokens: int = 4000,
         max_retries: int = 3,
-        retry_delay: int = 10,  # Increased to 10s to handle rate limits (10 req/min = 6s minimum)
+        retry_delay: int = 10,  # Backoff after a failed call (e.g. 429 quota errors)
         timeout: int = 60,
         rubric = None,
         language: str = "indonesian",
-        strategy: str = "zero-shot"
+        strategy: str = "zero-shot",
+        max_concurrency: int = 5,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        prompt_layout: str = "standard"
     ):
         # Get API key from environment if not provided
         if api_key is None:
@@ -39,7 +45,11 @@ class GeminiAgent(BaseAgent):
             max_tokens=max_tokens,
             max_retries=max_retries,
             retry_delay=retry_delay,
-            timeout=timeout
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter or RateLimiter.from_config("gemini", requests_per_minute=10),
+            response_cache=response_cache or ResponseCache.from_env(),
+            prompt_layout=prompt_layout
         )
         
         # Store rubric, language, and strategy
@@ -61,30 +71,24 @@ class GeminiAgent(BaseAgent):
             }
         )
     
-    def _call_api(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Call Gemini API
-        
-        Args:
-            prompt: The grading prompt
-            system_prompt: System prompt (prepended to user prompt for Gemini)
-            
-        Returns:
-            Response with content and metadata
-        """
-        import time
-        
-        # Combine system prompt with user prompt (Gemini doesn't have separate system role)
+    def _build_full_prompt(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Combine system and user prompt (Gemini doesn't have separate system role)"""
         full_prompt = prompt
         if system_prompt:
             full_prompt = f"{system_prompt}\n\n---\n\n{prompt}"
         
         # Add explicit JSON instruction
         full_prompt += "\n\nIMPORTANT: Respond with ONLY valid JSON. No other text before or after the JSON."
-        
-        # Make API call
-        response = self.model.generate_content(full_prompt)
-        
+        return full_prompt
+    
+    def _generation_overrides(self, max_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Per-call generation_config (merged with the model's defaults)"""
+        if max_tokens is None or max_tokens == self.max_tokens:
+            return None
+        return {"max_output_tokens": max_tokens}
+    
+    def _extract_response(self, full_prompt: str, response) -> Dict[str, Any]:
+        """Convert a Gemini response into the agent's response dict"""
         # Extract text
         content = response.text
         
@@ -93,16 +97,70 @@ class GeminiAgent(BaseAgent):
         estimated_tokens = len(full_prompt + content) // 4
         self.total_tokens += estimated_tokens
         
-        # IMPORTANT: Add delay to respect rate limits (10 requests/min = 6s minimum)
-        time.sleep(7)  # 7 seconds ensures we stay under 10 req/min
+        # Implicit context caching reports the reused prompt prefix here
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
         
         return {
             "content": content,
             "tokens": estimated_tokens,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
             "model": self.model_name,
             "finish_reason": "stop"  # Gemini uses different finish reasons
         }
     
+    def _call_api(self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Call Gemini API
+        
+        Args:
+            prompt: The grading prompt
+            system_prompt: System prompt (prepended to user prompt for Gemini)
+            max_tokens: Output budget override (default: self.max_tokens)
+            
+        Returns:
+            Response with content and metadata
+        """
+        full_prompt = self._build_full_prompt(prompt, system_prompt)
+        
+        # Make API call (request spacing is handled by self.rate_limiter)
+        response = self.model.generate_content(
+            full_prompt, generation_config=self._generation_overrides(max_tokens)
+        )
+        return self._extract_response(full_prompt, response)
+    
+    async def _call_api_async(self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Call Gemini API through generate_content_async
+        
+        Args:
+            prompt: The grading prompt
+            system_prompt: System prompt (prepended to user prompt for Gemini)
+            max_tokens: Output budget override (default: self.max_tokens)
+            
+        Returns:
+            Response with content and metadata
+        """
+        full_prompt = self._build_full_prompt(prompt, system_prompt)
+        
+        # Make API call (request spacing is handled by self.rate_limiter)
+        response = await self.model.generate_content_async(
+            full_prompt, generation_config=self._generation_overrides(max_tokens)
+        )
+        return self._extract_response(full_prompt, response)
+    
     def parse_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parse Gemini response
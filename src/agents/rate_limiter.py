@@ -0,0 +1,288 @@
+"""
+Rate Limiter for LLM API calls
+Token-bucket limiting of requests-per-minute and tokens-per-minute,
+shared across threads and (optionally) across processes via SQLite
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import yaml
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter for one API quota (e.g. 'chatgpt', 'gemini')
+
+    Two buckets are kept: one for requests and one for tokens. Each refills
+    continuously at limit/60 per second up to a capacity of one minute's quota.
+    A call may proceed once both buckets hold enough budget.
+
+    Without state_path the buckets live in memory and are shared by all threads
+    using this instance. With state_path the buckets are stored in a SQLite file,
+    so every process pointing at the same file shares one quota.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        state_path: Optional[str] = None
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            name: Quota name; processes sharing a state file and name share budget
+            requests_per_minute: Request limit (None = unlimited)
+            tokens_per_minute: Token limit (None = unlimited)
+            state_path: Optional SQLite file for cross-process sharing
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.state_path = Path(state_path) if state_path else None
+
+        self._lock = threading.Lock()
+        self._local_state = None  # (requests, tokens, updated_at) when in memory
+
+        if self.state_path is not None:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    name TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.close()
+
+    @classmethod
+    def from_config(
+        cls,
+        name: str,
+        config_path: str = "config/models_config.yaml",
+        **defaults
+    ) -> "RateLimiter":
+        """
+        Create a limiter from the rate_limits section of models_config.yaml
+
+        Accepts both the short form (``chatgpt: 60``, requests per minute) and the
+        mapping form with requests_per_minute / tokens_per_minute. Keyword
+        defaults are used when the file or the entry is missing. The
+        AES_RATE_LIMIT_<NAME>_RPM / _TPM environment variables override the
+        file (a number, or "none" for unlimited).
+
+        Args:
+            name: Entry name under rate_limits
+            config_path: Path to models config file
+            **defaults: Fallback requests_per_minute / tokens_per_minute / state_path
+
+        Returns:
+            Configured RateLimiter
+        """
+        settings: Dict[str, Any] = dict(defaults)
+        path = Path(config_path)
+
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+
+            rate_limits = config.get("rate_limits") or {}
+            if "state_path" in rate_limits:
+                settings["state_path"] = rate_limits["state_path"]
+
+            entry = rate_limits.get(name)
+            if isinstance(entry, (int, float)):
+                settings["requests_per_minute"] = entry
+            elif isinstance(entry, dict):
+                settings.update(entry)
+
+        for key, suffix in (("requests_per_minute", "RPM"), ("tokens_per_minute", "TPM")):
+            value = os.getenv(f"AES_RATE_LIMIT_{name.upper()}_{suffix}")
+            if value is not None:
+                settings[key] = None if value.strip().lower() in ("", "none") else float(value)
+
+        return cls(
+            name=name,
+            requests_per_minute=settings.get("requests_per_minute"),
+            tokens_per_minute=settings.get("tokens_per_minute"),
+            state_path=settings.get("state_path")
+        )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get connection to the shared state file (autocommit, explicit BEGIN)."""
+        return sqlite3.connect(str(self.state_path), timeout=30, isolation_level=None)
+
+    def _capacity(self) -> tuple:
+        """Bucket capacities (one minute of quota each, inf = unlimited)."""
+        requests = float(self.requests_per_minute) if self.requests_per_minute else float("inf")
+        tokens = float(self.tokens_per_minute) if self.tokens_per_minute else float("inf")
+        return requests, tokens
+
+    def _take(self, requests: float, tokens: float, updated_at: float, cost: float, now: float) -> tuple:
+        """
+        Refill buckets and try to take one request plus `cost` tokens.
+
+        Returns:
+            Tuple of (new_requests, new_tokens, wait_seconds); wait is 0 on success
+        """
+        req_cap, tok_cap = self._capacity()
+        elapsed = max(0.0, now - updated_at)
+
+        requests = min(req_cap, requests + elapsed * req_cap / 60.0)
+        tokens = min(tok_cap, tokens + elapsed * tok_cap / 60.0)
+        cost = min(cost, tok_cap)  # A single oversized call must not wait forever
+
+        wait = 0.0
+        if requests < 1:
+            wait = max(wait, (1 - requests) * 60.0 / req_cap)
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) * 60.0 / tok_cap)
+
+        if wait == 0.0:
+            requests -= 1
+            tokens -= cost
+        return requests, tokens, wait
+
+    def _reserve(self, cost: float, adjust_only: bool = False) -> float:
+        """
+        Atomically reserve budget (or apply a token adjustment).
+
+        Returns:
+            Seconds to wait before trying again (0 = reserved)
+        """
+        with self._lock:
+            now = time.time()
+
+            if self.state_path is None:
+                if self._local_state is None:
+                    self._local_state = (*self._capacity(), now)
+                requests, tokens, updated_at = self._local_state
+                if adjust_only:
+                    self._local_state = (requests, tokens - cost, updated_at)
+                    return 0.0
+                requests, tokens, wait = self._take(requests, tokens, updated_at, cost, now)
+                if wait == 0.0:
+                    self._local_state = (requests, tokens, now)
+                return wait
+
+            conn = self._get_connection()
+            try:
+                # BEGIN IMMEDIATE serializes concurrent processes on the write lock
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT requests, tokens, updated_at FROM rate_limit_buckets WHERE name = ?",
+                    (self.name,)
+                ).fetchone()
+
+                req_cap, tok_cap = self._capacity()
+                # SQLite stores inf poorly, so unlimited buckets are persisted as 0
+                if row is None:
+                    requests, tokens, updated_at = req_cap, tok_cap, now
+                else:
+                    requests = row[0] if self.requests_per_minute else req_cap
+                    tokens = row[1] if self.tokens_per_minute else tok_cap
+                    updated_at = row[2]
+
+                if adjust_only:
+                    wait = 0.0
+                    tokens -= cost
+                else:
+                    requests, tokens, wait = self._take(requests, tokens, updated_at, cost, now)
+                    updated_at = now if wait == 0.0 else updated_at
+
+                if wait == 0.0:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_limit_buckets (name, requests, tokens, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (
+                            self.name,
+                            requests if self.requests_per_minute else 0.0,
+                            tokens if self.tokens_per_minute else 0.0,
+                            updated_at
+                        )
+                    )
+                conn.execute("COMMIT")
+                return wait
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def is_unlimited(self) -> bool:
+        """True when neither limit is configured."""
+        return not self.requests_per_minute and not self.tokens_per_minute
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until one request with an estimated token cost may be sent.
+
+        Args:
+            tokens: Estimated tokens for the call (prompt + max output)
+
+        Returns:
+            Total seconds spent waiting
+        """
+        if self.is_unlimited():
+            return 0.0
+
+        waited = 0.0
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Async counterpart of acquire (waits with asyncio.sleep).
+
+        The reservation runs in a worker thread: with a shared state file it
+        may block on another process's SQLite write lock.
+        """
+        if self.is_unlimited():
+            return 0.0
+
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._reserve, tokens)
+            if wait == 0.0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: int):
+        """
+        Reconcile a reservation with the tokens the API actually reported.
+
+        Unused budget is returned to the bucket; overruns are charged (the
+        bucket may go negative and later calls wait it off).
+
+        Args:
+            reserved_tokens: Tokens passed to acquire()
+            actual_tokens: Tokens reported by the API response
+        """
+        if not self.tokens_per_minute:
+            return
+        difference = actual_tokens - reserved_tokens
+        if difference:
+            self._reserve(difference, adjust_only=True)
+
+    async def record_usage_async(self, reserved_tokens: int, actual_tokens: int):
+        """Async counterpart of record_usage (the SQLite update runs in a worker thread)."""
+        await asyncio.to_thread(self.record_usage, reserved_tokens, actual_tokens)
+
+    def __repr__(self) -> str:
+        return (f"RateLimiter(name={self.name}, rpm={self.requests_per_minute}, "
+                f"tpm={self.tokens_per_minute}, shared={self.state_path is not None})")
@@ -0,0 +1,255 @@
+"""
+Response Cache for LLM API calls
+Content-addressed on-disk cache keyed by a fingerprint of the request,
+with size-based LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+# Cache modes
+READ_THROUGH = "read-through"  # Serve hits from cache, store misses
+WRITE_ONLY = "write-only"      # Always call the API, store every response
+BYPASS = "bypass"              # Neither read nor write
+CACHE_MODES = (READ_THROUGH, WRITE_ONLY, BYPASS)
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of raw API responses
+
+    Entries are keyed by a SHA-256 of (namespace, model, system prompt,
+    user prompt, temperature, trial). The trial is part of the key so that
+    independent trials are never collapsed into one response; the namespace
+    (usually the experiment id) keeps replicate experiments apart.
+    """
+
+    def __init__(
+        self,
+        cache_path: str = "results/response_cache.db",
+        mode: str = READ_THROUGH,
+        max_size_mb: float = 500,
+        namespace: str = ""
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            cache_path: Path to SQLite cache file
+            mode: 'read-through', 'write-only' or 'bypass'
+            max_size_mb: Size budget; least recently used entries are evicted above it
+            namespace: Extra key component (e.g. experiment id)
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Available: {list(CACHE_MODES)}")
+
+        self.cache_path = Path(cache_path)
+        self.mode = mode
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.namespace = namespace
+
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.mode != BYPASS:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._create_tables()
+
+    @classmethod
+    def from_env(cls, namespace: str = "") -> Optional["ResponseCache"]:
+        """
+        Create a cache from AES_RESPONSE_CACHE* environment variables
+
+        AES_RESPONSE_CACHE selects the mode; AES_RESPONSE_CACHE_PATH and
+        AES_RESPONSE_CACHE_MAX_MB override location and size budget.
+
+        Returns:
+            ResponseCache, or None if AES_RESPONSE_CACHE is unset
+        """
+        mode = os.getenv("AES_RESPONSE_CACHE")
+        if not mode:
+            return None
+        return cls(
+            cache_path=os.getenv("AES_RESPONSE_CACHE_PATH", "results/response_cache.db"),
+            mode=mode,
+            max_size_mb=float(os.getenv("AES_RESPONSE_CACHE_MAX_MB", "500")),
+            namespace=namespace
+        )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get cache database connection."""
+        return sqlite3.connect(str(self.cache_path), timeout=30)
+
+    def _create_tables(self):
+        """Create cache table if it doesn't exist."""
+        conn = self._get_connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_last_access
+            ON responses(last_access)
+        """)
+        conn.commit()
+        conn.close()
+
+    def make_key(
+        self,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        trial: int
+    ) -> str:
+        """
+        Fingerprint a request.
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = json.dumps(
+            {
+                "namespace": self.namespace,
+                "model": model,
+                "system_prompt": system_prompt or "",
+                "prompt": prompt,
+                "temperature": temperature,
+                "trial": trial,
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def reads_enabled(self) -> bool:
+        return self.mode == READ_THROUGH
+
+    @property
+    def writes_enabled(self) -> bool:
+        return self.mode in (READ_THROUGH, WRITE_ONLY)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response (no-op unless mode is read-through).
+
+        Returns:
+            Cached response dict or None
+        """
+        if not self.reads_enabled:
+            return None
+
+        with self._lock:
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                conn.commit()
+            conn.close()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """
+        Store a response (no-op in bypass mode) and evict LRU entries over budget.
+
+        Args:
+            key: Fingerprint from make_key
+            response: Raw response dict returned by the agent's _call_api
+        """
+        if not self.writes_enabled:
+            return
+
+        data = json.dumps(response, ensure_ascii=False, default=str)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("""
+                INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, data, size, now, now))
+            self._evict(conn)
+            conn.commit()
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used entries until the cache fits its budget."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+
+        cursor = conn.execute("SELECT key, size FROM responses ORDER BY last_access")
+        stale = []
+        for key, size in cursor:
+            if total <= self.max_size_bytes:
+                break
+            stale.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def clear(self) -> int:
+        """
+        Delete all cached responses.
+
+        Returns:
+            Number of entries deleted
+        """
+        with self._lock:
+            conn = self._get_connection()
+            count = conn.execute("DELETE FROM responses").rowcount
+            conn.commit()
+            conn.close()
+        return count
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        stats = {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": 0,
+            "size_bytes": 0
+        }
+        if self.mode != BYPASS:
+            conn = self._get_connection()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            conn.close()
+            stats["entries"] = entries
+            stats["size_bytes"] = size
+        return stats
+
+    def __repr__(self) -> str:
+        return f"ResponseCache(path={self.cache_path}, mode={self.mode}, namespace={self.namespace!r})"
@@ -0,0 +1,31 @@
+"""
+Analysis Data Module
+
+Shared, cached access to the data behind the analysis scripts:
+- Grading results and per-criterion grades from the SQLite database
+- Expert gold standard (results/gold_standard)
+- Baseline grades (results/baseline_batch)
+- Score -> letter grade conversion
+"""
+
+from .dataset import (
+    AnalysisDataset,
+    get_dataset,
+    score_to_grade,
+    scores_to_grades,
+    student_id_from_name,
+    GRADE_ORDER,
+    GPA_THRESHOLDS,
+    INDONESIAN_THRESHOLDS,
+)
+
+__all__ = [
+    'AnalysisDataset',
+    'get_dataset',
+    'score_to_grade',
+    'scores_to_grades',
+    'student_id_from_name',
+    'GRADE_ORDER',
+    'GPA_THRESHOLDS',
+    'INDONESIAN_THRESHOLDS',
+]
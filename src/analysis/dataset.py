@@ -0,0 +1,502 @@
+"""
+Shared Analysis Dataset
+
+Loads grading results, per-criterion grades, the gold standard and the
+baseline grades once into typed DataFrames, so analysis scripts stop
+re-running ad-hoc SQL and re-parsing the same JSON files.
+
+Frames are cached in memory and on disk (results/.analysis_cache/ by
+default). Each cache file is keyed by a fingerprint of its source (the
+database's data_fingerprint() or the size/mtime of the JSON files), so a
+new experiment run or an edited gold standard file invalidates it
+automatically and the next script rebuilds it once for everyone.
+
+Usage:
+    from src.analysis import get_dataset, scores_to_grades
+
+    data = get_dataset()
+    df = data.with_gold(data.results(experiment_prefix='exp_chatgpt_lenient'))
+    df['grade'] = scores_to_grades(df['weighted_score'])
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.database.db_manager import DatabaseManager
+
+
+# Bump when the layout of a cached frame changes
+SCHEMA_VERSION = 1
+
+GRADE_ORDER = ['A', 'B', 'C', 'D', 'E']
+
+# (minimum score, grade) on the 0-4 GPA scale; anything lower is 'E'
+GPA_THRESHOLDS: Tuple[Tuple[float, str], ...] = ((3.5, 'A'), (2.5, 'B'), (1.5, 'C'), (0.5, 'D'))
+
+# Stricter cut-offs used by the Indonesian grading reports
+INDONESIAN_THRESHOLDS: Tuple[Tuple[float, str], ...] = ((3.6, 'A'), (3.0, 'B'), (2.0, 'C'), (1.0, 'D'))
+
+# Columns of grading_results_base loaded into results() (no question/answer text)
+RESULT_COLUMNS = [
+    'id', 'experiment_id', 'model', 'strategy', 'trial_number', 'student_id',
+    'student_name', 'question_number', 'question_id', 'answer_id', 'status',
+    'weighted_score', 'grades', 'tokens_used', 'api_call_time', 'timestamp',
+    'error_message'
+]
+
+# Free-text columns attached on demand by with_text()
+TEXT_COLUMNS = ['question_text', 'answer_text', 'justification', 'overall_comment']
+
+_RESULT_DTYPES = {
+    'experiment_id': 'category',
+    'model': 'category',
+    'strategy': 'category',
+    'trial_number': 'int16',
+    'student_id': 'category',
+    'student_name': 'category',
+    'question_number': 'int16',
+    'question_id': 'Int32',
+    'answer_id': 'Int32',
+    'status': 'category',
+    'weighted_score': 'float64',
+    'tokens_used': 'Int32',
+    'api_call_time': 'float64',
+}
+
+
+def score_to_grade(score: float, thresholds: Tuple[Tuple[float, str], ...] = GPA_THRESHOLDS) -> str:
+    """
+    Convert a weighted score to a letter grade.
+
+    Args:
+        score: Weighted score (missing scores map to 'E')
+        thresholds: (minimum score, grade) pairs, highest first
+
+    Returns:
+        Letter grade
+    """
+    if score is None or pd.isna(score):
+        return 'E'
+    for minimum, grade in thresholds:
+        if score >= minimum:
+            return grade
+    return 'E'
+
+
+def scores_to_grades(scores, thresholds: Tuple[Tuple[float, str], ...] = GPA_THRESHOLDS):
+    """
+    Vectorized score_to_grade.
+
+    Args:
+        scores: Series or array of weighted scores
+        thresholds: (minimum score, grade) pairs, highest first
+
+    Returns:
+        Categorical of grades (categories GRADE_ORDER); a Series with the
+        same index when given a Series
+    """
+    values = np.asarray(scores, dtype=float)
+    grades = np.select([values >= minimum for minimum, _ in thresholds],
+                       [grade for _, grade in thresholds], default='E')
+    categorical = pd.Categorical(grades, categories=GRADE_ORDER)
+    if isinstance(scores, pd.Series):
+        return pd.Series(categorical, index=scores.index, name=scores.name)
+    return categorical
+
+
+def student_id_from_name(student_name: str) -> Optional[str]:
+    """Map 'Mahasiswa 7' to the database's 'student_07' (None without a number)."""
+    digits = ''.join(filter(str.isdigit, student_name))
+    return f"student_{int(digits):02d}" if digits else None
+
+
+def _directory_stats(directory: Path, pattern: str) -> List[Tuple[str, int, int]]:
+    """(name, size, mtime_ns) of the matching files, as a change marker."""
+    return sorted(
+        (path.name, stat.st_size, stat.st_mtime_ns)
+        for path in directory.glob(pattern)
+        for stat in [path.stat()]
+    )
+
+
+class AnalysisDataset:
+    """Typed, cached access to results, gold standard and baseline grades."""
+
+    def __init__(
+        self,
+        db_path: str = "results/grading_results.db",
+        gold_dir: str = "results/gold_standard",
+        baseline_dir: str = "results/baseline_batch",
+        cache_dir: Optional[str] = "results/.analysis_cache"
+    ):
+        """
+        Initialize the dataset (nothing is loaded until first use).
+
+        Args:
+            db_path: Path to SQLite database
+            gold_dir: Directory with student_*_gold.json files
+            baseline_dir: Directory with student_*_id.json baseline files
+            cache_dir: On-disk cache directory (None = in-memory only)
+        """
+        self.db_path = Path(db_path)
+        self.gold_dir = Path(gold_dir)
+        self.baseline_dir = Path(baseline_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self._db_manager: Optional[DatabaseManager] = None
+        self._frames: Dict[str, Tuple[str, pd.DataFrame]] = {}
+
+    # ------------------------------------------------------------------
+    # Public frames
+    # ------------------------------------------------------------------
+
+    def results(
+        self,
+        experiment_id: Optional[str] = None,
+        experiment_prefix: Optional[str] = None,
+        model: Optional[str] = None,
+        strategy: Optional[str] = None,
+        completed_only: bool = True
+    ) -> pd.DataFrame:
+        """
+        Grading results, one row per task (text columns: see with_text()).
+
+        Args:
+            experiment_id: Only this experiment
+            experiment_prefix: Only experiments whose id starts with this
+                               (replaces `experiment_id LIKE 'prefix%'`)
+            model: Only this model
+            strategy: Only this strategy
+            completed_only: Only rows with status 'completed'
+
+        Returns:
+            DataFrame with RESULT_COLUMNS (categorical ids, int16 trial and
+            question numbers, datetime timestamps)
+        """
+        df = self._load('results', self._db_fingerprint, self._build_results)
+        mask = np.ones(len(df), dtype=bool)
+        if completed_only:
+            mask &= (df['status'] == 'completed').to_numpy()
+        if experiment_id is not None:
+            mask &= (df['experiment_id'] == experiment_id).to_numpy()
+        if experiment_prefix is not None:
+            mask &= df['experiment_id'].astype(str).str.startswith(experiment_prefix).to_numpy()
+        if model is not None:
+            mask &= (df['model'] == model).to_numpy()
+        if strategy is not None:
+            mask &= (df['strategy'] == strategy).to_numpy()
+        return df[mask].reset_index(drop=True)
+
+    def criterion_grades(self, experiment_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Per-criterion grades of completed results in long format.
+
+        Args:
+            experiment_id: Only this experiment
+
+        Returns:
+            DataFrame with result_id, experiment_id, model, strategy,
+            trial_number, student_id, question_number, criterion, grade, points
+        """
+        df = self._load('criterion_grades', self._db_fingerprint, self._build_criterion_grades)
+        if experiment_id is not None:
+            df = df[df['experiment_id'] == experiment_id].reset_index(drop=True)
+        return df
+
+    def gold_standard(self) -> pd.DataFrame:
+        """
+        Expert gold standard, one row per (student_id, question_number).
+
+        Returns:
+            DataFrame with student_id, student_name, question_number,
+            weighted_score and one grade column per rubric criterion
+        """
+        return self._load(
+            'gold_standard',
+            lambda: self._files_fingerprint(self.gold_dir, 'student_*_gold.json'),
+            self._build_gold_standard
+        )
+
+    def gold_scores(self) -> Dict[Tuple[str, int], float]:
+        """Gold weighted scores keyed by (student_id, question_number)."""
+        gold = self.gold_standard()
+        return dict(zip(zip(gold['student_id'].astype(str), gold['question_number'].astype(int)),
+                        gold['weighted_score']))
+
+    def baseline(self, model: Optional[str] = None) -> pd.DataFrame:
+        """
+        Baseline grades (results/baseline_batch), long format by model.
+
+        Args:
+            model: Only this model ('chatgpt' or 'gemini')
+
+        Returns:
+            DataFrame with student_id, student_name, question_number, model,
+            weighted_score and one grade column per rubric criterion
+        """
+        df = self._load(
+            'baseline',
+            lambda: self._files_fingerprint(self.baseline_dir, 'student_*_id.json'),
+            self._build_baseline
+        )
+        if model is not None:
+            df = df[df['model'] == model].reset_index(drop=True)
+        return df
+
+    def experiments(self) -> pd.DataFrame:
+        """
+        One row per experiment with model, strategy, trials and task counts.
+
+        Returns:
+            DataFrame with experiment_id, model, strategy, trials, completed, total
+        """
+        df = self.results(completed_only=False)
+        df = df.assign(completed=df['status'] == 'completed')
+        return (
+            df.groupby('experiment_id', observed=True)
+            .agg(model=('model', 'first'), strategy=('strategy', 'first'),
+                 trials=('trial_number', 'nunique'), completed=('completed', 'sum'),
+                 total=('id', 'size'))
+            .reset_index()
+        )
+
+    def with_gold(self, df: pd.DataFrame, column: str = 'gold_score') -> pd.DataFrame:
+        """
+        Attach the gold weighted score to each row and drop rows without one.
+
+        Args:
+            df: Frame with student_id and question_number columns
+            column: Name of the added column
+
+        Returns:
+            New DataFrame (row order of df preserved, index reset)
+        """
+        gold = self.gold_standard()
+        lookup = pd.Series(
+            gold['weighted_score'].to_numpy(),
+            index=pd.MultiIndex.from_arrays([gold['student_id'].astype(str),
+                                             gold['question_number'].astype(int)])
+        )
+        keys = pd.MultiIndex.from_arrays([df['student_id'].astype(str),
+                                          df['question_number'].astype(int)])
+        scores = lookup.reindex(keys).to_numpy()
+        return df.assign(**{column: scores})[~np.isnan(scores)].reset_index(drop=True)
+
+    def with_text(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Attach question/answer text and the model's comments to results rows.
+
+        The text is kept out of results() and loaded into its own cached
+        frame the first time a script asks for it.
+
+        Args:
+            df: Frame from results() (needs the id column)
+            columns: Subset of TEXT_COLUMNS (default: all)
+
+        Returns:
+            New DataFrame with the text columns appended
+        """
+        columns = list(columns or TEXT_COLUMNS)
+        text = self._load('text', self._db_fingerprint, self._build_text)
+        return df.assign(**{
+            column: text[column].reindex(df['id'].to_numpy()).to_numpy()
+            for column in columns
+        })
+
+    def invalidate(self):
+        """Drop the in-memory frames and the on-disk cache files."""
+        self._frames.clear()
+        if self.cache_dir and self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.pkl'):
+                path.unlink()
+
+    def close(self):
+        """Close the database connection (frames stay cached)."""
+        if self._db_manager is not None:
+            self._db_manager.close()
+            self._db_manager = None
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _load(self, name: str, fingerprint_fn: Callable[[], str],
+              builder: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Return a frame from memory, the disk cache, or by building it."""
+        fingerprint = fingerprint_fn()
+        cached = self._frames.get(name)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        df = None
+        cache_file = self.cache_dir / f"{name}-{fingerprint[:16]}.pkl" if self.cache_dir else None
+        if cache_file is not None and cache_file.exists():
+            try:
+                with open(cache_file, 'rb') as f:
+                    df = pickle.load(f)
+            except Exception:
+                df = None  # Unreadable (e.g. written by another pandas version): rebuild
+        if df is None:
+            df = builder()
+            if cache_file is not None:
+                self._write_cache(name, cache_file, df)
+
+        self._frames[name] = (fingerprint, df)
+        return df
+
+    def _write_cache(self, name: str, cache_file: Path, df: pd.DataFrame):
+        """Write via a temporary file and remove the frame's stale cache files."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+        for stale in self.cache_dir.glob(f"{name}-*.pkl"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+
+    def _fingerprint(self, *parts: Any) -> str:
+        return hashlib.sha256(json.dumps([SCHEMA_VERSION, *parts]).encode('utf-8')).hexdigest()
+
+    def _db_fingerprint(self) -> str:
+        return self._fingerprint(str(self.db_path.resolve()), self._database().data_fingerprint())
+
+    def _files_fingerprint(self, directory: Path, pattern: str) -> str:
+        return self._fingerprint(str(directory.resolve()), _directory_stats(directory, pattern))
+
+    def _database(self) -> DatabaseManager:
+        if self._db_manager is None:
+            if not self.db_path.exists():
+                raise FileNotFoundError(f"Database not found: {self.db_path}")
+            self._db_manager = DatabaseManager(self.db_path)
+        return self._db_manager
+
+    # ------------------------------------------------------------------
+    # Builders
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str) -> pd.DataFrame:
+        db_manager = self._database()
+        conn = db_manager._acquire()
+        try:
+            return pd.read_sql_query(sql, conn)
+        finally:
+            db_manager._release(conn)
+
+    def _build_results(self) -> pd.DataFrame:
+        df = self._query(f"""
+            SELECT {', '.join(RESULT_COLUMNS)}
+            FROM grading_results_base
+            ORDER BY experiment_id, trial_number, student_id, question_number
+        """)
+        df = df.astype(_RESULT_DTYPES)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', format='ISO8601')
+        return df
+
+    def _build_text(self) -> pd.DataFrame:
+        df = self._query("""
+            SELECT r.id, q.question_text, a.answer_text, r.justification, r.overall_comment
+            FROM grading_results_base r
+            LEFT JOIN questions q ON q.id = r.question_id
+            LEFT JOIN answers a ON a.id = r.answer_id
+        """)
+        # Every question text repeats across students, trials and experiments
+        return df.set_index('id').astype({'question_text': 'category'})
+
+    def _build_criterion_grades(self) -> pd.DataFrame:
+        df = self._query("""
+            SELECT c.result_id, c.experiment_id, r.model, r.strategy, r.trial_number,
+                   r.student_id, r.question_number, c.criterion, c.grade, c.points
+            FROM criterion_grades c
+            JOIN grading_results_base r ON r.id = c.result_id
+            WHERE r.status = 'completed'
+            ORDER BY c.experiment_id, r.trial_number, r.student_id, r.question_number, c.criterion
+        """)
+        return df.astype({
+            'experiment_id': 'category', 'model': 'category', 'strategy': 'category',
+            'trial_number': 'int16', 'student_id': 'category', 'question_number': 'int16',
+            'criterion': 'category', 'grade': 'category', 'points': 'float32'
+        })
+
+    def _build_gold_standard(self) -> pd.DataFrame:
+        rows = []
+        for json_file in sorted(self.gold_dir.glob('student_*_gold.json')):
+            with open(json_file, encoding='utf-8') as f:
+                data = json.load(f)
+            student_id = student_id_from_name(data['student_name'])
+            if student_id is None:
+                continue
+            for q_idx, question in enumerate(data['questions'], start=1):
+                rows.append({
+                    'student_id': student_id,
+                    'student_name': data['student_name'],
+                    'question_number': q_idx,
+                    'weighted_score': question['weighted_score'],
+                    **question.get('grades', {})
+                })
+        return self._typed_grades_frame(rows, ['student_id', 'student_name', 'question_number',
+                                               'weighted_score'])
+
+    def _build_baseline(self) -> pd.DataFrame:
+        rows = []
+        for json_file in sorted(self.baseline_dir.glob('student_*_id.json')):
+            with open(json_file, encoding='utf-8') as f:
+                data = json.load(f)
+            student_id = student_id_from_name(data['student_name'])
+            if student_id is None:
+                continue
+            for q_idx, question in enumerate(data['questions'], start=1):
+                for model in ('chatgpt', 'gemini'):
+                    graded = question.get(model)
+                    if not graded or 'scores' not in graded:
+                        continue
+                    rows.append({
+                        'student_id': student_id,
+                        'student_name': data['student_name'],
+                        'question_number': q_idx,
+                        'model': model,
+                        'weighted_score': graded.get('weighted_score'),
+                        **{criterion: score.get('grade') for criterion, score in graded['scores'].items()}
+                    })
+        return self._typed_grades_frame(rows, ['student_id', 'student_name', 'question_number',
+                                               'model', 'weighted_score'])
+
+    @staticmethod
+    def _typed_grades_frame(rows: List[Dict[str, Any]], key_columns: List[str]) -> pd.DataFrame:
+        """Key columns first, then one categorical grade column per criterion."""
+        df = pd.DataFrame(rows, columns=key_columns if not rows else None)
+        criteria = [column for column in df.columns if column not in key_columns]
+        df = df[key_columns + criteria]
+        dtypes = {column: 'category' for column in key_columns
+                  if column in ('student_id', 'student_name', 'model')}
+        dtypes.update({'question_number': 'int16', 'weighted_score': 'float64'})
+        dtypes.update({criterion: 'category' for criterion in criteria})
+        return df.astype(dtypes)
+
+
+_shared: Dict[Tuple, AnalysisDataset] = {}
+
+
+def get_dataset(
+    db_path: str = "results/grading_results.db",
+    gold_dir: str = "results/gold_standard",
+    baseline_dir: str = "results/baseline_batch",
+    cache_dir: Optional[str] = "results/.analysis_cache"
+) -> AnalysisDataset:
+    """
+    Shared AnalysisDataset for the given sources (one per process).
+
+    Scripts and helper modules that call this with the same paths reuse the
+    same in-memory frames; separate processes share the on-disk cache.
+    """
+    key = (str(db_path), str(gold_dir), str(baseline_dir), str(cache_dir))
+    if key not in _shared:
+        _shared[key] = AnalysisDataset(db_path, gold_dir, baseline_dir, cache_dir)
+    return _shared[key]
@@ -3,18 +3,98 @@ Prompt Builder for AI Agents
 Generates dynamic prompts with rubric and essay information
 """
 
-from typing import Dict, Optional
+import re
+from typing import Dict, List, Optional
 from src.core.rubric import Rubric
 
 
+# Prompt layouts
+STANDARD_LAYOUT = "standard"          # Question and answer before rubric and instructions
+PREFIX_CACHE_LAYOUT = "prefix-cache"  # Static rubric/instructions first, question and answer last
+PROMPT_LAYOUTS = (STANDARD_LAYOUT, PREFIX_CACHE_LAYOUT)
+
+# Placeholders substituted into compiled templates (NUL cannot appear in rubric text)
+_FIELD_PATTERN = re.compile("\x00(question|answer|context)\x00")
+_QUESTION_FIELD = "\x00question\x00"
+_ANSWER_FIELD = "\x00answer\x00"
+_CONTEXT_FIELD = "\x00context\x00"
+
+# Compiled templates shared by all builders, keyed by
+# (rubric fingerprint, language, strategy, layout, has_context)
+_TEMPLATE_CACHE: Dict[tuple, "CompiledPromptTemplate"] = {}
+
+
+class CompiledPromptTemplate:
+    """
+    Grading prompt with all static text pre-rendered
+    
+    The rubric, examples, instructions and output format are rendered once;
+    render() only joins them with the question, answer and context.
+    """
+    
+    def __init__(self, text: str):
+        pieces = _FIELD_PATTERN.split(text)
+        self.literals = pieces[0::2]  # Static text around the fields
+        self.fields = pieces[1::2]    # Field names in order of appearance
+    
+    def render(self, question: str, answer: str, context: Optional[str] = None) -> str:
+        """Substitute question, answer and (optional) context"""
+        values = {"question": question, "answer": answer, "context": context}
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return "".join(parts)
+
+
+def clear_template_cache():
+    """Drop all compiled templates (e.g. after editing a rubric in place)"""
+    _TEMPLATE_CACHE.clear()
+
+
 class PromptBuilder:
     """Builds prompts for AI essay grading"""
     
-    def __init__(self, rubric: Rubric, system_prompt: Optional[str] = None, language: str = "indonesian", strategy: str = "zero-shot"):
+    def __init__(self, rubric: Rubric, system_prompt: Optional[str] = None, language: str = "indonesian", strategy: str = "zero-shot", layout: str = STANDARD_LAYOUT):
+        if layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout '{layout}'. Available: {list(PROMPT_LAYOUTS)}")
+        
         self.rubric = rubric
         self.language = language.lower()
         self.strategy = strategy.lower()
+        self.layout = layout
         self.system_prompt = system_prompt or self._default_system_prompt()
+        self._fingerprint = None
+    
+    @property
+    def fingerprint(self) -> str:
+        """Rubric fingerprint, computed once per builder"""
+        if self._fingerprint is None:
+            self._fingerprint = self.rubric.fingerprint()
+        return self._fingerprint
+    
+    def compile_template(self, with_context: bool = False) -> CompiledPromptTemplate:
+        """
+        Get the compiled grading template for this (rubric, language, strategy, layout)
+        
+        Templates are rendered on first use and cached by rubric fingerprint,
+        so all builders for the same combination share one template.
+        
+        Args:
+            with_context: Whether the template has an additional context section
+            
+        Returns:
+            CompiledPromptTemplate
+        """
+        key = (self.fingerprint, self.language, self.strategy, self.layout, with_context)
+        template = _TEMPLATE_CACHE.get(key)
+        if template is None:
+            text = self._render_grading_prompt(
+                _QUESTION_FIELD, _ANSWER_FIELD, _CONTEXT_FIELD if with_context else None
+            )
+            template = CompiledPromptTemplate(text)
+            _TEMPLATE_CACHE[key] = template
+        return template
     
     def _default_system_prompt(self) -> str:
         """Default system prompt based on strategy"""
@@ -103,53 +183,189 @@ Your response must be in valid JSON format."""
         Returns:
             Complete prompt string
         """
-        # Get strategy-specific additions
-        strategy_instructions = self._get_strategy_instructions()
-        strategy_examples = self._get_strategy_examples()
+        template = self.compile_template(with_context=bool(additional_context))
+        return template.render(question, student_answer, additional_context)
+    
+    def _render_grading_prompt(
+        self,
+        question: str,
+        student_answer: str,
+        additional_context: Optional[str] = None
+    ) -> str:
+        """Render the full grading prompt from scratch (used to compile templates)"""
+        if self.layout == PREFIX_CACHE_LAYOUT:
+            variable_parts = self._context_lines(additional_context)
+            variable_parts.extend(self._essay_lines(question, student_answer))
+            return self.build_static_prefix() + "\n" + "\n".join(variable_parts)
         
-        if self.language == "indonesian":
-            prompt_parts = [
-                "# TUGAS PENILAIAN ESAI\n",
-            ]
-            
-            # Add few-shot examples if applicable
-            if strategy_examples:
-                prompt_parts.extend(strategy_examples)
-                prompt_parts.append("")
+        prompt_parts = self._header_lines()
+        prompt_parts.extend(self._essay_lines(question, student_answer))
+        prompt_parts.extend(self._rubric_lines())
+        prompt_parts.extend(self._instruction_lines())
+        prompt_parts.extend(self._context_lines(additional_context))
+        prompt_parts.extend(self._output_format_lines())
+        
+        return "\n".join(prompt_parts)
+    
+    def build_static_prefix(self) -> str:
+        """
+        Build the essay-independent part of a prefix-cache layout prompt
+        
+        Header, few-shot examples, rubric, instructions and output format
+        depend only on (rubric, language, strategy), so every prompt of an
+        experiment starts with the same bytes and providers' automatic
+        prompt-prefix caching can reuse them.
+        
+        Returns:
+            Prompt prefix string
+        """
+        prompt_parts = self._header_lines()
+        prompt_parts.extend(self._rubric_lines())
+        prompt_parts.extend(self._instruction_lines())
+        prompt_parts.extend(self._output_format_lines())
+        prompt_parts.append("")
+        return "\n".join(prompt_parts)
+    
+    def build_packed_grading_prompt(
+        self,
+        items: List[Dict[str, str]],
+        additional_context: Optional[str] = None
+    ) -> str:
+        """
+        Build one prompt that grades several answers of the same student
+        
+        The rubric, instructions and examples appear once; the model returns
+        {"results": [...]} with one entry per question_id.
+        
+        Args:
+            items: List of dicts with question_id, question, answer
+            additional_context: Optional additional instructions
             
+        Returns:
+            Complete prompt string
+        """
+        prompt_parts = self._header_lines()
+        prompt_parts.extend(self._rubric_lines())
+        prompt_parts.extend(self._instruction_lines())
+        
+        if self.language == "indonesian":
             prompt_parts.extend([
-                "## Pertanyaan:",
-                question,
+                f"Anda akan menilai {len(items)} jawaban dari mahasiswa yang sama.",
+                "Nilai SETIAP jawaban secara terpisah dan independen; jangan biarkan satu jawaban mempengaruhi nilai jawaban lain.",
                 "",
-                "## Jawaban Mahasiswa:",
-                student_answer,
+            ])
+        else:
+            prompt_parts.extend([
+                f"You will grade {len(items)} answers from the same student.",
+                "Grade EACH answer separately and independently; do not let one answer influence the grade of another.",
                 "",
             ])
-            
-            # Add detailed rubric for detailed-rubric strategy
-            if self.strategy == "detailed-rubric":
+        
+        prompt_parts.extend(self._context_lines(additional_context))
+        
+        for item in items:
+            if self.language == "indonesian":
                 prompt_parts.extend([
-                    "## Rubrik Penilaian (Detail):",
-                    self._get_detailed_rubric_indonesian(),
+                    f"## Soal {item['question_id']}",
+                    "### Pertanyaan:",
+                    item["question"],
+                    "",
+                    "### Jawaban Mahasiswa:",
+                    item["answer"],
                     "",
                 ])
             else:
                 prompt_parts.extend([
-                    "## Rubrik Penilaian:",
-                    self.rubric.to_prompt_text(),
+                    f"## Question {item['question_id']}",
+                    "### Question/Prompt:",
+                    item["question"],
+                    "",
+                    "### Student's Answer:",
+                    item["answer"],
                     "",
                 ])
-            
-            prompt_parts.extend([
-                "## Instruksi:",
-            ])
-            
-            # Add strategy-specific instructions
-            if strategy_instructions:
-                prompt_parts.extend(strategy_instructions)
-                prompt_parts.append("")
-            
-            prompt_parts.extend([
+        
+        prompt_parts.extend(self._packed_output_format_lines([item["question_id"] for item in items]))
+        
+        return "\n".join(prompt_parts)
+    
+    def _header_lines(self) -> list:
+        """Task title plus few-shot examples (if any)"""
+        if self.language == "indonesian":
+            lines = ["# TUGAS PENILAIAN ESAI\n"]
+        else:
+            lines = ["# ESSAY GRADING TASK\n"]
+        
+        # Add few-shot examples if applicable
+        strategy_examples = self._get_strategy_examples()
+        if strategy_examples:
+            lines.extend(strategy_examples)
+            lines.append("")
+        return lines
+    
+    def _essay_lines(self, question: str, student_answer: str) -> list:
+        """Question and student answer section"""
+        if self.language == "indonesian":
+            return [
+                "## Pertanyaan:",
+                question,
+                "",
+                "## Jawaban Mahasiswa:",
+                student_answer,
+                "",
+            ]
+        return [
+            "## Question/Prompt:",
+            question,
+            "",
+            "## Student's Answer:",
+            student_answer,
+            "",
+        ]
+    
+    def _rubric_lines(self) -> list:
+        """Rubric section (detailed rubric for detailed-rubric strategy)"""
+        if self.language == "indonesian":
+            if self.strategy == "detailed-rubric":
+                return [
+                    "## Rubrik Penilaian (Detail):",
+                    self._get_detailed_rubric_indonesian(),
+                    "",
+                ]
+            return [
+                "## Rubrik Penilaian:",
+                self.rubric.to_prompt_text(),
+                "",
+            ]
+        
+        if self.strategy == "detailed-rubric":
+            return [
+                "## Evaluation Rubric (Detailed):",
+                self._get_detailed_rubric_english(),
+                "",
+            ]
+        return [
+            "## Evaluation Rubric:",
+            self.rubric.to_prompt_text(),
+            "",
+        ]
+    
+    def _instruction_lines(self) -> list:
+        """Instruction section with strategy-specific instructions"""
+        strategy_instructions = self._get_strategy_instructions()
+        
+        if self.language == "indonesian":
+            lines = ["## Instruksi:"]
+        else:
+            lines = ["## Instructions:"]
+        
+        # Add strategy-specific instructions
+        if strategy_instructions:
+            lines.extend(strategy_instructions)
+            lines.append("")
+        
+        if self.language == "indonesian":
+            lines.extend([
                 "Evaluasi jawaban mahasiswa sesuai dengan rubrik di atas.",
                 "Untuk SETIAP kriteria, berikan:",
                 "1. Nilai (A, B, C, atau D/E)",
@@ -160,49 +376,8 @@ Your response must be in valid JSON format."""
                 "   - Bersifat konstruktif dan spesifik (bukan generik)",
                 "",
             ])
-        else:  # English
-            prompt_parts = [
-                "# ESSAY GRADING TASK\n",
-            ]
-            
-            # Add few-shot examples if applicable
-            if strategy_examples:
-                prompt_parts.extend(strategy_examples)
-                prompt_parts.append("")
-            
-            prompt_parts.extend([
-                "## Question/Prompt:",
-                question,
-                "",
-                "## Student's Answer:",
-                student_answer,
-                "",
-            ])
-            
-            # Add detailed rubric for detailed-rubric strategy
-            if self.strategy == "detailed-rubric":
-                prompt_parts.extend([
-                    "## Evaluation Rubric (Detailed):",
-                    self._get_detailed_rubric_english(),
-                    "",
-                ])
-            else:
-                prompt_parts.extend([
-                    "## Evaluation Rubric:",
-                    self.rubric.to_prompt_text(),
-                    "",
-                ])
-            
-            prompt_parts.extend([
-                "## Instructions:",
-            ])
-            
-            # Add strategy-specific instructions
-            if strategy_instructions:
-                prompt_parts.extend(strategy_instructions)
-                prompt_parts.append("")
-            
-            prompt_parts.extend([
+        else:
+            lines.extend([
                 "Evaluate the student's answer according to the rubric above.",
                 "For EACH criterion, provide:",
                 "1. A grade (A, B, C, or D/E)",
@@ -213,48 +388,59 @@ Your response must be in valid JSON format."""
                 "   - Is constructive and specific (not generic)",
                 "",
             ])
-        
-        if additional_context:
-            if self.language == "indonesian":
-                prompt_parts.extend([
-                    "## Konteks Tambahan:",
-                    additional_context,
-                    ""
-                ])
-            else:
-                prompt_parts.extend([
-                    "## Additional Context:",
-                    additional_context,
-                    ""
-                ])
-        
+        return lines
+    
+    def _context_lines(self, additional_context: Optional[str]) -> list:
+        """Optional additional context section"""
+        if not additional_context:
+            return []
         if self.language == "indonesian":
-            prompt_parts.extend([
+            return [
+                "## Konteks Tambahan:",
+                additional_context,
+                ""
+            ]
+        return [
+            "## Additional Context:",
+            additional_context,
+            ""
+        ]
+    
+    def _criteria_format_lines(self, indent: str = "    ") -> list:
+        """Example JSON structure for each criterion"""
+        lines = []
+        for i, criterion_name in enumerate(self.rubric.criteria.keys()):
+            comma = "," if i < len(self.rubric.criteria) - 1 else ""
+            lines.append(f'{indent}"{criterion_name}": {{')
+            lines.append(f'{indent}  "grade": "A|B|C|D/E",')
+            lines.append(f'{indent}  "justification": "Detailed 2-4 sentence explanation here"')
+            lines.append(f'{indent}}}{comma}')
+        return lines
+    
+    def _output_format_lines(self) -> list:
+        """Required output format section"""
+        if self.language == "indonesian":
+            lines = [
                 "## Format Output yang Diperlukan:",
                 "Responlah dengan HANYA JSON valid dalam struktur berikut:",
                 "```json",
                 "{",
                 '  "scores": {',
-            ])
+            ]
         else:
-            prompt_parts.extend([
+            lines = [
                 "## Required Output Format:",
                 "Respond with ONLY valid JSON in this exact structure:",
                 "```json",
                 "{",
                 '  "scores": {',
-            ])
+            ]
         
         # Add example structure for each criterion
-        for i, criterion_name in enumerate(self.rubric.criteria.keys()):
-            comma = "," if i < len(self.rubric.criteria) - 1 else ""
-            prompt_parts.append(f'    "{criterion_name}": {{')
-            prompt_parts.append('      "grade": "A|B|C|D/E",')
-            prompt_parts.append('      "justification": "Detailed 2-4 sentence explanation here"')
-            prompt_parts.append(f'    }}{comma}')
+        lines.extend(self._criteria_format_lines())
         
         if self.language == "indonesian":
-            prompt_parts.extend([
+            lines.extend([
                 "  },",
                 '  "overall_comment": "Komentar keseluruhan singkat opsional (1-2 kalimat)"',
                 "}",
@@ -268,7 +454,7 @@ Your response must be in valid JSON format."""
                 "- Semua justifikasi dan overall_comment HARUS dalam Bahasa Indonesia",
             ])
         else:
-            prompt_parts.extend([
+            lines.extend([
                 "  },",
                 '  "overall_comment": "Optional brief overall assessment (1-2 sentences)"',
                 "}",
@@ -280,8 +466,67 @@ Your response must be in valid JSON format."""
                 "- Justifications must be specific to THIS essay, not generic",
                 "- Grade must be one of: A, B, C, D/E",
             ])
+        return lines
+    
+    def _packed_output_format_lines(self, question_ids: List[str]) -> list:
+        """Required output format section for packed (multi-answer) prompts"""
+        id_list = ", ".join(str(qid) for qid in question_ids)
         
-        return "\n".join(prompt_parts)
+        if self.language == "indonesian":
+            lines = [
+                "## Format Output yang Diperlukan:",
+                "Responlah dengan HANYA JSON valid dalam struktur berikut, dengan satu entri per soal:",
+            ]
+        else:
+            lines = [
+                "## Required Output Format:",
+                "Respond with ONLY valid JSON in this exact structure, with one entry per question:",
+            ]
+        
+        lines.extend([
+            "```json",
+            "{",
+            '  "results": [',
+            "    {",
+            '      "question_id": "<nomor soal>",' if self.language == "indonesian" else '      "question_id": "<question number>",',
+            '      "scores": {',
+        ])
+        lines.extend(self._criteria_format_lines(indent="        "))
+        
+        if self.language == "indonesian":
+            lines.extend([
+                "      },",
+                '      "overall_comment": "Komentar keseluruhan singkat opsional (1-2 kalimat)"',
+                "    }",
+                "  ]",
+                "}",
+                "```",
+                "",
+                "PENTING:",
+                "- Kembalikan HANYA JSON, tanpa teks lain",
+                f"- Array results harus berisi tepat satu entri untuk setiap soal: {id_list}",
+                "- Pastikan semua nama kriteria sesuai persis seperti yang ditampilkan di atas",
+                "- Justifikasi harus spesifik untuk jawaban soal tersebut, bukan generik",
+                "- Nilai harus salah satu dari: A, B, C, D/E",
+                "- Semua justifikasi dan overall_comment HARUS dalam Bahasa Indonesia",
+            ])
+        else:
+            lines.extend([
+                "      },",
+                '      "overall_comment": "Optional brief overall assessment (1-2 sentences)"',
+                "    }",
+                "  ]",
+                "}",
+                "```",
+                "",
+                "IMPORTANT:",
+                "- Return ONLY the JSON, no other text",
+                f"- The results array must contain exactly one entry for each question: {id_list}",
+                "- Ensure all criterion names match exactly as shown above",
+                "- Justifications must be specific to THAT question's answer, not generic",
+                "- Grade must be one of: A, B, C, D/E",
+            ])
+        return lines
     
     def _get_strategy_instructions(self) -> list:
         """Get strategy-specific instructions"""
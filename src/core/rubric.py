@@ -3,6 +3,7 @@ Core Rubric Management System
 Handles rubric loading, validation, and weighting
 """
 
+import hashlib
 import json
 from typing import Dict, List, Optional
 from pathlib import Path
@@ -141,6 +142,16 @@ class Rubric(BaseModel):
         """Convert to dictionary"""
         return self.dict()
     
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the rubric content
+        
+        Returns:
+            Hex SHA-256 digest (identical rubrics give identical fingerprints)
+        """
+        data = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+    
     @classmethod
     def from_dict(cls, data: Dict) -> "Rubric":
         """Create rubric from dictionary"""
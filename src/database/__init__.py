@@ -4,5 +4,6 @@ Provides SQLite-based checkpoint and resume functionality.
 """
 
 from .db_manager import DatabaseManager
+from .write_behind import WriteBehindWriter
 
-__all__ = ['DatabaseManager']
+__all__ = ['DatabaseManager', 'WriteBehindWriter']
@@ -3,50 +3,216 @@ Database Manager for AES Grading System
 
 Provides checkpoint and resume functionality using SQLite.
 Stores all grading results to prevent data loss and enable progress tracking.
+
+The database runs in WAL mode, so analysis scripts can read while an
+experiment is writing. Each thread keeps one long-lived connection.
+
+Question and answer text is stored once in the content-hashed `questions`
+and `answers` tables; result rows live in `grading_results_base` and
+reference them by id. `grading_results` is a view that joins the text back
+in, so queries written against the original single-table layout keep
+working. Databases with the old layout are migrated on first open.
+
+Per-criterion grades are additionally kept in the long-format
+`criterion_grades` table (one row per result and criterion), so agreement
+and distribution queries can run as SQL aggregates instead of parsing the
+`grades` JSON of every row.
+
+Running consistency statistics of every experiment and criterion (Welford
+moments and grade counts per item, ANOVA sums per trial and in total) are
+kept in the `live_items`, `live_raters` and `live_totals` tables, updated
+in the same transaction as criterion_grades. get_live_reliability() reads
+one row per criterion, so the reliability of an experiment in progress is
+available without re-scanning the results. Deleting results any other way
+(e.g. DELETE FROM grading_results in a script) drops the experiment's live
+rows and marks it in `live_stale`; it is rebuilt on the next read.
 """
 
 import sqlite3
+import hashlib
 import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import groupby
 from pathlib import Path
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Tuple, Set, Iterable, Iterator
+
+
+# Task lifecycle: pending -> processing -> completed | failed (failed tasks may be retried)
+TASK_STATUSES = ('pending', 'processing', 'completed', 'failed')
+
+# Content-hashed text tables: table -> text column
+TEXT_TABLES = {'questions': 'question_text', 'answers': 'answer_text'}
+
+# Output formats of export_results
+EXPORT_FORMATS = ('json', 'jsonl')
+
+# Grade -> points of the default rubric scale (config/rubrics.json)
+GRADE_POINTS = {'A': 4, 'B': 3, 'C': 2, 'D/E': 1}
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest used to deduplicate question and answer text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
 class DatabaseManager:
     """Manages SQLite database for grading results with checkpoint/resume support."""
     
-    def __init__(self, db_path: str = "results/grading_results.db"):
+    def __init__(
+        self,
+        db_path: str = "results/grading_results.db",
+        persistent: bool = True,
+        wal: bool = True,
+        grade_points: Optional[Dict[str, float]] = None
+    ):
         """
         Initialize database manager.
         
         Args:
             db_path: Path to SQLite database file
+            persistent: Keep one connection per thread open instead of
+                        opening and closing one in every method
+            wal: Use journal_mode=WAL with synchronous=NORMAL (readers no
+                 longer block the writer; commits skip the per-commit fsync)
+            grade_points: Grade -> points mapping for criterion_grades
+                          (default: GRADE_POINTS)
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.persistent = persistent
+        self.wal = wal
+        self.grade_points = grade_points or GRADE_POINTS
+        
+        self._local = threading.local()  # Per-thread connection and transaction depth
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        
         self._create_tables()
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection with JSON support."""
-        conn = sqlite3.connect(str(self.db_path))
+        """
+        Open a new database connection with JSON support.
+        
+        The caller owns the connection and must close it. Methods of this
+        class use _acquire(), which reuses the thread's persistent connection.
+        """
+        conn = sqlite3.connect(str(self.db_path), timeout=30, cached_statements=256)
         conn.row_factory = sqlite3.Row  # Enable column access by name
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
         return conn
     
-    def _create_tables(self):
-        """Create database tables if they don't exist."""
+    def _acquire(self) -> sqlite3.Connection:
+        """Get the connection for this thread (persistent or transaction-scoped, else new)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        
         conn = self._get_connection()
-        cursor = conn.cursor()
+        if self.persistent:
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Close a connection from _acquire() unless it is kept for reuse."""
+        if conn is not getattr(self._local, "conn", None):
+            conn.close()
+    
+    def _commit(self, conn: sqlite3.Connection):
+        """Commit, unless an explicit transaction() is open on this thread."""
+        if getattr(self._local, "depth", 0) == 0:
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several calls into one transaction (one commit, one fsync).
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS grading_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+        Nested use joins the outer transaction. The write lock is taken
+        up front (BEGIN IMMEDIATE) so concurrent writers wait instead of
+        failing halfway through.
+        
+        Example:
+            with db.transaction():
+                for task in tasks:
+                    db.insert_or_update(...)
+        
+        Yields:
+            The sqlite3 connection used by the transaction
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth > 0:
+            self._local.depth = depth + 1
+            try:
+                yield self._local.conn
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn = self._acquire()
+        owns_connection = getattr(self._local, "conn", None) is None
+        if owns_connection:
+            self._local.conn = conn  # Non-persistent mode: share one connection for the block
+        
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.depth = 0
+            if owns_connection:
+                self._local.conn = None
+                conn.close()
+    
+    def close(self):
+        """Close all persistent connections (they are reopened on next use)."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # Connection belongs to another, finished thread
+        self._local = threading.local()
+    
+    def close_thread_connection(self):
+        """Close the calling thread's persistent connection (e.g. before the thread exits)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        self._local.conn = None
+        conn.close()
+    
+    def __enter__(self) -> "DatabaseManager":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    # Result columns besides the question/answer references, in original order
+    _RESULT_COLUMNS = """
                 experiment_id TEXT NOT NULL,
                 trial_number INTEGER NOT NULL,
                 student_id TEXT NOT NULL,
                 student_name TEXT NOT NULL,
                 question_number INTEGER NOT NULL,
-                question_text TEXT NOT NULL,
-                answer_text TEXT NOT NULL,
+                question_id INTEGER NOT NULL REFERENCES questions(id),
+                answer_id INTEGER NOT NULL REFERENCES answers(id),
                 model TEXT NOT NULL,
                 strategy TEXT NOT NULL,
                 grades TEXT,
@@ -58,23 +224,551 @@ class DatabaseManager:
                 timestamp DATETIME NOT NULL,
                 status TEXT NOT NULL,
                 error_message TEXT,
+                worker_id TEXT,
+                lease_expires REAL,
                 UNIQUE(experiment_id, trial_number, student_id, question_number)
+    """
+    
+    def _create_tables(self):
+        """Create database tables if they don't exist (migrating the old layout)."""
+        with self.transaction() as conn:
+            for table, column in TEXT_TABLES.items():
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        content_hash TEXT NOT NULL UNIQUE,
+                        {column} TEXT NOT NULL
+                    )
+                """)
+            
+            legacy = conn.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'grading_results'
+            """).fetchone()
+            if legacy:
+                self._migrate_legacy_results(conn)
+            
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS grading_results_base (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    {self._RESULT_COLUMNS}
+                )
+            """)
+            
+            # Create index for faster queries
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_experiment_trial 
+                ON grading_results_base(experiment_id, trial_number)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_status 
+                ON grading_results_base(status)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_experiment_status
+                ON grading_results_base(experiment_id, status)
+            """)
+            
+            # Long-format per-criterion grades (derived from the grades JSON)
+            backfill = not conn.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'criterion_grades'
+            """).fetchone()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS criterion_grades (
+                    result_id INTEGER NOT NULL REFERENCES grading_results_base(id),
+                    experiment_id TEXT NOT NULL,
+                    criterion TEXT NOT NULL,
+                    grade TEXT,
+                    points REAL,
+                    justification TEXT,
+                    PRIMARY KEY (result_id, criterion)
+                ) WITHOUT ROWID
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_criterion_experiment
+                ON criterion_grades(experiment_id, criterion)
+            """)
+            
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS grading_results_base_delete
+                AFTER DELETE ON grading_results_base
+                BEGIN
+                    DELETE FROM criterion_grades WHERE result_id = OLD.id;
+                END
+            """)
+            
+            # Running statistics of completed criterion grades (see get_live_reliability)
+            live_backfill = not conn.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'live_totals'
+            """).fetchone()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS live_items (
+                    experiment_id TEXT NOT NULL,
+                    criterion TEXT NOT NULL,
+                    student_id TEXT NOT NULL,
+                    question_number INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    mean REAL NOT NULL,
+                    m2 REAL NOT NULL,
+                    counts TEXT NOT NULL,
+                    PRIMARY KEY (experiment_id, criterion, student_id, question_number)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS live_raters (
+                    experiment_id TEXT NOT NULL,
+                    criterion TEXT NOT NULL,
+                    trial_number INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    mean REAL NOT NULL,
+                    PRIMARY KEY (experiment_id, criterion, trial_number)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS live_totals (
+                    experiment_id TEXT NOT NULL,
+                    criterion TEXT NOT NULL,
+                    totals TEXT NOT NULL,
+                    PRIMARY KEY (experiment_id, criterion)
+                ) WITHOUT ROWID
+            """)
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS live_stale (
+                    experiment_id TEXT PRIMARY KEY
+                ) WITHOUT ROWID
+            """)
+            
+            # Deleted results cannot be subtracted in SQL: drop the experiment's
+            # running statistics and rebuild them on the next read
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS grading_results_base_delete_live
+                AFTER DELETE ON grading_results_base
+                BEGIN
+                    DELETE FROM live_items WHERE experiment_id = OLD.experiment_id;
+                    DELETE FROM live_raters WHERE experiment_id = OLD.experiment_id;
+                    DELETE FROM live_totals WHERE experiment_id = OLD.experiment_id;
+                    INSERT OR IGNORE INTO live_stale (experiment_id) VALUES (OLD.experiment_id);
+                END
+            """)
+            
+            if backfill:
+                self.rebuild_criterion_grades()  # Also rebuilds the live_* tables
+            elif live_backfill:
+                self.rebuild_live_stats()
+            
+            # Compatibility view: the original single-table layout
+            conn.execute("""
+                CREATE VIEW IF NOT EXISTS grading_results AS
+                SELECT
+                    r.id, r.experiment_id, r.trial_number, r.student_id, r.student_name,
+                    r.question_number, q.question_text, a.answer_text, r.model, r.strategy,
+                    r.grades, r.weighted_score, r.justification, r.overall_comment,
+                    r.tokens_used, r.api_call_time, r.timestamp, r.status, r.error_message,
+                    r.worker_id, r.lease_expires, r.question_id, r.answer_id
+                FROM grading_results_base r
+                LEFT JOIN questions q ON q.id = r.question_id
+                LEFT JOIN answers a ON a.id = r.answer_id
+            """)
+            
+            # Keep `DELETE FROM grading_results WHERE ...` in scripts working
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS grading_results_delete
+                INSTEAD OF DELETE ON grading_results
+                BEGIN
+                    DELETE FROM grading_results_base WHERE id = OLD.id;
+                END
+            """)
+    
+    def _migrate_legacy_results(self, conn: sqlite3.Connection):
+        """
+        Move a single-table grading_results into the normalized layout.
+        
+        Runs inside the caller's transaction: text is interned into the
+        questions/answers tables, rows are copied with their ids, and the
+        old table is dropped (the view takes its name).
+        """
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(grading_results)")}
+        for column in ('worker_id', 'lease_expires'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE grading_results ADD COLUMN {column} "
+                             f"{'TEXT' if column == 'worker_id' else 'REAL'}")
+        
+        conn.create_function("content_hash", 1, content_hash, deterministic=True)
+        for table, column in TEXT_TABLES.items():
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {table} (content_hash, {column})
+                SELECT content_hash({column}), {column}
+                FROM (SELECT DISTINCT {column} FROM grading_results)
+            """)
+        
+        conn.execute(f"""
+            CREATE TABLE grading_results_base (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {self._RESULT_COLUMNS}
             )
         """)
-        
-        # Create index for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_experiment_trial 
-            ON grading_results(experiment_id, trial_number)
+        conn.execute("""
+            INSERT INTO grading_results_base (
+                id, experiment_id, trial_number, student_id, student_name,
+                question_number, question_id, answer_id, model, strategy,
+                grades, weighted_score, justification, overall_comment,
+                tokens_used, api_call_time, timestamp, status, error_message,
+                worker_id, lease_expires
+            )
+            SELECT
+                g.id, g.experiment_id, g.trial_number, g.student_id, g.student_name,
+                g.question_number, q.id, a.id, g.model, g.strategy,
+                g.grades, g.weighted_score, g.justification, g.overall_comment,
+                g.tokens_used, g.api_call_time, g.timestamp, g.status, g.error_message,
+                g.worker_id, g.lease_expires
+            FROM grading_results g
+            JOIN questions q ON q.content_hash = content_hash(g.question_text)
+            JOIN answers a ON a.content_hash = content_hash(g.answer_text)
         """)
+        conn.execute("DROP TABLE grading_results")
+    
+    def _intern_texts(
+        self,
+        conn: sqlite3.Connection,
+        table: str,
+        texts: Iterable[str]
+    ) -> Dict[str, int]:
+        """
+        Store texts in a content-hashed table (once each) and look up their ids.
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_status 
-            ON grading_results(status)
-        """)
+        Must run inside a transaction.
         
-        conn.commit()
-        conn.close()
+        Args:
+            conn: Connection of the open transaction
+            table: 'questions' or 'answers'
+            texts: Texts to intern (duplicates allowed)
+        
+        Returns:
+            Dict of text -> row id
+        """
+        column = TEXT_TABLES[table]
+        hashes = {text: content_hash(text) for text in set(texts)}
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {table} (content_hash, {column}) VALUES (?, ?)",
+            [(digest, text) for text, digest in hashes.items()]
+        )
+        
+        ids: Dict[str, int] = {}
+        digests = list(hashes.values())
+        for offset in range(0, len(digests), 500):
+            chunk = digests[offset:offset + 500]
+            ids.update(conn.execute(
+                f"SELECT content_hash, id FROM {table} "
+                f"WHERE content_hash IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        
+        return {text: ids[digest] for text, digest in hashes.items()}
+    
+    def _criterion_rows(
+        self,
+        grades: Dict[str, Any]
+    ) -> List[Tuple[str, Optional[str], Optional[float], Optional[str]]]:
+        """
+        Flatten a grades dict to (criterion, grade, points, justification) tuples.
+        
+        Accepts both {criterion: {'grade', 'justification'}} and {criterion: grade}.
+        """
+        rows = []
+        for criterion, value in grades.items():
+            if isinstance(value, dict):
+                grade, justification = value.get('grade'), value.get('justification')
+            else:
+                grade, justification = value, None
+            rows.append((criterion, grade, self.grade_points.get(grade), justification))
+        return rows
+    
+    def _write_criterion_grades(
+        self,
+        conn: sqlite3.Connection,
+        experiment_id: str,
+        results: List[Tuple[int, str, int, Optional[Dict[str, Any]]]]
+    ):
+        """
+        Replace the criterion_grades rows of results identified by task key.
+        
+        Must run inside a transaction.
+        
+        Args:
+            conn: Connection of the open transaction
+            experiment_id: Experiment identifier
+            results: (trial_number, student_id, question_number, grades) tuples;
+                     grades may be None (the result's rows are only removed)
+        """
+        key_clause = """
+            WHERE experiment_id = ?
+            AND trial_number = ?
+            AND student_id = ?
+            AND question_number = ?
+        """
+        keys = [(trial, student, question) for trial, student, question, _ in results]
+        removed = self._scored_criterion_rows(conn, experiment_id, keys)
+        conn.executemany(f"""
+            DELETE FROM criterion_grades
+            WHERE result_id = (SELECT id FROM grading_results_base {key_clause})
+        """, [(experiment_id, trial, student, question) for trial, student, question, _ in results])
+        conn.executemany(f"""
+            INSERT INTO criterion_grades (
+                result_id, experiment_id, criterion, grade, points, justification
+            )
+            SELECT id, experiment_id, ?, ?, ?, ?
+            FROM grading_results_base {key_clause}
+        """, [
+            (*row, experiment_id, trial, student, question)
+            for trial, student, question, grades in results if grades
+            for row in self._criterion_rows(grades)
+        ])
+        self._update_live_stats(conn, experiment_id, removed,
+                                self._scored_criterion_rows(conn, experiment_id, keys))
+    
+    def _scored_criterion_rows(
+        self,
+        conn: sqlite3.Connection,
+        experiment_id: str,
+        keys: List[Tuple[int, str, int]]
+    ) -> List[Tuple[str, int, str, int, str, float]]:
+        """
+        Criterion grades with points of the completed results behind task keys.
+        
+        Returns:
+            (criterion, trial_number, student_id, question_number, grade, points) tuples
+        """
+        rows = []
+        for key in keys:
+            rows.extend(conn.execute("""
+                SELECT c.criterion, r.trial_number, r.student_id, r.question_number,
+                       c.grade, c.points
+                FROM grading_results_base r
+                JOIN criterion_grades c ON c.result_id = r.id
+                WHERE r.experiment_id = ?
+                AND r.trial_number = ?
+                AND r.student_id = ?
+                AND r.question_number = ?
+                AND r.status = 'completed'
+                AND c.points IS NOT NULL
+            """, (experiment_id, *key)).fetchall())
+        return [tuple(row) for row in rows]
+    
+    def _update_live_stats(
+        self,
+        conn: sqlite3.Connection,
+        experiment_id: str,
+        removed: List[Tuple[str, int, str, int, str, float]],
+        added: List[Tuple[str, int, str, int, str, float]]
+    ):
+        """
+        Apply removed and added criterion grades to the live_* tables.
+        
+        Only the rows of the touched items, trials and criteria are read and
+        written. Must run inside a transaction.
+        """
+        if not removed and not added:
+            return
+        if conn.execute("SELECT 1 FROM live_stale WHERE experiment_id = ?", (experiment_id,)).fetchone():
+            return  # Rebuilt from criterion_grades on the next read
+        from ..evaluation.streaming import StreamingReliability
+        
+        changes = [(row, -1) for row in removed] + [(row, 1) for row in added]
+        changes.sort(key=lambda change: change[0][0])
+        for criterion, group in groupby(changes, key=lambda change: change[0][0]):
+            group = list(group)
+            scope = (experiment_id, criterion)
+            items = {(student, question) for (_, _, student, question, _, _), _ in group}
+            raters = {trial for (_, trial, _, _, _, _), _ in group}
+            
+            row = conn.execute(
+                "SELECT totals FROM live_totals WHERE experiment_id = ? AND criterion = ?", scope
+            ).fetchone()
+            live = StreamingReliability(totals=json.loads(row['totals']) if row else None)
+            for student, question in items:
+                row = conn.execute("""
+                    SELECT n, mean, m2, counts FROM live_items
+                    WHERE experiment_id = ? AND criterion = ? AND student_id = ? AND question_number = ?
+                """, (*scope, student, question)).fetchone()
+                if row:
+                    live.items[student, question] = (row['n'], row['mean'], row['m2'], json.loads(row['counts']))
+            for trial in raters:
+                row = conn.execute("""
+                    SELECT n, mean FROM live_raters
+                    WHERE experiment_id = ? AND criterion = ? AND trial_number = ?
+                """, (*scope, trial)).fetchone()
+                if row:
+                    live.raters[trial] = (row['n'], row['mean'])
+            
+            for (_, trial, student, question, grade, points), weight in group:
+                live.change((student, question), trial, grade, points, weight)
+            self._write_live_stats(conn, experiment_id, criterion, live, items, raters)
+    
+    def _write_live_stats(
+        self,
+        conn: sqlite3.Connection,
+        experiment_id: str,
+        criterion: str,
+        live: Any,
+        items: Iterable[Tuple[str, int]],
+        raters: Iterable[int]
+    ):
+        """Store the given items and raters of a StreamingReliability (dropping empty ones) and its totals."""
+        scope = (experiment_id, criterion)
+        for student, question in items:
+            state = live.items.get((student, question))
+            if state:
+                n, mean, m2, counts = state
+                conn.execute("""
+                    INSERT OR REPLACE INTO live_items (
+                        experiment_id, criterion, student_id, question_number, n, mean, m2, counts
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (*scope, student, question, n, mean, m2, json.dumps(counts)))
+            else:
+                conn.execute("""
+                    DELETE FROM live_items
+                    WHERE experiment_id = ? AND criterion = ? AND student_id = ? AND question_number = ?
+                """, (*scope, student, question))
+        for trial in raters:
+            state = live.raters.get(trial)
+            if state:
+                conn.execute("""
+                    INSERT OR REPLACE INTO live_raters (experiment_id, criterion, trial_number, n, mean)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (*scope, trial, *state))
+            else:
+                conn.execute("""
+                    DELETE FROM live_raters
+                    WHERE experiment_id = ? AND criterion = ? AND trial_number = ?
+                """, (*scope, trial))
+        if live.totals['n'] > 0:
+            conn.execute("""
+                INSERT OR REPLACE INTO live_totals (experiment_id, criterion, totals) VALUES (?, ?, ?)
+            """, (*scope, json.dumps(live.totals)))
+        else:
+            conn.execute("DELETE FROM live_totals WHERE experiment_id = ? AND criterion = ?", scope)
+    
+    def rebuild_criterion_grades(self, experiment_id: Optional[str] = None) -> int:
+        """
+        Regenerate criterion_grades from the grades JSON of stored results.
+        
+        Runs automatically when the table is first created on an existing
+        database. Rows whose grades are not valid JSON are skipped. The
+        live_* statistics are rebuilt as well.
+        
+        Args:
+            experiment_id: Optional experiment filter (default: all)
+        
+        Returns:
+            Number of criterion rows written
+        """
+        query = "SELECT id, experiment_id, grades FROM grading_results_base WHERE grades IS NOT NULL"
+        params: List[Any] = []
+        if experiment_id is not None:
+            query += " AND experiment_id = ?"
+            params.append(experiment_id)
+        
+        with self.transaction() as conn:
+            if experiment_id is not None:
+                conn.execute("DELETE FROM criterion_grades WHERE experiment_id = ?", (experiment_id,))
+            else:
+                conn.execute("DELETE FROM criterion_grades")
+            
+            rows = []
+            for result_id, result_experiment, grades_json in conn.execute(query, params).fetchall():
+                try:
+                    grades = json.loads(grades_json)
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(grades, dict):
+                    rows.extend(
+                        (result_id, result_experiment, *row) for row in self._criterion_rows(grades)
+                    )
+            conn.executemany("""
+                INSERT OR REPLACE INTO criterion_grades (
+                    result_id, experiment_id, criterion, grade, points, justification
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            self.rebuild_live_stats(experiment_id)
+        
+        return len(rows)
+    
+    def rebuild_live_stats(self, experiment_id: Optional[str] = None) -> int:
+        """
+        Regenerate the live_* tables from criterion_grades.
+        
+        Runs automatically when the tables are first created on an existing
+        database, and from get_live_reliability for an experiment whose
+        results were deleted other than through clear_experiment (e.g.
+        DELETE FROM grading_results in a script).
+        
+        Args:
+            experiment_id: Optional experiment filter (default: all)
+        
+        Returns:
+            Number of criterion grades accumulated
+        """
+        from ..evaluation.streaming import StreamingReliability
+        
+        query = """
+            SELECT c.experiment_id, c.criterion, r.trial_number, r.student_id,
+                   r.question_number, c.grade, c.points
+            FROM criterion_grades c
+            JOIN grading_results_base r ON r.id = c.result_id
+            WHERE r.status = 'completed'
+            AND c.points IS NOT NULL
+        """
+        params: List[Any] = []
+        if experiment_id is not None:
+            query += " AND c.experiment_id = ?"
+            params.append(experiment_id)
+        query += " ORDER BY c.experiment_id, c.criterion"
+        
+        count = 0
+        with self.transaction() as conn:
+            for table in ('live_items', 'live_raters', 'live_totals', 'live_stale'):
+                if experiment_id is not None:
+                    conn.execute(f"DELETE FROM {table} WHERE experiment_id = ?", (experiment_id,))
+                else:
+                    conn.execute(f"DELETE FROM {table}")
+            
+            rows = conn.execute(query, params).fetchall()
+            for (experiment, criterion), group in groupby(rows, key=lambda row: (row[0], row[1])):
+                live = StreamingReliability()
+                for _, _, trial, student, question, grade, points in group:
+                    live.change((student, question), trial, grade, points)
+                    count += 1
+                self._write_live_stats(conn, experiment, criterion, live,
+                                       list(live.items), list(live.raters))
+        
+        return count
+    
+    def compact(self) -> Dict[str, int]:
+        """
+        Delete question/answer text no longer referenced by any result, then VACUUM.
+        
+        Returns:
+            Dict of table -> number of orphaned rows deleted
+        """
+        deleted = {}
+        with self.transaction() as conn:
+            for table, column in TEXT_TABLES.items():
+                reference = 'question_id' if table == 'questions' else 'answer_id'
+                deleted[table] = conn.execute(f"""
+                    DELETE FROM {table}
+                    WHERE id NOT IN (SELECT {reference} FROM grading_results_base)
+                """).rowcount
+        
+        conn = self._acquire()
+        conn.execute("VACUUM")
+        self._release(conn)
+        return deleted
     
     def insert_or_update(
         self,
@@ -121,32 +815,95 @@ class DatabaseManager:
         Returns:
             Row ID of inserted/updated record
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         timestamp = datetime.now().isoformat()
         grades_json = json.dumps(grades) if grades else None
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO grading_results (
+        with self.transaction() as conn:
+            question_id = self._intern_texts(conn, 'questions', [question_text])[question_text]
+            answer_id = self._intern_texts(conn, 'answers', [answer_text])[answer_text]
+            # REPLACE gives the row a new id: drop the old criterion rows first
+            key = (trial_number, student_id, question_number)
+            self._write_criterion_grades(conn, experiment_id, [(*key, None)])
+            cursor = conn.execute("""
+                INSERT OR REPLACE INTO grading_results_base (
+                    experiment_id, trial_number, student_id, student_name,
+                    question_number, question_id, answer_id, model, strategy,
+                    grades, weighted_score, justification, overall_comment,
+                    tokens_used, api_call_time, timestamp, status, error_message
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
                 experiment_id, trial_number, student_id, student_name,
-                question_number, question_text, answer_text, model, strategy,
-                grades, weighted_score, justification, overall_comment,
+                question_number, question_id, answer_id, model, strategy,
+                grades_json, weighted_score, justification, overall_comment,
                 tokens_used, api_call_time, timestamp, status, error_message
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            experiment_id, trial_number, student_id, student_name,
-            question_number, question_text, answer_text, model, strategy,
-            grades_json, weighted_score, justification, overall_comment,
-            tokens_used, api_call_time, timestamp, status, error_message
-        ))
-        
-        row_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            ))
+            row_id = cursor.lastrowid
+            self._write_criterion_grades(conn, experiment_id, [(*key, grades)])
         
         return row_id
     
+    def ingest_results(
+        self,
+        experiment_id: str,
+        results: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Bulk-write finished results onto existing task rows in one transaction.
+
+        Used to ingest Batch API output for tasks seeded as 'pending'.
+
+        Args:
+            experiment_id: Experiment identifier
+            results: Dicts with trial_number, student_id, question_number, status
+                    and optionally grades, weighted_score, justification,
+                    overall_comment, tokens_used, api_call_time, error_message
+
+        Returns:
+            Number of rows updated
+        """
+        timestamp = datetime.now().isoformat()
+        rows = [
+            (
+                json.dumps(r['grades']) if r.get('grades') else None,
+                r.get('weighted_score'),
+                r.get('justification'),
+                r.get('overall_comment'),
+                r.get('tokens_used'),
+                r.get('api_call_time'),
+                timestamp,
+                r['status'],
+                r.get('error_message'),
+                experiment_id,
+                r['trial_number'],
+                r['student_id'],
+                r['question_number']
+            )
+            for r in results
+        ]
+
+        with self.transaction() as conn:
+            # Drop the old criterion rows while the previous status still applies
+            self._write_criterion_grades(conn, experiment_id, [
+                (r['trial_number'], r['student_id'], r['question_number'], None)
+                for r in results
+            ])
+            count = conn.executemany("""
+                UPDATE grading_results_base
+                SET grades = ?, weighted_score = ?, justification = ?,
+                    overall_comment = ?, tokens_used = ?, api_call_time = ?,
+                    timestamp = ?, status = ?, error_message = ?
+                WHERE experiment_id = ?
+                AND trial_number = ?
+                AND student_id = ?
+                AND question_number = ?
+            """, rows).rowcount
+            self._write_criterion_grades(conn, experiment_id, [
+                (r['trial_number'], r['student_id'], r['question_number'], r.get('grades'))
+                for r in results
+            ])
+
+        return count
+
     def get_result(
         self,
         experiment_id: str,
@@ -166,7 +923,7 @@ class DatabaseManager:
         Returns:
             Dictionary with result data or None if not found
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -178,7 +935,7 @@ class DatabaseManager:
         """, (experiment_id, trial_number, student_id, question_number))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         if row:
             result = dict(row)
@@ -209,6 +966,81 @@ class DatabaseManager:
         result = self.get_result(experiment_id, trial_number, student_id, question_number)
         return result is not None and result['status'] == 'completed'
     
+    def get_completed_keys(
+        self,
+        experiment_id: str,
+        trial_number: Optional[int] = None
+    ) -> Set[Tuple[int, str, int]]:
+        """
+        Get the keys of all completed tasks in a single query.
+        
+        Replaces one check_exists call per task when resuming.
+        
+        Args:
+            experiment_id: Experiment identifier
+            trial_number: Optional trial number filter
+        
+        Returns:
+            Set of (trial_number, student_id, question_number)
+        """
+        conn = self._acquire()
+        
+        if trial_number is not None:
+            rows = conn.execute("""
+                SELECT trial_number, student_id, question_number
+                FROM grading_results_base
+                WHERE experiment_id = ?
+                AND trial_number = ?
+                AND status = 'completed'
+            """, (experiment_id, trial_number)).fetchall()
+        else:
+            rows = conn.execute("""
+                SELECT trial_number, student_id, question_number
+                FROM grading_results_base
+                WHERE experiment_id = ?
+                AND status = 'completed'
+            """, (experiment_id,)).fetchall()
+        
+        self._release(conn)
+        return {(row[0], row[1], row[2]) for row in rows}
+    
+    def get_experiment_counts(
+        self,
+        experiment_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Get task counts per status for many experiments in a single query.
+        
+        Args:
+            experiment_ids: Experiments to include (default: all)
+        
+        Returns:
+            Dict of experiment_id -> {'total', 'completed', 'failed', 'processing', 'pending'}
+        """
+        conn = self._acquire()
+        rows = conn.execute("""
+            SELECT experiment_id, status, COUNT(*) as count
+            FROM grading_results_base
+            GROUP BY experiment_id, status
+        """).fetchall()
+        self._release(conn)
+        
+        wanted = set(experiment_ids) if experiment_ids is not None else None
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            if wanted is not None and row['experiment_id'] not in wanted:
+                continue
+            entry = counts.setdefault(
+                row['experiment_id'], {'total': 0, **{status: 0 for status in TASK_STATUSES}}
+            )
+            entry['total'] += row['count']
+            entry[row['status']] = entry.get(row['status'], 0) + row['count']
+        
+        if wanted is not None:
+            for experiment_id in wanted:
+                counts.setdefault(experiment_id, {'total': 0, **{status: 0 for status in TASK_STATUSES}})
+        return counts
+    
     def get_pending_tasks(
         self,
         experiment_id: str,
@@ -224,7 +1056,7 @@ class DatabaseManager:
         Returns:
             List of pending task dictionaries
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         if trial_number is not None:
@@ -244,7 +1076,7 @@ class DatabaseManager:
             """, (experiment_id,))
         
         rows = cursor.fetchall()
-        conn.close()
+        self._release(conn)
         
         tasks = []
         for row in rows:
@@ -270,7 +1102,7 @@ class DatabaseManager:
         Returns:
             Tuple of (completed_count, total_count, percentage)
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         if trial_number is not None:
@@ -278,7 +1110,7 @@ class DatabaseManager:
                 SELECT 
                     COUNT(*) as total,
                     SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed
-                FROM grading_results
+                FROM grading_results_base
                 WHERE experiment_id = ?
                 AND trial_number = ?
             """, (experiment_id, trial_number))
@@ -287,12 +1119,12 @@ class DatabaseManager:
                 SELECT 
                     COUNT(*) as total,
                     SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed
-                FROM grading_results
+                FROM grading_results_base
                 WHERE experiment_id = ?
             """, (experiment_id,))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         total = row['total'] or 0
         completed = row['completed'] or 0
@@ -310,7 +1142,7 @@ class DatabaseManager:
         Returns:
             List of failed task dictionaries
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -321,7 +1153,7 @@ class DatabaseManager:
         """, (experiment_id,))
         
         rows = cursor.fetchall()
-        conn.close()
+        self._release(conn)
         
         tasks = [dict(row) for row in rows]
         return tasks
@@ -346,21 +1178,494 @@ class DatabaseManager:
             status: New status
             error_message: Optional error message
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        key = (trial_number, student_id, question_number)
+        with self.transaction() as conn:
+            # Only completed results count in the live statistics
+            removed = self._scored_criterion_rows(conn, experiment_id, [key])
+            conn.execute("""
+                UPDATE grading_results_base
+                SET status = ?, error_message = ?, timestamp = ?
+                WHERE experiment_id = ?
+                AND trial_number = ?
+                AND student_id = ?
+                AND question_number = ?
+            """, (status, error_message, datetime.now().isoformat(), experiment_id, *key))
+            self._update_live_stats(conn, experiment_id, removed,
+                                    self._scored_criterion_rows(conn, experiment_id, [key]))
+    
+    def seed_tasks(
+        self,
+        experiment_id: str,
+        model: str,
+        strategy: str,
+        tasks: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Insert pending rows for many tasks in one transaction.
         
-        cursor.execute("""
-            UPDATE grading_results
-            SET status = ?, error_message = ?, timestamp = ?
+        Existing rows (completed, failed or in progress) are left untouched,
+        so seeding is safe to repeat on resume. Each distinct question and
+        answer text is stored once and referenced by id.
+        
+        Args:
+            experiment_id: Experiment identifier
+            model: AI model used
+            strategy: Prompting strategy used
+            tasks: Dicts with trial_number, student_id, student_name,
+                   question_number, question_text, answer_text
+        
+        Returns:
+            Number of new rows inserted
+        """
+        timestamp = datetime.now().isoformat()
+        
+        with self.transaction() as conn:
+            question_ids = self._intern_texts(conn, 'questions', [t['question_text'] for t in tasks])
+            answer_ids = self._intern_texts(conn, 'answers', [t['answer_text'] for t in tasks])
+            rows = [
+                (
+                    experiment_id, t['trial_number'], t['student_id'], t['student_name'],
+                    t['question_number'], question_ids[t['question_text']],
+                    answer_ids[t['answer_text']], model, strategy, timestamp
+                )
+                for t in tasks
+            ]
+            
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO grading_results_base (
+                    experiment_id, trial_number, student_id, student_name,
+                    question_number, question_id, answer_id, model, strategy,
+                    timestamp, status
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+            """, rows)
+            inserted = conn.total_changes - before
+        
+        return inserted
+    
+    def start_tasks(
+        self,
+        experiment_id: str,
+        keys: List[Tuple[int, str, int]]
+    ) -> int:
+        """
+        Move tasks to 'processing' (status columns only, one transaction).
+        
+        Completed tasks are never moved back.
+        
+        Args:
+            experiment_id: Experiment identifier
+            keys: (trial_number, student_id, question_number) tuples
+        
+        Returns:
+            Number of tasks moved
+        """
+        timestamp = datetime.now().isoformat()
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                UPDATE grading_results_base
+                SET status = 'processing', error_message = NULL, timestamp = ?,
+                    worker_id = NULL, lease_expires = NULL
+                WHERE experiment_id = ?
+                AND trial_number = ?
+                AND student_id = ?
+                AND question_number = ?
+                AND status != 'completed'
+            """, [(timestamp, experiment_id, *key) for key in keys])
+            moved = conn.total_changes - before
+        
+        return moved
+    
+    def complete_task(
+        self,
+        experiment_id: str,
+        trial_number: int,
+        student_id: str,
+        question_number: int,
+        grades: Dict[str, Any],
+        weighted_score: float,
+        justification: Optional[str] = None,
+        overall_comment: Optional[str] = None,
+        tokens_used: Optional[int] = None,
+        api_call_time: Optional[float] = None,
+        worker_id: Optional[str] = None
+    ) -> bool:
+        """
+        Store a grading result and mark the task completed in one statement.
+        
+        Unlike insert_or_update, the question and answer text are not rewritten.
+        The per-criterion grades are written to criterion_grades in the same
+        transaction. With worker_id, the update only applies while that worker
+        still holds the task's lease (a reclaimed task is not overwritten by a
+        stale worker).
+        
+        Returns:
+            True if the task row existed and was updated
+        """
+        with self.transaction() as conn:
+            cursor = conn.execute(f"""
+                UPDATE grading_results_base
+                SET grades = ?, weighted_score = ?, justification = ?,
+                    overall_comment = ?, tokens_used = ?, api_call_time = ?,
+                    timestamp = ?, status = 'completed', error_message = NULL,
+                    lease_expires = NULL
+                WHERE experiment_id = ?
+                AND trial_number = ?
+                AND student_id = ?
+                AND question_number = ?
+                {self._OWNER_CLAUSE if worker_id else ""}
+            """, (
+                json.dumps(grades) if grades else None, weighted_score, justification,
+                overall_comment, tokens_used, api_call_time, datetime.now().isoformat(),
+                experiment_id, trial_number, student_id, question_number,
+                *((worker_id,) if worker_id else ())
+            ))
+            updated = cursor.rowcount > 0
+            if updated:
+                self._write_criterion_grades(
+                    conn, experiment_id, [(trial_number, student_id, question_number, grades)]
+                )
+        
+        return updated
+    
+    def fail_task(
+        self,
+        experiment_id: str,
+        trial_number: int,
+        student_id: str,
+        question_number: int,
+        error_message: str,
+        worker_id: Optional[str] = None
+    ) -> bool:
+        """
+        Mark a task failed (a completed task is never downgraded).
+        
+        With worker_id, the update only applies while that worker holds the lease.
+        
+        Returns:
+            True if the task row was updated
+        """
+        conn = self._acquire()
+        cursor = conn.execute(f"""
+            UPDATE grading_results_base
+            SET status = 'failed', error_message = ?, timestamp = ?, lease_expires = NULL
             WHERE experiment_id = ?
             AND trial_number = ?
             AND student_id = ?
             AND question_number = ?
-        """, (status, error_message, datetime.now().isoformat(),
-              experiment_id, trial_number, student_id, question_number))
+            AND status != 'completed'
+            {self._OWNER_CLAUSE if worker_id else ""}
+        """, (error_message, datetime.now().isoformat(),
+              experiment_id, trial_number, student_id, question_number,
+              *((worker_id,) if worker_id else ())))
+        updated = cursor.rowcount > 0
+        self._commit(conn)
+        self._release(conn)
         
-        conn.commit()
-        conn.close()
+        return updated
+    
+    # Lease fencing: only the worker that owns a processing task may finalize it
+    _OWNER_CLAUSE = "AND status = 'processing' AND worker_id = ?"
+    
+    def claim_tasks(
+        self,
+        experiment_id: str,
+        worker_id: str,
+        limit: int = 10,
+        lease_seconds: float = 300,
+        include_failed: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to `limit` tasks for one worker.
+        
+        Claims pending tasks and tasks whose lease has expired (their worker
+        crashed or stalled). Processing rows without a lease (single-process
+        runs of run_experiment) are never taken over. The select and update
+        happen in one UPDATE ... RETURNING statement, so concurrent workers
+        never claim the same task.
+        
+        Args:
+            experiment_id: Experiment identifier
+            worker_id: Unique id of the claiming worker
+            limit: Maximum number of tasks to claim
+            lease_seconds: Lease duration; renew with heartbeat()
+            include_failed: Also claim failed tasks (retry)
+        
+        Returns:
+            List of claimed task dictionaries (id, trial_number, student_id, ...)
+        """
+        now = time.time()
+        statuses = "('pending', 'failed')" if include_failed else "('pending')"
+        
+        with self.transaction() as conn:
+            rows = conn.execute(f"""
+                UPDATE grading_results_base
+                SET status = 'processing', worker_id = ?, lease_expires = ?,
+                    error_message = NULL, timestamp = ?
+                WHERE id IN (
+                    SELECT id FROM grading_results_base
+                    WHERE experiment_id = ?
+                    AND (
+                        status IN {statuses}
+                        OR (status = 'processing' AND lease_expires < ?)
+                    )
+                    ORDER BY trial_number, student_id, question_number
+                    LIMIT ?
+                )
+                RETURNING id
+            """, (worker_id, now + lease_seconds, datetime.now().isoformat(),
+                  experiment_id, now, limit)).fetchall()
+            
+            # RETURNING cannot join, so read the claimed rows (with text) back
+            ids = [row['id'] for row in rows]
+            rows = conn.execute(f"""
+                SELECT * FROM grading_results
+                WHERE id IN ({', '.join('?' * len(ids))})
+            """, ids).fetchall() if ids else []
+        
+        tasks = [dict(row) for row in rows]
+        tasks.sort(key=lambda t: (t['trial_number'], t['student_id'], t['question_number']))
+        return tasks
+    
+    def heartbeat(
+        self,
+        worker_id: str,
+        task_ids: List[int],
+        lease_seconds: float = 300
+    ) -> int:
+        """
+        Extend the lease of tasks a worker is still processing.
+        
+        Args:
+            worker_id: Worker that claimed the tasks
+            task_ids: Row ids returned by claim_tasks
+            lease_seconds: New lease duration from now
+        
+        Returns:
+            Number of leases extended (fewer means some were lost to reclaim)
+        """
+        expires = time.time() + lease_seconds
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                UPDATE grading_results_base
+                SET lease_expires = ?
+                WHERE id = ?
+                AND worker_id = ?
+                AND status = 'processing'
+            """, [(expires, task_id, worker_id) for task_id in task_ids])
+            extended = conn.total_changes - before
+        
+        return extended
+    
+    def release_tasks(self, worker_id: str, task_ids: List[int]) -> int:
+        """
+        Return unfinished claimed tasks to 'pending' (e.g. on worker shutdown).
+        
+        Returns:
+            Number of tasks released
+        """
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                UPDATE grading_results_base
+                SET status = 'pending', lease_expires = NULL
+                WHERE id = ?
+                AND worker_id = ?
+                AND status = 'processing'
+            """, [(task_id, worker_id) for task_id in task_ids])
+            released = conn.total_changes - before
+        
+        return released
+    
+    def get_lease_summary(self, experiment_id: str) -> Dict[str, Any]:
+        """
+        Summarize the processing tasks of an experiment by lease.
+        
+        Returns:
+            Dict with 'leased' (processing tasks held by a worker lease),
+            'unleased' (processing tasks without a lease, from run_experiment),
+            'first_expiry' and 'last_expiry' (earliest / latest lease_expires
+            as epoch seconds, None without leases)
+        """
+        conn = self._acquire()
+        row = conn.execute("""
+            SELECT COUNT(lease_expires) as leased,
+                   COUNT(*) - COUNT(lease_expires) as unleased,
+                   MIN(lease_expires) as first_expiry,
+                   MAX(lease_expires) as last_expiry
+            FROM grading_results_base
+            WHERE experiment_id = ?
+            AND status = 'processing'
+        """, (experiment_id,)).fetchone()
+        self._release(conn)
+        
+        return dict(row)
+    
+    def reclaim_expired_leases(self, experiment_id: Optional[str] = None) -> int:
+        """
+        Reset processing tasks with an expired lease to 'pending'.
+        
+        claim_tasks already takes over expired leases; this is for status
+        reports and manual cleanup.
+        
+        Args:
+            experiment_id: Optional experiment filter
+        
+        Returns:
+            Number of tasks reset
+        """
+        query = """
+            UPDATE grading_results_base
+            SET status = 'pending', lease_expires = NULL
+            WHERE status = 'processing'
+            AND lease_expires < ?
+        """
+        params: List[Any] = [time.time()]
+        if experiment_id is not None:
+            query += " AND experiment_id = ?"
+            params.append(experiment_id)
+        
+        with self.transaction() as conn:
+            count = conn.execute(query, params).rowcount
+        
+        return count
+    
+    def iter_export_rows(
+        self,
+        experiment_id: str,
+        trial_number: Optional[int] = None
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Stream the completed results of an experiment in one ordered query.
+        
+        Rows are yielded straight from the cursor (ordered by trial, student
+        and question), so memory use does not grow with the experiment size.
+        
+        Args:
+            experiment_id: Experiment identifier
+            trial_number: Optional trial number filter
+        
+        Yields:
+            Result rows with question_text and answer_text joined in
+        """
+        query = """
+            SELECT
+                r.trial_number, r.student_id, r.student_name, r.question_number,
+                q.question_text, a.answer_text, r.model, r.strategy, r.grades,
+                r.weighted_score, r.justification, r.overall_comment,
+                r.tokens_used, r.api_call_time, r.timestamp
+            FROM grading_results_base r
+            JOIN questions q ON q.id = r.question_id
+            JOIN answers a ON a.id = r.answer_id
+            WHERE r.experiment_id = ?
+            AND r.status = 'completed'
+        """
+        params: List[Any] = [experiment_id]
+        if trial_number is not None:
+            query += " AND r.trial_number = ?"
+            params.append(trial_number)
+        query += " ORDER BY r.trial_number, r.student_id, r.question_number"
+        
+        # A dedicated connection: the caller may write between rows
+        conn = self._get_connection()
+        try:
+            yield from conn.execute(query, params)
+        finally:
+            conn.close()
+    
+    def export_results(
+        self,
+        experiment_id: str,
+        output_dir: Path,
+        trial_number: Optional[int] = None,
+        fmt: str = "json",
+        indent: Optional[int] = 2,
+        trial_subdirs: bool = False
+    ) -> Dict[int, int]:
+        """
+        Export completed results, grouping the streamed rows per trial and student.
+        
+        Formats:
+            json:  one file per student and trial
+                   ({student_id}_{student_name}_trial{n}.json)
+            jsonl: one compact line per student and trial, all in a single
+                   {experiment_id}.jsonl (or {experiment_id}_trial{n}.jsonl)
+        
+        Args:
+            experiment_id: Experiment identifier
+            output_dir: Output directory path
+            trial_number: Optional trial number filter (default: all trials)
+            fmt: 'json' or 'jsonl'
+            indent: JSON indentation for the json format (None = compact)
+            trial_subdirs: Write json files to output_dir/trial_{n}/
+        
+        Returns:
+            Dict of trial_number -> number of exported results
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt} (expected one of {EXPORT_FORMATS})")
+        
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        jsonl_file = None
+        if fmt == "jsonl":
+            suffix = f"_trial{trial_number}" if trial_number is not None else ""
+            jsonl_file = open(output_dir / f"{experiment_id}{suffix}.jsonl", 'w', encoding='utf-8')
+        
+        counts: Dict[int, int] = {}
+        try:
+            rows = self.iter_export_rows(experiment_id, trial_number)
+            for (trial, student_id), group in groupby(rows, key=lambda r: (r['trial_number'], r['student_id'])):
+                questions = list(group)
+                first = questions[0]
+                result_data = {
+                    "student_id": student_id,
+                    "student_name": first['student_name'],
+                    "experiment_id": experiment_id,
+                    "trial": trial,
+                    "model": first['model'],
+                    "strategy": first['strategy'],
+                    "questions": [
+                        {
+                            "question_id": q['question_number'],
+                            "question": q['question_text'],
+                            "answer": q['answer_text'],
+                            "grades": json.loads(q['grades']) if q['grades'] else {},
+                            "weighted_score": q['weighted_score'],
+                            "justification": q['justification'],
+                            "overall_comment": q['overall_comment'],
+                            "metadata": {
+                                "tokens_used": q['tokens_used'],
+                                "api_call_time": q['api_call_time'],
+                                "timestamp": q['timestamp']
+                            }
+                        }
+                        for q in questions
+                    ]
+                }
+                counts[trial] = counts.get(trial, 0) + len(questions)
+                
+                if jsonl_file is not None:
+                    jsonl_file.write(json.dumps(result_data, ensure_ascii=False, separators=(',', ':')))
+                    jsonl_file.write('\n')
+                    continue
+                
+                # Save to JSON file
+                target_dir = output_dir / f"trial_{trial}" if trial_subdirs else output_dir
+                if trial_subdirs:
+                    target_dir.mkdir(exist_ok=True)
+                filename = f"{student_id}_{first['student_name'].replace(' ', '_')}_trial{trial}.json"
+                # Encode once and write once (json.dump issues a write per token)
+                with open(target_dir / filename, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(result_data, indent=indent, ensure_ascii=False))
+        finally:
+            if jsonl_file is not None:
+                jsonl_file.close()
+        
+        return counts
     
     def export_to_json(
         self,
@@ -376,74 +1681,55 @@ class DatabaseManager:
             trial_number: Trial number
             output_dir: Output directory path
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT DISTINCT student_id, student_name
-            FROM grading_results
-            WHERE experiment_id = ?
-            AND trial_number = ?
-            AND status = 'completed'
-            ORDER BY student_id
-        """, (experiment_id, trial_number))
-        
-        students = cursor.fetchall()
+        self.export_results(experiment_id, output_dir, trial_number=trial_number)
+    
+    def export_parquet(
+        self,
+        output_dir: Path = Path("results/parquet"),
+        experiment_ids: Optional[Iterable[str]] = None,
+        full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Export or incrementally refresh hive-partitioned Parquet datasets
+        (model/strategy/experiment_id) of results and criterion grades.
         
-        output_dir = Path(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        Requires pyarrow. See src/database/parquet_export.py for the layout
+        and load_parquet() for reading it back.
         
-        for student_row in students:
-            student_id = student_row['student_id']
-            student_name = student_row['student_name']
-            
-            cursor.execute("""
-                SELECT * FROM grading_results
-                WHERE experiment_id = ?
-                AND trial_number = ?
-                AND student_id = ?
-                AND status = 'completed'
-                ORDER BY question_number
-            """, (experiment_id, trial_number, student_id))
-            
-            questions = cursor.fetchall()
-            
-            result_data = {
-                "student_id": student_id,
-                "student_name": student_name,
-                "experiment_id": experiment_id,
-                "trial": trial_number,
-                "model": questions[0]['model'] if questions else "",
-                "strategy": questions[0]['strategy'] if questions else "",
-                "questions": []
-            }
-            
-            for q in questions:
-                question_data = {
-                    "question_id": q['question_number'],
-                    "question": q['question_text'],
-                    "answer": q['answer_text'],
-                    "grades": json.loads(q['grades']) if q['grades'] else {},
-                    "weighted_score": q['weighted_score'],
-                    "justification": q['justification'],
-                    "overall_comment": q['overall_comment'],
-                    "metadata": {
-                        "tokens_used": q['tokens_used'],
-                        "api_call_time": q['api_call_time'],
-                        "timestamp": q['timestamp']
-                    }
-                }
-                result_data["questions"].append(question_data)
-            
-            # Save to JSON file
-            filename = f"{student_id}_{student_name.replace(' ', '_')}_trial{trial_number}.json"
-            output_file = output_dir / filename
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result_data, f, indent=2, ensure_ascii=False)
+        Args:
+            output_dir: Root directory of the datasets
+            experiment_ids: Only refresh these experiments (default: all)
+            full: Rewrite every partition instead of only changed ones
         
-        conn.close()
+        Returns:
+            Dict with 'written' and 'removed' partitions, 'unchanged' count and 'rows'
+        """
+        try:
+            from .parquet_export import export_parquet
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        return export_parquet(self, output_dir, experiment_ids=experiment_ids, full=full)
     
+    def data_fingerprint(self) -> str:
+        """
+        Cheap change marker of the stored results.
+
+        Changes whenever a result is added, removed, rewritten or changes
+        status, so caches derived from the database know when to reload.
+
+        Returns:
+            Opaque fingerprint string
+        """
+        conn = self._acquire()
+        row = conn.execute("""
+            SELECT COUNT(*), SUM(status = 'completed'), MAX(timestamp),
+                   SUM(id), TOTAL(weighted_score)
+            FROM grading_results_base
+        """).fetchone()
+        criteria = conn.execute("SELECT COUNT(*) FROM criterion_grades").fetchone()[0]
+        self._release(conn)
+        return ":".join(str(value) for value in (*row, criteria))
+
     def get_statistics(self, experiment_id: str) -> Dict[str, Any]:
         """
         Get comprehensive statistics for an experiment.
@@ -454,7 +1740,7 @@ class DatabaseManager:
         Returns:
             Dictionary with statistics
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         # Overall stats
@@ -468,7 +1754,7 @@ class DatabaseManager:
                 AVG(CASE WHEN status = 'completed' THEN tokens_used END) as avg_tokens,
                 AVG(CASE WHEN status = 'completed' THEN api_call_time END) as avg_time,
                 SUM(CASE WHEN status = 'completed' THEN tokens_used ELSE 0 END) as total_tokens
-            FROM grading_results
+            FROM grading_results_base
             WHERE experiment_id = ?
         """, (experiment_id,))
         
@@ -493,7 +1779,7 @@ class DatabaseManager:
                 trial_number,
                 COUNT(*) as total,
                 SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed
-            FROM grading_results
+            FROM grading_results_base
             WHERE experiment_id = ?
             GROUP BY trial_number
             ORDER BY trial_number
@@ -510,9 +1796,134 @@ class DatabaseManager:
         
         stats['trials'] = trials
         
-        conn.close()
+        self._release(conn)
         return stats
     
+    def get_criterion_grades(
+        self,
+        experiment_id: str,
+        criterion: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get per-criterion grades of completed results in long format.
+        
+        Args:
+            experiment_id: Experiment identifier
+            criterion: Optional criterion filter
+        
+        Returns:
+            List of dicts with trial_number, student_id, question_number,
+            criterion, grade, points, justification
+        """
+        query = """
+            SELECT r.trial_number, r.student_id, r.question_number,
+                   c.criterion, c.grade, c.points, c.justification
+            FROM criterion_grades c
+            JOIN grading_results_base r ON r.id = c.result_id
+            WHERE c.experiment_id = ?
+            AND r.status = 'completed'
+        """
+        params: List[Any] = [experiment_id]
+        if criterion is not None:
+            query += " AND c.criterion = ?"
+            params.append(criterion)
+        query += " ORDER BY r.trial_number, r.student_id, r.question_number, c.criterion"
+        
+        conn = self._acquire()
+        rows = conn.execute(query, params).fetchall()
+        self._release(conn)
+        
+        return [dict(row) for row in rows]
+    
+    def get_criterion_distribution(
+        self,
+        experiment_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get grade counts and mean points per experiment and criterion (one query).
+        
+        Args:
+            experiment_ids: Experiments to include (default: all)
+        
+        Returns:
+            Dict of experiment_id -> criterion -> {'counts': {grade: n},
+            'total', 'mean_points'}
+        """
+        query = """
+            SELECT experiment_id, criterion, grade, COUNT(*) as count, SUM(points) as points
+            FROM criterion_grades
+        """
+        params: List[Any] = []
+        if experiment_ids is not None:
+            params = list(experiment_ids)
+            query += f" WHERE experiment_id IN ({', '.join('?' * len(params))})"
+        query += " GROUP BY experiment_id, criterion, grade"
+        
+        conn = self._acquire()
+        rows = conn.execute(query, params).fetchall() if params or experiment_ids is None else []
+        self._release(conn)
+        
+        distribution: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for row in rows:
+            entry = distribution.setdefault(row['experiment_id'], {}).setdefault(
+                row['criterion'], {'counts': {}, 'total': 0, 'points': 0.0, 'scored': 0}
+            )
+            entry['counts'][row['grade']] = row['count']
+            entry['total'] += row['count']
+            if row['points'] is not None:
+                entry['points'] += row['points']
+                entry['scored'] += row['count']
+        
+        for criteria in distribution.values():
+            for entry in criteria.values():
+                points, scored = entry.pop('points'), entry.pop('scored')
+                entry['mean_points'] = points / scored if scored else None
+        return distribution
+    
+    def get_live_reliability(
+        self,
+        experiment_id: str,
+        criterion: Optional[str] = None,
+        confidence: float = 0.95
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Consistency and reliability of the completed grades so far (O(1) per criterion).
+        
+        Computed from the running totals in live_totals, without reading
+        the results. Trials are the raters and (student, question) pairs the
+        items; ICCs are approximate while some trials of an item are still
+        missing (see src/evaluation/streaming.py). An experiment marked stale
+        by a deletion is rebuilt from criterion_grades first (one scan).
+        
+        Args:
+            experiment_id: Experiment identifier
+            criterion: Optional criterion filter
+            confidence: Confidence level of the ICC(2,1) interval
+        
+        Returns:
+            Dict of criterion -> metrics (n_ratings, n_items, n_raters,
+            fleiss_kappa, perfect_agreement_pct, mean_sd, icc_* ...)
+        """
+        from ..evaluation.streaming import live_metrics
+        
+        conn = self._acquire()
+        stale = conn.execute("SELECT 1 FROM live_stale WHERE experiment_id = ?", (experiment_id,)).fetchone()
+        self._release(conn)
+        if stale:
+            self.rebuild_live_stats(experiment_id)
+        
+        query = "SELECT criterion, totals FROM live_totals WHERE experiment_id = ?"
+        params: List[Any] = [experiment_id]
+        if criterion is not None:
+            query += " AND criterion = ?"
+            params.append(criterion)
+        
+        conn = self._acquire()
+        rows = conn.execute(query + " ORDER BY criterion", params).fetchall()
+        self._release(conn)
+        
+        return {row['criterion']: live_metrics(json.loads(row['totals']), confidence) for row in rows}
+    
     def reset_failed_tasks(self, experiment_id: str) -> int:
         """
         Reset all failed tasks to pending status for retry.
@@ -523,19 +1934,19 @@ class DatabaseManager:
         Returns:
             Number of tasks reset
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         cursor.execute("""
-            UPDATE grading_results
+            UPDATE grading_results_base
             SET status = 'pending', error_message = NULL
             WHERE experiment_id = ?
             AND status = 'failed'
         """, (experiment_id,))
         
         count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        self._commit(conn)
+        self._release(conn)
         
         return count
     
@@ -549,16 +1960,18 @@ class DatabaseManager:
         Returns:
             Number of records deleted
         """
-        conn = self._get_connection()
+        conn = self._acquire()
         cursor = conn.cursor()
         
         cursor.execute("""
-            DELETE FROM grading_results
+            DELETE FROM grading_results_base
             WHERE experiment_id = ?
         """, (experiment_id,))
         
         count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        # The delete trigger dropped the live rows; with no results left they are exact
+        cursor.execute("DELETE FROM live_stale WHERE experiment_id = ?", (experiment_id,))
+        self._commit(conn)
+        self._release(conn)
         
         return count
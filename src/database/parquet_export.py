@@ -0,0 +1,248 @@
+"""
+Partitioned Parquet export of grading results.
+
+Materializes the database into two hive-partitioned datasets for the
+analysis stack:
+
+    <root>/results/model=<m>/strategy=<s>/experiment_id=<e>/part-0.parquet
+    <root>/criterion_grades/model=<m>/strategy=<s>/experiment_id=<e>/part-0.parquet
+
+Columns are typed (small integers, dictionary-encoded ids and categories,
+real timestamps), so pandas loads them without parsing and readers can
+prune columns and partitions. A refresh only rewrites partitions whose
+rows changed since the previous export (tracked in <root>/_manifest.json)
+and removes partitions of experiments that no longer exist.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+MANIFEST_FILE = "_manifest.json"
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+RESULTS_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('trial_number', pa.int16()),
+    ('student_id', _CATEGORY),
+    ('student_name', _CATEGORY),
+    ('question_number', pa.int16()),
+    ('question_id', pa.int32()),
+    ('answer_id', pa.int32()),
+    ('status', _CATEGORY),
+    ('weighted_score', pa.float64()),
+    ('tokens_used', pa.int32()),
+    ('api_call_time', pa.float64()),
+    ('timestamp', pa.timestamp('us')),
+    ('grades', pa.string()),
+    ('justification', pa.string()),
+    ('overall_comment', pa.string()),
+    ('error_message', pa.string()),
+])
+
+CRITERION_SCHEMA = pa.schema([
+    ('result_id', pa.int64()),
+    ('trial_number', pa.int16()),
+    ('student_id', _CATEGORY),
+    ('question_number', pa.int16()),
+    ('criterion', _CATEGORY),
+    ('grade', _CATEGORY),
+    ('points', pa.float32()),
+    ('justification', pa.string()),
+])
+
+DATASETS = {'results': RESULTS_SCHEMA, 'criterion_grades': CRITERION_SCHEMA}
+
+
+def partition_path(model: str, strategy: str, experiment_id: str) -> str:
+    """Relative hive partition directory of one experiment."""
+    return "/".join(
+        f"{key}={quote(str(value), safe='')}"
+        for key, value in (('model', model), ('strategy', strategy), ('experiment_id', experiment_id))
+    )
+
+
+def _to_table(rows: List[Tuple], schema: pa.Schema) -> pa.Table:
+    """Build a typed table from DB rows (column order of the schema)."""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_timestamp(field.type):
+            parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='ISO8601')
+            arrays.append(pa.array(parsed, type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_atomic(table: pa.Table, path: Path):
+    """Write a Parquet file via a temporary name so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def _remove_partition(root: Path, relative: str):
+    """Delete one experiment's files and the directories left empty."""
+    for dataset in DATASETS:
+        directory = root / dataset / relative
+        if not directory.exists():
+            continue
+        for file in directory.iterdir():
+            file.unlink()
+        while directory != root / dataset and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+
+
+def export_parquet(
+    db_manager,
+    output_dir: str = "results/parquet",
+    experiment_ids: Optional[Iterable[str]] = None,
+    full: bool = False
+) -> Dict[str, Any]:
+    """
+    Export (or incrementally refresh) the partitioned Parquet datasets.
+
+    Args:
+        db_manager: DatabaseManager to read from
+        output_dir: Root directory of the datasets
+        experiment_ids: Only refresh these experiments (default: all)
+        full: Rewrite every partition, ignoring the stored fingerprints
+
+    Returns:
+        Dict with 'written' and 'removed' partition paths, 'unchanged' count
+        and 'rows' written
+    """
+    root = Path(output_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_file = root / MANIFEST_FILE
+    manifest = {}
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f).get('partitions', {})
+
+    # One pass over the base table: a change fingerprint per partition
+    conn = db_manager._acquire()
+    fingerprints = conn.execute("""
+        SELECT model, strategy, experiment_id,
+               COUNT(*) AS rows, MAX(timestamp) AS last_write, SUM(id) AS id_sum
+        FROM grading_results_base
+        GROUP BY model, strategy, experiment_id
+    """).fetchall()
+
+    wanted = set(experiment_ids) if experiment_ids is not None else None
+    current = {}
+    for row in fingerprints:
+        relative = partition_path(row['model'], row['strategy'], row['experiment_id'])
+        current[relative] = {
+            'model': row['model'],
+            'strategy': row['strategy'],
+            'experiment_id': row['experiment_id'],
+            'rows': row['rows'],
+            'fingerprint': f"{row['rows']}:{row['last_write']}:{row['id_sum']}"
+        }
+
+    summary = {'written': [], 'removed': [], 'unchanged': 0, 'rows': 0}
+
+    for relative, entry in list(current.items()):
+        if wanted is not None and entry['experiment_id'] not in wanted:
+            # Not part of this refresh: keep whatever was exported before
+            if relative in manifest:
+                current[relative] = manifest[relative]
+            else:
+                del current[relative]
+            continue
+        previous = None if full else manifest.get(relative)
+        if previous and previous['fingerprint'] == entry['fingerprint'] \
+                and (root / 'results' / relative / 'part-0.parquet').exists():
+            summary['unchanged'] += 1
+            continue
+
+        key = (entry['model'], entry['strategy'], entry['experiment_id'])
+        results = conn.execute("""
+            SELECT id, trial_number, student_id, student_name, question_number,
+                   question_id, answer_id, status, weighted_score, tokens_used,
+                   api_call_time, timestamp, grades, justification, overall_comment,
+                   error_message
+            FROM grading_results_base
+            WHERE model = ? AND strategy = ? AND experiment_id = ?
+            ORDER BY trial_number, student_id, question_number
+        """, key).fetchall()
+        criteria = conn.execute("""
+            SELECT c.result_id, r.trial_number, r.student_id, r.question_number,
+                   c.criterion, c.grade, c.points, c.justification
+            FROM criterion_grades c
+            JOIN grading_results_base r ON r.id = c.result_id
+            WHERE r.model = ? AND r.strategy = ? AND r.experiment_id = ?
+            ORDER BY r.trial_number, r.student_id, r.question_number, c.criterion
+        """, key).fetchall()
+
+        _write_atomic(_to_table(results, RESULTS_SCHEMA), root / 'results' / relative / 'part-0.parquet')
+        _write_atomic(_to_table(criteria, CRITERION_SCHEMA),
+                      root / 'criterion_grades' / relative / 'part-0.parquet')
+        summary['written'].append(relative)
+        summary['rows'] += len(results)
+
+    db_manager._release(conn)
+
+    # Partitions whose rows are gone from the database
+    for relative in set(manifest) - set(current):
+        if wanted is None or manifest[relative]['experiment_id'] in wanted:
+            _remove_partition(root, relative)
+            summary['removed'].append(relative)
+        else:
+            current[relative] = manifest[relative]
+
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'exported_at': datetime.now().isoformat(),
+            'partitions': current
+        }, f, indent=2, ensure_ascii=False)
+
+    return summary
+
+
+def load_parquet(
+    output_dir: str = "results/parquet",
+    dataset: str = "results",
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Tuple[str, str, Any]]] = None
+) -> pd.DataFrame:
+    """
+    Load an exported dataset into pandas (memory-mapped, column/partition pruned).
+
+    Example:
+        load_parquet(columns=['experiment_id', 'student_id', 'weighted_score'],
+                     filters=[('model', '=', 'chatgpt'), ('status', '=', 'completed')])
+
+    Args:
+        output_dir: Root directory of the datasets
+        dataset: 'results' or 'criterion_grades'
+        columns: Columns to read (partition keys model/strategy/experiment_id included)
+        filters: pyarrow filters, e.g. [('strategy', 'in', ['lenient', 'zero-shot'])]
+
+    Returns:
+        DataFrame (dictionary-encoded columns and partition keys become
+        pandas categoricals)
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset} (expected one of {list(DATASETS)})")
+    path = Path(output_dir) / dataset
+    if not path.exists():
+        raise FileNotFoundError(f"No Parquet export at {path}; run scripts/export_parquet.py first")
+
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True,
+                          partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    return table.to_pandas()
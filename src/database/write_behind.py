@@ -0,0 +1,150 @@
+"""
+Write-behind writer for DatabaseManager.
+
+Grading callbacks enqueue finished results and return immediately; a
+dedicated thread drains the queue and writes the results in batched
+transactions. Batches are committed when they reach max_batch results or
+flush_interval seconds after their first result, whichever comes first.
+close() (also run by the context manager, on Ctrl+C, and at interpreter
+exit) writes everything still queued before returning.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db_manager import DatabaseManager
+
+
+_FLUSH = object()  # Commit the current batch now
+_STOP = object()   # Commit the current batch and exit the writer thread
+
+
+class WriteBehindWriter:
+    """Queue result writes and commit them in batches on a background thread."""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        flush_interval: float = 1.0,
+        max_batch: int = 500
+    ):
+        """
+        Initialize and start the writer thread.
+
+        Args:
+            db_manager: Database to write to
+            flush_interval: Maximum seconds a queued result waits before commit
+            max_batch: Maximum results per transaction
+        """
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self.written = 0        # Results written
+        self.transactions = 0   # Batched transactions committed
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def complete_task(self, *args, **kwargs):
+        """Queue DatabaseManager.complete_task (same arguments)."""
+        self._submit('complete_task', args, kwargs)
+
+    def fail_task(self, *args, **kwargs):
+        """Queue DatabaseManager.fail_task (same arguments)."""
+        self._submit('fail_task', args, kwargs)
+
+    @property
+    def pending(self) -> int:
+        """Number of queued writes not committed yet."""
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        if not self._closed:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Commit all queued writes and stop the writer thread (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+        self._raise_error()
+
+    def __enter__(self) -> "WriteBehindWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _submit(self, method: str, args: Tuple, kwargs: Dict[str, Any]):
+        if self._closed:
+            raise RuntimeError("WriteBehindWriter is closed")
+        self._queue.put((method, args, kwargs))
+
+    def _raise_error(self):
+        """Re-raise the first write error on the caller's thread."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        """Writer thread: collect a batch, write it, repeat until _STOP."""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            taken = 1
+            batch: List[Tuple[str, Tuple, Dict[str, Any]]] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                taken += 1
+
+            if batch:
+                self._write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+
+        self.db_manager.close_thread_connection()
+
+    def _write(self, batch: List[Tuple[str, Tuple, Dict[str, Any]]]):
+        """Write one batch in a single transaction (item by item if it fails)."""
+        try:
+            with self.db_manager.transaction():
+                for method, args, kwargs in batch:
+                    getattr(self.db_manager, method)(*args, **kwargs)
+            self.transactions += 1
+            self.written += len(batch)
+        except Exception:
+            # One bad write must not lose the rest of the batch
+            for method, args, kwargs in batch:
+                try:
+                    getattr(self.db_manager, method)(*args, **kwargs)
+                    self.transactions += 1
+                    self.written += 1
+                except Exception as e:
+                    self._error = self._error or e
@@ -5,12 +5,22 @@ This module provides comprehensive evaluation metrics for the AES system:
 - Agreement metrics (Fleiss' Kappa, Cohen's Kappa)
 - Consistency metrics (SD, CV, ICC)
 - Accuracy metrics (MAE, RMSE, F1-Score)
+- Reliability engine (ICC types, Cronbach's alpha, SEM)
+- Grouped metrics over long-format grade tables
+- Integer-coded rating matrix shared by all metrics
+- Streaming reliability for experiments in progress
+- Bootstrap confidence intervals (percentile, BCa)
 - Visualization tools
 """
 
 from .agreement import AgreementMetrics
 from .consistency import ConsistencyMetrics
 from .accuracy import AccuracyMetrics
+from .reliability import reliability_coefficients, reliability_by_group
+from .grouped import grouped_metrics
+from .ratings import RatingMatrix
+from .streaming import StreamingReliability
+from .bootstrap import bootstrap_ci
 
 try:
     from .visualizer import MetricsVisualizer
@@ -18,6 +28,12 @@ try:
         'AgreementMetrics',
         'ConsistencyMetrics',
         'AccuracyMetrics',
+        'reliability_coefficients',
+        'reliability_by_group',
+        'grouped_metrics',
+        'RatingMatrix',
+        'StreamingReliability',
+        'bootstrap_ci',
         'MetricsVisualizer',
     ]
 except ImportError:
@@ -25,5 +41,11 @@ except ImportError:
         'AgreementMetrics',
         'ConsistencyMetrics',
         'AccuracyMetrics',
+        'reliability_coefficients',
+        'reliability_by_group',
+        'grouped_metrics',
+        'RatingMatrix',
+        'StreamingReliability',
+        'bootstrap_ci',
     ]
 
@@ -21,6 +21,8 @@ from sklearn.metrics import (
     cohen_kappa_score
 )
 
+from .ratings import GRADE_CATEGORIES, GRADE_CODES, GRADE_POINTS, RatingMatrix
+
 
 class AccuracyMetrics:
     """
@@ -31,14 +33,28 @@ class AccuracyMetrics:
     
     def __init__(self):
         """Initialize accuracy metrics calculator."""
-        self.grade_to_numeric = {'A': 4, 'B': 3, 'C': 2, 'D/E': 1, 'D': 1, 'E': 1}
-        self.numeric_to_grade = {4: 'A', 3: 'B', 2: 'C', 1: 'D/E'}
-        self.grade_categories = ['A', 'B', 'C', 'D/E']
+        self.grade_to_numeric = {grade: GRADE_POINTS[code] for grade, code in GRADE_CODES.items()}
+        self.numeric_to_grade = {GRADE_POINTS[code]: grade for code, grade in enumerate(GRADE_CATEGORIES)}
+        self.grade_categories = list(GRADE_CATEGORIES)
     
     def convert_grades_to_numeric(self, grades: List[str]) -> np.ndarray:
-        """Convert letter grades to numeric values."""
+        """Convert letter grades (or a one-rater RatingMatrix) to numeric values."""
+        if isinstance(grades, RatingMatrix):
+            return grades.numeric()[:, 0]
         return np.array([self.grade_to_numeric.get(g, np.nan) for g in grades])
     
+    def _as_matrix(self, grades) -> RatingMatrix:
+        """One rater's grades as a one-column RatingMatrix ('D'/'E' become 'D/E')."""
+        if isinstance(grades, RatingMatrix):
+            return grades
+        return RatingMatrix.from_labels(np.asarray(grades, dtype=object).reshape(-1, 1))
+    
+    def _as_labels(self, grades) -> np.ndarray:
+        """Canonical grade labels of one rater ('' for missing/unknown grades)."""
+        matrix = self._as_matrix(grades)
+        labels = np.array(matrix.categories + ('',), dtype=object)
+        return labels[np.where(matrix.codes[:, 0] >= 0, matrix.codes[:, 0], matrix.n_categories)]
+    
     def mae(
         self,
         predictions: List[str],
@@ -51,7 +67,7 @@ class AccuracyMetrics:
         Lower is better (0 = perfect).
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades (ground truth)
         
         Returns:
@@ -97,7 +113,7 @@ class AccuracyMetrics:
         Lower is better (0 = perfect).
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
         
         Returns:
@@ -130,7 +146,7 @@ class AccuracyMetrics:
         Calculate Precision, Recall, and F1-Score.
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
             average: Averaging method ('micro', 'macro', 'weighted', or None)
         
@@ -138,8 +154,8 @@ class AccuracyMetrics:
             Dictionary with precision, recall, F1, and per-class metrics
         """
         # Ensure all categories are represented
-        pred_array = np.array(predictions)
-        truth_array = np.array(ground_truth)
+        pred_array = self._as_labels(predictions)
+        truth_array = self._as_labels(ground_truth)
         
         # Calculate metrics
         precision, recall, f1, support = precision_recall_fscore_support(
@@ -204,14 +220,14 @@ class AccuracyMetrics:
         Generate confusion matrix and analysis.
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
         
         Returns:
             Dictionary with confusion matrix and analysis
         """
-        pred_array = np.array(predictions)
-        truth_array = np.array(ground_truth)
+        pred_array = self._as_labels(predictions)
+        truth_array = self._as_labels(ground_truth)
         
         # Confusion matrix
         cm = confusion_matrix(
@@ -267,14 +283,14 @@ class AccuracyMetrics:
         Generate sklearn classification report as dictionary.
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
         
         Returns:
             Dictionary with complete classification report
         """
-        pred_array = np.array(predictions)
-        truth_array = np.array(ground_truth)
+        pred_array = self._as_labels(predictions)
+        truth_array = self._as_labels(ground_truth)
         
         report = classification_report(
             truth_array,
@@ -295,14 +311,14 @@ class AccuracyMetrics:
         Compare grade distributions between predictions and ground truth.
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
         
         Returns:
             Dictionary with distribution statistics
         """
-        pred_counts = pd.Series(predictions).value_counts()
-        truth_counts = pd.Series(ground_truth).value_counts()
+        pred_counts = pd.Series(self._as_labels(predictions)).value_counts()
+        truth_counts = pd.Series(self._as_labels(ground_truth)).value_counts()
         
         # Ensure all categories present
         for grade in self.grade_categories:
@@ -388,7 +404,7 @@ class AccuracyMetrics:
         This is the main function for comparing AI predictions to ground truth.
         
         Args:
-            predictions: AI-predicted grades
+            predictions: AI-predicted grades (list or one-rater RatingMatrix)
             ground_truth: Lecturer grades
             agent_name: Name of the agent (e.g., "ChatGPT", "Gemini")
             criterion_name: Name of the criterion being evaluated
@@ -396,6 +412,10 @@ class AccuracyMetrics:
         Returns:
             Comprehensive dictionary with all accuracy metrics
         """
+        # Encode the grades once for all metrics
+        predictions = self._as_matrix(predictions)
+        ground_truth = self._as_matrix(ground_truth)
+        
         mae_result = self.mae(predictions, ground_truth)
         rmse_result = self.rmse(predictions, ground_truth)
         prf_result = self.precision_recall_f1(predictions, ground_truth, average='weighted')
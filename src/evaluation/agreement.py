@@ -11,8 +11,153 @@ import numpy as np
 import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from scipy.stats import chi2_contingency
+from scipy.sparse import csr_matrix, issparse
 from itertools import combinations
 
+from .bootstrap import KAPPA_WEIGHTS, kappa_from_confusion, pairwise_kappa_ci
+from .ratings import (
+    GRADE_CATEGORIES, GRADE_CODES, GRADE_POINTS, RatingMatrix, category_counts, encode_ratings
+)
+
+
+# Input formats accepted by AgreementMetrics.fleiss_kappa
+RATING_FORMATS = ('labels', 'codes', 'counts')
+
+# Measurement levels of AgreementMetrics.krippendorff_alpha
+ALPHA_LEVELS = ('nominal', 'ordinal', 'interval', 'ratio')
+
+# Numeric value of each grade label for Krippendorff's alpha
+GRADE_VALUES = {grade: GRADE_POINTS[code] for grade, code in GRADE_CODES.items()}
+
+# Above this many (item, value) cells the coincidence matrix is built sparsely
+_DENSE_COUNT_LIMIT = 2 ** 25
+
+
+def _fleiss_components(freq_matrix: np.ndarray) -> Tuple[float, float, np.ndarray, int]:
+    """
+    Observed agreement, chance agreement, category proportions and item count
+    of a frequency matrix (items with fewer than two ratings are skipped).
+    """
+    freq_matrix = np.asarray(freq_matrix, dtype=float)
+    n_i = freq_matrix.sum(axis=1)
+    rated = n_i >= 2
+    if not rated.all():
+        freq_matrix, n_i = freq_matrix[rated], n_i[rated]
+    
+    # P_i (proportion of rater pairs agreeing for each item)
+    P_i = np.einsum('ij,ij->i', freq_matrix, freq_matrix - 1) / (n_i * (n_i - 1))
+    P_bar = P_i.mean() if len(P_i) else np.nan
+    
+    # p_j (proportion of all assignments to category j) and chance agreement
+    total = n_i.sum()
+    p_j = freq_matrix.sum(axis=0) / total if total else np.zeros(freq_matrix.shape[1])
+    P_bar_e = np.sum(p_j ** 2)
+    return P_bar, P_bar_e, p_j, int(rated.sum())
+
+
+def coincidence_matrix(codes: np.ndarray, n_values: int) -> Tuple[np.ndarray, int]:
+    """
+    Krippendorff coincidence matrix of integer-coded ratings.
+    
+    o_ck = sum over items u of n_uc * (n_uk - [c == k]) / (m_u - 1), where
+    n_uc counts the ratings of value c for item u and m_u is the number of
+    ratings of item u (items with m_u < 2 are not pairable).
+    
+    Args:
+        codes: Array of shape (n_items, n_raters), -1 for missing
+        n_values: Number of distinct values
+    
+    Returns:
+        (n_values x n_values coincidence matrix, number of pairable items)
+    """
+    codes = np.asarray(codes)
+    n_items = codes.shape[0]
+    if n_values == 0 or n_items == 0:
+        return np.zeros((n_values, n_values)), 0
+    
+    if n_items * n_values <= _DENSE_COUNT_LIMIT:
+        counts = category_counts(codes, n_values).astype(float)
+        m_u = counts.sum(axis=1)
+    else:
+        valid = (codes >= 0) & (codes < n_values)
+        items = np.nonzero(valid)[0]
+        counts = csr_matrix((np.ones(len(items)), (items, codes[valid])), shape=(n_items, n_values))
+        m_u = np.bincount(items, minlength=n_items).astype(float)
+    
+    pairable = m_u >= 2
+    weight = np.zeros(n_items)
+    weight[pairable] = 1.0 / (m_u[pairable] - 1)
+    
+    weighted = counts.multiply(weight[:, None]) if issparse(counts) else counts * weight[:, None]
+    coincidence = np.asarray((counts.T @ weighted).todense() if issparse(counts) else counts.T @ weighted)
+    coincidence -= np.diag(np.asarray(weighted.sum(axis=0)).ravel())
+    return coincidence, int(pairable.sum())
+
+
+def pairwise_confusion(codes: np.ndarray, n_categories: int) -> np.ndarray:
+    """
+    Confusion matrices of every pair of raters at once.
+    
+    With one-hot ratings X of shape (n_items, n_raters * n_categories),
+    X.T @ X holds, for raters a, b and categories c, d, the number of items
+    rated c by a and d by b; items where either rating is missing have an
+    all-zero block and drop out.
+    
+    Args:
+        codes: Array of shape (n_items, n_raters), -1 for missing
+        n_categories: Number of categories
+    
+    Returns:
+        Array of shape (n_raters, n_raters, n_categories, n_categories);
+        entry [a, b] is the confusion matrix of rater a (rows) vs rater b
+    """
+    codes = np.asarray(codes)
+    n_items, n_raters = codes.shape
+    valid = (codes >= 0) & (codes < n_categories)
+    columns = np.arange(n_raters, dtype=np.intp) * n_categories + codes.clip(0, n_categories - 1)
+    one_hot = np.zeros((n_items, n_raters * n_categories))
+    np.put_along_axis(one_hot, columns, valid.astype(float), axis=1)
+    confusion = (one_hot.T @ one_hot).reshape(n_raters, n_categories, n_raters, n_categories)
+    return confusion.transpose(0, 2, 1, 3)
+
+
+def _alpha_numeric(ratings, level: str) -> np.ndarray:
+    """Ratings as a float array (NaN = missing); grade labels via GRADE_VALUES."""
+    ratings = np.asarray(ratings)
+    if ratings.dtype.kind in 'biuf':
+        return ratings.astype(float)
+    
+    numeric = np.full(ratings.shape, np.nan)
+    for grade, value in GRADE_VALUES.items():
+        numeric[ratings == grade] = value
+    unknown = np.isnan(numeric) & ~pd.isna(ratings)
+    if unknown.any():
+        if level != 'nominal':
+            raise ValueError(f"Non-grade labels need level='nominal', got level='{level}'")
+        # Arbitrary labels: nominal alpha only needs distinct codes
+        codes, _ = pd.factorize(ratings.ravel())
+        numeric = np.where(codes >= 0, codes, np.nan).reshape(ratings.shape)
+    return numeric
+
+
+def _alpha_delta(level: str, values: np.ndarray, n_c: np.ndarray) -> np.ndarray:
+    """Squared difference function delta^2 of Krippendorff's alpha."""
+    if level == 'nominal':
+        return 1 - np.eye(len(values))
+    if level == 'ordinal':
+        # (sum of n_g for g between c and k) - (n_c + n_k) / 2, squared;
+        # n_c may carry leading (group) axes
+        cumulative = np.cumsum(n_c, axis=-1)
+        between = cumulative[..., None, :] - cumulative[..., :, None] + n_c[..., :, None]
+        delta = (between - (n_c[..., :, None] + n_c[..., None, :]) / 2) ** 2
+        return np.triu(delta) + np.swapaxes(np.triu(delta, 1), -1, -2)
+    difference = values[:, None] - values[None, :]
+    if level == 'interval':
+        return difference ** 2
+    total = values[:, None] + values[None, :]
+    ratio = np.divide(difference, total, out=np.zeros_like(difference), where=total != 0)
+    return ratio ** 2
+
 
 class AgreementMetrics:
     """
@@ -23,12 +168,13 @@ class AgreementMetrics:
     
     def __init__(self):
         """Initialize agreement metrics calculator."""
-        self.grade_categories = ['A', 'B', 'C', 'D/E']
+        self.grade_categories = list(GRADE_CATEGORIES)
     
     def fleiss_kappa(
         self,
         ratings: np.ndarray,
-        categories: Optional[List[str]] = None
+        categories: Optional[List[str]] = None,
+        input_format: str = 'labels'
     ) -> Dict[str, float]:
         """
         Calculate Fleiss' Kappa for multiple raters.
@@ -37,10 +183,21 @@ class AgreementMetrics:
         is rated by the same number of raters. Perfect for comparing:
         ChatGPT (4 trials) vs Gemini (4 trials) vs Lecturer (1 score)
         
+        Computed with array operations only (one bincount for the frequency
+        matrix), so millions of items take well under a second. Missing
+        ratings (None/NaN, labels outside categories, negative codes) are
+        allowed: each item's agreement uses its own number of ratings and
+        items with fewer than two ratings are skipped.
+        
         Args:
             ratings: Array of shape (n_items, n_raters) containing categorical ratings
                     Example: [[A, A, B], [B, B, B], [C, A, A], ...]
+                    or a RatingMatrix (its codebook is used, input_format ignored)
+                    With input_format='codes': integer category indices (-1 = missing)
+                    With input_format='counts': precomputed (n_items, n_categories)
+                    matrix of how many raters chose each category
             categories: List of possible categories (default: ['A', 'B', 'C', 'D/E'])
+            input_format: 'labels', 'codes' or 'counts'
         
         Returns:
             Dictionary with:
@@ -48,8 +205,8 @@ class AgreementMetrics:
                 - interpretation: Text interpretation
                 - p_observed: Observed agreement proportion
                 - p_expected: Expected agreement by chance
-                - n_items: Number of items rated
-                - n_raters: Number of raters
+                - n_items: Number of items rated (by at least two raters)
+                - n_raters: Number of raters (per item, at most)
         
         Interpretation:
             < 0.00: Poor agreement
@@ -62,34 +219,32 @@ class AgreementMetrics:
         if categories is None:
             categories = self.grade_categories
         
-        # Convert to numpy array if not already
-        ratings = np.array(ratings)
-        n_items, n_raters = ratings.shape
-        
-        # Create frequency matrix: n_items x n_categories
-        n_categories = len(categories)
-        freq_matrix = np.zeros((n_items, n_categories))
-        
-        for i, item_ratings in enumerate(ratings):
-            for rating in item_ratings:
-                if rating in categories:
-                    cat_idx = categories.index(rating)
-                    freq_matrix[i, cat_idx] += 1
-        
-        # Calculate P_i (proportion of rater pairs agreeing for each item)
-        P_i = np.sum(freq_matrix * (freq_matrix - 1), axis=1) / (n_raters * (n_raters - 1))
-        
-        # Calculate P_bar (mean proportion of agreement)
-        P_bar = np.mean(P_i)
-        
-        # Calculate p_j (proportion of all assignments to category j)
-        p_j = np.sum(freq_matrix, axis=0) / (n_items * n_raters)
+        if isinstance(ratings, RatingMatrix):
+            categories = list(ratings.categories)
+            freq_matrix = ratings.counts()
+            n_raters = ratings.n_raters
+        elif input_format == 'counts':
+            freq_matrix = np.asarray(ratings)
+            if freq_matrix.ndim != 2 or freq_matrix.shape[1] != len(categories):
+                raise ValueError(
+                    f"Count matrix must have shape (n_items, {len(categories)}), got {freq_matrix.shape}"
+                )
+            n_raters = int(freq_matrix.sum(axis=1).max()) if len(freq_matrix) else 0
+        elif input_format in ('labels', 'codes'):
+            codes = encode_ratings(ratings, categories) if input_format == 'labels' else np.asarray(ratings)
+            if codes.ndim != 2:
+                raise ValueError(f"Ratings must have shape (n_items, n_raters), got {codes.shape}")
+            freq_matrix = category_counts(codes, len(categories))
+            n_raters = codes.shape[1]
+        else:
+            raise ValueError(f"Unknown input_format: {input_format} (expected one of {RATING_FORMATS})")
         
-        # Calculate P_bar_e (expected agreement by chance)
-        P_bar_e = np.sum(p_j ** 2)
+        P_bar, P_bar_e, p_j, n_items = _fleiss_components(freq_matrix)
         
         # Calculate Fleiss' Kappa
-        if P_bar_e == 1.0:
+        if n_items == 0:
+            kappa = np.nan  # No item has two ratings
+        elif P_bar_e == 1.0:
             kappa = 1.0  # Perfect agreement
         else:
             kappa = (P_bar - P_bar_e) / (1 - P_bar_e)
@@ -123,57 +278,50 @@ class AgreementMetrics:
         - ChatGPT vs Gemini
         
         Args:
-            rater1: Array of ratings from first rater
-            rater2: Array of ratings from second rater
-            categories: List of possible categories
+            rater1: Array of ratings from first rater (or a one-rater RatingMatrix)
+            rater2: Array of ratings from second rater (or a one-rater RatingMatrix)
+            categories: List of possible categories (a RatingMatrix brings its own)
             weights: Weighting scheme ('linear', 'quadratic', or None)
         
         Returns:
-            Dictionary with kappa, standard error, and confidence interval
+            Dictionary with kappa, standard error, and confidence interval;
+            items where either rating is missing are skipped ('n' counts
+            the jointly rated items)
         """
-        if categories is None:
+        if isinstance(rater1, RatingMatrix):
+            categories = list(rater1.categories)
+        elif categories is None:
             categories = self.grade_categories
         
-        rater1 = np.array(rater1)
-        rater2 = np.array(rater2)
+        codes1 = self._rater_codes(rater1, categories)
+        codes2 = self._rater_codes(rater2, categories)
         
-        n = len(rater1)
         n_categories = len(categories)
         
-        # Create confusion matrix
-        confusion = np.zeros((n_categories, n_categories))
-        for r1, r2 in zip(rater1, rater2):
-            if r1 in categories and r2 in categories:
-                i = categories.index(r1)
-                j = categories.index(r2)
-                confusion[i, j] += 1
+        # Create confusion matrix (pairs where both raters gave a known category)
+        both = (codes1 >= 0) & (codes2 >= 0)
+        n = int(both.sum())
+        confusion = np.bincount(
+            codes1[both].astype(np.intp) * n_categories + codes2[both],
+            minlength=n_categories * n_categories
+        ).reshape(n_categories, n_categories).astype(float)
         
-        # Create weight matrix
+        # Same computation as pairwise_agreement_matrix (normalized by jointly rated items)
+        kappa = float(kappa_from_confusion(confusion, weights))
+        
+        # Observed and expected agreement (for reporting and the standard error)
+        index = np.arange(n_categories)
         if weights == 'linear':
-            weight_matrix = 1 - np.abs(np.arange(n_categories)[:, None] - np.arange(n_categories)) / (n_categories - 1)
+            weight_matrix = 1 - np.abs(index[:, None] - index) / (n_categories - 1)
         elif weights == 'quadratic':
-            weight_matrix = 1 - ((np.arange(n_categories)[:, None] - np.arange(n_categories)) / (n_categories - 1)) ** 2
+            weight_matrix = 1 - ((index[:, None] - index) / (n_categories - 1)) ** 2
         else:
             # Identity matrix for unweighted kappa
             weight_matrix = np.eye(n_categories)
-        
-        # Normalize confusion matrix
-        confusion_norm = confusion / n
-        
-        # Calculate observed agreement
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confusion_norm = confusion / n
         p_observed = np.sum(weight_matrix * confusion_norm)
-        
-        # Calculate expected agreement
-        row_sums = np.sum(confusion_norm, axis=1)
-        col_sums = np.sum(confusion_norm, axis=0)
-        expected = np.outer(row_sums, col_sums)
-        p_expected = np.sum(weight_matrix * expected)
-        
-        # Calculate Cohen's Kappa
-        if p_expected == 1.0:
-            kappa = 1.0
-        else:
-            kappa = (p_observed - p_expected) / (1 - p_expected)
+        p_expected = np.sum(weight_matrix * np.outer(confusion_norm.sum(axis=1), confusion_norm.sum(axis=0)))
         
         # Calculate standard error (for unweighted kappa)
         if weights is None:
@@ -192,7 +340,7 @@ class AgreementMetrics:
             'interpretation': interpretation,
             'p_observed': float(p_observed),
             'p_expected': float(p_expected),
-            'n': int(n),
+            'n': n,
             'confusion_matrix': confusion.tolist()
         }
         
@@ -203,6 +351,14 @@ class AgreementMetrics:
         
         return result
     
+    def _rater_codes(self, ratings, categories: List[str]) -> np.ndarray:
+        """1-D category codes of one rater (-1 for missing or unknown labels)."""
+        if isinstance(ratings, RatingMatrix):
+            if list(ratings.categories) != list(categories):
+                raise ValueError("Both raters must use the same categories")
+            return ratings.column()
+        return encode_ratings(np.asarray(ratings), categories)
+    
     def _cohen_kappa_se(
         self,
         confusion_norm: np.ndarray,
@@ -240,67 +396,52 @@ class AgreementMetrics:
         More robust than Fleiss' Kappa for missing data and different numbers
         of raters per item.
         
+        The coincidence matrix is built from per-item value counts (bincount,
+        or a sparse product for many distinct values) instead of looping
+        over items and value pairs, so large rating matrices with arbitrary
+        missingness are cheap. Items with fewer than two ratings are not
+        pairable and are skipped.
+        
         Args:
-            ratings: Array of shape (n_raters, n_items) with possible NaN for missing
+            ratings: Array of shape (n_raters, n_items) with possible NaN/None for missing.
+                     Numeric values, or grade labels (mapped with GRADE_VALUES;
+                     other labels are allowed for the nominal level only).
+                     A RatingMatrix (items x raters) uses its codes and
+                     category values directly.
             level: Measurement level ('nominal', 'ordinal', 'interval', 'ratio')
         
         Returns:
             Dictionary with alpha value and interpretation
         """
-        ratings = np.array(ratings, dtype=float)
-        n_raters, n_items = ratings.shape
-        
-        # Convert grades to numeric if needed
-        if level in ['ordinal', 'interval', 'ratio']:
-            # Map grades to numeric values: A=4, B=3, C=2, D/E=1
-            grade_map = {'A': 4, 'B': 3, 'C': 2, 'D/E': 1, 'D': 1, 'E': 1}
-            ratings_numeric = np.array([[grade_map.get(r, np.nan) for r in row] for row in ratings])
+        if level not in ALPHA_LEVELS:
+            raise ValueError(f"Unknown level: {level} (expected one of {ALPHA_LEVELS})")
+        
+        if isinstance(ratings, RatingMatrix):
+            # Already integer-coded; unused categories have zero coincidences
+            codes, values = ratings.codes, ratings.values
         else:
-            ratings_numeric = ratings
+            numeric = _alpha_numeric(ratings, level)
+            if numeric.ndim != 2:
+                raise ValueError(f"Ratings must have shape (n_raters, n_items), got {numeric.shape}")
+            
+            # Integer codes of the sorted distinct values, -1 for missing
+            codes, uniques = pd.factorize(numeric.T.ravel(), sort=True)
+            values = np.asarray(uniques, dtype=float)
+            codes = codes.reshape(numeric.shape[1], numeric.shape[0])
         
-        # Calculate coincidence matrix
-        values = np.unique(ratings_numeric[~np.isnan(ratings_numeric)])
-        n_values = len(values)
-        coincidence = np.zeros((n_values, n_values))
+        coincidence, n_pairable = coincidence_matrix(codes, len(values))
+        n_c = coincidence.sum(axis=1)
+        n = n_c.sum()
+        delta = _alpha_delta(level, values, n_c)
         
-        for item in range(n_items):
-            item_ratings = ratings_numeric[:, item]
-            valid_ratings = item_ratings[~np.isnan(item_ratings)]
-            n_valid = len(valid_ratings)
-            
-            if n_valid < 2:
-                continue
-            
-            for i, val1 in enumerate(values):
-                for j, val2 in enumerate(values):
-                    count1 = np.sum(valid_ratings == val1)
-                    count2 = np.sum(valid_ratings == val2)
-                    
-                    if i == j:
-                        coincidence[i, j] += count1 * (count1 - 1) / (n_valid - 1) if n_valid > 1 else 0
-                    else:
-                        coincidence[i, j] += count1 * count2 / (n_valid - 1) if n_valid > 1 else 0
-        
-        # Calculate disagreement
-        if level == 'nominal':
-            delta = 1 - np.eye(n_values)
-        elif level == 'ordinal':
-            # Ordinal distance
-            delta = np.abs(np.arange(n_values)[:, None] - np.arange(n_values))
-        else:  # interval or ratio
-            # Squared difference
-            delta = (values[:, None] - values) ** 2
-        
-        # Observed disagreement
-        n_c = np.sum(coincidence)
-        d_o = np.sum(coincidence * delta) / n_c if n_c > 0 else 0
-        
-        # Expected disagreement
-        n_k = np.sum(coincidence, axis=1)
-        d_e = np.sum(np.outer(n_k, n_k) * delta) / (n_c ** 2) if n_c > 0 else 0
+        # Observed and expected disagreement
+        d_o = np.sum(coincidence * delta) / n if n > 0 else 0
+        d_e = np.sum(np.outer(n_c, n_c) * delta) / (n * (n - 1)) if n > 1 else 0
         
         # Krippendorff's Alpha
-        if d_e == 0:
+        if n_pairable == 0:
+            alpha = np.nan
+        elif d_e == 0:
             alpha = 1.0
         else:
             alpha = 1 - (d_o / d_e)
@@ -312,38 +453,100 @@ class AgreementMetrics:
             'interpretation': interpretation,
             'd_observed': float(d_o),
             'd_expected': float(d_e),
-            'level': level
+            'level': level,
+            'n_items': int(n_pairable),
+            'n_values': int(len(values))
         }
     
+    def _pairwise_ratings(self, ratings) -> RatingMatrix:
+        """RatingMatrix of a {name: ratings} dict (a RatingMatrix is returned as is)."""
+        if isinstance(ratings, RatingMatrix):
+            return ratings
+        names = list(ratings.keys())
+        labels = np.column_stack([np.asarray(ratings[name], dtype=object) for name in names])
+        return RatingMatrix.from_labels(labels, raters=names)
+    
     def pairwise_agreement_matrix(
         self,
-        raters_dict: Dict[str, np.ndarray]
+        raters_dict: Dict[str, np.ndarray],
+        weights: Optional[str] = None
     ) -> pd.DataFrame:
         """
         Calculate Cohen's Kappa for all pairs of raters.
         
+        All pairwise confusion matrices come from one product of the one-hot
+        rating codes (pairwise_confusion), and kappa is evaluated for every
+        pair at once; each pair only uses items both raters graded.
+        
         Args:
             raters_dict: Dictionary mapping rater names to their ratings
                         Example: {'ChatGPT': [...], 'Gemini': [...], 'Lecturer': [...]}
+                        or a RatingMatrix whose raters are compared
+            weights: Weighting scheme ('linear', 'quadratic', or None)
         
         Returns:
             DataFrame with pairwise kappa values
         """
-        rater_names = list(raters_dict.keys())
-        n_raters = len(rater_names)
+        matrix = self._pairwise_ratings(raters_dict)
+        confusion = pairwise_confusion(matrix.codes, matrix.n_categories)
+        kappa_matrix = kappa_from_confusion(confusion, weights)
+        np.fill_diagonal(kappa_matrix, 1.0)  # Perfect agreement with self
+        
+        return pd.DataFrame(kappa_matrix, index=list(matrix.raters), columns=list(matrix.raters))
+    
+    def pairwise_kappa(
+        self,
+        ratings,
+        n_resamples: int = 0,
+        confidence: float = 0.95,
+        method: str = 'percentile',
+        seed: Optional[int] = None,
+        n_jobs: int = 1
+    ) -> pd.DataFrame:
+        """
+        Unweighted, linear and quadratic Cohen's Kappa for every pair of raters.
         
-        kappa_matrix = np.zeros((n_raters, n_raters))
+        Useful with many raters (e.g. every trial of every model plus the
+        lecturer), where calling cohen_kappa per pair is slow.
         
-        for i, rater1 in enumerate(rater_names):
-            for j, rater2 in enumerate(rater_names):
-                if i == j:
-                    kappa_matrix[i, j] = 1.0  # Perfect agreement with self
-                elif i < j:
-                    result = self.cohen_kappa(raters_dict[rater1], raters_dict[rater2])
-                    kappa_matrix[i, j] = result['kappa']
-                    kappa_matrix[j, i] = result['kappa']  # Symmetric
+        Args:
+            ratings: {name: ratings} dictionary or RatingMatrix (items x raters)
+            n_resamples: Bootstrap resamples per pair (0 = no confidence intervals)
+            confidence: Confidence level of the intervals
+            method: 'percentile' or 'bca'
+            seed: Seed for reproducible resamples
+            n_jobs: Worker processes for the bootstrap (-1 = all CPUs)
         
-        return pd.DataFrame(kappa_matrix, index=rater_names, columns=rater_names)
+        Returns:
+            DataFrame with one row per pair: rater_1, rater_2, n (items both
+            graded), percent_agreement, kappa, linear_kappa, quadratic_kappa
+            and, with n_resamples > 0, <kappa column>_ci_lower / _ci_upper
+        """
+        matrix = self._pairwise_ratings(ratings)
+        confusion = pairwise_confusion(matrix.codes, matrix.n_categories)
+        first, second = np.triu_indices(matrix.n_raters, k=1)
+        pairs = confusion[first, second]
+        n = pairs.sum(axis=(-2, -1))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table = pd.DataFrame({
+                'rater_1': matrix.raters[first],
+                'rater_2': matrix.raters[second],
+                'n': n.astype(int),
+                'percent_agreement': np.trace(pairs, axis1=-2, axis2=-1) / n * 100,
+            })
+        columns = {None: 'kappa', 'linear': 'linear_kappa', 'quadratic': 'quadratic_kappa'}
+        for weights in KAPPA_WEIGHTS:
+            table[columns[weights]] = kappa_from_confusion(pairs, weights)
+        
+        if n_resamples > 0:
+            intervals = pairwise_kappa_ci(matrix.codes, matrix.n_categories, KAPPA_WEIGHTS,
+                                          n_resamples=n_resamples, confidence=confidence,
+                                          method=method, seed=seed, n_jobs=n_jobs)
+            for position, weights in enumerate(KAPPA_WEIGHTS):
+                table[f'{columns[weights]}_ci_lower'] = intervals[:, position, 0]
+                table[f'{columns[weights]}_ci_upper'] = intervals[:, position, 1]
+        return table
     
     def _interpret_kappa(self, kappa: float) -> str:
         """
@@ -380,15 +583,25 @@ class AgreementMetrics:
         
         Args:
             chatgpt_scores: List of ChatGPT grades (e.g., average of 4 trials)
+                            or a one-rater RatingMatrix
             gemini_scores: List of Gemini grades (e.g., average of 4 trials)
+                           or a one-rater RatingMatrix
             lecturer_scores: List of Lecturer grades (ground truth)
+                             or a one-rater RatingMatrix
             criterion_name: Name of the criterion being evaluated
         
         Returns:
             Comprehensive dictionary with all metrics
         """
-        # Combine all ratings for Fleiss' Kappa
-        ratings = np.column_stack([chatgpt_scores, gemini_scores, lecturer_scores])
+        scores = (chatgpt_scores, gemini_scores, lecturer_scores)
+        if all(isinstance(rater, RatingMatrix) for rater in scores):
+            # Already encoded: reuse the codes instead of re-parsing labels
+            ratings = RatingMatrix(np.column_stack([rater.column() for rater in scores]),
+                                   chatgpt_scores.categories, chatgpt_scores.values,
+                                   raters=['ChatGPT', 'Gemini', 'Lecturer'])
+        else:
+            # Combine all ratings for Fleiss' Kappa
+            ratings = np.column_stack([chatgpt_scores, gemini_scores, lecturer_scores])
         
         # Fleiss' Kappa (primary metric)
         fleiss = self.fleiss_kappa(ratings)
@@ -399,11 +612,14 @@ class AgreementMetrics:
         cohen_chatgpt_gemini = self.cohen_kappa(chatgpt_scores, gemini_scores)
         
         # Pairwise agreement matrix
-        raters_dict = {
-            'ChatGPT': chatgpt_scores,
-            'Gemini': gemini_scores,
-            'Lecturer': lecturer_scores
-        }
+        if isinstance(ratings, RatingMatrix):
+            raters_dict = ratings
+        else:
+            raters_dict = {
+                'ChatGPT': chatgpt_scores,
+                'Gemini': gemini_scores,
+                'Lecturer': lecturer_scores
+            }
         agreement_matrix = self.pairwise_agreement_matrix(raters_dict)
         
         return {
@@ -0,0 +1,464 @@
+"""
+Bootstrap Confidence Intervals
+
+Generic nonparametric bootstrap for agreement and reliability statistics:
+- All resample indices of a shard are drawn as one (batch, n) matrix
+- Statistics are evaluated for the whole batch at once (vectorized
+  statistics take an array with a leading batch axis)
+- Shards run in a process pool; every shard has its own child seed, so
+  results are reproducible for a given seed regardless of n_jobs
+- Percentile and BCa (bias-corrected and accelerated) intervals
+- Per-pair kappa intervals for many raters (pairwise_kappa_ci), with the
+  pairs spread over the process pool
+
+Statistics that only depend on sums of per-item terms (ItemSumStatistic:
+Fleiss' kappa, Cohen's / weighted kappa, ICC) skip materializing the
+resampled data: a resample is a row of item multiplicities, so a whole
+shard is one (batch x n) @ (n x terms) product, and the BCa jackknife is
+exact leave-one-out at O(n).
+
+Example:
+    counts = category_counts(codes, 4)
+    result = bootstrap_ci(fleiss_kappa_batch, counts, n_resamples=10000, seed=42, n_jobs=4)
+    print(result['estimate'], result['bca_ci'])
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.stats import norm
+
+from .reliability import ICC_TYPES, icc_from_mean_squares
+
+
+# Interval methods of bootstrap_ci
+CI_METHODS = ('percentile', 'bca', 'both')
+
+# Weighting schemes of Cohen's kappa (unweighted, linear, quadratic)
+KAPPA_WEIGHTS = (None, 'linear', 'quadratic')
+
+
+class ItemSumStatistic:
+    """
+    Statistic of the form finish(sum over items of terms(item)).
+
+    Callable like any batched statistic (samples with a leading batch axis
+    in, one value per sample out); bootstrap_ci additionally uses the sum
+    structure to resample via multiplicity weights.
+    """
+
+    def __init__(self, terms: Callable, finish: Callable, **params):
+        """
+        Args:
+            terms: Maps data (..., n_items, ...) to per-item terms (..., n_items, n_terms)
+            finish: Maps summed terms (..., n_terms) to the statistic (...)
+            **params: Keyword arguments passed to both functions
+        """
+        self.terms_fn = terms
+        self.finish_fn = finish
+        self.params = params
+
+    def terms(self, data: np.ndarray) -> np.ndarray:
+        return np.asarray(self.terms_fn(data, **self.params), dtype=float)
+
+    def finish(self, sums: np.ndarray) -> np.ndarray:
+        return self.finish_fn(sums, **self.params)
+
+    def __call__(self, samples: np.ndarray) -> np.ndarray:
+        return self.finish(self.terms(samples).sum(axis=-2))
+
+
+def _fleiss_terms(counts: np.ndarray) -> np.ndarray:
+    """Per item: [P_i, rated, n_ij...] (zero for items with fewer than two ratings)."""
+    counts = np.asarray(counts, dtype=float)
+    n_i = counts.sum(axis=-1)
+    rated = n_i >= 2
+    # sum_j n_ij (n_ij - 1) = sum_j n_ij^2 - n_i
+    agreeing = np.einsum('...ij,...ij->...i', counts, counts) - n_i
+    P_i = np.divide(agreeing, n_i * (n_i - 1), out=np.zeros(n_i.shape), where=rated)
+    return np.concatenate([P_i[..., None], rated[..., None], counts * rated[..., None]], axis=-1)
+
+
+def _fleiss_finish(sums: np.ndarray) -> np.ndarray:
+    n_rated = sums[..., 1]
+    P_bar = sums[..., 0] / np.maximum(n_rated, 1)
+    category_totals = sums[..., 2:]
+    p_j = category_totals / np.maximum(category_totals.sum(axis=-1, keepdims=True), 1)
+    P_bar_e = np.sum(p_j ** 2, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((n_rated > 0) & (P_bar_e < 1), (P_bar - P_bar_e) / (1 - P_bar_e), np.nan)
+
+
+# Fleiss' kappa of (..., n_items, n_categories) count matrices
+fleiss_kappa_batch = ItemSumStatistic(_fleiss_terms, _fleiss_finish)
+
+
+def _cohen_terms(pairs: np.ndarray, n_categories: int, weights: Optional[str] = None) -> np.ndarray:
+    """Per item: one-hot confusion cell (zero when a rating is missing)."""
+    pairs = np.asarray(pairs)
+    valid = ((pairs >= 0) & (pairs < n_categories)).all(axis=-1)
+    cell = np.where(valid, pairs[..., 0] * n_categories + pairs[..., 1], 0)
+    one_hot = np.zeros(cell.shape + (n_categories ** 2,))
+    np.put_along_axis(one_hot, cell[..., None], valid[..., None].astype(float), axis=-1)
+    return one_hot
+
+
+def _cohen_finish(sums: np.ndarray, n_categories: int, weights: Optional[str] = None) -> np.ndarray:
+    confusion = sums.reshape(sums.shape[:-1] + (n_categories, n_categories))
+    return kappa_from_confusion(confusion, weights)
+
+
+def cohen_kappa_statistic(n_categories: int, weights: Optional[str] = None) -> ItemSumStatistic:
+    """
+    Batched Cohen's kappa over (..., n_items, 2) integer code pairs.
+
+    Args:
+        n_categories: Number of ordered categories
+        weights: None, 'linear' or 'quadratic' (QWK)
+    """
+    return ItemSumStatistic(_cohen_terms, _cohen_finish, n_categories=n_categories, weights=weights)
+
+
+def cohen_kappa_batch(
+    pairs: np.ndarray,
+    n_categories: int,
+    weights: Optional[str] = None
+) -> np.ndarray:
+    """
+    Cohen's kappa (optionally weighted) of a batch of rater pairs.
+
+    Args:
+        pairs: Integer codes of shape (..., n_items, 2), negative for missing
+               (items with a missing rating are skipped)
+        n_categories: Number of ordered categories
+        weights: None, 'linear' or 'quadratic' (QWK)
+
+    Returns:
+        Array of shape (...): kappa per batch entry
+    """
+    pairs = np.asarray(pairs)
+    batch_shape = pairs.shape[:-2]
+    flat = pairs.reshape(-1, pairs.shape[-2], 2).astype(np.intp)
+    n_batch = flat.shape[0]
+
+    # All confusion matrices with one bincount: batch offset + r1 * k + r2
+    valid = ((flat >= 0) & (flat < n_categories)).all(axis=-1)
+    cells = np.where(valid, flat[..., 0] * n_categories + flat[..., 1], n_categories ** 2)
+    cells = cells + np.arange(n_batch)[:, None] * (n_categories ** 2 + 1)
+    confusion = np.bincount(cells.ravel(), minlength=n_batch * (n_categories ** 2 + 1))
+    confusion = confusion.reshape(n_batch, n_categories ** 2 + 1)[:, :-1]
+    confusion = confusion.reshape(n_batch, n_categories, n_categories)
+
+    return kappa_from_confusion(confusion, weights).reshape(batch_shape)
+
+
+def kappa_from_confusion(confusion: np.ndarray, weights: Optional[str] = None) -> np.ndarray:
+    """
+    Cohen's kappa of confusion matrices of shape (..., k, k).
+
+    Uses agreement weights like AgreementMetrics.cohen_kappa (1 on the
+    diagonal, 1 - |i-j|/(k-1) linear, 1 - ((i-j)/(k-1))^2 quadratic).
+    """
+    confusion = np.asarray(confusion, dtype=float)
+    n_categories = confusion.shape[-1]
+    index = np.arange(n_categories)
+    if weights == 'linear':
+        weight_matrix = 1 - np.abs(index[:, None] - index) / max(n_categories - 1, 1)
+    elif weights == 'quadratic':
+        weight_matrix = 1 - ((index[:, None] - index) / max(n_categories - 1, 1)) ** 2
+    elif weights is None:
+        weight_matrix = np.eye(n_categories)
+    else:
+        raise ValueError(f"Unknown weights: {weights} (expected None, 'linear' or 'quadratic')")
+
+    n = confusion.sum(axis=(-2, -1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportions = confusion / n[..., None, None]
+        p_observed = np.sum(weight_matrix * proportions, axis=(-2, -1))
+        expected = proportions.sum(axis=-1)[..., :, None] * proportions.sum(axis=-2)[..., None, :]
+        p_expected = np.sum(weight_matrix * expected, axis=(-2, -1))
+        kappa = (p_observed - p_expected) / (1 - p_expected)
+    return np.where(p_expected == 1, 1.0, kappa)
+
+
+def _icc_terms(scores: np.ndarray, model: str = '2,1') -> np.ndarray:
+    """Per item: [1, sum_j x_ij^2, (sum_j x_ij)^2, x_i1 .. x_ik]."""
+    scores = np.asarray(scores, dtype=float)
+    row_sums = scores.sum(axis=-1, keepdims=True)
+    return np.concatenate([np.ones_like(row_sums), np.sum(scores ** 2, axis=-1, keepdims=True),
+                           row_sums ** 2, scores], axis=-1)
+
+
+def _icc_finish(sums: np.ndarray, model: str = '2,1') -> np.ndarray:
+    """Two-way ANOVA mean squares from the summed terms, then ICC."""
+    n = sums[..., 0]
+    column_sums = sums[..., 3:]
+    k = column_sums.shape[-1]
+    total = column_sums.sum(axis=-1)
+    correction = total ** 2 / (n * k)
+
+    ss_total = sums[..., 1] - correction
+    ss_rows = sums[..., 2] / k - correction
+    ss_cols = np.sum(column_sums ** 2, axis=-1) / n - correction
+    ss_error = ss_total - ss_rows - ss_cols
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ms_rows = ss_rows / (n - 1)
+        ms_cols = ss_cols / (k - 1)
+        ms_error = ss_error / ((n - 1) * (k - 1))
+        ms_within = (ss_cols + ss_error) / (n * (k - 1))
+    return icc_from_mean_squares(ms_rows, ms_cols, ms_error, ms_within, n, k, f'ICC({model})')
+
+
+def icc_statistic(model: str = '2,1') -> ItemSumStatistic:
+    """
+    Batched ICC over complete (..., n_items, n_raters) score matrices.
+
+    Args:
+        model: '1,1', '2,1', '3,1', '1,k', '2,k' or '3,k' (see reliability.ICC_TYPES)
+    """
+    if f'ICC({model})' not in ICC_TYPES:
+        raise ValueError(f"Unknown ICC model: {model} (expected one of {[t[4:-1] for t in ICC_TYPES]})")
+    return ItemSumStatistic(_icc_terms, _icc_finish, model=model)
+
+
+# Worker state of the process pool (set once per worker by _init_worker)
+_worker_state: Tuple[Optional[Callable], Optional[np.ndarray]] = (None, None)
+
+
+def _init_worker(statistic: Callable, data: np.ndarray):
+    global _worker_state
+    _worker_state = (statistic, data)
+
+
+def _run_shard(size: int, seed: np.random.SeedSequence, statistic: Optional[Callable] = None,
+               data: Optional[np.ndarray] = None) -> np.ndarray:
+    """Evaluate the statistic on `size` resamples drawn as one index matrix."""
+    if statistic is None:
+        statistic, data = _worker_state
+    n = len(data)
+    indices = np.random.default_rng(seed).integers(0, n, size=(size, n))
+
+    if isinstance(statistic, ItemSumStatistic):
+        # data holds the per-item terms: resample = multiplicity row @ terms
+        offsets = np.arange(size, dtype=np.intp)[:, None] * n
+        weights = np.bincount((indices + offsets).ravel(), minlength=size * n).reshape(size, n)
+        values = statistic.finish(weights.astype(float) @ data)
+    else:
+        values = statistic(data[indices])
+    return np.asarray(values, dtype=float).reshape(size)
+
+
+def _jackknife(statistic: Callable, data: np.ndarray, max_groups: int,
+               batch_size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Leave-one-out estimates.
+
+    Exact for ItemSumStatistic (data = terms). Otherwise delete-a-group
+    with max_groups equal groups when there are more items, to keep the
+    cost linear.
+    """
+    if isinstance(statistic, ItemSumStatistic):
+        return np.asarray(statistic.finish(data.sum(axis=0) - data), dtype=float)
+
+    n = len(data)
+    if n <= max_groups:
+        order, group_size = np.arange(n), 1
+    else:
+        order = np.random.default_rng(seed).permutation(n)
+        group_size = n // max_groups
+    n_groups = min(n, max_groups)
+    grouped = order[:n_groups * group_size].reshape(n_groups, group_size)
+    always = order[n_groups * group_size:]
+
+    estimates = []
+    for start in range(0, n_groups, batch_size):
+        stop = min(start + batch_size, n_groups)
+        # Row g keeps every group except g, plus the items outside all groups
+        keep = ~np.eye(n_groups, dtype=bool)[start:stop]
+        kept = np.broadcast_to(grouped, (stop - start, n_groups, group_size))[keep]
+        kept = kept.reshape(stop - start, (n_groups - 1) * group_size)
+        if len(always):
+            kept = np.hstack([kept, np.broadcast_to(always, (stop - start, len(always)))])
+        estimates.append(np.asarray(statistic(data[kept]), dtype=float).reshape(stop - start))
+    return np.concatenate(estimates)
+
+
+def bootstrap_ci(
+    statistic: Callable[[np.ndarray], np.ndarray],
+    data: np.ndarray,
+    n_resamples: int = 10000,
+    confidence: float = 0.95,
+    method: str = 'both',
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+    batch_size: int = 500,
+    max_jackknife: int = 2000
+) -> Dict[str, Any]:
+    """
+    Bootstrap confidence interval of a vectorized statistic.
+
+    The statistic receives resampled data with a leading batch axis and
+    returns one value per resample: statistic(data[indices]) where indices
+    has shape (batch, n). Resampling is over the first axis of data (items).
+    It must be picklable (a module-level function, functools.partial of one,
+    or an ItemSumStatistic) when n_jobs > 1.
+
+    Args:
+        statistic: Batched statistic, e.g. fleiss_kappa_batch or icc_statistic('2,1')
+        data: Array whose first axis is resampled
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the intervals
+        method: 'percentile', 'bca' or 'both'
+        seed: Seed for reproducible resamples (None = random)
+        n_jobs: Worker processes (1 = in process, -1 = all CPUs)
+        batch_size: Resamples per shard (bounds memory: batch_size x n indices)
+        max_jackknife: Maximum jackknife groups for the BCa acceleration
+                       (not used for ItemSumStatistic, whose jackknife is exact)
+
+    Returns:
+        Dictionary with estimate, standard_error, bias, percentile_ci and/or
+        bca_ci ([lower, upper]), confidence, n_resamples and n_valid
+        (resamples with a finite statistic)
+    """
+    if method not in CI_METHODS:
+        raise ValueError(f"Unknown method: {method} (expected one of {CI_METHODS})")
+    data = np.asarray(data)
+    if isinstance(statistic, ItemSumStatistic):
+        data = statistic.terms(data)  # Resampling only ever needs the per-item terms
+        estimate = float(statistic.finish(data.sum(axis=0)))
+    else:
+        estimate = float(np.asarray(statistic(data[None, ...]), dtype=float).reshape(-1)[0])
+
+    # One child seed per shard (plus one for the jackknife): same draws for any n_jobs
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes) + 1)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(sizes)), initializer=_init_worker,
+                                 initargs=(statistic, data)) as executor:
+            shards = list(executor.map(_run_shard, sizes, seeds[:-1]))
+    else:
+        shards = [_run_shard(size, shard_seed, statistic, data)
+                  for size, shard_seed in zip(sizes, seeds[:-1])]
+
+    replicates = np.concatenate(shards) if shards else np.empty(0)
+    finite = replicates[np.isfinite(replicates)]
+    alpha = 1 - confidence
+
+    result: Dict[str, Any] = {
+        'estimate': estimate,
+        'standard_error': float(np.std(finite, ddof=1)) if len(finite) > 1 else float('nan'),
+        'bias': float(np.mean(finite) - estimate) if len(finite) else float('nan'),
+        'confidence': confidence,
+        'n_resamples': int(n_resamples),
+        'n_valid': int(len(finite)),
+    }
+
+    if method in ('percentile', 'both'):
+        if len(finite):
+            lower, upper = np.percentile(finite, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+            result['percentile_ci'] = [float(lower), float(upper)]
+        else:
+            result['percentile_ci'] = [float('nan'), float('nan')]
+
+    if method in ('bca', 'both'):
+        if len(finite) and np.isfinite(estimate):
+            result['bca_ci'] = list(_bca_interval(statistic, data, finite, estimate, alpha,
+                                                  max_jackknife, batch_size, seeds[-1]))
+        else:
+            result['bca_ci'] = [float('nan'), float('nan')]
+    return result
+
+
+def _bca_interval(statistic: Callable, data: np.ndarray, replicates: np.ndarray, estimate: float,
+                  alpha: float, max_jackknife: int, batch_size: int,
+                  seed: np.random.SeedSequence) -> Tuple[float, float]:
+    """BCa interval: bias correction z0 from the replicates, acceleration from the jackknife."""
+    proportion_below = (np.sum(replicates < estimate) + 0.5 * np.sum(replicates == estimate)) / len(replicates)
+    z0 = norm.ppf(np.clip(proportion_below, 1e-10, 1 - 1e-10))
+
+    jackknife = _jackknife(statistic, data, max_jackknife, batch_size, seed)
+    jackknife = jackknife[np.isfinite(jackknife)]
+    deviations = jackknife.mean() - jackknife if len(jackknife) else np.zeros(1)
+    denominator = 6 * np.sum(deviations ** 2) ** 1.5
+    acceleration = np.sum(deviations ** 3) / denominator if denominator > 0 else 0.0
+
+    z = norm.ppf([alpha / 2, 1 - alpha / 2])
+    adjusted = norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    lower, upper = np.percentile(replicates, 100 * np.nan_to_num(adjusted, nan=0.5))
+    return float(lower), float(upper)
+
+
+def _pair_intervals(pair: np.ndarray, seed: np.random.SeedSequence, n_categories: int,
+                    weights: Sequence[Optional[str]], n_resamples: int, confidence: float,
+                    method: str) -> np.ndarray:
+    """Bootstrap CIs of one rater pair's kappas, all weightings on the same resamples."""
+    pair = pair[((pair >= 0) & (pair < n_categories)).all(axis=1)]
+    intervals = np.full((len(weights), 2), np.nan)
+    if len(pair) < 2:
+        return intervals
+    pair_seed = int(seed.generate_state(1)[0])
+    for position, weighting in enumerate(weights):
+        result = bootstrap_ci(cohen_kappa_statistic(n_categories, weighting), pair,
+                              n_resamples=n_resamples, confidence=confidence, method=method,
+                              seed=pair_seed)
+        intervals[position] = result[f'{method}_ci']
+    return intervals
+
+
+def pairwise_kappa_ci(
+    codes: np.ndarray,
+    n_categories: int,
+    weights: Sequence[Optional[str]] = KAPPA_WEIGHTS,
+    n_resamples: int = 2000,
+    confidence: float = 0.95,
+    method: str = 'percentile',
+    seed: Optional[int] = None,
+    n_jobs: int = 1
+) -> np.ndarray:
+    """
+    Bootstrap confidence intervals of Cohen's kappa for every pair of raters.
+
+    Each pair is resampled over the items both raters graded, with its own
+    child seed (reproducible for any n_jobs); pairs are spread over a
+    process pool.
+
+    Args:
+        codes: Integer codes of shape (n_items, n_raters), negative for missing
+        n_categories: Number of ordered categories
+        weights: Kappa weightings (None, 'linear', 'quadratic')
+        n_resamples: Bootstrap resamples per pair
+        confidence: Confidence level of the intervals
+        method: 'percentile' or 'bca'
+        seed: Seed for reproducible resamples (None = random)
+        n_jobs: Worker processes (1 = in process, -1 = all CPUs)
+
+    Returns:
+        Array of shape (n_pairs, len(weights), 2) with [lower, upper] per
+        pair in np.triu_indices(n_raters, k=1) order
+    """
+    if method not in ('percentile', 'bca'):
+        raise ValueError(f"Unknown method: {method} (expected 'percentile' or 'bca')")
+    codes = np.asarray(codes)
+    first, second = np.triu_indices(codes.shape[1], k=1)
+    pairs = [codes[:, [a, b]] for a, b in zip(first, second)]
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    run = partial(_pair_intervals, n_categories=n_categories, weights=tuple(weights),
+                  n_resamples=n_resamples, confidence=confidence, method=method)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and len(pairs) > 1:
+        n_workers = min(n_jobs, len(pairs))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            intervals = list(executor.map(run, pairs, seeds,
+                                          chunksize=max(1, len(pairs) // (4 * n_workers))))
+    else:
+        intervals = [run(pair, pair_seed) for pair, pair_seed in zip(pairs, seeds)]
+    return np.stack(intervals) if intervals else np.empty((0, len(weights), 2))
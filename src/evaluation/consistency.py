@@ -8,10 +8,11 @@ Measures consistency of AI agents across multiple trials:
 """
 
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from scipy import stats
-from scipy.stats import f
+
+from .ratings import GRADE_CATEGORIES, GRADE_CODES, GRADE_POINTS, RatingMatrix
+from .reliability import ICC_TYPES, icc_key, reliability_coefficients
 
 
 class ConsistencyMetrics:
@@ -23,13 +24,17 @@ class ConsistencyMetrics:
     
     def __init__(self):
         """Initialize consistency metrics calculator."""
-        self.grade_to_numeric = {'A': 4, 'B': 3, 'C': 2, 'D/E': 1, 'D': 1, 'E': 1}
-        self.numeric_to_grade = {4: 'A', 3: 'B', 2: 'C', 1: 'D/E'}
+        self.grade_to_numeric = {grade: GRADE_POINTS[code] for grade, code in GRADE_CODES.items()}
+        self.numeric_to_grade = {GRADE_POINTS[code]: grade for code, grade in enumerate(GRADE_CATEGORIES)}
     
     def convert_grades_to_numeric(self, grades: List[str]) -> np.ndarray:
         """Convert letter grades to numeric values."""
         return np.array([self.grade_to_numeric.get(g, np.nan) for g in grades])
     
+    def _as_matrix(self, trials) -> RatingMatrix:
+        """Trial lists (n_trials x n_essays) as an essays x trials RatingMatrix (encoded once)."""
+        return trials if isinstance(trials, RatingMatrix) else RatingMatrix.from_trials(trials)
+    
     def standard_deviation(
         self,
         trials: List[List[str]],
@@ -41,14 +46,14 @@ class ConsistencyMetrics:
         Args:
             trials: List of trial results, each trial is a list of grades
                    Example: [['A', 'B', 'C', ...], ['A', 'B', 'B', ...], ...]
+                   or a RatingMatrix (essays x trials)
             per_essay: If True, calculate SD per essay; if False, overall SD
         
         Returns:
             Dictionary with SD statistics
         """
-        # Convert to numeric
-        trials_numeric = [self.convert_grades_to_numeric(trial) for trial in trials]
-        trials_array = np.array(trials_numeric)  # Shape: (n_trials, n_essays)
+        matrix = self._as_matrix(trials)
+        trials_array = matrix.numeric().T  # Shape: (n_trials, n_essays)
         
         if per_essay:
             # SD for each essay across trials
@@ -63,7 +68,7 @@ class ConsistencyMetrics:
                 'max_sd': float(np.max(sd_per_essay)),
                 'mean_per_essay': mean_per_essay.tolist(),
                 'n_essays': len(sd_per_essay),
-                'n_trials': len(trials)
+                'n_trials': matrix.n_raters
             }
         else:
             # Overall SD
@@ -86,7 +91,7 @@ class ConsistencyMetrics:
         consistency across different scales.
         
         Args:
-            trials: List of trial results
+            trials: List of trial results or a RatingMatrix
             per_essay: If True, calculate CV per essay; if False, overall CV
         
         Returns:
@@ -133,11 +138,13 @@ class ConsistencyMetrics:
         ICC measures reliability/consistency of measurements across trials.
         
         Args:
-            trials: List of trial results
+            trials: List of trial results or a RatingMatrix (unknown grades
+                    count as missing)
             icc_type: Type of ICC to calculate:
                      'ICC(1,1)': One-way random effects
                      'ICC(2,1)': Two-way random effects, single measurement
                      'ICC(3,1)': Two-way mixed effects, single measurement
+                     'ICC(1,k)', 'ICC(2,k)', 'ICC(3,k)': Average of k trials
         
         Returns:
             Dictionary with ICC value, confidence interval, and interpretation
@@ -148,54 +155,15 @@ class ConsistencyMetrics:
             0.60 - 0.74: Good reliability
             0.75 - 1.00: Excellent reliability
         """
-        # Convert to numeric
-        trials_numeric = [self.convert_grades_to_numeric(trial) for trial in trials]
-        data = np.array(trials_numeric).T  # Shape: (n_essays, n_trials)
-        
-        n_essays, n_trials = data.shape
-        
-        # Grand mean
-        grand_mean = np.mean(data)
-        
-        # Between-target (essay) variance
-        essay_means = np.mean(data, axis=1)
-        ms_between = n_trials * np.var(essay_means, ddof=1)
-        
-        # Within-target variance
-        ms_within = np.mean(np.var(data, axis=1, ddof=1))
-        
-        # Between-rater (trial) variance
-        trial_means = np.mean(data, axis=0)
-        ms_trials = n_essays * np.var(trial_means, ddof=1)
-        
-        # Residual variance
-        ms_error = ms_within
-        
-        if icc_type == 'ICC(1,1)':
-            # One-way random effects
-            icc = (ms_between - ms_within) / (ms_between + (n_trials - 1) * ms_within)
-            
-        elif icc_type == 'ICC(2,1)':
-            # Two-way random effects, single measurement
-            icc = (ms_between - ms_error) / (ms_between + (n_trials - 1) * ms_error + n_trials * (ms_trials - ms_error) / n_essays)
-            
-        elif icc_type == 'ICC(3,1)':
-            # Two-way mixed effects, single measurement
-            icc = (ms_between - ms_error) / (ms_between + (n_trials - 1) * ms_error)
-            
-        else:
+        if icc_type not in ICC_TYPES:
             raise ValueError(f"Unknown ICC type: {icc_type}")
         
-        # Confidence interval (approximate)
-        df1 = n_essays - 1
-        df2 = n_essays * (n_trials - 1)
-        f_stat = ms_between / ms_error
-        
-        f_lower = f_stat / f.ppf(0.975, df1, df2)
-        f_upper = f_stat / f.ppf(0.025, df1, df2)
+        data = self._as_matrix(trials).numeric()  # Shape: (n_essays, n_trials)
         
-        ci_lower = (f_lower - 1) / (f_lower + n_trials - 1)
-        ci_upper = (f_upper - 1) / (f_upper + n_trials - 1)
+        result = reliability_coefficients(data)
+        name = icc_key(icc_type)
+        icc = result[name]
+        ms_residual = result['ms_within'] if icc_type.startswith('ICC(1') else result['ms_error']
         
         interpretation = self._interpret_icc(icc)
         
@@ -203,13 +171,13 @@ class ConsistencyMetrics:
             'icc': float(icc),
             'icc_type': icc_type,
             'interpretation': interpretation,
-            'ci_95_lower': float(max(0, ci_lower)),
-            'ci_95_upper': float(min(1, ci_upper)),
-            'n_essays': int(n_essays),
-            'n_trials': int(n_trials),
-            'ms_between': float(ms_between),
-            'ms_within': float(ms_within),
-            'f_statistic': float(f_stat)
+            'ci_95_lower': float(max(0, result[f'{name}_ci_lower'])),
+            'ci_95_upper': float(min(1, result[f'{name}_ci_upper'])),
+            'n_essays': int(result['n_items']),
+            'n_trials': int(result['n_raters']),
+            'ms_between': float(result['ms_rows']),
+            'ms_within': float(result['ms_within']),
+            'f_statistic': float(result['ms_rows'] / ms_residual)
         }
     
     def agreement_percentage(
@@ -220,37 +188,28 @@ class ConsistencyMetrics:
         Calculate percentage of essays where all trials agree.
         
         Args:
-            trials: List of trial results
+            trials: List of trial results or a RatingMatrix
         
         Returns:
             Dictionary with agreement statistics
         """
-        trials_array = np.array(trials).T  # Shape: (n_essays, n_trials)
-        n_essays = len(trials_array)
-        
-        # Count perfect agreement (all trials give same grade)
-        perfect_agreement = 0
-        partial_agreement = 0
-        no_agreement = 0
-        
-        agreement_per_essay = []
-        
-        for essay_trials in trials_array:
-            unique_grades = set(essay_trials)
-            n_unique = len(unique_grades)
-            
-            if n_unique == 1:
-                perfect_agreement += 1
-                agreement_per_essay.append(100.0)
-            elif n_unique == 2:
-                partial_agreement += 1
-                # Calculate percentage based on majority
-                grade_counts = pd.Series(essay_trials).value_counts()
-                majority_pct = (grade_counts.iloc[0] / len(essay_trials)) * 100
-                agreement_per_essay.append(majority_pct)
-            else:
-                no_agreement += 1
-                agreement_per_essay.append(0.0)
+        matrix = self._as_matrix(trials)
+        counts = matrix.counts()
+        n_essays = matrix.n_items
+        n_graded = counts.sum(axis=1)
+        n_unique = (counts > 0).sum(axis=1)
+        
+        # Perfect: all trials give the same grade; partial: two grades, scored
+        # by the majority share; otherwise no agreement
+        perfect = n_unique == 1
+        partial = n_unique == 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            majority_pct = counts.max(axis=1) / n_graded * 100
+        agreement_per_essay = np.select([perfect, partial], [100.0, majority_pct], 0.0)
+        
+        perfect_agreement = int(perfect.sum())
+        partial_agreement = int(partial.sum())
+        no_agreement = n_essays - perfect_agreement - partial_agreement
         
         return {
             'perfect_agreement_count': perfect_agreement,
@@ -259,10 +218,10 @@ class ConsistencyMetrics:
             'partial_agreement_pct': (partial_agreement / n_essays) * 100,
             'no_agreement_count': no_agreement,
             'no_agreement_pct': (no_agreement / n_essays) * 100,
-            'agreement_per_essay': agreement_per_essay,
+            'agreement_per_essay': agreement_per_essay.tolist(),
             'mean_agreement': float(np.mean(agreement_per_essay)),
             'n_essays': n_essays,
-            'n_trials': len(trials)
+            'n_trials': matrix.n_raters
         }
     
     def _interpret_cv(self, cv: float) -> str:
@@ -306,23 +265,24 @@ class ConsistencyMetrics:
         This is the main function for analyzing trial consistency.
         
         Args:
-            trials: List of trial results (4 trials expected)
+            trials: List of trial results (4 trials expected) or a RatingMatrix
             agent_name: Name of the agent (e.g., "ChatGPT", "Gemini")
             criterion_name: Name of the criterion being evaluated
         
         Returns:
             Comprehensive dictionary with all consistency metrics
         """
-        sd = self.standard_deviation(trials, per_essay=True)
-        cv = self.coefficient_of_variation(trials, per_essay=True)
-        icc = self.intraclass_correlation(trials, icc_type='ICC(2,1)')
-        agreement = self.agreement_percentage(trials)
+        matrix = self._as_matrix(trials)  # Encode the grades once for all metrics
+        sd = self.standard_deviation(matrix, per_essay=True)
+        cv = self.coefficient_of_variation(matrix, per_essay=True)
+        icc = self.intraclass_correlation(matrix, icc_type='ICC(2,1)')
+        agreement = self.agreement_percentage(matrix)
         
         return {
             'agent': agent_name,
             'criterion': criterion_name,
-            'n_trials': len(trials),
-            'n_essays': len(trials[0]) if trials else 0,
+            'n_trials': matrix.n_raters,
+            'n_essays': matrix.n_items,
             'standard_deviation': sd,
             'coefficient_of_variation': cv,
             'intraclass_correlation': icc,
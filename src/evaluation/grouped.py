@@ -0,0 +1,202 @@
+"""
+Grouped Metrics
+
+Computes agreement, consistency and accuracy metrics for every group of a
+long-format grade table (one row per item, rater and group) in one pass:
+
+    item      rater   criterion   agent     grade   lecturer_grade
+    essay_1   1       content     ChatGPT   B       A
+    ...
+
+Grades are integer-encoded once; every group is scattered into one padded
+(groups, items, raters) code array, from which per-item category counts,
+Fleiss' kappa, Krippendorff's alpha, the ICC engine and the confusion
+matrices against the reference grade are all computed with array
+operations over the group axis. The result is a tidy DataFrame with one
+row per group.
+
+Example:
+    metrics = grouped_metrics(frame, item='essay', rater='trial', grade='grade',
+                              by=['criterion', 'agent'], reference='lecturer_grade')
+"""
+
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .agreement import _alpha_delta
+from .bootstrap import kappa_from_confusion
+from .ratings import GRADE_CATEGORIES, GRADE_POINTS, category_counts, encode_labels
+from .reliability import long_format_codes, reliability_coefficients
+
+
+def _fleiss(counts: np.ndarray) -> np.ndarray:
+    """Fleiss' kappa per group of (G, N, C) counts (items rated < 2 times skipped)."""
+    n_i = counts.sum(axis=-1)
+    rated = n_i >= 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        P_i = np.where(rated, np.einsum('gnc,gnc->gn', counts, counts - 1) / (n_i * (n_i - 1)), 0.0)
+        P_bar = P_i.sum(axis=-1) / rated.sum(axis=-1)
+        totals = np.where(rated[..., None], counts, 0).sum(axis=-2)
+        p_j = totals / totals.sum(axis=-1, keepdims=True)
+        P_e = np.sum(p_j ** 2, axis=-1)
+        return (P_bar - P_e) / (1 - P_e)
+
+
+def _krippendorff(counts: np.ndarray, level: str) -> np.ndarray:
+    """Krippendorff's alpha per group from (G, N, C) counts (values = GRADE_POINTS)."""
+    n_u = counts.sum(axis=-1)
+    pairable = n_u >= 2
+    weight = np.divide(1.0, n_u - 1, out=np.zeros(n_u.shape), where=pairable)
+    weighted = counts * weight[..., None]
+    coincidence = np.einsum('gnc,gnk->gck', weighted, counts)
+    coincidence -= np.einsum('gc,ck->gck', weighted.sum(axis=-2), np.eye(counts.shape[-1]))
+
+    n_c = coincidence.sum(axis=-1)
+    n = n_c.sum(axis=-1)
+    delta = _alpha_delta(level, GRADE_POINTS, n_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = np.sum(coincidence * delta, axis=(-2, -1))
+        expected = np.sum(n_c[..., :, None] * n_c[..., None, :] * delta, axis=(-2, -1))
+        return 1 - (n - 1) * observed / expected
+
+
+def consensus_grades(
+    frame: pd.DataFrame,
+    item: Union[str, List[str]],
+    grade: str,
+    by: Optional[Union[str, List[str]]] = None
+) -> pd.DataFrame:
+    """
+    Modal grade of every item (ties -> better grade, like Series.mode()[0]).
+
+    Args:
+        frame: Long-format grades
+        item: Column(s) identifying the graded item
+        grade: Grade label column
+        by: Optional grouping column(s)
+
+    Returns:
+        DataFrame with the group and item columns and `grade` (NaN when the
+        item has no valid grade)
+    """
+    keys = ([] if by is None else ([by] if isinstance(by, str) else list(by))) + \
+        ([item] if isinstance(item, str) else list(item))
+    grouped = frame.groupby(keys, sort=True, observed=True)
+    item_codes = grouped.ngroup().to_numpy()
+    n_items = int(item_codes.max()) + 1 if len(frame) else 0
+    n_categories = len(GRADE_CATEGORIES)
+
+    codes = encode_labels(frame[grade])
+    known = codes >= 0
+    counts = np.bincount(item_codes[known] * n_categories + codes[known],
+                         minlength=n_items * n_categories).reshape(n_items, n_categories)
+    labels = np.array(GRADE_CATEGORIES, dtype=object)[counts.argmax(axis=-1)]
+    labels[counts.sum(axis=-1) == 0] = np.nan
+    return pd.DataFrame({grade: labels}, index=grouped.size().index).reset_index()
+
+
+def grouped_metrics(
+    frame: pd.DataFrame,
+    item: Union[str, List[str]],
+    rater: str,
+    grade: str,
+    by: Optional[Union[str, List[str]]] = None,
+    reference: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Every agreement, consistency and accuracy metric per group.
+
+    Args:
+        frame: Long-format grades, one row per (item, rater[, group])
+        item: Column(s) identifying the graded item
+        rater: Column identifying the rater (trial or agent)
+        grade: Grade label column ('A', 'B', 'C', 'D/E'; 'D' and 'E' map to 'D/E')
+        by: Grouping column(s), e.g. ['criterion', 'agent']; None for one row
+        reference: Optional column with the ground-truth grade of the item
+                   (e.g. the lecturer's); enables the accuracy columns, which
+                   compare the per-item modal grade against it
+
+    Returns:
+        DataFrame with the group columns and: n_items, n_raters, n_ratings,
+        fleiss_kappa, alpha_nominal, alpha_ordinal, alpha_interval,
+        perfect_agreement_pct, mean_sd, mean_cv, icc_2_1 (+ CI),
+        cronbach_alpha, sem; with a reference also n_compared, mae, rmse,
+        exact_match_pct, within_1_grade_pct, precision, recall, f1_score
+        (support-weighted), cohen_kappa and quadratic_kappa
+    """
+    group_codes, item_codes, rater_codes, shape, index = long_format_codes(frame, item, rater, by)
+    n_groups, n_items, _ = shape
+    n_categories = len(GRADE_CATEGORIES)
+
+    codes = np.full(shape, -1, dtype=np.int8)
+    valid = rater_codes >= 0
+    codes[group_codes[valid], item_codes[valid], rater_codes[valid]] = encode_labels(frame[grade])[valid]
+    counts = category_counts(codes.reshape(n_groups * n_items, -1), n_categories) \
+        .reshape(n_groups, n_items, n_categories).astype(float)
+    n_i = counts.sum(axis=-1)
+    scores = np.where(codes >= 0, GRADE_POINTS[codes.clip(0)], np.nan)
+
+    result = {
+        'n_items': (n_i > 0).sum(axis=-1),
+        'n_raters': (codes >= 0).any(axis=-2).sum(axis=-1),
+        'n_ratings': n_i.sum(axis=-1).astype(int),
+        'fleiss_kappa': _fleiss(counts),
+    }
+    for level in ('nominal', 'ordinal', 'interval'):
+        result[f'alpha_{level}'] = _krippendorff(counts, level)
+
+    # Trial-to-trial consistency (items rated at least twice)
+    rated = n_i >= 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n_rated = rated.sum(axis=-1)
+        result['perfect_agreement_pct'] = \
+            (rated & (counts.max(axis=-1) == n_i)).sum(axis=-1) / n_rated * 100
+        item_mean = np.nansum(scores, axis=-1) / n_i
+        item_sd = np.sqrt(np.nansum((scores - item_mean[..., None]) ** 2, axis=-1) / (n_i - 1))
+        result['mean_sd'] = np.where(rated, item_sd, 0).sum(axis=-1) / n_rated
+        result['mean_cv'] = np.where(rated, item_sd / item_mean * 100, 0).sum(axis=-1) / n_rated
+
+    reliability = reliability_coefficients(scores)
+    for key in ('icc_2_1', 'icc_2_1_ci_lower', 'icc_2_1_ci_upper', 'cronbach_alpha', 'sem'):
+        result[key] = reliability[key]
+
+    if reference is not None:
+        truth = np.full((n_groups, n_items), -1, dtype=np.int8)
+        reference_codes = encode_labels(frame[reference])
+        known = reference_codes >= 0
+        truth[group_codes[known], item_codes[known]] = reference_codes[known]
+
+        # Modal grade per item (ties -> better grade, like Series.mode()[0])
+        consensus = counts.argmax(axis=-1)
+        compared = (n_i > 0) & (truth >= 0)
+        cells = (np.arange(n_groups)[:, None] * n_categories + truth.clip(0)) * n_categories + consensus
+        confusion = np.bincount(cells[compared], minlength=n_groups * n_categories ** 2) \
+            .reshape(n_groups, n_categories, n_categories).astype(float)
+
+        difference = np.where(compared, GRADE_POINTS[consensus] - GRADE_POINTS[truth.clip(0)], 0.0)
+        n_compared = compared.sum(axis=-1)
+        support = confusion.sum(axis=-1)
+        predicted = confusion.sum(axis=-2)
+        hits = np.diagonal(confusion, axis1=-2, axis2=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(predicted > 0, hits / predicted, 0.0)
+            recall = np.where(support > 0, hits / support, 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+            share = support / n_compared[:, None]
+            result.update({
+                'n_compared': n_compared,
+                'mae': np.abs(difference).sum(axis=-1) / n_compared,
+                'rmse': np.sqrt((difference ** 2).sum(axis=-1) / n_compared),
+                'exact_match_pct': (compared & (difference == 0)).sum(axis=-1) / n_compared * 100,
+                'within_1_grade_pct': (compared & (np.abs(difference) <= 1)).sum(axis=-1) / n_compared * 100,
+                'precision': np.sum(share * precision, axis=-1),
+                'recall': np.sum(share * recall, axis=-1),
+                'f1_score': np.sum(share * f1, axis=-1),
+                'cohen_kappa': kappa_from_confusion(confusion),
+                'quadratic_kappa': kappa_from_confusion(confusion, 'quadratic'),
+            })
+
+    table = pd.DataFrame(result, index=index)
+    return table.reset_index() if index is not None else table.reset_index(drop=True)
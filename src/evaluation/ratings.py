@@ -0,0 +1,346 @@
+"""
+Rating Matrix
+
+Compact integer-coded store for categorical ratings, shared by all metric
+classes:
+- codes: int8 array (n_items, n_raters), -1 for missing
+- categories: codebook, code i means categories[i]
+- values: numeric value of every category (for ICC, SD, MAE, ...)
+- items / raters: label arrays of the rows and columns
+- group_index / group_offsets: items are stored group by group, so every
+  group is a contiguous block of rows
+
+Grade labels are mapped to codes once, through one codebook where 'D' and
+'E' both mean the rubric's 'D/E'. Selecting a group or a contiguous range
+of raters returns a view that shares the code array (no copy).
+
+Example:
+    matrix = RatingMatrix.from_frame(df, item='student_id', rater='trial_number',
+                                     grade='grade', by='question_number')
+    AgreementMetrics().fleiss_kappa(matrix.group(3))
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Rubric grade scale: categories, label -> code codebook and numeric points
+GRADE_CATEGORIES = ('A', 'B', 'C', 'D/E')
+GRADE_CODES = {'A': 0, 'B': 1, 'C': 2, 'D/E': 3, 'D': 3, 'E': 3}
+GRADE_POINTS = np.array([4.0, 3.0, 2.0, 1.0])
+
+
+def encode_ratings(ratings, categories: List) -> np.ndarray:
+    """
+    Map categorical ratings to integer codes.
+
+    Args:
+        ratings: Array-like of ratings (any shape)
+        categories: Possible categories; code i means categories[i]
+
+    Returns:
+        int8 array of the same shape (int16 for > 127 categories), -1 for
+        missing ratings and values outside categories
+    """
+    ratings = np.asarray(ratings)
+    dtype = np.int8 if len(categories) <= 127 else np.int16
+    codes = np.full(ratings.shape, -1, dtype=dtype)
+    for code, category in enumerate(categories):
+        codes[ratings == category] = code
+    return codes
+
+
+def encode_labels(labels, codebook: Optional[Dict] = None) -> np.ndarray:
+    """
+    Integer-encode labels through a codebook, looking up each distinct label once.
+
+    Args:
+        labels: Array-like of labels (any shape)
+        codebook: Label -> code mapping (default: GRADE_CODES)
+
+    Returns:
+        int8 codes of the same shape, -1 for missing or unknown labels
+    """
+    codebook = GRADE_CODES if codebook is None else codebook
+    labels = np.asarray(labels, dtype=object)
+    positions, uniques = pd.factorize(labels.ravel(), use_na_sentinel=True)
+    lookup = np.array([codebook.get(label, -1) for label in uniques] + [-1], dtype=np.int8)
+    return lookup[positions].reshape(labels.shape)  # position -1 (missing) picks the trailing -1
+
+
+def category_counts(codes: np.ndarray, n_categories: int) -> np.ndarray:
+    """
+    Frequency matrix of integer-coded ratings.
+
+    Args:
+        codes: Array of shape (n_items, n_raters), -1 (any negative or
+               >= n_categories) for missing
+        n_categories: Number of categories
+
+    Returns:
+        Array of shape (n_items, n_categories): raters per item and category
+    """
+    codes = np.asarray(codes)
+    n_items = codes.shape[0]
+    # One extra bin per item collects missing ratings and is dropped afterwards
+    bins = codes.astype(np.intp)
+    bins[(bins < 0) | (bins >= n_categories)] = n_categories
+    bins += np.arange(n_items, dtype=np.intp)[:, None] * (n_categories + 1)
+    counts = np.bincount(bins.ravel(), minlength=n_items * (n_categories + 1))
+    return counts.reshape(n_items, n_categories + 1)[:, :n_categories]
+
+
+class RatingMatrix:
+    """
+    Integer-coded (n_items, n_raters) ratings with codebook and index arrays.
+
+    Build it with from_labels / from_trials / from_wide / from_frame rather
+    than directly; the metric classes accept it wherever they take ratings.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        categories: Sequence = GRADE_CATEGORIES,
+        values: Optional[np.ndarray] = None,
+        items: Optional[np.ndarray] = None,
+        raters: Optional[np.ndarray] = None,
+        group_index: Optional[np.ndarray] = None,
+        group_offsets: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            codes: Integer codes (n_items, n_raters), -1 for missing
+            categories: Codebook (default: the rubric grades)
+            values: Numeric value per category (default: GRADE_POINTS for the
+                    rubric grades, otherwise n_categories .. 1)
+            items: Item labels (default: 0..n_items-1)
+            raters: Rater labels (default: 0..n_raters-1)
+            group_index: Group labels, in storage order
+            group_offsets: Row offsets of the groups (len(group_index) + 1)
+        """
+        codes = np.asarray(codes)
+        if codes.ndim != 2:
+            raise ValueError(f"codes must have shape (n_items, n_raters), got {codes.shape}")
+        self.codes = codes
+        self.categories = tuple(categories)
+        if values is None:
+            values = GRADE_POINTS if self.categories == GRADE_CATEGORIES \
+                else np.arange(len(self.categories), 0, -1, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.items = np.arange(codes.shape[0]) if items is None else np.asarray(items)
+        self.raters = np.arange(codes.shape[1]) if raters is None else np.asarray(raters)
+        if group_index is None:
+            group_index, group_offsets = np.array([None], dtype=object), np.array([0, codes.shape[0]])
+        self.group_index = np.asarray(group_index)
+        self.group_offsets = np.asarray(group_offsets)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_labels(
+        cls,
+        ratings,
+        categories: Sequence = GRADE_CATEGORIES,
+        codebook: Optional[Dict] = None,
+        items: Optional[Sequence] = None,
+        raters: Optional[Sequence] = None
+    ) -> 'RatingMatrix':
+        """
+        Encode an (n_items, n_raters) array of labels.
+
+        Args:
+            ratings: Labels, None/NaN for missing
+            categories: Codebook
+            codebook: Label -> code mapping (default: GRADE_CODES for the rubric
+                      grades, so 'D' and 'E' become 'D/E'; otherwise the
+                      position in categories)
+            items: Item labels
+            raters: Rater labels
+        """
+        categories = tuple(categories)
+        if codebook is None:
+            codebook = GRADE_CODES if categories == GRADE_CATEGORIES \
+                else {category: code for code, category in enumerate(categories)}
+        return cls(encode_labels(ratings, codebook), categories, items=items, raters=raters)
+
+    @classmethod
+    def from_trials(cls, trials: List[List[str]], **kwargs) -> 'RatingMatrix':
+        """Encode the metric classes' trial lists (n_trials lists of n_items grades)."""
+        return cls.from_labels(np.array(trials, dtype=object).T, **kwargs)
+
+    @classmethod
+    def from_wide(cls, frame: pd.DataFrame, **kwargs) -> 'RatingMatrix':
+        """Encode an items x raters DataFrame of labels (index/columns become labels)."""
+        return cls.from_labels(frame.to_numpy(dtype=object), items=frame.index.to_numpy(),
+                               raters=frame.columns.to_numpy(), **kwargs)
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pd.DataFrame,
+        item: Union[str, List[str]],
+        rater: str,
+        grade: str,
+        by: Optional[Union[str, List[str]]] = None,
+        categories: Sequence = GRADE_CATEGORIES,
+        codebook: Optional[Dict] = None
+    ) -> 'RatingMatrix':
+        """
+        Encode a long-format table (one row per item and rater).
+
+        Items are sorted by group so each group is a contiguous row block;
+        cells without a row stay missing. When a cell occurs more than once
+        the last row wins.
+
+        Args:
+            frame: Long-format ratings
+            item: Column(s) identifying the item
+            rater: Column identifying the rater
+            grade: Label column
+            by: Optional grouping column(s)
+            categories: Codebook
+            codebook: Label -> code mapping (see from_labels)
+        """
+        categories = tuple(categories)
+        if codebook is None:
+            codebook = GRADE_CODES if categories == GRADE_CATEGORIES \
+                else {category: code for code, category in enumerate(categories)}
+        groups = [] if by is None else ([by] if isinstance(by, str) else list(by))
+        keys = groups + ([item] if isinstance(item, str) else list(item))
+
+        grouped = frame.groupby(keys, sort=True, observed=True)
+        item_codes = grouped.ngroup().to_numpy()
+        item_index = grouped.size().index
+        rater_codes, rater_index = pd.factorize(frame[rater], sort=True)
+
+        codes = np.full((len(item_index), len(rater_index)), -1, dtype=np.int8)
+        valid = rater_codes >= 0
+        codes[item_codes[valid], rater_codes[valid]] = encode_labels(frame[grade].to_numpy(), codebook)[valid]
+
+        if groups:
+            # Items are ordered by group: a group's block starts at its first item
+            group_keys = item_index.droplevel(list(range(len(groups), item_index.nlevels))) \
+                if item_index.nlevels > 1 else item_index
+            starts = np.flatnonzero(np.r_[True, group_keys[1:] != group_keys[:-1]])
+            group_index = group_keys[starts].to_numpy()
+            group_offsets = np.r_[starts, len(item_index)]
+            item_labels = item_index.droplevel(list(range(len(groups)))).to_numpy()
+        else:
+            group_index = group_offsets = None
+            item_labels = item_index.to_numpy()
+
+        return cls(codes, categories, items=item_labels, raters=np.asarray(rater_index),
+                   group_index=group_index, group_offsets=group_offsets)
+
+    # ------------------------------------------------------------------
+    # Properties and conversions
+    # ------------------------------------------------------------------
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.codes.shape
+
+    @property
+    def n_items(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def n_raters(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def n_categories(self) -> int:
+        return len(self.categories)
+
+    @property
+    def missing(self) -> np.ndarray:
+        """Boolean mask of missing ratings."""
+        return self.codes < 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+    def __len__(self) -> int:
+        return self.n_items
+
+    def __repr__(self) -> str:
+        return (f"RatingMatrix({self.n_items} items x {self.n_raters} raters, "
+                f"{len(self.group_index)} groups, categories={list(self.categories)})")
+
+    def numeric(self) -> np.ndarray:
+        """Ratings as category values (float, NaN for missing)."""
+        return np.where(self.codes >= 0, self.values[self.codes.clip(0)], np.nan)
+
+    def counts(self) -> np.ndarray:
+        """(n_items, n_categories) frequency matrix."""
+        return category_counts(self.codes, self.n_categories)
+
+    def labels(self) -> np.ndarray:
+        """Ratings as category labels (object array, None for missing)."""
+        labels = np.array(self.categories + (None,), dtype=object)
+        return labels[np.where(self.codes >= 0, self.codes, self.n_categories)]
+
+    def column(self, rater=None) -> np.ndarray:
+        """Codes of one rater as a 1-D view (default: the only rater)."""
+        if rater is None:
+            if self.n_raters != 1:
+                raise ValueError(f"Matrix has {self.n_raters} raters; name one")
+            return self.codes[:, 0]
+        return self.codes[:, self._rater_position(rater)]
+
+    # ------------------------------------------------------------------
+    # Slicing (views share the code array)
+    # ------------------------------------------------------------------
+
+    def _view(self, codes, items=None, raters=None, group_index=None, group_offsets=None) -> 'RatingMatrix':
+        return RatingMatrix(
+            codes, self.categories, self.values,
+            items=self.items if items is None else items,
+            raters=self.raters if raters is None else raters,
+            group_index=group_index, group_offsets=group_offsets
+        )
+
+    def _rater_position(self, rater) -> int:
+        positions = np.flatnonzero(self.raters == rater)
+        if len(positions) == 0:
+            raise KeyError(f"Unknown rater: {rater}")
+        return int(positions[0])
+
+    def select_raters(self, raters: Union[slice, Sequence, object]) -> 'RatingMatrix':
+        """
+        Columns of some raters.
+
+        Args:
+            raters: Positional slice, one rater label or a list of labels.
+                    Slices, single raters and consecutive labels give views;
+                    other selections copy the codes.
+        """
+        if isinstance(raters, slice):
+            columns = raters
+        else:
+            labels = list(raters) if isinstance(raters, (list, tuple, np.ndarray, pd.Index)) else [raters]
+            positions = [self._rater_position(label) for label in labels]
+            consecutive = all(b == a + 1 for a, b in zip(positions, positions[1:]))
+            columns = slice(positions[0], positions[-1] + 1) if positions and consecutive else positions
+        return self._view(self.codes[:, columns], raters=self.raters[columns],
+                          group_index=self.group_index, group_offsets=self.group_offsets)
+
+    def group(self, label) -> 'RatingMatrix':
+        """Rows of one group as a view."""
+        positions = [i for i, key in enumerate(self.group_index) if key == label]
+        if not positions:
+            raise KeyError(f"Unknown group: {label}")
+        start, stop = self.group_offsets[positions[0]], self.group_offsets[positions[0] + 1]
+        return self._view(self.codes[start:stop], items=self.items[start:stop])
+
+    def groups(self) -> Iterator[Tuple[object, 'RatingMatrix']]:
+        """Iterate (group label, view) in storage order."""
+        for position, label in enumerate(self.group_index):
+            start, stop = self.group_offsets[position], self.group_offsets[position + 1]
+            yield label, self._view(self.codes[start:stop], items=self.items[start:stop])
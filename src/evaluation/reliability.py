@@ -0,0 +1,360 @@
+"""
+Reliability Engine
+
+One two-way ANOVA (items x raters) from which every reliability coefficient
+is derived:
+- ICC(1,1), ICC(2,1), ICC(3,1) and their average-measure forms ICC(1,k),
+  ICC(2,k), ICC(3,k) (Shrout & Fleiss, 1979), with F-based confidence
+  intervals (McGraw & Wong, 1996)
+- Cronbach's alpha (equal to ICC(3,k))
+- Standard error of measurement (SD * sqrt(1 - ICC(2,1)))
+
+Scores are NumPy arrays of shape (..., n_items, n_raters) with NaN for
+missing cells; leading axes are independent groups (criteria, questions,
+models) that are all computed in one vectorized pass. Missing cells are
+replaced by their least-squares estimates under the additive item + rater
+model (Yates' method) and the error degrees of freedom are reduced by the
+number of estimated cells, so one missing trial no longer drops the item.
+Items or raters without any observed score are ignored.
+"""
+
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.stats import f
+
+
+ICC_TYPES = ('ICC(1,1)', 'ICC(2,1)', 'ICC(3,1)', 'ICC(1,k)', 'ICC(2,k)', 'ICC(3,k)')
+
+
+def icc_key(icc_type: str) -> str:
+    """Result key of an ICC type: 'ICC(2,1)' -> 'icc_2_1'."""
+    return 'icc_' + icc_type[4:-1].replace(',', '_')
+
+
+def _complete(scores: np.ndarray, max_iter: int, tol: float):
+    """
+    Fill missing cells with the additive-model estimates.
+
+    Returns:
+        (completed scores, active cell mask, n_items, n_raters, n_estimated)
+    """
+    observed = ~np.isnan(scores)
+    rows = observed.any(axis=-1)
+    cols = observed.any(axis=-2)
+    active = rows[..., :, None] & cols[..., None, :]
+    missing = active & ~observed
+    n = rows.sum(axis=-1)
+    k = cols.sum(axis=-1)
+
+    completed = np.where(observed, scores, 0.0)
+    if missing.any():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Start from the item means, then iterate row + column - grand mean
+            start = completed.sum(axis=-1) / observed.sum(axis=-1)
+            completed = np.where(missing, start[..., :, None], completed)
+            for _ in range(max_iter):
+                row_means = completed.sum(axis=-1) / k[..., None]
+                col_means = completed.sum(axis=-2) / n[..., None]
+                grand_mean = completed.sum(axis=(-2, -1)) / (n * k)
+                fill = row_means[..., :, None] + col_means[..., None, :] - grand_mean[..., None, None]
+                change = np.abs(fill - completed)[missing].max()
+                completed = np.where(missing, fill, completed)
+                if change < tol:
+                    break
+    return completed, active, n, k, missing.sum(axis=(-2, -1))
+
+
+def anova_mean_squares(
+    scores: np.ndarray,
+    max_iter: int = 500,
+    tol: float = 1e-10
+) -> Dict[str, np.ndarray]:
+    """
+    Two-way ANOVA (items x raters, one score per cell) over the last two axes.
+
+    Args:
+        scores: Array (..., n_items, n_raters), NaN for missing cells
+        max_iter: Iterations of the missing-cell estimation
+        tol: Convergence tolerance of the missing-cell estimation
+
+    Returns:
+        Dict of arrays shaped like the leading axes: n_items, n_raters,
+        n_missing, mean, sd, ms_rows, ms_cols, ms_error, ms_within and the
+        matching df_* degrees of freedom
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.ndim < 2:
+        raise ValueError("scores must have shape (..., n_items, n_raters)")
+
+    completed, active, n, k, n_missing = _complete(scores, max_iter, tol)
+    observed = active & ~np.isnan(scores)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grand_mean = completed.sum(axis=(-2, -1)) / (n * k)
+        row_dev = np.where(active.any(axis=-1), completed.sum(axis=-1) / k[..., None] - grand_mean[..., None], 0.0)
+        col_dev = np.where(active.any(axis=-2), completed.sum(axis=-2) / n[..., None] - grand_mean[..., None], 0.0)
+        residual = np.where(active, completed - grand_mean[..., None, None], 0.0)
+
+        ss_total = np.sum(residual ** 2, axis=(-2, -1))
+        ss_rows = k * np.sum(row_dev ** 2, axis=-1)
+        ss_cols = n * np.sum(col_dev ** 2, axis=-1)
+        ss_error = ss_total - ss_rows - ss_cols
+
+        df_rows = n - 1
+        df_cols = k - 1
+        df_error = (n - 1) * (k - 1) - n_missing
+        df_within = n * (k - 1) - n_missing
+
+        n_observed = observed.sum(axis=(-2, -1))
+        observed_scores = np.where(observed, scores, 0.0)
+        mean = observed_scores.sum(axis=(-2, -1)) / n_observed
+        sd = np.sqrt(np.sum(np.where(observed, scores - mean[..., None, None], 0.0) ** 2,
+                            axis=(-2, -1)) / n_observed)
+
+        return {
+            'n_items': n,
+            'n_raters': k,
+            'n_missing': n_missing,
+            'mean': mean,
+            'sd': sd,
+            'ms_rows': ss_rows / df_rows,
+            'ms_cols': ss_cols / df_cols,
+            'ms_error': ss_error / df_error,
+            'ms_within': (ss_cols + ss_error) / df_within,
+            'df_rows': df_rows,
+            'df_cols': df_cols,
+            'df_error': df_error,
+            'df_within': df_within,
+        }
+
+
+def icc_from_mean_squares(
+    ms_rows: np.ndarray,
+    ms_cols: np.ndarray,
+    ms_error: np.ndarray,
+    ms_within: np.ndarray,
+    n: np.ndarray,
+    k: np.ndarray,
+    icc_type: str = 'ICC(2,1)'
+) -> np.ndarray:
+    """
+    ICC of the given type from ANOVA mean squares (Shrout & Fleiss, 1979).
+
+    Args:
+        ms_rows, ms_cols, ms_error, ms_within: Mean squares (broadcastable)
+        n: Number of items
+        k: Number of raters
+        icc_type: One of ICC_TYPES
+
+    Returns:
+        ICC values
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if icc_type == 'ICC(1,1)':
+            return (ms_rows - ms_within) / (ms_rows + (k - 1) * ms_within)
+        if icc_type == 'ICC(2,1)':
+            return (ms_rows - ms_error) / (ms_rows + (k - 1) * ms_error + k * (ms_cols - ms_error) / n)
+        if icc_type == 'ICC(3,1)':
+            return (ms_rows - ms_error) / (ms_rows + (k - 1) * ms_error)
+        if icc_type == 'ICC(1,k)':
+            return (ms_rows - ms_within) / ms_rows
+        if icc_type == 'ICC(2,k)':
+            return (ms_rows - ms_error) / (ms_rows + (ms_cols - ms_error) / n)
+        if icc_type == 'ICC(3,k)':
+            return (ms_rows - ms_error) / ms_rows
+    raise ValueError(f"Unknown ICC type: {icc_type} (expected one of {ICC_TYPES})")
+
+
+def _confidence_intervals(anova: Dict[str, np.ndarray], icc: Dict[str, np.ndarray],
+                          confidence: float) -> Dict[str, np.ndarray]:
+    """F-based confidence intervals of every ICC type (McGraw & Wong, 1996)."""
+    q = 1 - (1 - confidence) / 2
+    n, k = anova['n_items'], anova['n_raters']
+    ms_rows, ms_cols, ms_error = anova['ms_rows'], anova['ms_cols'], anova['ms_error']
+    df_rows, df_error, df_within = anova['df_rows'], anova['df_error'], anova['df_within']
+    bounds = {}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # One-way and consistency models: exact F intervals
+        for model, ms_residual, df_residual in (('1', anova['ms_within'], df_within),
+                                                 ('3', ms_error, df_error)):
+            f_obs = ms_rows / ms_residual
+            f_lower = f_obs / f.ppf(q, df_rows, df_residual)
+            f_upper = f_obs * f.ppf(q, df_residual, df_rows)
+            bounds[f'ICC({model},1)'] = ((f_lower - 1) / (f_lower + k - 1),
+                                         (f_upper - 1) / (f_upper + k - 1))
+            bounds[f'ICC({model},k)'] = (1 - 1 / f_lower, 1 - 1 / f_upper)
+
+        # Absolute agreement: Satterthwaite approximation of the denominator df
+        rho = icc['ICC(2,1)']
+        a = k * rho / (n * (1 - rho))
+        b = 1 + k * rho * (n - 1) / (n * (1 - rho))
+        v = (a * ms_cols + b * ms_error) ** 2 / ((a * ms_cols) ** 2 / (k - 1) + (b * ms_error) ** 2 / df_error)
+        f_star_upper = f.ppf(q, df_rows, v)
+        f_star_lower = f.ppf(q, v, df_rows)
+        scale = k * ms_cols + (k * n - k - n) * ms_error
+        lower = n * (ms_rows - f_star_upper * ms_error) / (f_star_upper * scale + n * ms_rows)
+        upper = n * (f_star_lower * ms_rows - ms_error) / (scale + n * f_star_lower * ms_rows)
+        bounds['ICC(2,1)'] = (lower, upper)
+        bounds['ICC(2,k)'] = (lower * k / (1 + lower * (k - 1)), upper * k / (1 + upper * (k - 1)))
+    return bounds
+
+
+def reliability_coefficients(
+    scores: np.ndarray,
+    confidence: float = 0.95
+) -> Dict[str, Union[float, np.ndarray]]:
+    """
+    All ICC types, Cronbach's alpha and SEM from one ANOVA.
+
+    Args:
+        scores: Array (..., n_items, n_raters), NaN for missing cells
+        confidence: Confidence level of the ICC intervals
+
+    Returns:
+        Dict with icc_1_1 .. icc_3_k, their *_ci_lower / *_ci_upper bounds,
+        cronbach_alpha, sem, f_statistic, f_p_value and the ANOVA entries of
+        anova_mean_squares. Floats for a single (n_items, n_raters) matrix,
+        arrays over the leading axes otherwise.
+    """
+    anova = anova_mean_squares(scores)
+    args = (anova['ms_rows'], anova['ms_cols'], anova['ms_error'], anova['ms_within'],
+            anova['n_items'], anova['n_raters'])
+    icc = {icc_type: icc_from_mean_squares(*args, icc_type=icc_type) for icc_type in ICC_TYPES}
+    bounds = _confidence_intervals(anova, icc, confidence)
+
+    result = {}
+    for icc_type in ICC_TYPES:
+        name = icc_key(icc_type)
+        result[name] = icc[icc_type]
+        result[f'{name}_ci_lower'], result[f'{name}_ci_upper'] = bounds[icc_type]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_statistic = anova['ms_rows'] / anova['ms_error']
+        result['cronbach_alpha'] = icc['ICC(3,k)']
+        result['sem'] = anova['sd'] * np.sqrt(1 - icc['ICC(2,1)'])
+        result['f_statistic'] = f_statistic
+        result['f_p_value'] = f.sf(f_statistic, anova['df_rows'], anova['df_error'])
+    result.update(anova)
+
+    if np.ndim(result['icc_2_1']) == 0:
+        return {key: int(value) if key.startswith(('n_', 'df_')) and np.isfinite(value) else float(value)
+                for key, value in result.items()}
+    return result
+
+
+def long_format_codes(
+    frame: pd.DataFrame,
+    item: Union[str, List[str]],
+    rater: str,
+    by: Optional[Union[str, List[str]]] = None
+):
+    """
+    Dense integer positions of a long-format table.
+
+    Groups and raters are numbered 0..G-1 / 0..K-1 over the whole table,
+    items 0..N_g-1 within their group.
+
+    Args:
+        frame: Long-format table
+        item: Column(s) identifying the rated item
+        rater: Column identifying the rater
+        by: Optional grouping column(s)
+
+    Returns:
+        (group_codes, item_codes, rater_codes, shape (G, N, K), group index
+        or None); rater code -1 marks rows without a rater
+    """
+    items = [item] if isinstance(item, str) else list(item)
+    groups = [] if by is None else ([by] if isinstance(by, str) else list(by))
+
+    if groups:
+        grouped = frame.groupby(groups, sort=True, observed=True)
+        group_codes = grouped.ngroup().to_numpy()
+        index = grouped.size().index
+    else:
+        group_codes = np.zeros(len(frame), dtype=np.intp)
+        index = None
+
+    item_codes = frame.groupby(groups + items, sort=True, observed=True).ngroup().to_numpy()
+    if len(frame):
+        # ngroup is sorted by group first: offset each group's items to start at 0
+        first = np.full(group_codes.max() + 1, np.iinfo(np.intp).max)
+        np.minimum.at(first, group_codes, item_codes)
+        item_codes = item_codes - first[group_codes]
+    rater_codes, _ = pd.factorize(frame[rater], sort=True)
+
+    shape = tuple(int(codes.max()) + 1 if len(frame) else 0
+                  for codes in (group_codes, item_codes, rater_codes))
+    return group_codes, item_codes, rater_codes, shape, index
+
+
+def score_matrix(
+    frame: pd.DataFrame,
+    item: Union[str, List[str]],
+    rater: str,
+    value: str,
+    by: Optional[Union[str, List[str]]] = None
+):
+    """
+    Pivot long-format scores into one padded (groups, items, raters) array.
+
+    Rows are scattered into the array in one pass; absent (group, item,
+    rater) cells and padding stay NaN. When a cell occurs more than once the
+    last row wins.
+
+    Args:
+        frame: Long-format scores
+        item: Column(s) identifying the rated item (e.g. student, question)
+        rater: Column identifying the rater (e.g. trial_number)
+        value: Numeric score column
+        by: Optional grouping column(s) (e.g. criterion, question_number)
+
+    Returns:
+        (scores array, group index or None)
+    """
+    group_codes, item_codes, rater_codes, shape, index = long_format_codes(frame, item, rater, by)
+    scores = np.full(shape, np.nan)
+    valid = rater_codes >= 0
+    scores[group_codes[valid], item_codes[valid], rater_codes[valid]] = \
+        pd.to_numeric(frame[value], errors='coerce').to_numpy(dtype=float)[valid]
+    return scores, index
+
+
+def reliability_by_group(
+    frame: pd.DataFrame,
+    item: Union[str, List[str]],
+    rater: str,
+    value: str,
+    by: Optional[Union[str, List[str]]] = None,
+    confidence: float = 0.95
+) -> pd.DataFrame:
+    """
+    Reliability coefficients per group of a long-format score table.
+
+    All groups are pivoted into one padded array and computed together, e.g.
+    per criterion and question:
+
+        reliability_by_group(df, item='student_id', rater='trial_number',
+                             value='points', by=['criterion', 'question_number'])
+
+    Args:
+        frame: Long-format scores
+        item: Column(s) identifying the rated item
+        rater: Column identifying the rater
+        value: Numeric score column
+        by: Grouping column(s); None for a single overall row
+        confidence: Confidence level of the ICC intervals
+
+    Returns:
+        Tidy DataFrame: the group columns followed by the entries of
+        reliability_coefficients
+    """
+    scores, index = score_matrix(frame, item, rater, value, by)
+    coefficients = reliability_coefficients(scores, confidence)
+    result = pd.DataFrame(coefficients, index=index)
+    for column in result.columns:
+        if column.startswith(('n_', 'df_')):
+            result[column] = result[column].astype(int)
+    return result.reset_index() if index is not None else result.reset_index(drop=True)
@@ -0,0 +1,253 @@
+"""
+Streaming Reliability
+
+Incremental consistency and reliability statistics for an experiment that
+is still running. Every rating updates a handful of running sums, and the
+metrics are computed from those sums in O(1), without re-reading earlier
+results:
+- Welford mean / variance per item (trial-to-trial SD)
+- Running category counts per item (Fleiss' kappa, perfect agreement)
+- Two-way ANOVA sums of squares (ICC types, Cronbach's alpha, SEM)
+
+Each aggregate is a sum of per-item (or per-rater) terms, so a rating
+that is added, replaced or removed changes the totals by the difference
+between the item's terms before and after the update. The totals are
+plain dicts (DatabaseManager persists them in its live_* tables).
+
+With a complete design (every item rated by every rater) the ANOVA equals
+the one of reliability_coefficients. While trials are still missing,
+SS_error is the residual of the unweighted decomposition and its degrees
+of freedom are reduced by the number of missing cells, so the ICCs are
+approximate until the experiment finishes.
+
+Example:
+    live = StreamingReliability()
+    live.update(('student_00', 1), trial_number, 'B', 3.0)
+    print(live.metrics()['icc_2_1'], live.metrics()['fleiss_kappa'])
+"""
+
+import math
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .reliability import ICC_TYPES, _confidence_intervals, icc_from_mean_squares, icc_key
+
+
+# Running sums of the totals dict (besides the global n / mean / m2 and counts)
+TERM_KEYS = (
+    'n_items', 'item_ss', 'within_ss', 'rated_items', 'agreement_sum', 'perfect_items', 'sd_sum',
+    'n_raters', 'rater_ss',
+)
+
+
+def welford_update(n: int, mean: float, m2: float, x: float, weight: int = 1) -> Tuple[int, float, float]:
+    """
+    Add (weight=1) or remove (weight=-1) one value from Welford's running moments.
+
+    Returns:
+        (n, mean, m2) where m2 is the sum of squared deviations from the mean
+    """
+    n_new = n + weight
+    if n_new <= 0:
+        return 0, 0.0, 0.0
+    delta = x - mean
+    mean_new = mean + weight * delta / n_new
+    return n_new, mean_new, max(m2 + weight * delta * (x - mean_new), 0.0)
+
+
+def item_terms(n: int, mean: float, m2: float, counts: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Contribution of one item (n ratings, moments, grade counts) to the totals.
+
+    Items rated fewer than two times count towards the ANOVA but not towards
+    kappa and the trial-to-trial statistics, like the batch metrics.
+    """
+    terms = {'n_items': float(n > 0), 'item_ss': n * mean * mean, 'within_ss': m2}
+    if n >= 2:
+        agreeing = sum(c * (c - 1) for c in counts.values())
+        terms.update({
+            'rated_items': 1.0,
+            'agreement_sum': agreeing / (n * (n - 1)),
+            'perfect_items': float(max(counts.values(), default=0) == n),
+            'sd_sum': math.sqrt(m2 / (n - 1)),
+            'counts': counts,
+        })
+    return terms
+
+
+def rater_terms(n: int, mean: float) -> Dict[str, float]:
+    """Contribution of one rater (trial) to the totals."""
+    return {'n_raters': float(n > 0), 'rater_ss': n * mean * mean}
+
+
+def empty_totals() -> Dict[str, Any]:
+    """Totals of an empty experiment."""
+    totals: Dict[str, Any] = {'n': 0, 'mean': 0.0, 'm2': 0.0, 'counts': {}}
+    totals.update({key: 0.0 for key in TERM_KEYS})
+    return totals
+
+
+def add_terms(totals: Dict[str, Any], terms: Dict[str, Any], sign: int = 1):
+    """Add (sign=1) or subtract (sign=-1) item or rater terms from the totals in place."""
+    for key, value in terms.items():
+        if key == 'counts':
+            for grade, count in value.items():
+                totals['counts'][grade] = totals['counts'].get(grade, 0) + sign * count
+                if totals['counts'][grade] == 0:
+                    del totals['counts'][grade]
+        else:
+            totals[key] += sign * value
+
+
+def live_metrics(totals: Dict[str, Any], confidence: float = 0.95) -> Dict[str, float]:
+    """
+    Consistency and reliability metrics from running totals (O(1)).
+
+    Args:
+        totals: Totals dict (see empty_totals)
+        confidence: Confidence level of the ICC(2,1) interval
+
+    Returns:
+        Dictionary with n_ratings, n_items, n_raters, n_missing, mean, sd,
+        fleiss_kappa, perfect_agreement_pct, mean_sd, every ICC type
+        (icc_1_1 ... icc_3_k), icc_2_1_ci_lower / _ci_upper,
+        cronbach_alpha and sem (NaN where undefined)
+    """
+    n_ratings, grand_mean = totals['n'], totals['mean']
+    n, k = totals['n_items'], totals['n_raters']
+    rated = totals['rated_items']
+
+    # Fleiss' kappa over items rated at least twice
+    assigned = sum(totals['counts'].values())
+    p_expected = sum((count / assigned) ** 2 for count in totals['counts'].values()) if assigned else math.nan
+    p_observed = totals['agreement_sum'] / rated if rated else math.nan
+    fleiss = (p_observed - p_expected) / (1 - p_expected) if rated and p_expected < 1 else math.nan
+
+    # Two-way ANOVA; df_error loses one degree of freedom per missing cell
+    ss_rows = totals['item_ss'] - n_ratings * grand_mean ** 2
+    ss_cols = totals['rater_ss'] - n_ratings * grand_mean ** 2
+    ss_error = totals['m2'] - ss_rows - ss_cols
+
+    def denoise(ss):
+        # Cancellation noise of the running sums; exact zero e.g. on perfect consistency
+        return 0.0 if abs(ss) <= 1e-9 * totals['m2'] else ss
+    ss_rows, ss_cols, ss_error = denoise(ss_rows), denoise(ss_cols), denoise(ss_error)
+    df_rows, df_cols = n - 1, k - 1
+    df_error, df_within = n_ratings - n - k + 1, n_ratings - n
+
+    def mean_square(ss, df):
+        # numpy floats, so zero mean squares give inf / NaN ICCs instead of raising
+        return np.float64(ss / df if df > 0 else math.nan)
+
+    anova = {
+        'n_items': n, 'n_raters': k,
+        'ms_rows': mean_square(ss_rows, df_rows), 'ms_cols': mean_square(ss_cols, df_cols),
+        'ms_error': mean_square(ss_error, df_error), 'ms_within': mean_square(totals['within_ss'], df_within),
+        'df_rows': df_rows, 'df_error': df_error, 'df_within': df_within,
+    }
+    args = (anova['ms_rows'], anova['ms_cols'], anova['ms_error'], anova['ms_within'], n, k)
+    icc = {icc_type: np.float64(icc_from_mean_squares(*args, icc_type=icc_type)) for icc_type in ICC_TYPES}
+    ci_lower, ci_upper = _confidence_intervals(anova, icc, confidence)['ICC(2,1)'] \
+        if n > 1 and k > 1 and df_error > 0 else (math.nan, math.nan)
+    sd = math.sqrt(totals['m2'] / n_ratings) if n_ratings else math.nan
+
+    metrics = {
+        'n_ratings': int(n_ratings),
+        'n_items': int(n),
+        'n_raters': int(k),
+        'n_missing': int(n * k - n_ratings),
+        'mean': grand_mean if n_ratings else math.nan,
+        'sd': sd,
+        'fleiss_kappa': fleiss,
+        'perfect_agreement_pct': totals['perfect_items'] / rated * 100 if rated else math.nan,
+        'mean_sd': totals['sd_sum'] / rated if rated else math.nan,
+    }
+    metrics.update({icc_key(icc_type): float(value) for icc_type, value in icc.items()})
+    metrics['icc_2_1_ci_lower'] = float(ci_lower)
+    metrics['icc_2_1_ci_upper'] = float(ci_upper)
+    metrics['cronbach_alpha'] = float(icc['ICC(3,k)'])
+    with np.errstate(invalid='ignore'):
+        metrics['sem'] = float(sd * np.sqrt(1 - icc['ICC(2,1)']))
+    return metrics
+
+
+class StreamingReliability:
+    """
+    In-memory running statistics of one set of ratings (e.g. one criterion
+    of one experiment), updated one rating at a time.
+    """
+
+    def __init__(
+        self,
+        totals: Optional[Dict[str, Any]] = None,
+        items: Optional[Dict[Hashable, Tuple[int, float, float, Dict[str, int]]]] = None,
+        raters: Optional[Dict[Hashable, Tuple[int, float]]] = None
+    ):
+        """
+        Args:
+            totals: Running totals to continue from (default: empty)
+            items: Item -> (n, mean, m2, grade counts) of the items that will change
+            raters: Rater -> (n, mean) of the raters that will change
+        """
+        self.totals = empty_totals() if totals is None else totals
+        self.items = {} if items is None else items
+        self.raters = {} if raters is None else raters
+        self.cells: Dict[Tuple[Hashable, Hashable], Tuple[str, float]] = {}
+
+    def change(self, item: Hashable, rater: Hashable, grade: str, points: float, weight: int = 1):
+        """
+        Add (weight=1) or remove (weight=-1) one rating.
+
+        Unlike update, earlier ratings of the cell are not tracked: the
+        caller removes them itself (DatabaseManager reads them back from
+        criterion_grades).
+        """
+        n, mean, m2, counts = self.items.get(item, (0, 0.0, 0.0, {}))
+        add_terms(self.totals, item_terms(n, mean, m2, counts), -1)
+        counts = dict(counts)
+        counts[grade] = counts.get(grade, 0) + weight
+        if counts[grade] == 0:
+            del counts[grade]
+        n, mean, m2 = welford_update(n, mean, m2, points, weight)
+        add_terms(self.totals, item_terms(n, mean, m2, counts))
+        if n:
+            self.items[item] = (n, mean, m2, counts)
+        else:
+            del self.items[item]
+
+        n, mean = self.raters.get(rater, (0, 0.0))
+        add_terms(self.totals, rater_terms(n, mean), -1)
+        n, mean, _ = welford_update(n, mean, 0.0, points, weight)
+        add_terms(self.totals, rater_terms(n, mean))
+        if n:
+            self.raters[rater] = (n, mean)
+        else:
+            del self.raters[rater]
+
+        total = welford_update(self.totals['n'], self.totals['mean'], self.totals['m2'], points, weight)
+        self.totals['n'], self.totals['mean'], self.totals['m2'] = total
+
+    def update(self, item: Hashable, rater: Hashable, grade: str, points: float):
+        """
+        Record the rating of an item by a rater (replacing an earlier one).
+
+        Args:
+            item: Item key, e.g. (student_id, question_number)
+            rater: Rater key, e.g. the trial number
+            grade: Grade label (category for kappa)
+            points: Numeric value of the grade
+        """
+        self.remove(item, rater)
+        self.change(item, rater, grade, float(points), 1)
+        self.cells[item, rater] = (grade, float(points))
+
+    def remove(self, item: Hashable, rater: Hashable):
+        """Forget the rating of an item by a rater (no-op if there is none)."""
+        previous = self.cells.pop((item, rater), None)
+        if previous is not None:
+            self.change(item, rater, *previous, -1)
+
+    def metrics(self, confidence: float = 0.95) -> Dict[str, float]:
+        """Current metrics (see live_metrics)."""
+        return live_metrics(self.totals, confidence)
@@ -3,6 +3,7 @@ Experiment Runner
 Runs 4x trials for each model (ChatGPT and Gemini)
 """
 
+import asyncio
 import json
 import time
 from pathlib import Path
@@ -26,9 +27,11 @@ class ExperimentRunner:
         num_trials: int = 4,
         results_dir: str = "data/results",
         save_interval: int = 10,
-        checkpoint_enabled: bool = True
+        checkpoint_enabled: bool = True,
+        max_concurrency: int = 1
     ):
         self.num_trials = num_trials
+        self.max_concurrency = max_concurrency  # >1 grades each trial with the async path
         self.results_dir = Path(results_dir)
         self.save_interval = save_interval
         self.checkpoint_enabled = checkpoint_enabled
@@ -111,6 +114,9 @@ class ExperimentRunner:
         
         self.logger.info(f"Starting {model.upper()} Trial {trial}/{self.num_trials}")
         
+        if self.max_concurrency > 1:
+            return self._run_single_trial_async(agent, essays, model, trial)
+        
         results = []
         failed_count = 0
         
@@ -148,6 +154,51 @@ class ExperimentRunner:
         
         return results
     
+    def _run_single_trial_async(
+        self,
+        agent,
+        essays: List[Dict[str, Any]],
+        model: str,
+        trial: int
+    ) -> List[Dict[str, Any]]:
+        """Run a single trial with up to max_concurrency in-flight API calls"""
+        results = []
+        failed_count = 0
+        pbar = tqdm(total=len(essays), desc=f"{model.upper()} Trial {trial}", unit="essay")
+        
+        def on_result(essay, outcome):
+            nonlocal failed_count
+            pbar.update(1)
+            if isinstance(outcome, Exception):
+                self.logger.error(f"Error grading essay {essay['student_id']}-{essay['question_id']}: {outcome}")
+                failed_count += 1
+                self.metadata["failed_essays"] += 1
+                pbar.set_postfix({"failed": failed_count})
+                return
+            
+            results.append(outcome.to_dict())
+            
+            # Save checkpoint periodically
+            if self.checkpoint_enabled and len(results) % self.save_interval == 0:
+                self._save_checkpoint(model, trial, results)
+                pbar.set_postfix({"saved": len(results), "failed": failed_count})
+        
+        asyncio.run(agent.grade_batch_async(
+            essays,
+            self.rubric,
+            trial=trial,
+            max_concurrency=self.max_concurrency,
+            on_result=on_result
+        ))
+        pbar.close()
+        
+        self.logger.info(f"Completed {model.upper()} Trial {trial}: {len(results)}/{len(essays)} essays graded")
+        
+        if failed_count > 0:
+            self.logger.warning(f"{failed_count} essays failed during {model.upper()} Trial {trial}")
+        
+        return results
+    
     def run_full_experiment(
         self,
         essays: List[Dict[str, Any]],